@@ -0,0 +1,22 @@
+"""Add parsed features to form submissions
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Parsed at ingest; submissions without features are parsed when read
+    op.add_column('form_submissions', sa.Column('features', sa.JSON(), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column('form_submissions', 'features')
@@ -0,0 +1,26 @@
+"""Add AI enrichment status to dashboards
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19 10:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Existing dashboards are not re-enriched
+    op.add_column('dashboards', sa.Column('ai_status', sa.String(length=20), nullable=True, server_default='completed'))
+    op.add_column('dashboards', sa.Column('ai_attempts', sa.Integer(), nullable=True, server_default='0'))
+    op.add_column('dashboards', sa.Column('ai_retry_at', sa.DateTime(), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column('dashboards', 'ai_retry_at')
+    op.drop_column('dashboards', 'ai_attempts')
+    op.drop_column('dashboards', 'ai_status')
@@ -0,0 +1,22 @@
+"""Add AI adjustment status to lead scores
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19 10:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Existing scores already carry their AI adjustment
+    op.add_column('lead_scores', sa.Column('ai_status', sa.String(length=20), nullable=True, server_default='completed'))
+
+def downgrade() -> None:
+    op.drop_column('lead_scores', 'ai_status')
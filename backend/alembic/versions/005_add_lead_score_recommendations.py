@@ -0,0 +1,23 @@
+"""Add cached follow-up recommendations to lead scores
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19 10:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('lead_scores', sa.Column('recommendations', sa.JSON(), nullable=True))
+    op.add_column('lead_scores', sa.Column('recommendations_key', sa.String(length=64), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column('lead_scores', 'recommendations_key')
+    op.drop_column('lead_scores', 'recommendations')
@@ -0,0 +1,31 @@
+"""Scope scoring rules to the account they score for
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19 10:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('scoring_rules', sa.Column('user_id', sa.String(), nullable=True))
+    
+    # Rules were neither created nor applied by the app before they had an
+    # owner, one without an account cannot be attributed and would never score
+    op.execute("DELETE FROM scoring_rules WHERE user_id IS NULL")
+    
+    op.alter_column('scoring_rules', 'user_id', nullable=False)
+    op.create_foreign_key('scoring_rules_user_id_fkey', 'scoring_rules', 'users', ['user_id'], ['id'])
+    op.create_index('ix_scoring_rules_user_id', 'scoring_rules', ['user_id'])
+
+def downgrade() -> None:
+    op.drop_index('ix_scoring_rules_user_id', table_name='scoring_rules')
+    op.drop_constraint('scoring_rules_user_id_fkey', 'scoring_rules', type_='foreignkey')
+    op.drop_column('scoring_rules', 'user_id')
@@ -0,0 +1,30 @@
+"""Add cache key and data version to multi-form dashboards
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19 10:25:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Without a cache key existing cached data is recomputed once
+    op.add_column('multi_form_dashboards', sa.Column('cache_key', sa.String(length=64), nullable=True))
+    op.add_column('multi_form_dashboards', sa.Column('data_version', sa.Integer(), nullable=False, server_default='0'))
+    
+    # Dependency index: which dashboards read a given form or submission
+    op.create_index('ix_multi_form_mappings_external_id', 'multi_form_mappings', ['form_external_id'])
+    op.create_index('ix_multi_form_mappings_submission_id', 'multi_form_mappings', ['form_submission_id'])
+
+def downgrade() -> None:
+    op.drop_index('ix_multi_form_mappings_submission_id', table_name='multi_form_mappings')
+    op.drop_index('ix_multi_form_mappings_external_id', table_name='multi_form_mappings')
+    op.drop_column('multi_form_dashboards', 'data_version')
+    op.drop_column('multi_form_dashboards', 'cache_key')
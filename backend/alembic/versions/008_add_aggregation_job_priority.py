@@ -0,0 +1,21 @@
+"""Add priority to aggregation jobs
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('aggregation_jobs', sa.Column('priority', sa.String(length=20), nullable=True, server_default='interactive'))
+
+def downgrade() -> None:
+    op.drop_column('aggregation_jobs', 'priority')
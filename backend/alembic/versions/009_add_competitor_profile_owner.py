@@ -0,0 +1,35 @@
+"""Add tenant profiles and aliases to competitor profiles
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19 10:35:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Existing profiles stay shared by all tenants (user_id NULL)
+    op.add_column('competitor_profiles', sa.Column('user_id', sa.String(), nullable=True))
+    op.add_column('competitor_profiles', sa.Column('aliases', sa.JSON(), nullable=True))
+    op.create_foreign_key('competitor_profiles_user_id_fkey', 'competitor_profiles', 'users', ['user_id'], ['id'])
+    op.create_index('ix_competitor_profiles_user_id', 'competitor_profiles', ['user_id'])
+    
+    # Names are unique per tenant, a tenant profile extends the global one of that name
+    op.drop_constraint('competitor_profiles_name_key', 'competitor_profiles', type_='unique')
+    op.create_unique_constraint('uq_competitor_profiles_user_name', 'competitor_profiles', ['user_id', 'name'])
+
+def downgrade() -> None:
+    op.execute("DELETE FROM competitor_profiles WHERE user_id IS NOT NULL")
+    op.drop_constraint('uq_competitor_profiles_user_name', 'competitor_profiles', type_='unique')
+    op.create_unique_constraint('competitor_profiles_name_key', 'competitor_profiles', ['name'])
+    op.drop_index('ix_competitor_profiles_user_id', table_name='competitor_profiles')
+    op.drop_constraint('competitor_profiles_user_id_fkey', 'competitor_profiles', type_='foreignkey')
+    op.drop_column('competitor_profiles', 'aliases')
+    op.drop_column('competitor_profiles', 'user_id')
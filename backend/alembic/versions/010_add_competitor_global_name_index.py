@@ -0,0 +1,28 @@
+"""Keep names of global competitor profiles unique
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19 10:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # NULLs are distinct in uq_competitor_profiles_user_name, global names need their own index
+    op.create_index(
+        'uq_competitor_profiles_global_name',
+        'competitor_profiles',
+        ['name'],
+        unique=True,
+        postgresql_where=sa.text('user_id IS NULL')
+    )
+
+def downgrade() -> None:
+    op.drop_index('uq_competitor_profiles_global_name', table_name='competitor_profiles')
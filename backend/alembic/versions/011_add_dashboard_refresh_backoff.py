@@ -0,0 +1,23 @@
+"""Add refresh backoff to multi-form dashboards
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19 10:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('multi_form_dashboards', sa.Column('refresh_failures', sa.Integer(), nullable=True, server_default='0'))
+    op.add_column('multi_form_dashboards', sa.Column('refresh_retry_at', sa.DateTime(), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column('multi_form_dashboards', 'refresh_retry_at')
+    op.drop_column('multi_form_dashboards', 'refresh_failures')
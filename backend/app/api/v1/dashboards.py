@@ -1,12 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, status, Query
 from fastapi.responses import HTMLResponse
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.form import Dashboard, FormSubmission
 from app.models.user import User
-from app.schemas.dashboard import DashboardResponse
+from app.schemas.dashboard import DashboardResponse, TimeSeriesResponse
+from app.services.rollup_service import SubmissionRollupService
 from app.api.v1.auth import get_current_user
 from typing import List, Optional
+from datetime import datetime, timedelta
 
 router = APIRouter()
 
@@ -139,4 +141,27 @@ async def list_user_dashboards(
                 token=submission.response_id  # Add token for frontend
             ))
     
-    return result
\ No newline at end of file
+    return result
+
+@router.get("/user/me/timeseries", response_model=TimeSeriesResponse)
+async def get_user_submission_time_series(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: Optional[str] = Query(None, pattern="^(hour|day)$"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Submission counts over time for the current user, served from rollups"""
+    
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=30)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end"
+        )
+    
+    series = SubmissionRollupService(db).get_time_series(
+        "user", [current_user.id], start, end, granularity
+    )
+    return TimeSeriesResponse(**series)
@@ -8,17 +8,22 @@ from typing import List, Optional, Dict
 from uuid import UUID
 from datetime import datetime
 
-from app.api.deps import get_db, get_current_user
+from app.api.dependencies import get_current_user
+from app.database import get_db
 from app.models.user import User
 from app.models.form import FormSubmission
 from app.models.competitive_analysis import (
     CompetitorProfile,
-    CompetitiveInsight,
-    ObjectionHandler,
-    CompetitiveOutcome
+    CompetitiveInsight
 )
 from app.services.competitive_analysis import CompetitiveAnalysisService
+from app.services.competitive_rollups import CompetitiveRollupService
+from app.services.competitor_catalog import competitor_catalog
+from app.services.competitor_dictionaries import competitor_dictionaries
+from app.services.submission_features import features_for
 from app.schemas.competitive import (
+    CompetitorProfileCreate,
+    CompetitorProfileUpdate,
     CompetitorProfileResponse,
     CompetitiveInsightResponse,
     BattleCardResponse,
@@ -58,7 +63,12 @@ async def analyze_competition(
     
     # Generate new analysis
     service = CompetitiveAnalysisService(db)
-    insight = await service.analyze_competition(lead_id, submission.form_data)
+    insight = await service.analyze_competition(
+        lead_id,
+        submission.answers or {},
+        features=features_for(submission.answers, submission.features, competitor_dictionaries.get(db, current_user.id)),
+        user_id=current_user.id
+    )
     
     return insight
 
@@ -70,16 +80,70 @@ async def get_competitors(
     db: Session = Depends(get_db)
 ):
     """
-    Get list of all competitor profiles
+    Get list of all competitor profiles, the shared ones and this account's
+    """
+    return competitor_catalog.get(db).profiles_for(current_user.id, is_active)
+
+
+@router.post("/competitors", response_model=CompetitorProfileResponse, status_code=201)
+async def create_competitor(
+    competitor_data: CompetitorProfileCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Add a competitor with its aliases to this account's competitor dictionary
+    """
+    name = competitor_data.name.strip().lower()
+    existing = db.query(CompetitorProfile).filter(
+        CompetitorProfile.user_id == current_user.id,
+        CompetitorProfile.name == name
+    ).first()
+    
+    if existing:
+        raise HTTPException(status_code=409, detail="Competitor already exists")
+    
+    competitor = CompetitorProfile(
+        **competitor_data.dict(exclude={"name"}),
+        name=name,
+        user_id=current_user.id
+    )
+    db.add(competitor)
+    db.commit()
+    db.refresh(competitor)
+    competitor_dictionaries.invalidate(current_user.id)
+    competitor_catalog.invalidate()
+    
+    return competitor
+
+
+@router.patch("/competitors/{competitor_id}", response_model=CompetitorProfileResponse)
+async def update_competitor(
+    competitor_id: UUID,
+    competitor_data: CompetitorProfileUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Update one of this account's competitors, e.g. its aliases
     """
-    query = db.query(CompetitorProfile)
+    competitor = db.query(CompetitorProfile).filter(
+        CompetitorProfile.id == competitor_id,
+        CompetitorProfile.user_id == current_user.id
+    ).first()
+    
+    if not competitor:
+        raise HTTPException(status_code=404, detail="Competitor not found")
     
-    if is_active is not None:
-        query = query.filter(CompetitorProfile.is_active == is_active)
+    for field, value in competitor_data.dict(exclude_unset=True).items():
+        setattr(competitor, field, value)
     
-    competitors = query.order_by(CompetitorProfile.win_rate.desc()).all()
+    db.commit()
+    db.refresh(competitor)
+    competitor_dictionaries.invalidate(current_user.id)
+    competitor_catalog.invalidate()
     
-    return competitors
+    return competitor
 
 
 @router.get("/competitors/{competitor_name}/battle-card", response_model=BattleCardResponse)
@@ -92,7 +156,7 @@ async def get_battle_card(
     Get battle card for specific competitor
     """
     service = CompetitiveAnalysisService(db)
-    battle_card = service.get_battle_card(competitor_name.lower())
+    battle_card = service.get_battle_card(competitor_name.lower(), current_user.id)
     
     if not battle_card:
         raise HTTPException(status_code=404, detail="Battle card not found")
@@ -114,17 +178,7 @@ async def get_objection_handlers(
     """
     Get objection handling scripts for competitor
     """
-    query = db.query(ObjectionHandler).filter(
-        ObjectionHandler.competitor_id == competitor_id,
-        ObjectionHandler.is_active == True
-    )
-    
-    if objection_type:
-        query = query.filter(ObjectionHandler.objection_type == objection_type)
-    
-    handlers = query.order_by(ObjectionHandler.success_rate.desc()).all()
-    
-    return handlers
+    return competitor_catalog.get(db).objection_handlers(competitor_id, objection_type)
 
 
 @router.post("/competitive-outcomes")
@@ -146,9 +200,7 @@ async def track_competitive_outcome(
         raise HTTPException(status_code=404, detail="Lead not found")
     
     # Get competitor
-    competitor = db.query(CompetitorProfile).filter(
-        CompetitorProfile.name == outcome_data.competitor_name.lower()
-    ).first()
+    competitor = competitor_catalog.get(db).profile(outcome_data.competitor_name.lower(), current_user.id)
     
     if not competitor:
         raise HTTPException(status_code=404, detail="Competitor not found")
@@ -159,7 +211,8 @@ async def track_competitive_outcome(
         lead_id=outcome_data.lead_id,
         competitor_id=competitor.id,
         outcome=outcome_data.outcome,
-        details=outcome_data.dict()
+        details=outcome_data.dict(),
+        user_id=current_user.id
     )
     
     return {"status": "success", "message": "Outcome tracked"}
@@ -173,56 +226,9 @@ async def get_competitive_statistics(
     db: Session = Depends(get_db)
 ):
     """
-    Get competitive win/loss statistics
+    Get competitive win/loss statistics, served from the daily outcome rollups
     """
-    # Get all competitors with stats
-    competitors = db.query(CompetitorProfile).filter(
-        CompetitorProfile.total_competitions > 0
-    ).all()
-    
-    stats = {
-        "overall": {
-            "total_competitions": sum(c.total_competitions for c in competitors),
-            "total_wins": sum(c.wins_against for c in competitors),
-            "total_losses": sum(c.losses_against for c in competitors),
-            "overall_win_rate": 0
-        },
-        "by_competitor": {}
-    }
-    
-    # Calculate overall win rate
-    if stats["overall"]["total_competitions"] > 0:
-        stats["overall"]["overall_win_rate"] = (
-            stats["overall"]["total_wins"] / stats["overall"]["total_competitions"]
-        )
-    
-    # Stats by competitor
-    for comp in competitors:
-        stats["by_competitor"][comp.name] = {
-            "competitions": comp.total_competitions,
-            "wins": comp.wins_against,
-            "losses": comp.losses_against,
-            "win_rate": comp.win_rate,
-            "top_advantages": comp.our_advantages[:3] if comp.our_advantages else []
-        }
-    
-    # Get recent outcomes if date range specified
-    if date_from or date_to:
-        query = db.query(CompetitiveOutcome)
-        if date_from:
-            query = query.filter(CompetitiveOutcome.outcome_date >= date_from)
-        if date_to:
-            query = query.filter(CompetitiveOutcome.outcome_date <= date_to)
-        
-        recent_outcomes = query.all()
-        
-        stats["recent_trends"] = {
-            "period_wins": sum(1 for o in recent_outcomes if o.outcome == 'won'),
-            "period_losses": sum(1 for o in recent_outcomes if o.outcome == 'lost'),
-            "average_deal_size": sum(o.deal_size or 0 for o in recent_outcomes) / len(recent_outcomes) if recent_outcomes else 0
-        }
-    
-    return stats
+    return CompetitiveRollupService(db).get_statistics(current_user.id, date_from, date_to)
 
 
 @router.get("/competitors/compare", response_model=CompetitorComparisonResponse)
@@ -244,10 +250,9 @@ async def compare_competitors(
         "our_advantages": {}
     }
     
+    catalog = competitor_catalog.get(db)
     for comp_name in competitors:
-        competitor = db.query(CompetitorProfile).filter(
-            CompetitorProfile.name == comp_name.lower()
-        ).first()
+        competitor = catalog.profile(comp_name.lower(), current_user.id)
         
         if competitor:
             comparison["competitors"].append({
@@ -282,8 +287,8 @@ async def generate_custom_battle_card(
     """
     service = CompetitiveAnalysisService(db)
     
-    # Get base battle card
-    base_card = service.get_battle_card(competitor_name.lower())
+    # Get base battle card, a copy that can be customized
+    base_card = service.get_battle_card(competitor_name.lower(), current_user.id)
     
     if not base_card:
         raise HTTPException(status_code=404, detail="Competitor not found")
@@ -3,29 +3,67 @@ API Endpoints for CRM Export (FA-48)
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Response
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, FileResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
-from datetime import datetime, timedelta
-import io
+from datetime import datetime
+import os
+import tempfile
 
-from app.api.deps import get_db, get_current_user
+from app.api.dependencies import get_current_user
+from app.database import SessionLocal, get_db
 from app.models.user import User
-from app.models.form import FormSubmission
 from app.models.lead_score import LeadScore
-from app.services.crm_export import CRMExportService
+from app.models.export_job import ExportJob
+from app.services.crm_export import EXPORT_BATCH_SIZE, PYARROW_AVAILABLE, CRMExportService, lead_from_submission, lead_query
+from app.services.export_history import complete_export, fail_export, list_exports, start_export
+from app.services.export_jobs import (
+    COLUMNAR_FORMATS,
+    EXPORT_FORMATS,
+    FILE_EXTENSIONS,
+    MEDIA_TYPES,
+    ExportJobService,
+    export_job_runner
+)
 from app.schemas.crm_export import (
     CRMExportRequest,
     ExportFormat,
     CRMType,
     FieldMappingResponse,
-    ExportHistoryResponse
+    ExportHistoryResponse,
+    ExportJobResponse
 )
 
 router = APIRouter()
 
 
+class _RowCounter:
+    """Counts the rows passing through an export pipeline"""
+    
+    def __init__(self):
+        self.count = 0
+    
+    def __call__(self, rows):
+        for row in rows:
+            self.count += 1
+            yield row
+
+
+def _validate_lead_selection(db: Session, user_id, request: CRMExportRequest):
+    """Check ownership of requested leads without loading them"""
+    query = lead_query(db, user_id, request)
+    
+    if request.lead_ids:
+        if query.count() != len(set(request.lead_ids)):
+            raise HTTPException(status_code=404, detail="Some leads not found or unauthorized")
+    elif not request.delta and query.first() is None:
+        # An empty delta is a valid result, it still advances the watermark
+        raise HTTPException(status_code=404, detail="No leads found")
+
+
 @router.post("/export/leads/csv")
 async def export_leads_csv(
     request: CRMExportRequest,
@@ -34,55 +72,47 @@ async def export_leads_csv(
 ):
     """
     Export leads to CSV format for CRM import
-    """
-    # Validate lead ownership
-    if request.lead_ids:
-        leads = db.query(FormSubmission).filter(
-            FormSubmission.id.in_(request.lead_ids),
-            FormSubmission.user_id == current_user.id
-        ).all()
-        
-        if len(leads) != len(request.lead_ids):
-            raise HTTPException(status_code=404, detail="Some leads not found or unauthorized")
-    else:
-        # Export all leads with optional date filter
-        query = db.query(FormSubmission).filter(
-            FormSubmission.user_id == current_user.id
-        )
-        
-        if request.date_from:
-            query = query.filter(FormSubmission.created_at >= request.date_from)
-        if request.date_to:
-            query = query.filter(FormSubmission.created_at <= request.date_to)
-        
-        leads = query.all()
-    
-    if not leads:
-        raise HTTPException(status_code=404, detail="No leads found")
     
-    # Convert to dictionaries and add metadata
-    lead_data = []
-    for lead in leads:
-        data = lead.form_data.copy() if isinstance(lead.form_data, dict) else {}
-        data['submission_id'] = lead.id
-        data['created_at'] = lead.created_at
-        lead_data.append(data)
-    
-    # Generate CSV
-    export_service = CRMExportService(db)
-    csv_content = export_service.export_to_csv(
-        lead_data,
-        crm_type=request.crm_type,
-        include_scores=request.include_scores,
-        include_insights=request.include_insights,
-        include_recommendations=request.include_recommendations
-    )
+    Rows are streamed as they are read, memory does not grow with lead count.
+    With ``delta`` only leads created or re-scored since the last completed
+    export to the same CRM are exported.
+    """
+    _validate_lead_selection(db, current_user.id, request)
+    user_id = current_user.id
     
     # Return as downloadable file
-    filename = f"leads_{request.crm_type}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
+    filename = f"leads_{request.crm_type.value}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
+    history = start_export(db, user_id, request, "csv", file_name=filename)
+    history_id, since = history.id, history.since
+    
+    def generate():
+        # The request session is closed once the response starts, use a dedicated one
+        export_db = SessionLocal()
+        counter = _RowCounter()
+        try:
+            export_service = CRMExportService(export_db)
+            leads = export_service.iter_leads(
+                lead_query(export_db, user_id, request, since=since),
+                include_scores=request.include_scores
+            )
+            rows = export_service.iter_rows(
+                leads,
+                crm_type=request.crm_type,
+                include_insights=request.include_insights,
+                include_recommendations=request.include_recommendations,
+                upsert_key=request.upsert_key
+            )
+            yield from export_service.iter_csv(counter(rows))
+            complete_export(export_db, history_id, counter.count)
+        except (Exception, GeneratorExit) as e:
+            # Client went away or the export failed, the watermark stays put
+            fail_export(export_db, history_id, str(e) or type(e).__name__)
+            raise
+        finally:
+            export_db.close()
     
     return StreamingResponse(
-        io.StringIO(csv_content),
+        generate(),
         media_type="text/csv",
         headers={
             "Content-Disposition": f"attachment; filename={filename}"
@@ -99,40 +129,32 @@ async def export_leads_json(
     """
     Export leads to JSON format for API integration
     """
-    # Validate lead ownership
-    if request.lead_ids:
-        leads = db.query(FormSubmission).filter(
-            FormSubmission.id.in_(request.lead_ids),
-            FormSubmission.user_id == current_user.id
-        ).all()
-    else:
-        leads = db.query(FormSubmission).filter(
-            FormSubmission.user_id == current_user.id
-        ).all()
-    
-    if not leads:
-        raise HTTPException(status_code=404, detail="No leads found")
+    _validate_lead_selection(db, current_user.id, request)
     
-    # Convert to dictionaries
-    lead_data = []
-    for lead in leads:
-        data = lead.form_data.copy() if isinstance(lead.form_data, dict) else {}
-        data['submission_id'] = lead.id
-        lead_data.append(data)
+    filename = f"leads_{request.crm_type.value}.json"
+    history = start_export(db, current_user.id, request, "json", file_name=filename)
     
-    # Generate JSON
     export_service = CRMExportService(db)
-    json_content = export_service.export_to_json(
-        lead_data,
-        crm_type=request.crm_type,
-        include_scores=request.include_scores
-    )
+    counter = _RowCounter()
+    try:
+        query = lead_query(db, current_user.id, request, since=history.since)
+        json_content = export_service.export_to_json(
+            counter(lead_from_submission(lead) for lead in query.yield_per(EXPORT_BATCH_SIZE)),
+            crm_type=request.crm_type,
+            include_scores=request.include_scores,
+            upsert_key=request.upsert_key
+        )
+    except Exception as e:
+        db.rollback()
+        fail_export(db, history.id, str(e))
+        raise
+    complete_export(db, history.id, counter.count)
     
     return Response(
         content=json_content,
         media_type="application/json",
         headers={
-            "Content-Disposition": f"attachment; filename=leads_{request.crm_type}.json"
+            "Content-Disposition": f"attachment; filename={filename}"
         }
     )
 
@@ -145,43 +167,222 @@ async def export_leads_excel(
 ):
     """
     Export leads to Excel format
+    
+    The workbook is written row by row to a temporary file and served from
+    disk, memory does not grow with lead count.
     """
-    # Validate lead ownership
-    if request.lead_ids:
-        leads = db.query(FormSubmission).filter(
-            FormSubmission.id.in_(request.lead_ids),
-            FormSubmission.user_id == current_user.id
-        ).all()
-    else:
-        leads = db.query(FormSubmission).filter(
-            FormSubmission.user_id == current_user.id
-        ).all()
-    
-    if not leads:
-        raise HTTPException(status_code=404, detail="No leads found")
+    _validate_lead_selection(db, current_user.id, request)
     
-    # Convert to dictionaries
-    lead_data = []
-    for lead in leads:
-        data = lead.form_data.copy() if isinstance(lead.form_data, dict) else {}
-        data['submission_id'] = lead.id
-        lead_data.append(data)
+    filename = f"leads_{request.crm_type.value}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    history = start_export(db, current_user.id, request, "excel", file_name=filename)
+    since = history.since
     
-    # Generate Excel
     export_service = CRMExportService(db)
-    excel_content = export_service.export_to_excel(lead_data, crm_type=request.crm_type)
     
-    filename = f"leads_{request.crm_type}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    def build(path: str) -> int:
+        leads = export_service.iter_leads(
+            lead_query(db, current_user.id, request, since=since),
+            include_scores=request.include_scores
+        )
+        rows = export_service.iter_rows(
+            leads,
+            crm_type=request.crm_type,
+            include_insights=request.include_insights,
+            include_recommendations=request.include_recommendations,
+            upsert_key=request.upsert_key
+        )
+        return export_service.write_excel(rows, path, crm_type=request.crm_type)
     
-    return Response(
-        content=excel_content,
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        # Keep the event loop free while the workbook is written
+        lead_count = await run_in_threadpool(build, path)
+    except Exception as e:
+        os.unlink(path)
+        db.rollback()
+        fail_export(db, history.id, str(e))
+        raise
+    complete_export(db, history.id, lead_count)
+    
+    return FileResponse(
+        path,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": f"attachment; filename={filename}"
-        }
+        filename=filename,
+        background=BackgroundTask(os.unlink, path)
     )
 
 
+async def _export_columnar(request: CRMExportRequest, current_user: User, db: Session, export_format: str):
+    """Write a typed columnar export to a temporary file and serve it from disk"""
+    if not PYARROW_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Columnar exports are not available on this server")
+    
+    _validate_lead_selection(db, current_user.id, request)
+    
+    media_type, extension = MEDIA_TYPES[export_format], FILE_EXTENSIONS[export_format]
+    filename = f"leads_{request.crm_type.value}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    history = start_export(db, current_user.id, request, export_format, file_name=filename)
+    since = history.since
+    
+    export_service = CRMExportService(db)
+    
+    def build(path: str) -> int:
+        leads = export_service.iter_leads(
+            lead_query(db, current_user.id, request, since=since),
+            include_scores=request.include_scores
+        )
+        batches = export_service.iter_record_batches(
+            leads,
+            crm_type=request.crm_type,
+            include_insights=request.include_insights,
+            include_recommendations=request.include_recommendations,
+            upsert_key=request.upsert_key
+        )
+        schema = export_service.arrow_schema(request.crm_type, request.upsert_key)
+        if export_format == "parquet":
+            return export_service.write_parquet(batches, path, schema)
+        return export_service.write_arrow_stream(batches, path, schema)
+    
+    fd, path = tempfile.mkstemp(suffix=f".{extension}")
+    os.close(fd)
+    try:
+        # Keep the event loop free while the file is written
+        lead_count = await run_in_threadpool(build, path)
+    except Exception as e:
+        os.unlink(path)
+        db.rollback()
+        fail_export(db, history.id, str(e))
+        raise
+    complete_export(db, history.id, lead_count)
+    
+    return FileResponse(
+        path,
+        media_type=media_type,
+        filename=filename,
+        background=BackgroundTask(os.unlink, path)
+    )
+
+
+@router.post("/export/leads/parquet")
+async def export_leads_parquet(
+    request: CRMExportRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Export leads to Parquet for analytics tooling
+    
+    Columns are typed (scores as integers, dates as timestamps) with the
+    answers flattened into a map column. Leads are read from a streaming
+    cursor and written as zstd-compressed row groups.
+    """
+    return await _export_columnar(request, current_user, db, "parquet")
+
+
+@router.post("/export/leads/arrow")
+async def export_leads_arrow(
+    request: CRMExportRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Export leads as an Arrow IPC stream with the same typed columns as Parquet
+    """
+    return await _export_columnar(request, current_user, db, "arrow")
+
+
+def _job_response(job: ExportJob) -> ExportJobResponse:
+    response = ExportJobResponse.model_validate(job)
+    if job.status == "completed":
+        response.download_url = f"/api/v1/export/jobs/{job.id}/download"
+    return response
+
+
+def _get_owned_export_job(db: Session, job_id: str, current_user: User) -> ExportJob:
+    job = db.query(ExportJob).filter(
+        ExportJob.id == job_id,
+        ExportJob.user_id == str(current_user.id)
+    ).first()
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+
+@router.post("/export/jobs", response_model=ExportJobResponse, status_code=202)
+async def create_export_job(
+    request: CRMExportRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Start a background export
+    
+    The file is produced in checkpointed chunks outside the request; poll the
+    job and download the file once it is completed.
+    """
+    if request.format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {request.format.value}")
+    if request.format in COLUMNAR_FORMATS and not PYARROW_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Columnar exports are not available on this server")
+    
+    _validate_lead_selection(db, current_user.id, request)
+    
+    job = ExportJobService(db).create_job(current_user.id, request)
+    export_job_runner.submit(job.id)
+    
+    return _job_response(job)
+
+
+@router.get("/export/jobs/{job_id}", response_model=ExportJobResponse)
+async def get_export_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get status and progress of a background export
+    """
+    return _job_response(_get_owned_export_job(db, job_id, current_user))
+
+
+@router.get("/export/jobs/{job_id}/download")
+async def download_export_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Download the file of a completed background export
+    """
+    job = _get_owned_export_job(db, job_id, current_user)
+    
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Export job is {job.status}")
+    if not job.file_path or not os.path.exists(job.file_path):
+        raise HTTPException(status_code=410, detail="Export file is no longer available")
+    
+    return FileResponse(job.file_path, media_type=MEDIA_TYPES[job.format], filename=job.file_name)
+
+
+@router.delete("/export/jobs/{job_id}")
+async def cancel_export_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Cancel a pending or running background export
+    """
+    job = _get_owned_export_job(db, job_id, current_user)
+    
+    if not export_job_runner.cancel(job.id):
+        raise HTTPException(status_code=409, detail=f"Export job is already {job.status}")
+    
+    return {"message": "Export job cancelled"}
+
+
 @router.get("/export/field-mappings/{crm_type}", response_model=FieldMappingResponse)
 async def get_field_mappings(
     crm_type: CRMType,
@@ -285,31 +486,22 @@ async def get_export_history(
     """
     Get user's export history
     """
-    # This would query an export_history table
-    # For now, return sample data
-    
-    history = [
-        ExportHistoryResponse(
-            id="export-1",
-            export_date=datetime.utcnow() - timedelta(days=1),
-            crm_type="salesforce",
-            format="csv",
-            lead_count=25,
-            file_name="leads_salesforce_20250109.csv",
-            status="completed"
-        ),
+    return [
         ExportHistoryResponse(
-            id="export-2",
-            export_date=datetime.utcnow() - timedelta(days=3),
-            crm_type="hubspot",
-            format="json",
-            lead_count=15,
-            file_name="leads_hubspot_20250107.json",
-            status="completed"
+            id=entry.id,
+            export_date=entry.created_at,
+            crm_type=entry.crm_type,
+            format=entry.format,
+            lead_count=entry.lead_count or 0,
+            file_name=entry.file_name,
+            delta=bool(entry.delta),
+            since=entry.since,
+            watermark=entry.watermark,
+            status=entry.status,
+            error_message=entry.error_message
         )
+        for entry in list_exports(db, current_user.id, limit=limit, offset=offset)
     ]
-    
-    return history[offset:offset+limit]
 
 
 @router.post("/export/webhook-setup")
@@ -8,17 +8,25 @@ from typing import List, Optional
 from uuid import UUID
 from datetime import datetime, timedelta
 
-from app.api.deps import get_db, get_current_user
+from app.api.dependencies import get_current_user
+from app.database import get_db
+from app.api.dependencies import require_admin
 from app.models.user import User
-from app.models.lead_score import LeadScore
+from app.models.lead_score import LeadScore, ScoringRule
 from app.models.form import FormSubmission
 from app.services.lead_scoring import LeadScoringEngine
+from app.services.bulk_rescoring import RescoringConfig, get_rescore_run, start_rescore_run
+from app.services.scoring_rules import compile_rule, rule_plans
+from app.services.submission_features import features_for
 from app.schemas.lead_score import (
     LeadScoreResponse,
     LeadScoreCreate,
     LeadScoreExplanation,
     ScoringRuleCreate,
-    ScoringRuleResponse
+    ScoringRuleUpdate,
+    ScoringRuleResponse,
+    RescoreRequest,
+    RescoreRunResponse
 )
 
 router = APIRouter()
@@ -28,11 +36,15 @@ router = APIRouter()
 async def calculate_lead_score(
     submission_id: UUID,
     force_recalculate: bool = False,
+    wait_for_ai: bool = Query(False, description="Include the AI adjustment instead of applying it in the background"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Calculate or retrieve lead score for a form submission
+    
+    The rule-based score is returned right away, the AI adjustment follows
+    in the background unless ``wait_for_ai`` is set.
     """
     # Check if submission exists and belongs to user
     submission = db.query(FormSubmission).filter(
@@ -55,7 +67,10 @@ async def calculate_lead_score(
     scoring_engine = LeadScoringEngine(db)
     lead_score = await scoring_engine.calculate_lead_score(
         submission_id,
-        submission.form_data
+        submission.answers,
+        user_id=current_user.id,
+        defer_ai=not wait_for_ai,
+        features=features_for(submission.answers, submission.features)
     )
     
     return lead_score
@@ -192,7 +207,10 @@ async def calculate_batch_scores(
         if not existing_score:
             lead_score = await scoring_engine.calculate_lead_score(
                 submission.id,
-                submission.form_data
+                submission.answers,
+                user_id=current_user.id,
+                defer_ai=True,
+                features=features_for(submission.answers, submission.features)
             )
             lead_scores.append(lead_score)
         else:
@@ -201,6 +219,96 @@ async def calculate_batch_scores(
     return lead_scores
 
 
+@router.get("/scoring/rules", response_model=List[ScoringRuleResponse])
+async def list_scoring_rules(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    List the scoring rules that replace the default criteria for this account
+    """
+    return db.query(ScoringRule).filter(
+        ScoringRule.user_id == current_user.id
+    ).order_by(ScoringRule.created_at).all()
+
+
+@router.post("/scoring/rules", response_model=ScoringRuleResponse, status_code=201)
+async def create_scoring_rule(
+    rule_data: ScoringRuleCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Add a scoring rule
+    """
+    rule = ScoringRule(user_id=current_user.id, **rule_data.dict())
+    try:
+        compile_rule(rule)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    db.add(rule)
+    db.commit()
+    db.refresh(rule)
+    rule_plans.invalidate(current_user.id)
+    
+    return rule
+
+
+@router.patch("/scoring/rules/{rule_id}", response_model=ScoringRuleResponse)
+async def update_scoring_rule(
+    rule_id: UUID,
+    rule_data: ScoringRuleUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Update a scoring rule
+    """
+    rule = db.query(ScoringRule).filter(
+        ScoringRule.id == rule_id,
+        ScoringRule.user_id == current_user.id
+    ).first()
+    
+    if not rule:
+        raise HTTPException(status_code=404, detail="Scoring rule not found")
+    
+    for field, value in rule_data.dict(exclude_unset=True).items():
+        setattr(rule, field, value)
+    try:
+        compile_rule(rule)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    db.commit()
+    db.refresh(rule)
+    rule_plans.invalidate(current_user.id)
+    
+    return rule
+
+
+@router.delete("/scoring/rules/{rule_id}", status_code=204)
+async def delete_scoring_rule(
+    rule_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Delete a scoring rule
+    """
+    deleted = db.query(ScoringRule).filter(
+        ScoringRule.id == rule_id,
+        ScoringRule.user_id == current_user.id
+    ).delete(synchronize_session=False)
+    
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Scoring rule not found")
+    
+    db.commit()
+    rule_plans.invalidate(current_user.id)
+
+
 @router.get("/leads/stats")
 async def get_lead_statistics(
     date_from: Optional[datetime] = Query(None, description="Start date for statistics"),
@@ -262,4 +370,51 @@ async def get_lead_statistics(
         "lowest_score": min(scores),
         "hot_leads_count": category_counts["hot"],
         "conversion_ready": sum(1 for s in scores if s >= 70)
-    }
\ No newline at end of file
+    }
+
+
+@router.post("/admin/leads/rescore", response_model=RescoreRunResponse, status_code=202)
+async def start_bulk_rescore(
+    request: RescoreRequest,
+    admin: User = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Rescore stored submissions in the background with tuned weights or thresholds
+    """
+    try:
+        config = RescoringConfig.with_overrides(
+            scoring_version=request.scoring_version,
+            weights=request.weights,
+            budget_thresholds=request.budget_thresholds,
+            timeline_scores=request.timeline_scores,
+            authority_scores=request.authority_scores,
+            company_size_scores=request.company_size_scores
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    run = start_rescore_run(
+        db,
+        config,
+        user_id=request.user_id,
+        batch_size=request.batch_size,
+        dry_run=request.dry_run,
+        changed_by=admin.id
+    )
+    return run
+
+
+@router.get("/admin/leads/rescore/{run_id}", response_model=RescoreRunResponse)
+async def get_bulk_rescore(
+    run_id: str,
+    admin: User = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the progress of a bulk rescore
+    """
+    run = get_rescore_run(db, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Rescore run not found")
+    return run
@@ -3,20 +3,27 @@ API Endpoints for Multi-Form Dashboard Operations (FA-44)
 """
 
 from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+import json
+import logging
 from uuid import UUID
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from app.api.deps import get_db, get_current_user
+from app.api.dependencies import get_current_user
+from app.database import SessionLocal, get_db
 from app.models.user import User
 from app.models.multi_form_dashboard import (
     MultiFormDashboard,
     MultiFormMapping,
     CustomMetric,
-    ScheduledReport
+    ScheduledReport,
+    AggregationJob
 )
-from app.services.aggregation_engine import AggregationEngine
+from app.services.aggregation_engine import AggregationEngine, StaleCursorError
+from app.services.aggregation_scheduler import aggregation_scheduler
+from app.services.dashboard_cache import dashboard_result_cache, mark_dashboards_dirty
 from app.schemas.multi_form import (
     MultiFormDashboardCreate,
     MultiFormDashboardUpdate,
@@ -24,9 +31,13 @@ from app.schemas.multi_form import (
     MultiFormMappingCreate,
     CustomMetricCreate,
     ScheduledReportCreate,
-    AggregationResultResponse
+    AggregationResultResponse,
+    AggregationJobResponse,
+    AggregatedRecordsPage
 )
-from app.core.logging import logger
+from app.schemas.dashboard import TimeSeriesResponse
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -162,9 +173,9 @@ async def update_multi_form_dashboard(
     
     dashboard.updated_at = datetime.utcnow()
     
-    # Clear cache on configuration change
-    dashboard.cached_data = None
-    dashboard.cache_updated_at = None
+    # Invalidate cached results on configuration change
+    if {"aggregation_config", "filter_config", "analytics_config"} & update_data.keys():
+        mark_dashboards_dirty(db, [dashboard.id], commit=False)
     
     db.commit()
     db.refresh(dashboard)
@@ -206,12 +217,14 @@ async def delete_multi_form_dashboard(
 async def aggregate_dashboard_data(
     dashboard_id: UUID,
     force_refresh: bool = Query(False),
-    background_tasks: BackgroundTasks = BackgroundTasks(),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> AggregationResultResponse:
     """
     Trigger data aggregation for a multi-form dashboard
+    
+    Returns cached results when they are fresh, otherwise queues an
+    aggregation job and returns its id to poll.
     """
     dashboard = db.query(MultiFormDashboard).filter_by(
         id=dashboard_id,
@@ -224,42 +237,187 @@ async def aggregate_dashboard_data(
             detail="Dashboard not found"
         )
     
-    # Check if aggregation is already in progress
-    from app.models.multi_form_dashboard import AggregationJob
-    active_job = db.query(AggregationJob).filter_by(
-        dashboard_id=dashboard_id,
-        status="processing"
+    cached = None if force_refresh else dashboard_result_cache.get(dashboard)
+    if cached is not None:
+        return AggregationResultResponse(
+            status="completed",
+            metrics=cached.get("metrics", {}),
+            metadata=cached.get("metadata", {})
+        )
+    
+    # Concurrent refreshes of the same dashboard share one job
+    job_id = aggregation_scheduler.submit(
+        dashboard_id,
+        priority="interactive",
+        force_refresh=force_refresh
+    )
+    
+    return AggregationResultResponse(
+        status="pending",
+        message="Aggregation queued",
+        job_id=str(job_id)
+    )
+
+
+@router.get("/multi-dashboards/{dashboard_id}/jobs/{job_id}", response_model=AggregationJobResponse)
+async def get_aggregation_job(
+    dashboard_id: UUID,
+    job_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> AggregationJobResponse:
+    """
+    Get status and progress of an aggregation job
+    """
+    return _get_owned_job(db, dashboard_id, job_id, current_user)
+
+
+@router.delete("/multi-dashboards/{dashboard_id}/jobs/{job_id}")
+async def cancel_aggregation_job(
+    dashboard_id: UUID,
+    job_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Cancel a pending or running aggregation job
+    """
+    job = _get_owned_job(db, dashboard_id, job_id, current_user)
+    
+    if not aggregation_scheduler.cancel(job.id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job is already {job.status}"
+        )
+    
+    logger.info(f"Cancelled aggregation job {job_id} for dashboard {dashboard_id}")
+    
+    return {"message": "Aggregation job cancelled"}
+
+
+def _get_owned_job(
+    db: Session,
+    dashboard_id: UUID,
+    job_id: UUID,
+    current_user: User
+) -> AggregationJob:
+    """Load an aggregation job of a dashboard owned by the current user"""
+    job = db.query(AggregationJob).join(
+        MultiFormDashboard, MultiFormDashboard.id == AggregationJob.dashboard_id
+    ).filter(
+        AggregationJob.id == job_id,
+        AggregationJob.dashboard_id == dashboard_id,
+        MultiFormDashboard.user_id == current_user.id
     ).first()
     
-    if active_job:
-        return AggregationResultResponse(
-            status="processing",
-            message="Aggregation already in progress",
-            job_id=str(active_job.id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Aggregation job not found"
         )
     
-    # Run aggregation
-    engine = AggregationEngine(db)
+    return job
+
+
+@router.get("/multi-dashboards/{dashboard_id}/records", response_model=AggregatedRecordsPage)
+async def get_dashboard_records(
+    dashboard_id: UUID,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> AggregatedRecordsPage:
+    """
+    Get a page of aggregated records for a multi-form dashboard
+    """
+    dashboard = db.query(MultiFormDashboard).filter_by(
+        id=dashboard_id,
+        user_id=current_user.id
+    ).first()
     
-    try:
-        result = await engine.aggregate_dashboard_data(
-            dashboard_id=dashboard_id,
-            force_refresh=force_refresh
+    if not dashboard:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dashboard not found"
         )
-        
-        return AggregationResultResponse(
-            status="completed",
-            data=result.get("data", []),
-            metrics=result.get("metrics", {}),
-            metadata=result.get("metadata", {})
+    
+    return _get_records_page(db, dashboard, cursor, limit)
+
+
+@router.get("/multi-dashboards/{dashboard_id}/records/stream")
+async def stream_dashboard_records(
+    dashboard_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> StreamingResponse:
+    """
+    Stream all aggregated records of a multi-form dashboard as NDJSON
+    """
+    dashboard = db.query(MultiFormDashboard).filter_by(
+        id=dashboard_id,
+        user_id=current_user.id
+    ).first()
+    
+    if not dashboard:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dashboard not found"
         )
-        
-    except Exception as e:
-        logger.error(f"Aggregation failed for dashboard {dashboard_id}: {e}")
+    
+    if not (dashboard.cached_data or {}).get("metadata", {}).get("run_id"):
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Aggregation failed: {str(e)}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dashboard has not been aggregated yet"
         )
+    
+    def generate():
+        # The request session is closed once the response starts, use a dedicated one
+        stream_db = SessionLocal()
+        try:
+            stream_dashboard = stream_db.query(MultiFormDashboard).get(dashboard_id)
+            for record in AggregationEngine(stream_db).iter_records(stream_dashboard):
+                yield json.dumps(record, default=str) + "\n"
+        finally:
+            stream_db.close()
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@router.get("/multi-dashboards/{dashboard_id}/timeseries", response_model=TimeSeriesResponse)
+async def get_dashboard_time_series(
+    dashboard_id: UUID,
+    start: Optional[datetime] = Query(None, description="Range start (defaults to 30 days ago)"),
+    end: Optional[datetime] = Query(None, description="Range end (defaults to now)"),
+    granularity: Optional[str] = Query(None, pattern="^(hour|day)$", description="hour or day; chosen from the range if omitted"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> TimeSeriesResponse:
+    """
+    Get submission time series for the forms of a multi-form dashboard
+    """
+    dashboard = db.query(MultiFormDashboard).filter_by(
+        id=dashboard_id,
+        user_id=current_user.id
+    ).first()
+    
+    if not dashboard:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dashboard not found"
+        )
+    
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=30)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end"
+        )
+    
+    engine = AggregationEngine(db)
+    series = engine.get_time_series(dashboard_id, start, end, granularity)
+    
+    return TimeSeriesResponse(**series)
 
 
 @router.post("/multi-dashboards/{dashboard_id}/mappings", response_model=Dict[str, str])
@@ -307,9 +465,8 @@ async def add_form_mapping(
     
     db.add(mapping)
     
-    # Clear dashboard cache
-    dashboard.cached_data = None
-    dashboard.cache_updated_at = None
+    # Invalidate cached results
+    mark_dashboards_dirty(db, [dashboard.id], commit=False)
     
     db.commit()
     
@@ -352,9 +509,8 @@ async def remove_form_mapping(
     
     db.delete(mapping)
     
-    # Clear dashboard cache
-    dashboard.cached_data = None
-    dashboard.cache_updated_at = None
+    # Invalidate cached results
+    mark_dashboards_dirty(db, [dashboard.id], commit=False)
     
     db.commit()
     
@@ -506,33 +662,67 @@ async def get_public_multi_dashboard(
     db.commit()
     
     # Return cached data or aggregate
+    if dashboard_result_cache.get(dashboard) is None:
+        job_id = aggregation_scheduler.submit(dashboard.id, priority="interactive")
+    else:
+        job_id = None
+    
+    # Outdated results are served while the refresh runs
     if dashboard.cached_data:
         return AggregationResultResponse(
             status="completed",
-            data=dashboard.cached_data.get("data", []),
+            job_id=str(job_id) if job_id else None,
             metrics=dashboard.cached_data.get("metrics", {}),
             metadata=dashboard.cached_data.get("metadata", {})
         )
     
-    # Trigger aggregation if no cache
+    # No results yet, the viewer reloads once the job completes
+    
+    return AggregationResultResponse(
+        status="processing",
+        message="Dashboard data is being prepared",
+        job_id=str(job_id)
+    )
+
+
+@router.get("/multi-dashboards/public/{share_token}/records", response_model=AggregatedRecordsPage)
+async def get_public_dashboard_records(
+    share_token: str,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+) -> AggregatedRecordsPage:
+    """
+    Get a page of aggregated records for a public multi-form dashboard
+    """
+    dashboard = db.query(MultiFormDashboard).filter_by(
+        share_token=share_token,
+        is_public=True
+    ).first()
+    
+    if not dashboard:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dashboard not found or not public"
+        )
+    
+    return _get_records_page(db, dashboard, cursor, limit)
+
+
+def _get_records_page(
+    db: Session,
+    dashboard: MultiFormDashboard,
+    cursor: Optional[str],
+    limit: int
+) -> AggregatedRecordsPage:
+    """Shared cursor pagination for owner and public record endpoints"""
     engine = AggregationEngine(db)
     
     try:
-        result = await engine.aggregate_dashboard_data(
-            dashboard_id=dashboard.id,
-            force_refresh=False
-        )
-        
-        return AggregationResultResponse(
-            status="completed",
-            data=result.get("data", []),
-            metrics=result.get("metrics", {}),
-            metadata=result.get("metadata", {})
-        )
-        
-    except Exception as e:
-        logger.error(f"Failed to get public dashboard {share_token}: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to load dashboard data"
-        )
\ No newline at end of file
+        page = engine.get_records_page(dashboard, cursor=cursor, limit=limit)
+    except StaleCursorError as e:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    
+    return AggregatedRecordsPage(**page)
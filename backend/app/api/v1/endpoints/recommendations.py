@@ -3,17 +3,25 @@ API Endpoints for Follow-up Recommendations (FA-47)
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict
 from uuid import UUID
 from datetime import datetime
+import json
+import logging
 
-from app.api.deps import get_db, get_current_user
+from app.api.dependencies import get_current_user
+from app.core.config import settings
+from app.database import SessionLocal, get_db
 from app.models.user import User
 from app.models.lead_score import LeadScore
 from app.models.form import FormSubmission
-from app.services.follow_up_engine import FollowUpRecommendationEngine
+from app.services.follow_up_engine import FollowUpRecommendationEngine, generate_batched, generate_concurrently
 from app.services.lead_scoring import LeadScoringEngine
+from app.services.recommendation_cache import recommendation_cache, recommendation_key
+from app.services.submission_features import features_for
 from app.schemas.recommendations import (
     RecommendationResponse,
     RecommendationRequest,
@@ -21,6 +29,8 @@ from app.schemas.recommendations import (
     BulkRecommendationsRequest
 )
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
@@ -43,6 +53,9 @@ async def generate_recommendations(
     if not submission:
         raise HTTPException(status_code=404, detail="Lead not found")
     
+    answers = submission.answers or {}
+    features = features_for(answers, submission.features)
+    
     # Get lead score
     lead_score = db.query(LeadScore).filter(
         LeadScore.submission_id == lead_id
@@ -51,113 +64,177 @@ async def generate_recommendations(
     # If no score exists, calculate it
     if not lead_score:
         scoring_engine = LeadScoringEngine(db)
-        lead_score = await scoring_engine.calculate_lead_score(lead_id, submission.form_data)
+        lead_score = await scoring_engine.calculate_lead_score(
+            lead_id, answers, user_id=current_user.id, features=features
+        )
     
     # Generate recommendations
     recommendation_engine = FollowUpRecommendationEngine(db)
     
-    # Determine urgency based on form data
+    # Determine urgency from the timeline and signals parsed at ingest
     urgency = 'medium'
-    form_text = str(submission.form_data).lower()
-    if any(word in form_text for word in ['urgent', 'asap', 'immediate']):
+    if features.timeline == 'immediate' or 'high_urgency' in features.signals:
         urgency = 'urgent'
-    elif any(word in form_text for word in ['soon', 'quickly', 'this month']):
+    elif features.timeline == 'this_month':
         urgency = 'high'
     
-    recommendations = await recommendation_engine.generate_recommendations(
-        lead_data=submission.form_data,
-        lead_score=lead_score.final_score,
-        score_category=lead_score.score_category,
-        urgency=urgency
-    )
-    
-    # Format response
-    response = []
-    for idx, rec in enumerate(recommendations):
-        response.append(RecommendationResponse(
-            id=f"{lead_id}-{idx}",
-            lead_id=lead_id,
-            action=rec['action'],
-            priority=rec['priority'],
-            timing=rec['timing'],
-            method=rec.get('method', 'email'),
-            template=rec.get('template') if include_templates else None,
-            reason=rec.get('reason'),
-            success_probability=rec.get('success_probability', 0),
-            generated_at=datetime.utcnow()
-        ))
+    # Reps reopen the same leads, reuse recommendations until the inputs change
+    key = recommendation_key(answers, lead_score.final_score, lead_score.score_category, urgency, features)
+    recommendations = recommendation_cache.get(lead_score, key)
+    if recommendations is None:
+        recommendations = await recommendation_engine.generate_recommendations(
+            lead_data=answers,
+            lead_score=lead_score.final_score,
+            score_category=lead_score.score_category,
+            urgency=urgency,
+            features=features
+        )
+        # Base recommendations served while the AI is unavailable are regenerated next time
+        if not recommendation_engine.degraded:
+            recommendation_cache.put(lead_score, key, recommendations)
+            db.commit()
     
-    return response
+    return _format_recommendations(lead_id, recommendations, include_templates)
 
 
-@router.post("/leads/recommendations/bulk", response_model=Dict[str, List[RecommendationResponse]])
+@router.post("/leads/recommendations/bulk")
 async def generate_bulk_recommendations(
     request: BulkRecommendationsRequest,
     background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
-):
+) -> StreamingResponse:
     """
     Generate recommendations for multiple leads at once
+    
+    Streams one NDJSON line per lead as soon as its recommendations are ready,
+    cached recommendations first: ``{"lead_id", "status", "recommendations"}``. Status is ``completed``,
+    ``not_found``, ``scoring`` (the lead is scored in the background, request
+    it again later) or ``failed``. The AI enhancement of LLM_BATCH_SIZE leads
+    is requested in one completion, at most RECOMMENDATION_CONCURRENCY at once.
     """
-    results = {}
+    lead_ids = list(dict.fromkeys(request.lead_ids))
     
-    for lead_id in request.lead_ids:
-        # Verify ownership
-        submission = db.query(FormSubmission).filter(
-            FormSubmission.id == lead_id,
+    # Leads and scores in two queries, read before the request session closes
+    submissions = {
+        submission.id: submission
+        for submission in db.query(FormSubmission).filter(
+            FormSubmission.id.in_([str(lead_id) for lead_id in lead_ids]),
             FormSubmission.user_id == current_user.id
-        ).first()
-        
+        )
+    }
+    scores = {
+        str(score.submission_id): score
+        for score in db.query(LeadScore).filter(LeadScore.submission_id.in_(lead_ids))
+    }
+    
+    leads = []
+    cached = []
+    pending = []
+    keys = {}
+    for lead_id in lead_ids:
+        submission = submissions.get(str(lead_id))
         if not submission:
-            results[str(lead_id)] = []
+            pending.append((lead_id, "not_found"))
             continue
         
-        # Get lead score
-        lead_score = db.query(LeadScore).filter(
-            LeadScore.submission_id == lead_id
-        ).first()
-        
+        lead_score = scores.get(str(lead_id))
         if not lead_score:
             # Calculate in background if not exists
             background_tasks.add_task(
                 calculate_and_generate_recommendations,
                 lead_id,
-                submission.form_data,
-                db
+                submission.answers or {},
+                current_user.id,
+                submission.features
             )
-            results[str(lead_id)] = []
+            pending.append((lead_id, "scoring"))
             continue
         
-        # Generate recommendations
-        recommendation_engine = FollowUpRecommendationEngine(db)
+        answers = submission.answers or {}
+        features = features_for(submission.answers, submission.features)
+        key = recommendation_key(answers, lead_score.final_score, lead_score.score_category, 'medium', features)
+        recommendations = recommendation_cache.get(lead_score, key)
+        if recommendations is not None:
+            cached.append((lead_id, recommendations))
+            continue
         
-        recommendations = await recommendation_engine.generate_recommendations(
-            lead_data=submission.form_data,
-            lead_score=lead_score.final_score,
-            score_category=lead_score.score_category,
-            urgency='medium'
-        )
+        keys[lead_id] = (lead_score.id, key)
+        leads.append((lead_id, {
+            "lead_data": answers,
+            "lead_score": lead_score.final_score,
+            "score_category": lead_score.score_category,
+            "urgency": 'medium',
+            "features": features
+        }))
+    
+    # Generation does not use the database, the request session is closed while streaming
+    recommendation_engine = FollowUpRecommendationEngine(None)
+    include_templates = request.include_templates
+    
+    async def generate():
+        for lead_id, status in pending:
+            yield _bulk_line(lead_id, status)
+        for lead_id, recommendations in cached:
+            yield _bulk_line(lead_id, "completed", _format_recommendations(lead_id, recommendations, include_templates))
         
-        # Format response
-        lead_recs = []
-        for idx, rec in enumerate(recommendations):
-            lead_recs.append(RecommendationResponse(
-                id=f"{lead_id}-{idx}",
-                lead_id=lead_id,
-                action=rec['action'],
-                priority=rec['priority'],
-                timing=rec['timing'],
-                method=rec.get('method', 'email'),
-                template=rec.get('template') if request.include_templates else None,
-                reason=rec.get('reason'),
-                success_probability=rec.get('success_probability', 0),
-                generated_at=datetime.utcnow()
-            ))
+        generated = []
+        if settings.LLM_BATCH_SIZE > 1:
+            results = generate_batched(recommendation_engine, leads, concurrency=settings.RECOMMENDATION_CONCURRENCY)
+        else:
+            results = generate_concurrently(recommendation_engine, leads, settings.RECOMMENDATION_CONCURRENCY)
+        async for lead_id, result in results:
+            if isinstance(result, Exception):
+                yield _bulk_line(lead_id, "failed")
+            else:
+                generated.append((lead_id, result))
+                yield _bulk_line(lead_id, "completed", _format_recommendations(lead_id, result, include_templates))
         
-        results[str(lead_id)] = lead_recs
+        if generated and not recommendation_engine.degraded:
+            # The request session is closed once the response starts, use a dedicated one
+            cache_db = SessionLocal()
+            try:
+                for lead_id, recommendations in generated:
+                    lead_score_id, key = keys[lead_id]
+                    recommendation_cache.store(cache_db, lead_score_id, key, recommendations)
+                cache_db.commit()
+            except Exception as e:
+                cache_db.rollback()
+                logger.error(f"Storing bulk recommendations failed: {e}")
+            finally:
+                cache_db.close()
     
-    return results
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+def _format_recommendations(
+    lead_id: UUID,
+    recommendations: List[Dict[str, Any]],
+    include_templates: bool
+) -> List[RecommendationResponse]:
+    response = []
+    for idx, rec in enumerate(recommendations):
+        response.append(RecommendationResponse(
+            id=f"{lead_id}-{idx}",
+            lead_id=lead_id,
+            action=rec['action'],
+            priority=rec['priority'],
+            timing=rec['timing'],
+            method=rec.get('method', 'email'),
+            template=rec.get('template') if include_templates else None,
+            reason=rec.get('reason'),
+            success_probability=rec.get('success_probability', 0),
+            generated_at=datetime.utcnow()
+        ))
+    return response
+
+
+def _bulk_line(lead_id: UUID, status: str, recommendations: Optional[List[RecommendationResponse]] = None) -> str:
+    return json.dumps(jsonable_encoder({
+        "lead_id": lead_id,
+        "status": status,
+        "recommendations": recommendations or []
+    })) + "\n"
 
 
 @router.get("/leads/recommendations/templates")
@@ -314,10 +391,23 @@ async def get_recommendation_effectiveness(
 async def calculate_and_generate_recommendations(
     lead_id: UUID,
     form_data: Dict,
-    db: Session
+    user_id: str,
+    stored_features: Optional[Dict] = None
 ):
     """
     Background task to calculate score and generate recommendations
+    
+    Runs after the response, when the request session is closed, so it uses
+    a session of its own.
     """
-    scoring_engine = LeadScoringEngine(db)
-    await scoring_engine.calculate_lead_score(lead_id, form_data)
\ No newline at end of file
+    db = SessionLocal()
+    try:
+        scoring_engine = LeadScoringEngine(db)
+        await scoring_engine.calculate_lead_score(
+            lead_id, form_data, user_id=user_id, features=features_for(form_data, stored_features)
+        )
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Background scoring of lead {lead_id} failed: {e}")
+    finally:
+        db.close()
\ No newline at end of file
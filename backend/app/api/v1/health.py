@@ -4,6 +4,9 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 from app.database import get_db
 from app.config import settings
+from app.core.cache import cache_manager
+from app.services.llm_circuit import llm_circuit
+from app.services.llm_hedging import llm_requests
 import redis
 import asyncio
 
@@ -49,4 +52,17 @@ async def readiness_check(db: Session = Depends(get_db)) -> Dict:
         "status": "ready" if all_ready else "not_ready",
         "checks": checks,
         "errors": errors if errors else None
-    }
\ No newline at end of file
+    }
+
+@router.get("/health/cache")
+async def cache_stats() -> Dict:
+    """Hit/miss counters of the shared cache per namespace"""
+    return {
+        "backend": type(cache_manager.backend).__name__,
+        "namespaces": cache_manager.stats()
+    }
+
+@router.get("/health/llm")
+async def llm_circuit_stats() -> Dict:
+    """State of this process's LLM circuit breaker, its recent calls and request hedging"""
+    return {**llm_circuit.stats(), "hedging": llm_requests.stats()}
@@ -13,8 +13,15 @@ from app.models.user import User
 from app.database import get_db
 from app.config import settings
 from app.services.ai_processor import AIProcessor
+from app.services.ai_reenrichment import schedule_reenrichment
+from app.services.llm_circuit import llm_circuit
+from app.services.llm_hedging import llm_deadline
 from app.services.template_engine import TemplateEngine
 from app.services.custom_webhook_processor import CustomWebhookProcessor
+from app.services.rollup_service import SubmissionRollupService
+from app.services.dashboard_cache import invalidate_for_submission
+from app.services.competitor_dictionaries import competitor_dictionaries
+from app.services.submission_features import extract_submission_features, features_for
 from app.api.v1.auth import get_current_user
 import hashlib
 import hmac
@@ -74,25 +81,32 @@ async def receive_typeform_webhook(
             "submission_id": existing.id
         }
     
-    # Store submission
+    # Store submission with its features, parsed once for every later stage
+    answers = webhook.parse_answers()
     submission = FormSubmission(
         user_id=user_id,  # Associate with user if provided
         typeform_id=form_response.get("form_id", ""),
         form_title=form_response.get("definition", {}).get("title", "Untitled Form"),
         response_id=response_id,
         submitted_at=datetime.fromisoformat(form_response.get("submitted_at", datetime.utcnow().isoformat()).replace("Z", "+00:00")),
-        answers=webhook.parse_answers(),
+        answers=answers,
+        features=extract_submission_features(answers, competitor_dictionaries.get(db, user_id)).to_dict(),
         dashboard_url=f"/dashboard/{response_id}"
     )
     db.add(submission)
     db.commit()
     db.refresh(submission)
     
+    # Update time-series rollups and invalidate dependent dashboards
+    record_submission_rollup(db, submission)
+    invalidate_dashboard_caches(db, submission)
+    
     # Trigger AI processing in background
     background_tasks.add_task(
         process_submission,
         submission_id=submission.id,
-        answers=submission.answers
+        answers=submission.answers,
+        features=submission.features
     )
     
     return {
@@ -102,27 +116,28 @@ async def receive_typeform_webhook(
         "message": "Form submission received and processing started"
     }
 
-def process_submission(submission_id: str, answers: Dict[str, Any]):
+def process_submission(submission_id: str, answers: Dict[str, Any], features: Optional[Dict[str, Any]] = None):
     """Background task to process submission with AI"""
     import asyncio
     from app.database import SessionLocal
     
     # Run the async processing in a new event loop
-    asyncio.run(_process_submission_async(submission_id, answers))
+    asyncio.run(_process_submission_async(submission_id, answers, features))
 
-async def _process_submission_async(submission_id: str, answers: Dict[str, Any]):
+async def _process_submission_async(submission_id: str, answers: Dict[str, Any], features: Optional[Dict[str, Any]] = None):
     """Async helper for processing submission"""
     from app.database import SessionLocal
     
     db = SessionLocal()
     
     try:
-        # Determine template type based on form content
-        template_type = detect_template_type(answers)
+        # Template type detected at ingest, from the stored features
+        template_type = features_for(answers, features).template_type
         
-        # Process with AI
+        # Process with AI, within the deadline; past it the fallback content is used
         ai_processor = AIProcessor()
-        ai_content = await ai_processor.process(answers, template_type)
+        with llm_deadline(settings.SUBMISSION_AI_DEADLINE_SECONDS):
+            ai_content = await ai_processor.process(answers, template_type)
         
         # Generate HTML dashboard
         template_engine = TemplateEngine()
@@ -133,6 +148,7 @@ async def _process_submission_async(submission_id: str, answers: Dict[str, Any])
             submission_id=submission_id,
             template_type=template_type,
             ai_generated_content=ai_content,
+            ai_status="degraded" if ai_processor.degraded else "completed",
             html_content=html_content
         )
         db.add(dashboard)
@@ -143,6 +159,18 @@ async def _process_submission_async(submission_id: str, answers: Dict[str, Any])
             submission.processed = True
         
         db.commit()
+        
+        if ai_processor.degraded and not llm_circuit.is_open:
+            # Missed the deadline or failed on its own, enriched in the background; an open circuit re-enriches on close
+            schedule_reenrichment()
+        
+        # Add template type to the time-series rollups
+        if submission:
+            try:
+                SubmissionRollupService(db).record_template_type(submission, template_type)
+            except Exception as e:
+                print(f"⚠️ Failed to update template rollups for {submission_id}: {str(e)}")
+                db.rollback()
         print(f"✅ Successfully processed submission {submission_id}")
         
     except Exception as e:
@@ -151,35 +179,22 @@ async def _process_submission_async(submission_id: str, answers: Dict[str, Any])
     finally:
         db.close()
 
-def detect_template_type(answers: Dict[str, Any]) -> str:
-    """Detect which template to use based on form answers"""
-    # Combine all answer values into a single text for analysis
-    text = " ".join(str(v).lower() for v in answers.values() if v)
-    
-    # Keywords for different template types
-    diet_keywords = ["diet", "weight", "calories", "meal", "nutrition", "food", "eating", "healthy"]
-    lead_keywords = ["lead", "company", "budget", "timeline", "business", "purchase", "decision"]
-    event_keywords = ["event", "registration", "attend", "ticket", "conference", "workshop"]
-    
-    # Count keyword matches
-    diet_score = sum(1 for keyword in diet_keywords if keyword in text)
-    lead_score = sum(1 for keyword in lead_keywords if keyword in text)
-    event_score = sum(1 for keyword in event_keywords if keyword in text)
-    
-    # Return template with highest score
-    scores = {
-        "diet_plan": diet_score,
-        "lead_score": lead_score,
-        "event_registration": event_score
-    }
-    
-    template = max(scores, key=scores.get)
-    
-    # Default to generic if no clear match
-    if scores[template] == 0:
-        return "generic"
-    
-    return template
+def record_submission_rollup(db: Session, submission: FormSubmission):
+    """Fold a stored submission into the time-series rollups"""
+    try:
+        SubmissionRollupService(db).record_submission(submission)
+    except Exception as e:
+        # Rollups can be rebuilt from raw submissions, never fail the ingest
+        print(f"⚠️ Failed to update rollups for submission {submission.id}: {str(e)}")
+        db.rollback()
+
+def invalidate_dashboard_caches(db: Session, submission: FormSubmission):
+    """Mark multi-form dashboards reading this submission's form dirty"""
+    try:
+        invalidate_for_submission(db, submission)
+    except Exception as e:
+        print(f"⚠️ Failed to invalidate dashboards for submission {submission.id}: {str(e)}")
+        db.rollback()
 
 @router.post("/google-forms")
 async def receive_google_forms_webhook(
@@ -230,25 +245,32 @@ async def receive_google_forms_webhook(
     # This allows the same form to be submitted multiple times
     print(f"Creating new submission with unique ID: {unique_id}")
     
-    # Store submission with unique ID
+    # Store submission with unique ID and its features
+    answers = webhook.parse_answers()
     submission = FormSubmission(
         user_id=user_id,  # Associate with user if provided
         typeform_id=form_response.get("form_id", ""),
         form_title=form_response.get("definition", {}).get("title", "Untitled Form"),
         response_id=unique_id,  # Use unique ID to allow multiple submissions
         submitted_at=datetime.fromisoformat(form_response.get("submitted_at", datetime.utcnow().isoformat()).replace("Z", "+00:00")),
-        answers=webhook.parse_answers(),
+        answers=answers,
+        features=extract_submission_features(answers, competitor_dictionaries.get(db, user_id)).to_dict(),
         dashboard_url=f"/dashboard/{unique_id}"  # Use unique ID in dashboard URL
     )
     db.add(submission)
     db.commit()
     db.refresh(submission)
     
+    # Update time-series rollups and invalidate dependent dashboards
+    record_submission_rollup(db, submission)
+    invalidate_dashboard_caches(db, submission)
+    
     # Trigger AI processing in background
     background_tasks.add_task(
         process_submission,
         submission_id=submission.id,
-        answers=submission.answers
+        answers=submission.answers,
+        features=submission.features
     )
     
     return {
@@ -488,7 +510,7 @@ async def process_custom_webhook(config_id: str, data: Dict[str, Any], ip_addres
                 submission = db.query(FormSubmission).filter(FormSubmission.id == submission_id).first()
                 if submission:
                     # Process submission
-                    background_process_submission(submission.id, submission.answers)
+                    background_process_submission(submission.id, submission.answers, submission.features)
         
         print(f"✅ Successfully processed custom webhook: {result}")
         
@@ -497,10 +519,10 @@ async def process_custom_webhook(config_id: str, data: Dict[str, Any], ip_addres
     finally:
         db.close()
 
-def background_process_submission(submission_id: str, answers: Dict[str, Any]):
+def background_process_submission(submission_id: str, answers: Dict[str, Any], features: Optional[Dict[str, Any]] = None):
     """Process submission with AI (same as existing function)"""
     import asyncio
-    asyncio.run(_process_submission_async(submission_id, answers))
+    asyncio.run(_process_submission_async(submission_id, answers, features))
 
 @router.get("/test")
 async def test_webhook_endpoint():
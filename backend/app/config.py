@@ -14,6 +14,13 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
     
+    # Cache
+    CACHE_BACKEND: str = "memory"  # 'memory' or 'redis'
+    CACHE_DEFAULT_TTL: int = 300  # Seconds
+    CACHE_MAX_ENTRIES: int = 10000  # Memory backend bounds
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    VERSIONED_CACHE_CHECK_SECONDS: int = 5  # How long compiled caches trust the version of their rows
+    
     # OpenAI
     OPENAI_API_KEY: Optional[str] = None
     
@@ -47,6 +54,47 @@ class Settings(BaseSettings):
     # Email
     RESEND_API_KEY: Optional[str] = None
     
+    # Multi-form aggregation
+    AGGREGATION_MAX_CONCURRENCY: int = 2  # Aggregation jobs run at once per API process
+    AGGREGATION_PROCESS_WORKERS: int = 2  # Process pool size for CPU-heavy steps, 0 runs them inline
+    AGGREGATION_REFRESH_INTERVAL: int = 300  # Seconds between scheduled refreshes of stale dashboards, 0 disables
+    AGGREGATION_RETRY_SECONDS: int = 300  # Wait after a dashboard's first failed aggregation before refreshing it again, doubled per failure
+    AGGREGATION_RETRY_MAX_SECONDS: int = 86400  # Longest wait between scheduled refreshes of a failing dashboard
+    
+    # CRM export jobs
+    EXPORT_STORAGE_DIR: str = "/tmp/formflow_exports"
+    EXPORT_CHUNK_SIZE: int = 5000  # Leads per checkpointed chunk
+    EXPORT_PROCESS_WORKERS: int = 2  # Processes producing chunks in parallel, 0 uses threads
+    
+    # Lead scoring
+    RESCORE_BATCH_SIZE: int = 2000  # Submissions scored and written back per transaction
+    
+    # Follow-up recommendations
+    RECOMMENDATION_CONCURRENCY: int = 8  # Leads generated at once by a bulk request
+    
+    # LLM batching
+    LLM_BATCH_SIZE: int = 10  # Items packed into one chat completion by bulk jobs, 1 sends one per item
+    LLM_BATCH_COMPLETION_WINDOW: str = "24h"  # Completion window of offline batches
+    LLM_BATCH_POLL_INTERVAL: int = 300  # Seconds between checks of submitted offline batches
+    
+    # LLM circuit breaker
+    LLM_CIRCUIT_WINDOW: int = 20  # Recent LLM calls the failure rate is computed over
+    LLM_CIRCUIT_MIN_CALLS: int = 5  # Calls in the window before the circuit can open
+    LLM_CIRCUIT_FAILURE_RATE: float = 0.5  # Share of failed or slow calls that opens the circuit
+    LLM_CIRCUIT_SLOW_CALL_SECONDS: float = 20.0  # Calls slower than this count as failed
+    LLM_CIRCUIT_OPEN_SECONDS: int = 30  # Seconds calls fail fast before a probe call is let through
+    AI_REENRICH_BATCH_SIZE: int = 200  # Degraded dashboards and pending scores read at a time by a run
+    AI_REENRICH_RETRY_SECONDS: int = 300  # Wait after a dashboard's first failed re-enrichment, doubled per attempt
+    AI_REENRICH_MAX_ATTEMPTS: int = 6  # Failed re-enrichments after which a dashboard stays degraded
+    AI_REENRICH_SWEEP_INTERVAL: int = 300  # Seconds between runs for dashboard retries falling due, 0 disables
+    
+    # LLM deadlines and hedging
+    SUBMISSION_AI_DEADLINE_SECONDS: float = 30.0  # AI processing of a submission, its dashboard is degraded after it
+    LLM_HEDGING_ENABLED: bool = True  # Duplicate requests still running after the recent p95 latency
+    LLM_HEDGE_MAX_RATE: float = 0.05  # Share of recent requests that may be hedged
+    LLM_HEDGE_MIN_SAMPLES: int = 20  # Latencies observed before hedging starts
+    LLM_HEDGE_LATENCY_WINDOW: int = 200  # Recent requests the p95 latency and hedge rate are computed over
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,470 @@
+"""
+Shared cache layer
+Namespaced, TTL-based caching with in-process LRU or Redis storage
+
+Usage:
+    profiles = cache_manager.namespace("competitor_profiles", ttl=600, stale_ttl=60)
+    profile = await profiles.get_or_set(str(competitor_id), load_profile)
+
+Values are serialized to JSON (compressed above ``compress_threshold``) so
+both backends store bytes and the memory backend can enforce a byte budget.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import inspect
+import json
+import logging
+import threading
+import time
+import zlib
+
+from app.config import settings
+
+# Redis is optional, the memory backend is used without it
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "formflow"
+
+# Payload markers
+_RAW = b"j"
+_COMPRESSED = b"z"
+
+Loader = Callable[[], Union[Any, Awaitable[Any]]]
+
+
+class CacheBackend(ABC):
+    """Byte storage with per-entry TTL"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Stored bytes, or None if missing or expired"""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        """Store bytes, expiring after ``ttl`` seconds if given"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove one entry"""
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str) -> int:
+        """Remove every entry whose key starts with ``prefix``, returns the count"""
+
+
+class MemoryBackend(CacheBackend):
+    """
+    In-process LRU bounded by entry count and total payload bytes.
+    Expired entries are dropped lazily on access and when evicting.
+    """
+
+    def __init__(self, max_entries: int = 10_000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        if len(value) > self.max_bytes:
+            return
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at)
+            self._bytes += len(value)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def delete_prefix(self, prefix: str) -> int:
+        with self._lock:
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self._bytes -= len(value)
+
+
+class RedisBackend(CacheBackend):
+    """
+    Redis storage shared by all API processes.
+    Any client with the redis-py get/set/delete/scan_iter interface works.
+    The default client connects on first use, so an unreachable Redis only
+    turns lookups into misses instead of failing or blocking at import.
+    """
+
+    def __init__(self, url: Optional[str] = None, client: Any = None):
+        if client is None and not REDIS_AVAILABLE:
+            raise RuntimeError("redis package is not installed")
+        self.url = url or settings.REDIS_URL
+        self._client = client
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        if ttl:
+            self.client.set(key, value, px=max(int(ttl * 1000), 1))
+        else:
+            self.client.set(key, value)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+    def delete_prefix(self, prefix: str) -> int:
+        deleted = 0
+        for key in self.client.scan_iter(match=f"{prefix}*", count=500):
+            deleted += self.client.delete(key)
+        return deleted
+
+
+class CacheManager:
+    """
+    Cache front-end shared by services.
+
+    Entries carry a fresh period (``ttl``) and an optional stale period
+    (``stale_ttl``). ``get_or_set`` serves fresh entries directly, serves
+    stale entries while one background refresh runs, and coalesces
+    concurrent misses for the same key into a single loader call.
+    Backend errors are logged and treated as misses.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        default_ttl: float = 300,
+        compress_threshold: int = 1024
+    ):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.compress_threshold = compress_threshold
+
+        self._metrics: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._sync_inflight: Dict[str, threading.Event] = {}
+        self._sync_lock = threading.Lock()
+        self._refresh_pool: Optional[ThreadPoolExecutor] = None
+
+    def namespace(self, name: str, ttl: Optional[float] = None, stale_ttl: float = 0) -> "CacheNamespace":
+        return CacheNamespace(self, name, ttl if ttl is not None else self.default_ttl, stale_ttl)
+
+    # ------------------------------------------------------------------
+    # Basic operations
+    # ------------------------------------------------------------------
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        """Fresh or stale value, or ``default`` on a miss"""
+        entry = self._read(namespace, key)
+        if entry is None:
+            self._count(namespace, "misses")
+            return default
+        value, fresh_until = entry
+        self._count(namespace, "hits" if fresh_until > time.time() else "stale_hits")
+        return value
+
+    def set(
+        self,
+        namespace: str,
+        key: str,
+        value: Any,
+        ttl: Optional[float] = None,
+        stale_ttl: float = 0
+    ) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        try:
+            payload = self._serialize({"v": value, "f": time.time() + ttl})
+            self.backend.set(self._key(namespace, key), payload, ttl + stale_ttl)
+            self._count(namespace, "sets")
+        except Exception as e:
+            self._count(namespace, "errors")
+            logger.warning(f"Cache set failed for {namespace}:{key}: {e}")
+
+    def delete(self, namespace: str, key: str) -> None:
+        try:
+            self.backend.delete(self._key(namespace, key))
+        except Exception as e:
+            self._count(namespace, "errors")
+            logger.warning(f"Cache delete failed for {namespace}:{key}: {e}")
+
+    def clear_namespace(self, namespace: str) -> int:
+        try:
+            return self.backend.delete_prefix(f"{KEY_PREFIX}:{namespace}:")
+        except Exception as e:
+            self._count(namespace, "errors")
+            logger.warning(f"Cache clear failed for {namespace}: {e}")
+            return 0
+
+    # ------------------------------------------------------------------
+    # Read-through with stampede protection
+    # ------------------------------------------------------------------
+
+    async def get_or_set(
+        self,
+        namespace: str,
+        key: str,
+        loader: Loader,
+        ttl: Optional[float] = None,
+        stale_ttl: float = 0
+    ) -> Any:
+        """Read-through lookup; ``loader`` may be sync or async"""
+        entry = self._read(namespace, key)
+        if entry is not None:
+            value, fresh_until = entry
+            if fresh_until > time.time():
+                self._count(namespace, "hits")
+                return value
+
+            # Stale: serve it and let a single refresh run in the background
+            self._count(namespace, "stale_hits")
+            full_key = self._key(namespace, key)
+            if full_key not in self._inflight:
+                task = asyncio.ensure_future(self._load(namespace, key, loader, ttl, stale_ttl))
+                task.add_done_callback(_log_refresh_failure)
+            return value
+
+        self._count(namespace, "misses")
+        return await self._load(namespace, key, loader, ttl, stale_ttl)
+
+    def get_or_set_sync(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: Optional[float] = None,
+        stale_ttl: float = 0
+    ) -> Any:
+        """Thread-safe variant of ``get_or_set`` for synchronous callers"""
+        entry = self._read(namespace, key)
+        if entry is not None:
+            value, fresh_until = entry
+            if fresh_until > time.time():
+                self._count(namespace, "hits")
+                return value
+
+            self._count(namespace, "stale_hits")
+            if self._claim_sync(namespace, key) is None:
+                self._refresh_executor().submit(self._load_sync_claimed, namespace, key, loader, ttl, stale_ttl)
+            return value
+
+        self._count(namespace, "misses")
+        while True:
+            waiter = self._claim_sync(namespace, key)
+            if waiter is None:
+                return self._load_sync_claimed(namespace, key, loader, ttl, stale_ttl)
+
+            # Another thread is loading this key, wait for its result
+            waiter.wait()
+            entry = self._read(namespace, key)
+            if entry is not None:
+                self._count(namespace, "coalesced")
+                return entry[0]
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Counters per namespace with hit ratio"""
+        stats = {}
+        for namespace, counters in self._metrics.items():
+            lookups = counters["hits"] + counters["stale_hits"] + counters["misses"]
+            stats[namespace] = dict(counters)
+            stats[namespace]["hit_ratio"] = round(
+                (counters["hits"] + counters["stale_hits"]) / lookups, 3
+            ) if lookups else None
+        return stats
+
+    def reset_stats(self) -> None:
+        self._metrics.clear()
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    async def _load(self, namespace, key, loader, ttl, stale_ttl) -> Any:
+        full_key = self._key(namespace, key)
+        inflight = self._inflight.get(full_key)
+        if inflight is not None:
+            self._count(namespace, "coalesced")
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[full_key] = future
+        try:
+            value = loader()
+            if inspect.isawaitable(value):
+                value = await value
+            self.set(namespace, key, value, ttl, stale_ttl)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters receive the exception; mark it retrieved for the owner
+            future.exception()
+            raise
+        finally:
+            del self._inflight[full_key]
+
+    def _claim_sync(self, namespace: str, key: str) -> Optional[threading.Event]:
+        """Returns None if the caller now owns the load, else the owner's event"""
+        full_key = self._key(namespace, key)
+        with self._sync_lock:
+            event = self._sync_inflight.get(full_key)
+            if event is not None:
+                return event
+            self._sync_inflight[full_key] = threading.Event()
+            return None
+
+    def _load_sync_claimed(self, namespace, key, loader, ttl, stale_ttl) -> Any:
+        full_key = self._key(namespace, key)
+        try:
+            value = loader()
+            self.set(namespace, key, value, ttl, stale_ttl)
+            return value
+        finally:
+            with self._sync_lock:
+                event = self._sync_inflight.pop(full_key)
+            event.set()
+
+    def _refresh_executor(self) -> ThreadPoolExecutor:
+        if self._refresh_pool is None:
+            self._refresh_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+        return self._refresh_pool
+
+    def _read(self, namespace: str, key: str) -> Optional[Tuple[Any, float]]:
+        try:
+            payload = self.backend.get(self._key(namespace, key))
+        except Exception as e:
+            self._count(namespace, "errors")
+            logger.warning(f"Cache get failed for {namespace}:{key}: {e}")
+            return None
+        if payload is None:
+            return None
+        try:
+            entry = self._deserialize(payload)
+            return entry["v"], entry["f"]
+        except Exception as e:
+            # Corrupt or foreign payload: drop it so the next load replaces it
+            self._count(namespace, "errors")
+            logger.warning(f"Cache entry {namespace}:{key} is unreadable, deleting it: {e}")
+            self.delete(namespace, key)
+            return None
+
+    def _serialize(self, entry: Dict[str, Any]) -> bytes:
+        data = json.dumps(entry, default=str, separators=(",", ":")).encode()
+        if len(data) >= self.compress_threshold:
+            return _COMPRESSED + zlib.compress(data, 6)
+        return _RAW + data
+
+    @staticmethod
+    def _deserialize(payload: bytes) -> Dict[str, Any]:
+        marker, data = payload[:1], payload[1:]
+        if marker == _COMPRESSED:
+            data = zlib.decompress(data)
+        return json.loads(data)
+
+    @staticmethod
+    def _key(namespace: str, key: str) -> str:
+        return f"{KEY_PREFIX}:{namespace}:{key}"
+
+    def _count(self, namespace: str, metric: str) -> None:
+        self._metrics[namespace][metric] += 1
+
+
+class CacheNamespace:
+    """A namespace with its own TTL settings, bound to a CacheManager"""
+
+    def __init__(self, manager: CacheManager, name: str, ttl: float, stale_ttl: float = 0):
+        self.manager = manager
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.manager.get(self.name, key, default)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.manager.set(self.name, key, value, self.ttl if ttl is None else ttl, self.stale_ttl)
+
+    def delete(self, key: str) -> None:
+        self.manager.delete(self.name, key)
+
+    def clear(self) -> int:
+        return self.manager.clear_namespace(self.name)
+
+    async def get_or_set(self, key: str, loader: Loader, ttl: Optional[float] = None) -> Any:
+        return await self.manager.get_or_set(
+            self.name, key, loader, self.ttl if ttl is None else ttl, self.stale_ttl
+        )
+
+    def get_or_set_sync(self, key: str, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        return self.manager.get_or_set_sync(
+            self.name, key, loader, self.ttl if ttl is None else ttl, self.stale_ttl
+        )
+
+
+def _log_refresh_failure(task: asyncio.Future) -> None:
+    if not task.cancelled() and task.exception():
+        logger.warning(f"Background cache refresh failed: {task.exception()}")
+
+
+def create_backend() -> CacheBackend:
+    """Backend selected by CACHE_BACKEND, falls back to memory if the redis package is missing"""
+    if settings.CACHE_BACKEND == "redis":
+        if REDIS_AVAILABLE:
+            return RedisBackend(settings.REDIS_URL)
+        logger.warning("⚠️ redis package is not installed, using in-process cache")
+    return MemoryBackend(
+        max_entries=settings.CACHE_MAX_ENTRIES,
+        max_bytes=settings.CACHE_MAX_BYTES
+    )
+
+
+cache_manager = CacheManager(create_backend(), default_ttl=settings.CACHE_DEFAULT_TTL)
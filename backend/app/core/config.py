@@ -0,0 +1,7 @@
+"""
+Settings for modules importing them from app.core
+"""
+
+from app.config import Settings, settings
+
+__all__ = ["Settings", "settings"]
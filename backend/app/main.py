@@ -4,8 +4,12 @@ from contextlib import asynccontextmanager
 from app.config import settings
 from app.database import engine, Base
 from app.api.v1 import health, webhooks, dashboards, billing, auth, users, onboarding, templates
+from app.api.v1.endpoints import competitive, crm_export, lead_scoring, multi_form, recommendations
 from app.monitoring import setup_monitoring
 from app.middleware.security import setup_security
+from app.services.aggregation_scheduler import aggregation_scheduler
+from app.services.export_jobs import export_job_runner
+from app.services.ai_reenrichment import register_reenrichment, start_reenrichment_sweep, stop_reenrichment_sweep
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -22,9 +26,25 @@ async def lifespan(app: FastAPI):
         print(f"Warning: Could not create database tables: {e}")
         # Continue anyway for Cloud Run
     
+    try:
+        export_job_runner.resume_incomplete()
+    except Exception as e:
+        print(f"Warning: Could not resume export jobs: {e}")
+    
+    # Dashboards whose data changed since their last aggregation are refreshed in the background
+    aggregation_scheduler.start_scheduled_refreshes()
+    
+    # Dashboards and scores built while the LLM was down are enriched once it is back,
+    # dashboards backing off after a failed attempt when their retry is due
+    register_reenrichment()
+    start_reenrichment_sweep()
+    
     print(f"🚀 {settings.APP_NAME} v{settings.VERSION} started successfully!")
     yield
     # Shutdown
+    await export_job_runner.shutdown()
+    await aggregation_scheduler.shutdown()
+    await stop_reenrichment_sweep()
     print(f"👋 {settings.APP_NAME} shutting down...")
 
 app = FastAPI(
@@ -55,6 +75,11 @@ app.include_router(auth.router, prefix="/api/v1/auth", tags=["authentication"])
 app.include_router(users.router, prefix="/api/v1/users", tags=["users"])
 app.include_router(onboarding.router, prefix="/api/v1", tags=["onboarding"])
 app.include_router(templates.router, prefix="/api/v1/templates", tags=["templates"])
+app.include_router(multi_form.router, prefix="/api/v1", tags=["multi-form dashboards"])
+app.include_router(lead_scoring.router, prefix="/api/v1", tags=["lead scoring"])
+app.include_router(recommendations.router, prefix="/api/v1", tags=["recommendations"])
+app.include_router(competitive.router, prefix="/api/v1", tags=["competitive analysis"])
+app.include_router(crm_export.router, prefix="/api/v1", tags=["crm export"])
 
 @app.get("/")
 async def root():
@@ -2,5 +2,11 @@ from app.models.user import User
 from app.models.form import FormSubmission, Dashboard
 from app.models.template import DashboardTemplate, CustomTemplate, WidgetConfiguration
 from app.models.webhook import WebhookConfig, WebhookLog
+from app.models.submission_rollup import SubmissionRollup
+from app.models.lead_score import LeadScore, ScoringRule, LeadScoreHistory, RescoreRun
+from app.models.multi_form_dashboard import MultiFormDashboard, MultiFormMapping, AggregationJob, AggregatedRecord
+from app.models.export_job import ExportJob, ExportChunk, ExportHistory
+from app.models.competitive_analysis import CompetitorProfile, CompetitiveInsight, ObjectionHandler, BattleCard, CompetitiveOutcome, CompetitiveOutcomeRollup
+from app.models.llm_batch_job import LLMBatchJob
 
-__all__ = ["User", "FormSubmission", "Dashboard", "DashboardTemplate", "CustomTemplate", "WidgetConfiguration", "WebhookConfig", "WebhookLog"]
\ No newline at end of file
+__all__ = ["User", "FormSubmission", "Dashboard", "DashboardTemplate", "CustomTemplate", "WidgetConfiguration", "WebhookConfig", "WebhookLog", "SubmissionRollup", "LeadScore", "ScoringRule", "LeadScoreHistory", "RescoreRun", "MultiFormDashboard", "MultiFormMapping", "AggregationJob", "AggregatedRecord", "ExportJob", "ExportChunk", "ExportHistory", "CompetitorProfile", "CompetitiveInsight", "ObjectionHandler", "BattleCard", "CompetitiveOutcome", "CompetitiveOutcomeRollup", "LLMBatchJob"]
\ No newline at end of file
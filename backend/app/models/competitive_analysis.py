@@ -3,7 +3,7 @@ Competitive Analysis Models for FA-49
 Database models for competitive intelligence and battle cards
 """
 
-from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey, JSON, Boolean, Text
+from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey, JSON, Boolean, Text, UniqueConstraint, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -15,10 +15,21 @@ from app.database import Base
 class CompetitorProfile(Base):
     """Model for storing competitor information"""
     __tablename__ = "competitor_profiles"
+    __table_args__ = (
+        # Names are unique per tenant, a tenant profile extends the global one of that name
+        UniqueConstraint("user_id", "name", name="uq_competitor_profiles_user_name"),
+        # NULLs are distinct in the constraint above, global names need their own index
+        Index(
+            "uq_competitor_profiles_global_name", "name", unique=True,
+            postgresql_where=text("user_id IS NULL"), sqlite_where=text("user_id IS NULL")
+        ),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    name = Column(String(255), nullable=False, unique=True)
+    user_id = Column(String, ForeignKey("users.id"), nullable=True, index=True)  # NULL: shared by all tenants
+    name = Column(String(255), nullable=False)
     display_name = Column(String(255))
+    aliases = Column(JSON)  # Product names, abbreviations and spellings detected as this competitor
     
     # Company information
     company_info = Column(JSON)  # website, founded, size, revenue, etc.
@@ -204,4 +215,32 @@ class CompetitiveOutcome(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # For analysis
-    tags = Column(JSON)  # Industry, company size, use case, etc.
\ No newline at end of file
+    tags = Column(JSON)  # Industry, company size, use case, etc.
+
+
+class CompetitiveOutcomeRollup(Base):
+    """
+    Daily win/loss rollup of competitive outcomes for one competitor and tenant.
+
+    Maintained by CompetitiveAnalysisService.track_competitive_outcome, so the
+    competitive statistics read a few buckets per competitor instead of every
+    outcome ever tracked. Buckets are keyed on the outcome date.
+    """
+    __tablename__ = "competitive_outcome_rollups"
+    __table_args__ = (
+        UniqueConstraint("user_id", "competitor_id", "bucket_start", name="uq_competitive_outcome_rollup_bucket"),
+        Index("ix_competitive_outcome_rollups_lookup", "user_id", "bucket_start"),
+    )
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, nullable=False)  # Tenant of the lead
+    competitor_id = Column(UUID(as_uuid=True), ForeignKey("competitor_profiles.id"), nullable=False)
+    bucket_start = Column(DateTime, nullable=False)  # Day of the outcome (naive UTC)
+    
+    outcome_count = Column(Integer, default=0, nullable=False)
+    wins = Column(Integer, default=0, nullable=False)
+    losses = Column(Integer, default=0, nullable=False)
+    deal_size_sum = Column(Float, default=0.0, nullable=False)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
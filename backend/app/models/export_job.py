@@ -0,0 +1,124 @@
+"""
+Export Job Models for FA-48
+Background CRM exports produced in checkpointed chunks, and the export history
+that delta exports take their watermark from
+"""
+
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, JSON, Text, UniqueConstraint, Index
+from datetime import datetime
+import uuid
+
+from app.database import Base
+
+
+class ExportJob(Base):
+    """
+    A CRM export produced in the background.
+
+    The lead selection is split into chunks of consecutive leads (ordered by
+    created_at, id) when the job starts. Each chunk is written to its own part
+    file and checkpointed in ExportChunk, so an interrupted job resumes with
+    the chunks that are not done yet.
+    """
+    __tablename__ = "export_jobs"
+    __table_args__ = (
+        Index("ix_export_jobs_user_created", "user_id", "created_at"),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+
+    crm_type = Column(String(50), nullable=False)
+    format = Column(String(20), nullable=False)  # 'csv', 'json', 'excel'
+    request_params = Column(JSON, nullable=False)  # CRMExportRequest the job was submitted with
+    delta_since = Column(DateTime)  # Lower bound of a delta export, None exports the full selection
+    status = Column(String(50), default="pending")  # 'pending', 'processing', 'completed', 'failed', 'cancelled'
+
+    # Progress tracking
+    chunk_size = Column(Integer, nullable=False)
+    total_chunks = Column(Integer)  # Set once the chunks are planned
+    completed_chunks = Column(Integer, default=0)
+    total_rows = Column(Integer)
+    exported_rows = Column(Integer, default=0)
+
+    # Result
+    file_name = Column(String)
+    file_path = Column(String)
+    error_message = Column(Text)
+
+    started_at = Column(DateTime)
+    completed_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def progress(self) -> float:
+        """Completion ratio over produced chunks"""
+        if self.status == "completed":
+            return 1.0
+        if not self.total_chunks:
+            return 0.0
+        return round((self.completed_chunks or 0) / self.total_chunks, 2)
+
+
+class ExportChunk(Base):
+    """
+    One range of leads of an export job and its checkpoint.
+
+    The range is bounded by the (created_at, id) keys of the last lead of the
+    previous chunk (exclusive) and the last lead of this chunk (inclusive).
+    """
+    __tablename__ = "export_chunks"
+    __table_args__ = (
+        UniqueConstraint("job_id", "chunk_index", name="uq_export_chunk_index"),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    job_id = Column(String, ForeignKey("export_jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=False)
+
+    after_created_at = Column(DateTime)
+    after_id = Column(String)
+    last_created_at = Column(DateTime, nullable=False)
+    last_id = Column(String, nullable=False)
+
+    status = Column(String(50), default="pending")  # 'pending', 'processing', 'completed'
+    row_count = Column(Integer)
+    claimed_at = Column(DateTime)
+    completed_at = Column(DateTime)
+
+
+class ExportHistory(Base):
+    """
+    One export of a user's leads to a CRM format.
+
+    ``watermark`` is the time the export started reading leads. A delta
+    export selects leads created or re-scored after the watermark of the
+    user's last completed export of the full selection for the same CRM
+    type; exports restricted to lead ids or a date range leave it alone.
+    """
+    __tablename__ = "export_history"
+    __table_args__ = (
+        Index("ix_export_history_watermark", "user_id", "crm_type", "status", "watermark"),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    job_id = Column(String, ForeignKey("export_jobs.id"))  # Set for background exports
+
+    crm_type = Column(String(50), nullable=False)
+    format = Column(String(20), nullable=False)
+    delta = Column(Boolean, default=False)
+    full_selection = Column(Boolean, default=True)  # No lead ids or date range, only these advance the watermark
+    upsert_key = Column(String(50))
+
+    since = Column(DateTime)  # Lower bound the delta was selected with
+    watermark = Column(DateTime, nullable=False)
+
+    status = Column(String(50), default="processing")  # 'processing', 'completed', 'failed'
+    lead_count = Column(Integer, default=0)
+    file_name = Column(String)
+    error_message = Column(Text)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime)
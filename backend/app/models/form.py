@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, JSON, DateTime, Integer, Text, Boolean, ForeignKey
+from sqlalchemy import Column, String, JSON, DateTime, Integer, Text, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 import uuid
@@ -6,6 +6,10 @@ from datetime import datetime
 
 class FormSubmission(Base):
     __tablename__ = "form_submissions"
+    __table_args__ = (
+        # Export selection and delta exports by creation time
+        Index("ix_form_submissions_user_created", "user_id", "created_at"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String, ForeignKey("users.id"), nullable=True)
@@ -14,12 +18,15 @@ class FormSubmission(Base):
     response_id = Column(String, unique=True)
     submitted_at = Column(DateTime)
     answers = Column(JSON)  # Store complete answer data
+    features = Column(JSON)  # SubmissionFeatures parsed from the answers at ingest
     processed = Column(Boolean, default=False)
     dashboard_url = Column(String, unique=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationship
     dashboard = relationship("Dashboard", back_populates="submission", uselist=False)
+    lead_score = relationship("LeadScore", back_populates="submission", uselist=False)
+    competitive_insight = relationship("CompetitiveInsight", back_populates="submission", uselist=False)
 
 class Dashboard(Base):
     __tablename__ = "dashboards"
@@ -29,6 +36,9 @@ class Dashboard(Base):
     template_type = Column(String)  # diet_plan, lead_score, event, generic
     template_id = Column(String, ForeignKey("dashboard_templates.id"))
     ai_generated_content = Column(JSON)
+    ai_status = Column(String(20), default="completed")  # 'degraded' when built from fallback content, until re-enriched
+    ai_attempts = Column(Integer, default=0)  # Failed re-enrichments of a degraded dashboard
+    ai_retry_at = Column(DateTime)  # Not re-enriched again before this time
     html_content = Column(Text)
     widgets = Column(JSON)  # Widget configurations for this dashboard
     theme = Column(JSON)  # Theme configuration
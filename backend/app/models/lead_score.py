@@ -3,7 +3,7 @@ Lead Scoring Model for FA-45
 Database model for storing lead scores and scoring metadata
 """
 
-from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey, JSON, Boolean
+from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey, JSON, Boolean, Text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -41,9 +41,15 @@ class LeadScore(Base):
     ai_insights = Column(JSON)
     buying_signals_detected = Column(JSON)
     
+    ai_status = Column(String(20), default="completed")  # 'pending' while the AI adjustment is deferred, 'batched' while in an offline batch, 'completed', 'fallback'
+    
+    # Follow-up recommendations generated for this score, valid while recommendations_key matches
+    recommendations = Column(JSON)
+    recommendations_key = Column(String(64))
+    
     # Metadata
     scoring_version = Column(String(50), default="v1.0")
-    calculated_at = Column(DateTime, default=datetime.utcnow)
+    calculated_at = Column(DateTime, default=datetime.utcnow, index=True)  # Delta exports select re-scored leads by it
     
     # Relationships
     submission = relationship("FormSubmission", back_populates="lead_score")
@@ -54,6 +60,7 @@ class ScoringRule(Base):
     __tablename__ = "scoring_rules"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)  # Tenant the rule scores for
     name = Column(String(255), nullable=False)
     field_name = Column(String(255), nullable=False)
     
@@ -61,7 +68,10 @@ class ScoringRule(Base):
     rule_type = Column(String(50))  # 'numeric', 'text', 'select', 'boolean'
     conditions = Column(JSON)
     # Example for numeric: {"operator": ">=", "value": 50000}
+    #   or a decision table: {"ranges": [[100000, 30], [50000, 25], [0, 5]]}
     # Example for text: {"contains": ["urgent", "asap", "immediately"]}
+    # Example for select: {"options": {"enterprise": 10, "smb": 5}} or {"values": ["yes"]}
+    # Example for boolean: {"equals": true}
     
     # Scoring
     weight = Column(Float, default=1.0)
@@ -85,4 +95,32 @@ class LeadScoreHistory(Base):
     change_reason = Column(String(500))
     
     changed_at = Column(DateTime, default=datetime.utcnow)
-    changed_by = Column(UUID(as_uuid=True), ForeignKey("users.id"))
\ No newline at end of file
+    changed_by = Column(UUID(as_uuid=True), ForeignKey("users.id"))
+
+
+class RescoreRun(Base):
+    """A bulk rescore started from the admin API, polled from any API process"""
+    __tablename__ = "rescore_runs"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String)  # Tenant whose submissions are rescored, None rescores all
+    requested_by = Column(String, ForeignKey("users.id"))
+    dry_run = Column(Boolean, default=False)
+    status = Column(String(20), default="pending")  # 'pending', 'processing', 'completed', 'failed'
+    
+    # Progress tracking
+    processed = Column(Integer, default=0)
+    total = Column(Integer)
+    
+    # Result
+    result = Column(JSON)  # Counts returned by BulkRescorer.run
+    error_message = Column(Text)
+    
+    started_at = Column(DateTime)
+    completed_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @property
+    def run_id(self) -> str:
+        return self.id
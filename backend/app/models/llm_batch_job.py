@@ -0,0 +1,27 @@
+"""
+LLM Batch Job Model
+Offline LLM batches submitted by bulk jobs, until their results are collected
+"""
+
+from sqlalchemy import Column, String, Integer, DateTime, JSON, Text
+from datetime import datetime
+import uuid
+
+from app.database import Base
+
+
+class LLMBatchJob(Base):
+    """An offline batch submitted to the LLM provider and the items it answers"""
+    __tablename__ = "llm_batch_jobs"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    kind = Column(String(50), nullable=False)  # BatchTask kind, selects how results are applied
+    provider_batch_id = Column(String(100), nullable=False)
+    status = Column(String(20), default="submitted", index=True)  # 'submitted', 'collected', 'failed'
+
+    item_ids = Column(JSON, nullable=False)  # Ids of the rows the batch answers
+    applied_count = Column(Integer, default=0)
+
+    submitted_at = Column(DateTime, default=datetime.utcnow)
+    collected_at = Column(DateTime)
+    error_message = Column(Text)
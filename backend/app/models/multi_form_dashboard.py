@@ -3,7 +3,7 @@ Multi-Form Dashboard Models for FA-44 Epic
 Enables aggregation of data from multiple forms into a single dashboard
 """
 
-from sqlalchemy import Column, String, DateTime, Integer, Boolean, ForeignKey, JSON, Text, Float
+from sqlalchemy import Column, String, DateTime, Integer, Boolean, ForeignKey, JSON, Text, Float, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime
@@ -31,8 +31,10 @@ class MultiFormDashboard(Base):
     #         {"form_id": "uuid", "type": "typeform", "weight": 1.0},
     #         {"form_id": "uuid", "type": "google_forms", "weight": 1.0}
     #     ],
-    #     "aggregation_method": "union|intersection|weighted",
-    #     "conflict_resolution": "latest|average|priority"
+    #     "aggregation_method": "union|intersection|weighted|join",
+    #     "conflict_resolution": "latest|average|priority",
+    #     "join_key": "email",  # For join aggregation
+    #     "join_type": "outer|inner"
     # }
     
     # Analytics configuration
@@ -57,9 +59,14 @@ class MultiFormDashboard(Base):
     #     "custom_filters": [{"field": "score", "operator": ">", "value": 7}]
     # }
     
-    # Cached aggregated data
+    # Cached aggregation metrics and metadata
+    # Row-level results live in aggregated_records, not in this column
     cached_data = Column(JSON)
     cache_updated_at = Column(DateTime)
+    cache_key = Column(String(64))  # "<config hash>:<data_version>" the cached data was computed for
+    data_version = Column(Integer, default=0, nullable=False)  # Data watermark, bumped when inputs change
+    refresh_failures = Column(Integer, default=0)  # Failed aggregations since the last successful one
+    refresh_retry_at = Column(DateTime)  # Not refreshed by the scheduler again before this time
     
     # Dashboard settings
     is_public = Column(Boolean, default=False)
@@ -76,6 +83,7 @@ class MultiFormDashboard(Base):
     form_mappings = relationship("MultiFormMapping", back_populates="dashboard", cascade="all, delete-orphan")
     scheduled_reports = relationship("ScheduledReport", back_populates="dashboard", cascade="all, delete-orphan")
     custom_metrics = relationship("CustomMetric", back_populates="dashboard", cascade="all, delete-orphan")
+    aggregated_records = relationship("AggregatedRecord", cascade="all, delete-orphan", passive_deletes=True, lazy="dynamic")
 
 
 class MultiFormMapping(Base):
@@ -83,6 +91,11 @@ class MultiFormMapping(Base):
     Maps individual forms to a multi-form dashboard
     """
     __tablename__ = "multi_form_mappings"
+    __table_args__ = (
+        # Dependency index: which dashboards read a given form or submission
+        Index("ix_multi_form_mappings_external_id", "form_external_id"),
+        Index("ix_multi_form_mappings_submission_id", "form_submission_id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     dashboard_id = Column(UUID(as_uuid=True), ForeignKey("multi_form_dashboards.id"), nullable=False)
@@ -234,7 +247,8 @@ class AggregationJob(Base):
     dashboard_id = Column(UUID(as_uuid=True), ForeignKey("multi_form_dashboards.id"), nullable=False)
     
     job_type = Column(String(50))  # 'full_refresh', 'incremental', 'real_time'
-    status = Column(String(50))  # 'pending', 'processing', 'completed', 'failed'
+    status = Column(String(50))  # 'pending', 'processing', 'completed', 'failed', 'cancelled'
+    priority = Column(String(20), default="interactive")  # 'interactive', 'scheduled'
     
     # Progress tracking
     total_forms = Column(Integer)
@@ -256,4 +270,32 @@ class AggregationJob(Base):
     result_summary = Column(JSON)
     
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def progress(self) -> float:
+        """Completion ratio: fetching forms is the first half, processing records the second"""
+        if self.status == "completed":
+            return 1.0
+        fetched = (self.processed_forms or 0) / self.total_forms if self.total_forms else 0
+        processed = (self.processed_records or 0) / self.total_records if self.total_records else 0
+        return round(fetched * 0.5 + processed * 0.5, 2)
+
+
+class AggregatedRecord(Base):
+    """
+    Row-level output of a dashboard aggregation run.
+    Stored outside cached_data so rows can be paginated and streamed.
+    """
+    __tablename__ = "aggregated_records"
+    __table_args__ = (
+        Index("ix_aggregated_records_run_row", "dashboard_id", "run_id", "row_number"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    dashboard_id = Column(UUID(as_uuid=True), ForeignKey("multi_form_dashboards.id", ondelete="CASCADE"), nullable=False)
+    run_id = Column(UUID(as_uuid=True), nullable=False)  # AggregationJob that produced the row
+    row_number = Column(Integer, nullable=False)  # Position within the run, used as pagination cursor
+    data = Column(JSON, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,56 @@
+"""
+Submission Rollup Model
+Pre-aggregated, time-bucketed submission statistics for time-series charts
+"""
+
+from sqlalchemy import Column, String, Integer, DateTime, JSON, UniqueConstraint, Index
+from datetime import datetime
+import uuid
+
+from app.database import Base
+
+
+class SubmissionRollup(Base):
+    """
+    Hourly/daily rollup of form submissions for a single scope.
+
+    A scope is either a form (``scope_type='form'``, keyed by ``typeform_id``)
+    or a user (``scope_type='user'``, keyed by ``user_id``). Buckets are keyed
+    on the submission's ``submitted_at`` so late-arriving webhooks land in the
+    bucket they belong to rather than the bucket they were received in.
+    """
+    __tablename__ = "submission_rollups"
+    __table_args__ = (
+        UniqueConstraint("scope_type", "scope_key", "granularity", "bucket_start", name="uq_submission_rollup_bucket"),
+        Index("ix_submission_rollups_lookup", "scope_type", "scope_key", "granularity", "bucket_start"),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    scope_type = Column(String(20), nullable=False)  # 'form', 'user'
+    scope_key = Column(String, nullable=False)  # typeform_id or user_id
+    granularity = Column(String(10), nullable=False)  # 'hour', 'day'
+    bucket_start = Column(DateTime, nullable=False)
+
+    submission_count = Column(Integer, default=0, nullable=False)
+
+    # Numeric answer aggregates
+    numeric_sums = Column(JSON, default=dict)
+    numeric_counts = Column(JSON, default=dict)
+    # Example: {"satisfaction_score": 42.0, "budget": 150000}
+
+    # Template type breakdown (filled in once a submission has been processed)
+    template_counts = Column(JSON, default=dict)
+    # Example: {"lead_score": 12, "generic": 3}
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_point(self) -> dict:
+        """Serialize the bucket as a chart data point"""
+        return {
+            "bucket_start": self.bucket_start.isoformat(),
+            "count": self.submission_count,
+            "numeric_sums": self.numeric_sums or {},
+            "numeric_counts": self.numeric_counts or {},
+            "template_counts": self.template_counts or {},
+        }
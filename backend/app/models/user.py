@@ -47,6 +47,7 @@ class User(Base):
     # Relationships
     custom_templates = relationship("CustomTemplate", back_populates="user")
     webhook_configs = relationship("WebhookConfig", back_populates="user")
+    multi_form_dashboards = relationship("MultiFormDashboard", back_populates="user")
     
     @property
     def name(self):
@@ -35,9 +35,31 @@ class CompetitorProfileBase(BaseModel):
     is_active: bool = True
 
 
+class CompetitorProfileCreate(CompetitorProfileBase):
+    """Schema for adding a competitor to the account's dictionary"""
+    aliases: List[str] = Field(default_factory=list, description="Product names, abbreviations and spellings")
+    strengths: List[str] = Field(default_factory=list)
+    weaknesses: List[str] = Field(default_factory=list)
+    our_advantages: List[str] = Field(default_factory=list)
+    their_advantages: List[str] = Field(default_factory=list)
+    positioning_strategy: Optional[str] = None
+    key_differentiators: List[str] = Field(default_factory=list)
+
+
+class CompetitorProfileUpdate(BaseModel):
+    """Schema for updating a competitor, only the fields given change"""
+    display_name: Optional[str] = None
+    aliases: Optional[List[str]] = None
+    target_market: Optional[str] = None
+    is_active: Optional[bool] = None
+    positioning_strategy: Optional[str] = None
+
+
 class CompetitorProfileResponse(CompetitorProfileBase):
     """Response schema for competitor profiles"""
     id: UUID
+    user_id: Optional[str] = None
+    aliases: Optional[List[str]] = None
     strengths: List[str]
     weaknesses: List[str]
     our_advantages: List[str]
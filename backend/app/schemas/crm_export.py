@@ -23,6 +23,14 @@ class ExportFormat(str, Enum):
     json = "json"
     excel = "excel"
     xml = "xml"
+    parquet = "parquet"
+    arrow = "arrow"  # Arrow IPC stream
+
+
+class UpsertKey(str, Enum):
+    """Lead identity written as the CRM's upsert key"""
+    submission_id = "submission_id"
+    email = "email"
 
 
 class CRMExportRequest(BaseModel):
@@ -36,6 +44,8 @@ class CRMExportRequest(BaseModel):
     date_from: Optional[datetime] = Field(None, description="Export leads from this date")
     date_to: Optional[datetime] = Field(None, description="Export leads until this date")
     custom_field_mapping: Optional[Dict[str, str]] = Field(None, description="Custom field mappings")
+    delta: bool = Field(False, description="Only leads created or re-scored since the last completed export to this CRM")
+    upsert_key: Optional[UpsertKey] = Field(None, description="Add a key column the CRM can upsert on")
 
 
 class FieldMappingResponse(BaseModel):
@@ -53,7 +63,10 @@ class ExportHistoryResponse(BaseModel):
     crm_type: str
     format: str
     lead_count: int
-    file_name: str
+    file_name: Optional[str] = None
+    delta: bool = False
+    since: Optional[datetime] = Field(None, description="Leads changed after this time (delta exports)")
+    watermark: Optional[datetime] = Field(None, description="Next delta export starts here")
     status: str = Field(..., description="completed, failed, processing")
     error_message: Optional[str] = None
     
@@ -61,6 +74,28 @@ class ExportHistoryResponse(BaseModel):
         from_attributes = True
 
 
+class ExportJobResponse(BaseModel):
+    """Response schema for background export jobs"""
+    id: str
+    crm_type: str
+    format: str
+    status: str = Field(..., description="pending, processing, completed, failed, cancelled")
+    progress: float = Field(0, description="Completion ratio between 0 and 1")
+    total_chunks: Optional[int] = None
+    completed_chunks: int = 0
+    total_rows: Optional[int] = None
+    exported_rows: int = 0
+    file_name: Optional[str] = None
+    download_url: Optional[str] = None
+    error_message: Optional[str] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
 class WebhookConfig(BaseModel):
     """Configuration for CRM webhook integration"""
     crm_type: CRMType
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from datetime import datetime
 
 class DashboardCreate(BaseModel):
@@ -19,4 +19,18 @@ class DashboardResponse(BaseModel):
     token: Optional[str] = None  # For accessing the dashboard
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class TimeSeriesPoint(BaseModel):
+    bucket_start: str
+    count: int
+    numeric_sums: Dict[str, float] = {}
+    numeric_counts: Dict[str, int] = {}
+    template_counts: Dict[str, int] = {}
+
+class TimeSeriesResponse(BaseModel):
+    granularity: str  # hour, day
+    start: str
+    end: str
+    total: int
+    points: List[TimeSeriesPoint]
@@ -3,7 +3,7 @@ Pydantic Schemas for Lead Scoring (FA-45)
 """
 
 from pydantic import BaseModel, Field
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from uuid import UUID
 from datetime import datetime
 
@@ -36,6 +36,7 @@ class LeadScoreResponse(LeadScoreBase):
     score_factors: Dict[str, ScoreFactorDetail]
     ai_insights: Optional[Dict[str, Any]] = None
     buying_signals_detected: Optional[List[str]] = None
+    ai_status: Optional[str] = Field(None, description="'pending' until the deferred AI adjustment is applied")
     calculated_at: datetime
     
     class Config:
@@ -95,4 +96,33 @@ class LeadScoreStats(BaseModel):
     highest_score: int
     lowest_score: int
     hot_leads_count: int
-    conversion_ready: int
\ No newline at end of file
+    conversion_ready: int
+
+
+class RescoreRequest(BaseModel):
+    """Bulk rescore with tuned weights or point tables, omitted values keep the defaults"""
+    weights: Optional[Dict[str, float]] = None
+    budget_thresholds: Optional[List[Tuple[int, int]]] = Field(None, description="(minimum amount, points) pairs")
+    timeline_scores: Optional[Dict[str, int]] = None
+    authority_scores: Optional[Dict[str, int]] = None
+    company_size_scores: Optional[Dict[str, int]] = None
+    scoring_version: Optional[str] = None
+    user_id: Optional[str] = Field(None, description="Only rescore this user's submissions")
+    batch_size: Optional[int] = Field(None, ge=1, le=50000)
+    dry_run: bool = False
+
+
+class RescoreRunResponse(BaseModel):
+    """Progress of a bulk rescore"""
+    run_id: str
+    status: str
+    dry_run: bool
+    processed: int
+    total: Optional[int] = None
+    result: Optional[Dict[str, int]] = None
+    error_message: Optional[str] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
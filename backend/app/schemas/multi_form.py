@@ -139,12 +139,14 @@ class ScheduledReportResponse(ScheduledReportBase):
 
 class AggregationConfig(BaseModel):
     """Schema for aggregation configuration"""
-    aggregation_method: str = Field("union", description="union, intersection, or weighted")
+    aggregation_method: str = Field("union", description="union, intersection, weighted, or join")
     conflict_resolution: str = Field("latest", description="latest, average, or priority")
+    join_key: Optional[str] = Field(None, description="Field to merge records on for join aggregation, e.g. email")
+    join_type: str = Field("outer", description="outer keeps unmatched records, inner only keys present in every form")
     
     @validator("aggregation_method")
     def validate_aggregation_method(cls, v):
-        allowed_methods = ["union", "intersection", "weighted"]
+        allowed_methods = ["union", "intersection", "weighted", "join"]
         if v not in allowed_methods:
             raise ValueError(f"aggregation_method must be one of {allowed_methods}")
         return v
@@ -155,6 +157,19 @@ class AggregationConfig(BaseModel):
         if v not in allowed_methods:
             raise ValueError(f"conflict_resolution must be one of {allowed_methods}")
         return v
+    
+    @validator("join_key", always=True)
+    def validate_join_key(cls, v, values):
+        if values.get("aggregation_method") == "join" and not v:
+            raise ValueError("join_key is required for join aggregation")
+        return v
+    
+    @validator("join_type")
+    def validate_join_type(cls, v):
+        allowed_types = ["outer", "inner"]
+        if v not in allowed_types:
+            raise ValueError(f"join_type must be one of {allowed_types}")
+        return v
 
 
 class AnalyticsConfig(BaseModel):
@@ -230,12 +245,22 @@ class AggregationResultResponse(BaseModel):
     error: Optional[str] = None
 
 
+class AggregatedRecordsPage(BaseModel):
+    """Schema for a page of aggregated records"""
+    records: List[Dict[str, Any]]
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to fetch the next page")
+    has_more: bool
+    total_records: Optional[int] = None
+
+
 class AggregationJobResponse(BaseModel):
     """Schema for aggregation job response"""
     id: UUID
     dashboard_id: UUID
     job_type: str
     status: str
+    priority: Optional[str]
+    progress: float = Field(0, description="Completion ratio between 0 and 1")
     total_forms: Optional[int]
     processed_forms: int
     total_records: Optional[int]
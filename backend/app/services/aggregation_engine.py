@@ -3,25 +3,87 @@ Aggregation Engine Service for FA-44 Epic
 Handles data aggregation from multiple form sources
 """
 
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy.orm import Session, defer
+from sqlalchemy import and_, or_, func, insert
 import pandas as pd
 import numpy as np
 from collections import defaultdict
+from concurrent.futures import Executor
 import asyncio
+import base64
 import json
+import logging
+import math
 from uuid import UUID
 
 from app.models.multi_form_dashboard import (
     MultiFormDashboard, 
     MultiFormMapping,
-    AggregationJob
+    AggregationJob,
+    AggregatedRecord
 )
-from app.models.form_submission import FormSubmission
-from app.core.logging import logger
-from app.core.cache import cache_manager
+from app.config import settings
+from app.models.form import FormSubmission
+from app.services.rollup_service import SubmissionRollupService
+from app.services.record_join import HashJoinAggregator
+from app.services.aggregation_scheduler import ACTIVE_STATUSES, AggregationCancelled
+from app.services.dashboard_cache import dashboard_result_cache, cache_key
+
+logger = logging.getLogger(__name__)
+
+
+# Rows written per INSERT when storing aggregation results
+RECORD_BATCH_SIZE = 1000
+
+
+class StaleCursorError(ValueError):
+    """Raised when a pagination cursor belongs to a superseded aggregation run"""
+
+
+def encode_cursor(run_id: UUID, row_number: int) -> str:
+    """Encode an opaque pagination cursor"""
+    return base64.urlsafe_b64encode(f"{run_id}:{row_number}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Decode a pagination cursor into (run_id, row_number)"""
+    try:
+        run_id, row_number = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return run_id, int(row_number)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def compute_aggregation(
+    all_data: List[Dict],
+    aggregation_config: Dict,
+    filter_config: Optional[Dict],
+    analytics_config: Optional[Dict]
+) -> Tuple[List[Dict], Dict[str, Any]]:
+    """
+    CPU-bound part of an aggregation run: combine, filter and compute metrics.
+    Module-level so it can be sent to a process pool.
+    """
+    engine = AggregationEngine(db=None)
+    aggregated_data = list(engine._apply_aggregation_method(all_data, aggregation_config))
+    return compute_metrics(aggregated_data, filter_config, analytics_config)
+
+
+def compute_metrics(
+    data: List[Dict],
+    filter_config: Optional[Dict],
+    analytics_config: Optional[Dict]
+) -> Tuple[List[Dict], Dict[str, Any]]:
+    """
+    Filter combined records and compute metrics.
+    Module-level so it can be sent to a process pool.
+    """
+    engine = AggregationEngine(db=None)
+    filtered_data = engine._apply_filters(data, filter_config)
+    metrics = engine._calculate_metrics(filtered_data, analytics_config)
+    return filtered_data, engine._to_json_safe(metrics)
 
 
 class AggregationEngine:
@@ -31,86 +93,316 @@ class AggregationEngine:
     
     def __init__(self, db: Session):
         self.db = db
-        self.cache = cache_manager
         
     async def aggregate_dashboard_data(
         self,
         dashboard_id: UUID,
-        force_refresh: bool = False
+        force_refresh: bool = False,
+        job_id: Optional[UUID] = None,
+        executor: Optional[Executor] = None
     ) -> Dict[str, Any]:
         """
         Main method to aggregate data for a multi-form dashboard
+        
+        Args:
+            dashboard_id: Dashboard to aggregate
+            force_refresh: Ignore cached results
+            job_id: Existing AggregationJob to run (created by the scheduler)
+            executor: Process pool for the CPU-heavy steps, inline when omitted
         """
-        # Get dashboard configuration
-        dashboard = self.db.query(MultiFormDashboard).filter_by(id=dashboard_id).first()
+        # Get dashboard configuration (cached_data is only loaded on a local cache miss)
+        dashboard = self.db.query(MultiFormDashboard).options(
+            defer(MultiFormDashboard.cached_data)
+        ).filter_by(id=dashboard_id).first()
         if not dashboard:
             raise ValueError(f"Dashboard {dashboard_id} not found")
         
+        # Captured before reading any data, see DashboardResultCache.put
+        key = cache_key(dashboard)
+        
         # Check cache if not forcing refresh
-        if not force_refresh and dashboard.cached_data:
-            cache_age = datetime.utcnow() - dashboard.cache_updated_at
-            if cache_age < timedelta(hours=1):  # Cache valid for 1 hour
+        if not force_refresh:
+            cached = dashboard_result_cache.get(dashboard)
+            if cached is not None:
                 logger.info(f"Using cached data for dashboard {dashboard_id}")
-                return dashboard.cached_data
+                if job_id:
+                    self._complete_aggregation_job(job_id, "completed", cached)
+                return cached
         
         # Create aggregation job
-        job = self._create_aggregation_job(dashboard_id)
+        job = self._start_aggregation_job(job_id) if job_id else self._create_aggregation_job(dashboard_id)
         
         try:
-            # Fetch data from all sources
             logger.info(f"Starting aggregation for dashboard {dashboard_id}")
-            all_data = await self._fetch_all_form_data(dashboard)
+            if dashboard.aggregation_config.get("aggregation_method") == "join":
+                # Sources are streamed into the join table, their records are never all in memory
+                joined, source_count = self._join_form_data(dashboard, job)
+                self._check_cancelled(job)
+                
+                if dashboard.filter_config or dashboard.analytics_config:
+                    # Filters and metrics need the joined records in one frame
+                    filtered_data, metrics = await self._run_cpu(
+                        executor,
+                        compute_metrics,
+                        list(joined),
+                        dashboard.filter_config,
+                        dashboard.analytics_config
+                    )
+                else:
+                    # Joined records go straight to the records table
+                    filtered_data, metrics = joined, {}
+            else:
+                # Fetch data from all sources
+                all_data = await self._fetch_all_form_data(dashboard, job)
+                self._check_cancelled(job)
+                source_count = len(all_data)
+                
+                # Combine, filter and calculate metrics
+                filtered_data, metrics = await self._run_cpu(
+                    executor,
+                    compute_aggregation,
+                    all_data,
+                    dashboard.aggregation_config,
+                    dashboard.filter_config,
+                    dashboard.analytics_config
+                )
             
-            # Apply aggregation method
-            aggregated_data = self._apply_aggregation_method(
-                all_data,
-                dashboard.aggregation_config
-            )
+            job.processed_records = job.total_records
+            self._check_cancelled(job)
             
-            # Apply filters
-            filtered_data = self._apply_filters(
-                aggregated_data,
-                dashboard.filter_config
-            )
+            # Store rows outside the dashboard's JSON column
+            total_records = self._store_records(dashboard_id, job.id, filtered_data)
             
-            # Calculate metrics
-            metrics = self._calculate_metrics(
-                filtered_data,
-                dashboard.analytics_config
-            )
-            
-            # Prepare final result
+            # Prepare final result (metrics and metadata only)
             result = {
-                "data": filtered_data,
                 "metrics": metrics,
                 "metadata": {
-                    "total_records": len(filtered_data),
-                    "sources": len(all_data),
+                    "total_records": total_records,
+                    "sources": source_count,
                     "aggregation_method": dashboard.aggregation_config.get("aggregation_method"),
+                    "run_id": str(job.id),
                     "last_updated": datetime.utcnow().isoformat()
                 }
             }
             
             # Update cache
-            dashboard.cached_data = result
+            dashboard_result_cache.put(dashboard, key, result)
             dashboard.cache_updated_at = datetime.utcnow()
+            dashboard.refresh_failures = 0
+            dashboard.refresh_retry_at = None
             
             # Complete job
-            self._complete_aggregation_job(job, "completed", result)
+            self._complete_aggregation_job(job.id, "completed", result)
+            
+            # Drop rows of previous runs now that the new run is visible
+            self._purge_records(dashboard_id, keep_run_id=job.id)
             
             self.db.commit()
             
             logger.info(f"Aggregation completed for dashboard {dashboard_id}")
             return result
             
+        except AggregationCancelled:
+            self.db.rollback()
+            logger.info(f"Aggregation cancelled for dashboard {dashboard_id}")
+            raise
         except Exception as e:
+            self.db.rollback()
             logger.error(f"Aggregation failed for dashboard {dashboard_id}: {str(e)}")
-            self._complete_aggregation_job(job, "failed", error_message=str(e))
+            self._record_refresh_failure(dashboard)
+            self._complete_aggregation_job(job.id, "failed", error_message=str(e))
             raise
     
+    def get_records_page(
+        self,
+        dashboard: MultiFormDashboard,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Dict[str, Any]:
+        """
+        Get one page of aggregated rows using keyset pagination on row_number
+        """
+        run_id = self._current_run_id(dashboard)
+        after = -1
+        
+        if cursor:
+            cursor_run_id, after = decode_cursor(cursor)
+            if cursor_run_id != str(run_id):
+                raise StaleCursorError("Dashboard was re-aggregated, restart pagination")
+        
+        rows = self.db.query(
+            AggregatedRecord.row_number,
+            AggregatedRecord.data
+        ).filter(
+            AggregatedRecord.dashboard_id == dashboard.id,
+            AggregatedRecord.run_id == run_id,
+            AggregatedRecord.row_number > after
+        ).order_by(AggregatedRecord.row_number).limit(limit + 1).all()
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        return {
+            "records": [row.data for row in rows],
+            "next_cursor": encode_cursor(run_id, rows[-1].row_number) if has_more else None,
+            "has_more": has_more,
+            "total_records": (dashboard.cached_data or {}).get("metadata", {}).get("total_records")
+        }
+    
+    def iter_records(
+        self,
+        dashboard: MultiFormDashboard,
+        batch_size: int = RECORD_BATCH_SIZE
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream all aggregated rows of the current run with a server-side cursor
+        """
+        run_id = self._current_run_id(dashboard)
+        
+        query = self.db.query(AggregatedRecord.data).filter(
+            AggregatedRecord.dashboard_id == dashboard.id,
+            AggregatedRecord.run_id == run_id
+        ).order_by(AggregatedRecord.row_number).yield_per(batch_size)
+        
+        for row in query:
+            yield row.data
+    
+    def _current_run_id(self, dashboard: MultiFormDashboard) -> UUID:
+        """
+        Run id of the aggregation whose rows are currently served
+        """
+        run_id = (dashboard.cached_data or {}).get("metadata", {}).get("run_id")
+        if not run_id:
+            raise ValueError(f"Dashboard {dashboard.id} has no aggregation results")
+        return UUID(run_id)
+    
+    def _store_records(
+        self,
+        dashboard_id: UUID,
+        run_id: UUID,
+        records: Iterable[Dict]
+    ) -> int:
+        """
+        Write aggregated rows in batches, returns the number of rows stored
+        """
+        total = 0
+        batch = []
+        
+        for row_number, record in enumerate(records):
+            batch.append({
+                "dashboard_id": dashboard_id,
+                "run_id": run_id,
+                "row_number": row_number,
+                "data": self._to_json_safe(record)
+            })
+            if len(batch) >= RECORD_BATCH_SIZE:
+                self.db.execute(insert(AggregatedRecord), batch)
+                total += len(batch)
+                batch = []
+        
+        if batch:
+            self.db.execute(insert(AggregatedRecord), batch)
+            total += len(batch)
+        
+        return total
+    
+    def _purge_records(self, dashboard_id: UUID, keep_run_id: UUID):
+        """
+        Delete rows of superseded aggregation runs
+        """
+        self.db.query(AggregatedRecord).filter(
+            AggregatedRecord.dashboard_id == dashboard_id,
+            AggregatedRecord.run_id != keep_run_id
+        ).delete(synchronize_session=False)
+    
+    def _to_json_safe(self, value: Any) -> Any:
+        """
+        Convert pandas/numpy values into JSON-serializable data.
+        Missing values (NaN/NaT) produced by DataFrame filtering are dropped.
+        """
+        if isinstance(value, dict):
+            return {
+                key: self._to_json_safe(item)
+                for key, item in value.items()
+                if not self._is_missing(item)
+            }
+        if isinstance(value, (list, tuple)):
+            return [self._to_json_safe(item) for item in value]
+        if isinstance(value, (np.generic,)):
+            return value.item()
+        if isinstance(value, (datetime, pd.Timestamp)):
+            return value.isoformat()
+        return value
+    
+    @staticmethod
+    def _is_missing(value: Any) -> bool:
+        if value is pd.NaT:
+            return True
+        return isinstance(value, float) and math.isnan(value)
+    
+    def get_time_series(
+        self,
+        dashboard_id: UUID,
+        start: datetime,
+        end: datetime,
+        granularity: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Time series of submissions across a dashboard's forms.
+        Served from hourly/daily rollups instead of raw submissions.
+        """
+        dashboard = self.db.query(MultiFormDashboard).filter_by(id=dashboard_id).first()
+        if not dashboard:
+            raise ValueError(f"Dashboard {dashboard_id} not found")
+        
+        form_ids = self._get_dashboard_form_ids(dashboard)
+        
+        return SubmissionRollupService(self.db).get_time_series(
+            "form",
+            form_ids,
+            start,
+            end,
+            granularity
+        )
+    
+    def _get_dashboard_form_ids(self, dashboard: MultiFormDashboard) -> List[str]:
+        """
+        Resolve the form ids (typeform_id) referenced by a dashboard's active mappings
+        """
+        form_mappings = self.db.query(MultiFormMapping).filter_by(
+            dashboard_id=dashboard.id,
+            is_active=True
+        ).all()
+        
+        form_ids = set()
+        submission_ids = []
+        for mapping in form_mappings:
+            if mapping.form_external_id:
+                form_ids.add(mapping.form_external_id)
+            elif mapping.form_submission_id:
+                submission_ids.append(mapping.form_submission_id)
+        
+        if submission_ids:
+            rows = self.db.query(FormSubmission.typeform_id).filter(
+                FormSubmission.id.in_(submission_ids)
+            ).all()
+            form_ids.update(row.typeform_id for row in rows if row.typeform_id)
+        
+        return sorted(form_ids)
+    
+    async def _run_cpu(self, executor: Optional[Executor], step, *args):
+        """
+        Run a CPU-heavy step in the process pool, inline without one
+        """
+        if executor:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, step, *args)
+        return step(*args)
+    
     async def _fetch_all_form_data(
         self,
-        dashboard: MultiFormDashboard
+        dashboard: MultiFormDashboard,
+        job: Optional[AggregationJob] = None
     ) -> List[Dict[str, Any]]:
         """
         Fetch data from all form sources
@@ -121,6 +413,10 @@ class AggregationEngine:
             is_active=True
         ).all()
         
+        if job:
+            job.total_forms = len(form_mappings)
+            self.db.commit()
+        
         # Fetch data in parallel
         tasks = []
         for mapping in form_mappings:
@@ -141,34 +437,84 @@ class AggregationEngine:
                 "priority": form_mappings[idx].priority
             })
         
+        if job:
+            job.processed_forms = len(all_data)
+            job.total_records = sum(len(source["data"]) for source in all_data)
+            self.db.commit()
+        
         return all_data
     
     async def _fetch_form_data(self, mapping: MultiFormMapping) -> List[Dict]:
         """
         Fetch data from a single form source
         """
+        return list(self._iter_form_data(mapping))
+    
+    def _iter_form_data(self, mapping: MultiFormMapping) -> Iterator[Dict]:
+        """
+        Stream the records of a single form source, RECORD_BATCH_SIZE submissions per fetch
+        """
         # Query form submissions
-        query = self.db.query(FormSubmission)
+        query = self.db.query(FormSubmission.id, FormSubmission.answers, FormSubmission.submitted_at)
         
         if mapping.form_submission_id:
-            query = query.filter_by(id=mapping.form_submission_id)
+            query = query.filter(FormSubmission.id == mapping.form_submission_id)
         elif mapping.form_external_id:
-            query = query.filter_by(typeform_id=mapping.form_external_id)
-        
-        submissions = query.all()
+            query = query.filter(FormSubmission.typeform_id == mapping.form_external_id)
         
         # Transform data according to field mappings
-        transformed_data = []
-        for submission in submissions:
+        for submission in query.yield_per(RECORD_BATCH_SIZE):
             record = self._transform_record(
                 submission.answers,
                 mapping.field_mappings or {}
             )
             record["_source_id"] = str(submission.id)
             record["_submitted_at"] = submission.submitted_at.isoformat()
-            transformed_data.append(record)
+            yield record
+    
+    def _join_form_data(
+        self,
+        dashboard: MultiFormDashboard,
+        job: Optional[AggregationJob] = None
+    ) -> Tuple[Iterator[Dict], int]:
+        """
+        Stream every form source into the join of a join dashboard.
+        Returns the lazily merged records and the number of sources.
+        """
+        form_mappings = self.db.query(MultiFormMapping).filter_by(
+            dashboard_id=dashboard.id,
+            is_active=True
+        ).all()
+        
+        if job:
+            job.total_forms = len(form_mappings)
+            self.db.commit()
+        
+        fetched = 0
+        
+        def counted(records: Iterator[Dict]) -> Iterator[Dict]:
+            nonlocal fetched
+            for record in records:
+                fetched += 1
+                yield record
+        
+        sources = [
+            {
+                "form_type": mapping.form_type,
+                "form_title": mapping.form_title,
+                "data": counted(self._iter_form_data(mapping)),
+                "priority": mapping.priority
+            }
+            for mapping in form_mappings
+        ]
+        joined = self._aggregate_join(sources, dashboard.aggregation_config)
+        
+        if job:
+            job.processed_forms = len(form_mappings)
+            job.total_records = fetched
+            self.db.commit()
         
-        return transformed_data
+        return joined, len(form_mappings)
     
     def _transform_record(
         self,
@@ -214,7 +560,7 @@ class AggregationEngine:
         self,
         all_data: List[Dict],
         config: Dict
-    ) -> List[Dict]:
+    ) -> Iterable[Dict]:
         """
         Apply the specified aggregation method to combine data
         """
@@ -226,6 +572,8 @@ class AggregationEngine:
             return self._aggregate_intersection(all_data)
         elif method == "weighted":
             return self._aggregate_weighted(all_data)
+        elif method == "join":
+            return self._aggregate_join(all_data, config)
         else:
             raise ValueError(f"Unknown aggregation method: {method}")
     
@@ -298,6 +646,29 @@ class AggregationEngine:
         
         return combined
     
+    def _aggregate_join(self, all_data: List[Dict], config: Dict) -> Iterator[Dict]:
+        """
+        Join aggregation - merge records that share a key (e.g. email) across sources.
+        Uses a single-pass hash join; field conflicts follow conflict_resolution.
+        Source data may be iterators, they are consumed here; the merged records
+        are yielded lazily.
+        """
+        joiner = HashJoinAggregator(
+            join_key=config.get("join_key"),
+            conflict_resolution=config.get("conflict_resolution", "latest"),
+            join_type=config.get("join_type", "outer")
+        )
+        
+        for source in all_data:
+            joiner.add_source(
+                source["data"],
+                source_title=source["form_title"],
+                priority=source.get("priority") or 0,
+                form_type=source["form_type"]
+            )
+        
+        return joiner.results()
+    
     def _apply_filters(
         self,
         data: List[Dict],
@@ -487,26 +858,68 @@ class AggregationEngine:
         self.db.commit()
         return job
     
+    def _start_aggregation_job(self, job_id: UUID) -> AggregationJob:
+        """
+        Mark a queued aggregation job as processing
+        """
+        job = self.db.query(AggregationJob).get(job_id)
+        if not job:
+            raise ValueError(f"Aggregation job {job_id} not found")
+        if job.status == "cancelled":
+            raise AggregationCancelled(str(job_id))
+        
+        job.status = "processing"
+        job.started_at = datetime.utcnow()
+        self.db.commit()
+        return job
+    
+    def _check_cancelled(self, job: AggregationJob):
+        """
+        Stop the run if the job was cancelled, possibly from another process
+        """
+        self.db.commit()
+        status = self.db.query(AggregationJob.status).filter_by(id=job.id).scalar()
+        if status == "cancelled":
+            raise AggregationCancelled(str(job.id))
+    
     def _complete_aggregation_job(
         self,
-        job: AggregationJob,
+        job_id: UUID,
         status: str,
         result: Dict = None,
         error_message: str = None
-    ):
+    ) -> bool:
         """
-        Complete an aggregation job
+        Complete an aggregation job unless it already finished
+
+        The update is conditional on the job still being pending or processing,
+        so a job cancelled meanwhile stays cancelled.
         """
-        job.status = status
-        job.completed_at = datetime.utcnow()
+        values = {"status": status, "completed_at": datetime.utcnow()}
         
         if result:
-            job.result_summary = {
+            values["result_summary"] = {
                 "total_records": result.get("metadata", {}).get("total_records"),
                 "sources": result.get("metadata", {}).get("sources")
             }
         
         if error_message:
-            job.error_message = error_message
+            values["error_message"] = error_message
         
-        self.db.commit()
\ No newline at end of file
+        updated = self.db.query(AggregationJob).filter(
+            AggregationJob.id == job_id,
+            AggregationJob.status.in_(ACTIVE_STATUSES)
+        ).update(values, synchronize_session=False)
+        self.db.commit()
+        return updated > 0
+    
+    def _record_refresh_failure(self, dashboard: MultiFormDashboard):
+        """
+        Back off scheduled refreshes of a dashboard whose aggregation failed
+        """
+        dashboard.refresh_failures = (dashboard.refresh_failures or 0) + 1
+        delay = min(
+            settings.AGGREGATION_RETRY_SECONDS * 2 ** (dashboard.refresh_failures - 1),
+            settings.AGGREGATION_RETRY_MAX_SECONDS
+        )
+        dashboard.refresh_retry_at = datetime.utcnow() + timedelta(seconds=delay)
\ No newline at end of file
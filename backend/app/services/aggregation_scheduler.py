@@ -0,0 +1,320 @@
+"""
+Aggregation Job Scheduler (FA-44)
+Runs dashboard aggregations in the background with per-dashboard dedup,
+priorities, cancellation and a process pool for the CPU-heavy steps
+"""
+
+from typing import Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from uuid import UUID
+import asyncio
+import itertools
+import logging
+
+from sqlalchemy import String, cast, literal, or_
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.multi_form_dashboard import AggregationJob, MultiFormDashboard
+
+logger = logging.getLogger(__name__)
+
+# Lower value runs first
+PRIORITIES = {"interactive": 0, "scheduled": 10}
+ACTIVE_STATUSES = ("pending", "processing")
+
+# Active job rows older than this are treated as abandoned (e.g. worker restart)
+JOB_STALE_AFTER = timedelta(minutes=30)
+
+
+class AggregationCancelled(Exception):
+    """Raised inside an aggregation run when its job was cancelled"""
+
+
+@dataclass
+class ScheduledJob:
+    """In-memory state of a queued or running aggregation job"""
+    job_id: UUID
+    dashboard_id: UUID
+    priority: str
+    force_refresh: bool = False
+    status: str = "pending"
+
+    @property
+    def rank(self) -> int:
+        return PRIORITIES[self.priority]
+
+
+class AggregationScheduler:
+    """
+    Process-local scheduler for dashboard aggregation jobs.
+
+    - Refresh requests for a dashboard that already has a pending or running
+      job are coalesced into that job, so concurrent refreshes run once.
+    - Interactive refreshes (user clicked refresh) run before scheduled ones;
+      a pending scheduled job is promoted when an interactive request joins it.
+    - The AggregationJob row is the source of truth for status and progress,
+      so jobs can be polled and cancelled from any API worker.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = settings.AGGREGATION_MAX_CONCURRENCY,
+        process_workers: int = settings.AGGREGATION_PROCESS_WORKERS
+    ):
+        self.max_concurrency = max_concurrency
+        self.process_workers = process_workers
+
+        self._jobs: Dict[UUID, ScheduledJob] = {}
+        self._jobs_by_dashboard: Dict[UUID, ScheduledJob] = {}
+        self._sequence = itertools.count()
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._workers: List[asyncio.Task] = []
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._refresher: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def submit(
+        self,
+        dashboard_id: UUID,
+        priority: str = "interactive",
+        force_refresh: bool = False
+    ) -> UUID:
+        """
+        Queue an aggregation for a dashboard and return its job id.
+
+        Must be called from a running event loop. Returns the id of the
+        existing job when the dashboard already has one pending or running.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        self._ensure_started()
+
+        existing = self._jobs_by_dashboard.get(dashboard_id)
+        if existing:
+            existing.force_refresh = existing.force_refresh or force_refresh
+            if existing.status == "pending" and PRIORITIES[priority] < existing.rank:
+                existing.priority = priority
+                self._update_job_row(existing.job_id, priority=priority)
+                self._enqueue(existing)
+            return existing.job_id
+
+        # A job started by another API worker process
+        active_job_id = self._find_active_job(dashboard_id)
+        if active_job_id:
+            return active_job_id
+
+        job = ScheduledJob(
+            job_id=self._create_job_row(dashboard_id, priority),
+            dashboard_id=dashboard_id,
+            priority=priority,
+            force_refresh=force_refresh
+        )
+        self._jobs[job.job_id] = job
+        self._jobs_by_dashboard[dashboard_id] = job
+        self._enqueue(job)
+
+        logger.info(f"Queued {priority} aggregation job {job.job_id} for dashboard {dashboard_id}")
+        return job.job_id
+
+    def submit_scheduled_refreshes(self) -> List[UUID]:
+        """
+        Queue scheduled-priority refreshes for dashboards marked dirty since
+        their last aggregation. Called every AGGREGATION_REFRESH_INTERVAL
+        seconds once start_scheduled_refreshes() ran. Dashboards whose last
+        aggregation failed are skipped until their refresh_retry_at.
+        """
+        db = SessionLocal()
+        try:
+            current_version = literal(":") + cast(MultiFormDashboard.data_version, String)
+            dashboard_ids = [
+                row.id for row in db.query(MultiFormDashboard.id).filter(
+                    or_(
+                        MultiFormDashboard.cache_key == None,  # noqa: E711
+                        ~MultiFormDashboard.cache_key.endswith(current_version)
+                    ),
+                    or_(
+                        MultiFormDashboard.refresh_retry_at == None,  # noqa: E711
+                        MultiFormDashboard.refresh_retry_at <= datetime.utcnow()
+                    )
+                )
+            ]
+        finally:
+            db.close()
+
+        return [self.submit(dashboard_id, priority="scheduled") for dashboard_id in dashboard_ids]
+
+    def start_scheduled_refreshes(self, interval: float = settings.AGGREGATION_REFRESH_INTERVAL) -> None:
+        """Call submit_scheduled_refreshes every ``interval`` seconds until shutdown, 0 never"""
+        if interval > 0 and self._refresher is None:
+            self._refresher = asyncio.get_running_loop().create_task(self._refresh_periodically(interval))
+
+    def cancel(self, job_id: UUID) -> bool:
+        """
+        Cancel a pending or running job.
+
+        Pending jobs are dropped from the queue. Running jobs stop at the next
+        stage boundary of the aggregation (a CPU step already handed to the
+        process pool finishes first). Returns False if the job is not active.
+        """
+        job = self._jobs.get(job_id)
+        if job and job.status == "pending":
+            self._forget(job)
+
+        return self._update_job_row(
+            job_id,
+            only_active=True,
+            status="cancelled",
+            completed_at=datetime.utcnow()
+        )
+
+    def is_active(self, dashboard_id: UUID) -> bool:
+        return dashboard_id in self._jobs_by_dashboard
+
+    async def shutdown(self) -> None:
+        """Stop the scheduled refreshes, workers and the process pool"""
+        if self._refresher:
+            self._refresher.cancel()
+            await asyncio.gather(self._refresher, return_exceptions=True)
+            self._refresher = None
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        self._loop = None
+
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    async def _refresh_periodically(self, interval: float) -> None:
+        while True:
+            try:
+                queued = self.submit_scheduled_refreshes()
+                if queued:
+                    logger.info(f"Queued scheduled refreshes of {len(queued)} dashboards")
+            except Exception as e:
+                logger.error(f"Scheduled aggregation refresh failed: {e}")
+            await asyncio.sleep(interval)
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._workers:
+            return
+
+        self._loop = loop
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [loop.create_task(self._worker()) for _ in range(self.max_concurrency)]
+
+        # Jobs queued on a previous loop are re-queued on the new one
+        for job in self._jobs.values():
+            if job.status == "pending":
+                self._enqueue(job)
+
+    def _enqueue(self, job: ScheduledJob) -> None:
+        # Promoted jobs are pushed again; the stale entry is skipped by rank
+        self._queue.put_nowait((job.rank, next(self._sequence), job.job_id))
+
+    async def _worker(self) -> None:
+        while True:
+            rank, _, job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None or job.status != "pending" or job.rank != rank:
+                continue
+
+            job.status = "processing"
+            try:
+                await self._run(job)
+            except AggregationCancelled:
+                logger.info(f"Aggregation job {job_id} cancelled")
+            except Exception as e:
+                logger.error(f"Aggregation job {job_id} failed: {e}")
+            finally:
+                self._forget(job)
+
+    async def _run(self, job: ScheduledJob) -> None:
+        # Imported lazily so the scheduler stays importable without pandas
+        from app.services.aggregation_engine import AggregationEngine
+
+        db = SessionLocal()
+        try:
+            engine = AggregationEngine(db)
+            await engine.aggregate_dashboard_data(
+                dashboard_id=job.dashboard_id,
+                force_refresh=job.force_refresh,
+                job_id=job.job_id,
+                executor=self._get_executor()
+            )
+        finally:
+            db.close()
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.process_workers <= 0:
+            return None
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.process_workers)
+        return self._executor
+
+    def _forget(self, job: ScheduledJob) -> None:
+        self._jobs.pop(job.job_id, None)
+        if self._jobs_by_dashboard.get(job.dashboard_id) is job:
+            del self._jobs_by_dashboard[job.dashboard_id]
+
+    # ------------------------------------------------------------------
+    # Job rows
+    # ------------------------------------------------------------------
+
+    def _create_job_row(self, dashboard_id: UUID, priority: str) -> UUID:
+        db = SessionLocal()
+        try:
+            job = AggregationJob(
+                dashboard_id=dashboard_id,
+                job_type="full_refresh",
+                status="pending",
+                priority=priority
+            )
+            db.add(job)
+            db.commit()
+            return job.id
+        finally:
+            db.close()
+
+    def _find_active_job(self, dashboard_id: UUID) -> Optional[UUID]:
+        db = SessionLocal()
+        try:
+            job = db.query(AggregationJob).filter(
+                AggregationJob.dashboard_id == dashboard_id,
+                AggregationJob.status.in_(ACTIVE_STATUSES),
+                AggregationJob.updated_at >= datetime.utcnow() - JOB_STALE_AFTER
+            ).order_by(AggregationJob.created_at.desc()).first()
+            return job.id if job else None
+        finally:
+            db.close()
+
+    def _update_job_row(self, job_id: UUID, only_active: bool = False, **values) -> bool:
+        db = SessionLocal()
+        try:
+            query = db.query(AggregationJob).filter(AggregationJob.id == job_id)
+            if only_active:
+                query = query.filter(AggregationJob.status.in_(ACTIVE_STATUSES))
+            updated = query.update(values, synchronize_session=False)
+            db.commit()
+            return updated > 0
+        finally:
+            db.close()
+
+
+aggregation_scheduler = AggregationScheduler()
@@ -2,10 +2,13 @@ from openai import AsyncOpenAI
 from typing import Dict, Any
 import json
 from app.config import settings
+from app.services.llm_hedging import llm_requests
 
 class AIProcessor:
     def __init__(self):
         self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY) if settings.OPENAI_API_KEY else None
+        # Set when the content came from the fallback because the LLM failed, missed the deadline or its circuit is open
+        self.degraded = False
     
     async def process(self, answers: Dict, template_type: str) -> Dict:
         """Process form answers with AI based on template type"""
@@ -74,7 +77,8 @@ class AIProcessor:
         """
         
         try:
-            response = await self.client.chat.completions.create(
+            response = await llm_requests.request(
+                self.client.chat.completions.create,
                 model="gpt-4-turbo-preview",
                 messages=[
                     {"role": "system", "content": "You are a professional nutritionist. Always respond with valid JSON."},
@@ -87,6 +91,7 @@ class AIProcessor:
             return json.loads(response.choices[0].message.content)
         except Exception as e:
             print(f"AI processing error: {str(e)}")
+            self.degraded = True
             return self._get_mock_data("diet_plan", answers)
     
     async def _process_lead_score(self, answers: Dict) -> Dict:
@@ -119,7 +124,8 @@ class AIProcessor:
         """
         
         try:
-            response = await self.client.chat.completions.create(
+            response = await llm_requests.request(
+                self.client.chat.completions.create,
                 model="gpt-4-turbo-preview",
                 messages=[
                     {"role": "system", "content": "You are a sales intelligence expert. Always respond with valid JSON."},
@@ -132,6 +138,7 @@ class AIProcessor:
             return json.loads(response.choices[0].message.content)
         except Exception as e:
             print(f"AI processing error: {str(e)}")
+            self.degraded = True
             return self._get_mock_data("lead_score", answers)
     
     async def _process_event_registration(self, answers: Dict) -> Dict:
@@ -0,0 +1,166 @@
+"""
+AI Re-enrichment
+Enriches the dashboards and lead scores built by the fallback paths once the LLM is back
+
+While the LLM errors or its circuit is open (see llm_circuit), submissions
+get dashboards built from the AI processor's fallback content (ai_status
+'degraded') and lead scores keep their rule-based adjustment (ai_status
+'pending'), so ingestion keeps its pace. When the circuit closes,
+reenrich() runs in the background: pending scores get their AI adjustment
+in batches, degraded dashboards are generated again one at a time. A run
+reads AI_REENRICH_BATCH_SIZE rows at a time until nothing is due or the
+circuit opens again; what is left then waits for the next close.
+A dashboard whose regeneration fails on its own (e.g. the answers keep
+getting invalid JSON back) is skipped and retried with exponential backoff,
+AI_REENRICH_MAX_ATTEMPTS times at most, so it does not hold up the others.
+Retries fall due without the circuit changing state, a sweep started at
+startup runs every AI_REENRICH_SWEEP_INTERVAL seconds to pick them up.
+Dashboards degraded while the circuit was closed, e.g. past the submission
+deadline (see llm_hedging), schedule a run themselves.
+"""
+
+from typing import Dict, Optional
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import threading
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.form import Dashboard, FormSubmission
+from app.models.lead_score import LeadScore
+from app.services.ai_processor import AIProcessor
+from app.services.lead_scoring import LeadScoringEngine
+from app.services.llm_circuit import llm_circuit
+from app.services.template_engine import TemplateEngine
+
+logger = logging.getLogger(__name__)
+
+_run_lock = threading.Lock()
+_sweeper: Optional[asyncio.Task] = None
+
+
+async def reenrich_dashboards(db: Session, limit: int = settings.AI_REENRICH_BATCH_SIZE) -> int:
+    """
+    Regenerate the content of degraded dashboards due for a retry, oldest
+    first and ``limit`` at a time, returning how many were enriched
+    """
+    template_engine = TemplateEngine()
+    enriched = 0
+    while not llm_circuit.is_open:
+        now = datetime.utcnow()
+        dashboards = db.query(Dashboard).filter(
+            Dashboard.ai_status == "degraded",
+            or_(Dashboard.ai_attempts.is_(None), Dashboard.ai_attempts < settings.AI_REENRICH_MAX_ATTEMPTS),
+            or_(Dashboard.ai_retry_at.is_(None), Dashboard.ai_retry_at <= now)
+        ).order_by(Dashboard.created_at).limit(limit).all()
+
+        for dashboard in dashboards:
+            if llm_circuit.is_open:
+                break
+            answers = db.query(FormSubmission.answers).filter(FormSubmission.id == dashboard.submission_id).scalar() or {}
+
+            processor = AIProcessor()
+            content = await processor.process(answers, dashboard.template_type)
+            if processor.degraded:
+                if llm_circuit.is_open:
+                    # The LLM is down again, the remaining dashboards wait for the next close
+                    break
+                # Fails on its own, retried later without holding up the others
+                dashboard.ai_attempts = (dashboard.ai_attempts or 0) + 1
+                dashboard.ai_retry_at = now + timedelta(
+                    seconds=settings.AI_REENRICH_RETRY_SECONDS * 2 ** (dashboard.ai_attempts - 1)
+                )
+                db.commit()
+                continue
+
+            dashboard.ai_generated_content = content
+            dashboard.html_content = template_engine.render(dashboard.template_type, content)
+            dashboard.ai_status = "completed"
+            db.commit()
+            enriched += 1
+
+        # Every dashboard of a full batch is enriched or backed off, the next batch is due
+        if len(dashboards) < limit:
+            break
+    return enriched
+
+
+def reenrich_scores(db: Session, limit: int = settings.AI_REENRICH_BATCH_SIZE) -> Dict[str, int]:
+    """AI adjustment of the pending lead scores, oldest first and ``limit`` at a time, in batched completions"""
+    counts = {"completed": 0, "fallback": 0}
+    while not llm_circuit.is_open:
+        lead_score_ids = [
+            row.id for row in db.query(LeadScore.id).filter(
+                LeadScore.ai_status == "pending"
+            ).order_by(LeadScore.calculated_at).limit(limit)
+        ]
+        if not lead_score_ids:
+            break
+        for status, count in LeadScoringEngine(db).apply_ai_adjustments(lead_score_ids).items():
+            counts[status] += count
+        # Scores stay pending only when the circuit opened, which ends the loop
+        if len(lead_score_ids) < limit:
+            break
+    return counts
+
+
+async def reenrich(limit: int = settings.AI_REENRICH_BATCH_SIZE) -> Dict[str, int]:
+    """One re-enrichment run of everything due, with a session of its own"""
+    db = SessionLocal()
+    try:
+        scores = await asyncio.to_thread(reenrich_scores, db, limit)
+        dashboards = await reenrich_dashboards(db, limit)
+        logger.info(f"AI re-enrichment: {scores['completed']} lead scores, {dashboards} dashboards")
+        return {"lead_scores": scores["completed"], "dashboards": dashboards}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"AI re-enrichment failed: {e}")
+        return {"lead_scores": 0, "dashboards": 0}
+    finally:
+        db.close()
+
+
+def schedule_reenrichment() -> None:
+    """Start a re-enrichment run in a background thread, unless one is running"""
+    if not _run_lock.acquire(blocking=False):
+        return
+
+    def run() -> None:
+        try:
+            asyncio.run(reenrich())
+        finally:
+            _run_lock.release()
+
+    threading.Thread(target=run, name="ai-reenrichment", daemon=True).start()
+
+
+def register_reenrichment() -> None:
+    """Re-enrich after every close of the LLM circuit, called once at startup"""
+    llm_circuit.on_close(schedule_reenrichment)
+
+
+def start_reenrichment_sweep(interval: float = settings.AI_REENRICH_SWEEP_INTERVAL) -> None:
+    """Schedule a re-enrichment run every ``interval`` seconds until stop_reenrichment_sweep, 0 never"""
+    global _sweeper
+    if interval > 0 and _sweeper is None:
+        _sweeper = asyncio.get_running_loop().create_task(_sweep_periodically(interval))
+
+
+async def stop_reenrichment_sweep() -> None:
+    global _sweeper
+    if _sweeper:
+        _sweeper.cancel()
+        await asyncio.gather(_sweeper, return_exceptions=True)
+        _sweeper = None
+
+
+async def _sweep_periodically(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        # While the circuit is open the run starts on its close instead
+        if not llm_circuit.is_open:
+            schedule_reenrichment()
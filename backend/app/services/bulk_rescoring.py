@@ -0,0 +1,433 @@
+"""
+Bulk Lead Rescoring for FA-45
+Rescores stored submissions after the scoring weights or thresholds change
+
+Each submission's features (budget amount, timeline level, authority level,
+indicator counts, company size level, buying signals) are read from the
+SubmissionFeatures stored at ingest, or extracted from its answers for older
+rows, into columnar arrays. The factor scores, weighted base score and
+category of a whole batch are then computed with NumPy and written back with
+bulk UPDATE/INSERT statements.
+
+Tenants with active ScoringRules are scored with their compiled rule plan
+instead (scoring_rules.RulePlan.evaluate_many), as lead_scoring does, so a
+rescore never replaces their rule-based scores with the default criteria.
+
+Rescoring never calls the LLM: an existing score keeps its AI adjustment and
+insights, a submission without a score gets the rule-based signal adjustment.
+With defer_ai those new scores are left 'pending', for the AI adjustment
+submitted in batches by llm_batch_jobs.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import logging
+import threading
+import uuid
+
+import numpy as np
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.form import FormSubmission
+from app.models.lead_score import LeadScore, LeadScoreHistory, RescoreRun
+from app.services.lead_scoring import (
+    AUTHORITY_SCORES,
+    BUDGET_THRESHOLDS,
+    COMPANY_SIZE_SCORES,
+    DEFAULT_SCORING_VERSION,
+    DEFAULT_WEIGHTS,
+    MAX_AI_ADJUSTMENT,
+    MAX_NEED_SCORE,
+    NO_BUDGET_SCORE,
+    RULES_SCORING_VERSION,
+    TIMELINE_SCORES,
+    score_category
+)
+from app.services.scoring_rules import RuleScore, rule_plans
+from app.services.submission_features import features_for
+
+logger = logging.getLogger(__name__)
+
+FACTORS = ["budget", "timeline", "authority", "need", "company_size"]
+
+# Level codes index these lists
+TIMELINE_LEVELS = list(TIMELINE_SCORES)
+AUTHORITY_LEVELS = list(AUTHORITY_SCORES)
+COMPANY_SIZE_LEVELS = list(COMPANY_SIZE_SCORES)
+
+ProgressCallback = Callable[[int, int], None]
+
+
+@dataclass
+class RescoringConfig:
+    """Weights and point tables a rescore applies, the engine defaults unless overridden"""
+    weights: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_WEIGHTS))
+    budget_thresholds: List[Tuple[int, int]] = field(default_factory=lambda: list(BUDGET_THRESHOLDS))
+    timeline_scores: Dict[str, int] = field(default_factory=lambda: dict(TIMELINE_SCORES))
+    authority_scores: Dict[str, int] = field(default_factory=lambda: dict(AUTHORITY_SCORES))
+    company_size_scores: Dict[str, int] = field(default_factory=lambda: dict(COMPANY_SIZE_SCORES))
+    scoring_version: str = DEFAULT_SCORING_VERSION
+
+    @classmethod
+    def with_overrides(cls, scoring_version: Optional[str] = None, **overrides) -> "RescoringConfig":
+        """Defaults updated with partial tables, unknown keys raise ValueError"""
+        config = cls()
+        for name, values in overrides.items():
+            if not values:
+                continue
+            if name == "budget_thresholds":
+                # Highest threshold first, the first one reached scores
+                config.budget_thresholds = sorted(((int(t), int(s)) for t, s in values), reverse=True)
+                continue
+            table = getattr(config, name)
+            unknown = set(values) - set(table)
+            if unknown:
+                raise ValueError(f"Unknown {name} keys: {', '.join(sorted(unknown))}")
+            table.update(values)
+        if scoring_version:
+            config.scoring_version = scoring_version
+        return config
+
+
+@dataclass
+class LeadFeatures:
+    """Scoring features of a batch of submissions, one array entry per submission"""
+    budget_amount: np.ndarray  # float, NaN without a stated budget
+    timeline: np.ndarray  # Index into TIMELINE_LEVELS
+    authority: np.ndarray  # Index into AUTHORITY_LEVELS
+    pain_count: np.ndarray
+    need_count: np.ndarray
+    company_size: np.ndarray  # Index into COMPANY_SIZE_LEVELS
+    signals: List[List[str]]
+
+    def __len__(self) -> int:
+        return len(self.signals)
+
+    @property
+    def signal_count(self) -> np.ndarray:
+        return np.fromiter((len(s) for s in self.signals), dtype=np.int64, count=len(self.signals))
+
+
+def extract_features(
+    answers_list: Sequence[Optional[Dict[str, Any]]],
+    stored_features: Optional[Sequence[Optional[Dict[str, Any]]]] = None
+) -> LeadFeatures:
+    """Columnar features of each submission, from its stored features when current"""
+    count = len(answers_list)
+    budget = np.full(count, np.nan)
+    timeline = np.empty(count, dtype=np.int64)
+    authority = np.empty(count, dtype=np.int64)
+    pain_count = np.empty(count, dtype=np.int64)
+    need_count = np.empty(count, dtype=np.int64)
+    company_size = np.empty(count, dtype=np.int64)
+    signals = []
+
+    timeline_codes = {level: code for code, level in enumerate(TIMELINE_LEVELS)}
+    authority_codes = {level: code for code, level in enumerate(AUTHORITY_LEVELS)}
+    size_codes = {level: code for code, level in enumerate(COMPANY_SIZE_LEVELS)}
+
+    for i, answers in enumerate(answers_list):
+        features = features_for(answers, stored_features[i] if stored_features is not None else None)
+        if features.budget_amount is not None:
+            budget[i] = features.budget_amount
+        timeline[i] = timeline_codes[features.timeline]
+        authority[i] = authority_codes[features.authority]
+        pain_count[i], need_count[i] = features.pain_count, features.need_count
+        company_size[i] = size_codes[features.company_size]
+        signals.append(list(features.signals))
+
+    return LeadFeatures(budget, timeline, authority, pain_count, need_count, company_size, signals)
+
+
+def _lookup(levels: List[str], scores: Dict[str, int]) -> np.ndarray:
+    return np.array([scores[level] for level in levels], dtype=np.int64)
+
+
+def score_features(
+    features: LeadFeatures,
+    config: RescoringConfig,
+    ai_adjustment: Optional[np.ndarray] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Factor scores, base and final score and category of every submission.
+
+    ``ai_adjustment`` holds the adjustment to keep per submission, NaN where
+    the rule-based signal adjustment applies.
+    """
+    amount = features.budget_amount
+    # NaN compares false everywhere and falls through to the default
+    budget = np.select(
+        [amount >= threshold for threshold, _ in config.budget_thresholds],
+        [score for _, score in config.budget_thresholds],
+        default=NO_BUDGET_SCORE
+    ).astype(np.int64)
+
+    factors = {
+        "budget": budget,
+        "timeline": _lookup(TIMELINE_LEVELS, config.timeline_scores)[features.timeline],
+        "authority": _lookup(AUTHORITY_LEVELS, config.authority_scores)[features.authority],
+        "need": np.minimum(MAX_NEED_SCORE, features.pain_count * 3 + features.need_count * 2),
+        "company_size": _lookup(COMPANY_SIZE_LEVELS, config.company_size_scores)[features.company_size]
+    }
+
+    # Same summation order as the engine, so totals match to the last bit
+    base = np.zeros(len(features))
+    for factor in FACTORS:
+        base = base + factors[factor] * config.weights[factor]
+
+    rule_adjustment = np.minimum(MAX_AI_ADJUSTMENT, features.signal_count * 2)
+    if ai_adjustment is None:
+        adjustment = rule_adjustment
+    else:
+        adjustment = np.where(np.isnan(ai_adjustment), rule_adjustment, ai_adjustment).astype(np.int64)
+
+    final = np.minimum(100, (base + adjustment).astype(np.int64))
+    category = np.select([final >= 80, final >= 60], ["hot", "warm"], default="cold")
+
+    return {
+        **factors,
+        "base_score": base.astype(np.int64),
+        "ai_adjustment": adjustment,
+        "final_score": final,
+        "score_category": category
+    }
+
+
+class BulkRescorer:
+    """Rescores stored submissions in batches and writes the results back in bulk"""
+
+    def __init__(
+        self,
+        db: Session,
+        config: Optional[RescoringConfig] = None,
+        batch_size: Optional[int] = None,
+        progress: Optional[ProgressCallback] = None,
+        dry_run: bool = False,
+        changed_by=None,
+        defer_ai: bool = False
+    ):
+        self.db = db
+        self.config = config or RescoringConfig()
+        self.batch_size = batch_size or settings.RESCORE_BATCH_SIZE
+        self.progress = progress
+        self.dry_run = dry_run
+        self.changed_by = uuid.UUID(str(changed_by)) if changed_by else None
+        self.defer_ai = defer_ai
+
+    def run(self, user_id=None) -> Dict[str, int]:
+        """Rescore all submissions, or one user's, and return the counts"""
+        query = self.db.query(
+            FormSubmission.id, FormSubmission.user_id, FormSubmission.answers, FormSubmission.features
+        )
+        if user_id is not None:
+            query = query.filter(FormSubmission.user_id == str(user_id))
+
+        totals = {"total": query.count(), "processed": 0, "updated": 0, "created": 0, "unchanged": 0}
+        self._report(totals)
+
+        # Keyset pages instead of one cursor, every batch commits
+        last_id = None
+        while True:
+            page = query
+            if last_id is not None:
+                page = page.filter(FormSubmission.id > last_id)
+            rows = page.order_by(FormSubmission.id).limit(self.batch_size).all()
+            if not rows:
+                break
+
+            for key, value in self._rescore_batch(rows).items():
+                totals[key] += value
+            totals["processed"] += len(rows)
+            last_id = rows[-1].id
+            self._report(totals)
+
+        logger.info(f"Rescored {totals['processed']} submissions: {totals['updated']} updated, {totals['created']} created")
+        return totals
+
+    def _report(self, totals: Dict[str, int]) -> None:
+        if self.progress:
+            self.progress(totals["processed"], totals["total"])
+
+    def _existing_scores(self, submission_ids: List[str]) -> Dict[str, Any]:
+        """Latest score of each submission in one IN query"""
+        rows = self.db.query(
+            LeadScore.id,
+            LeadScore.submission_id,
+            LeadScore.base_score,
+            LeadScore.ai_adjustment,
+            LeadScore.final_score,
+            LeadScore.score_factors,
+            LeadScore.score_category
+        ).filter(
+            LeadScore.submission_id.in_([uuid.UUID(str(s)) for s in submission_ids])
+        ).order_by(LeadScore.calculated_at).all()
+        return {str(row.submission_id): row for row in rows}
+
+    def _rule_scores(self, rows) -> Dict[int, RuleScore]:
+        """Rule plan scores of the rows whose tenant has active scoring rules, by row index"""
+        rule_scores: Dict[int, RuleScore] = {}
+        for user_id in {row.user_id for row in rows}:
+            plan = rule_plans.get(self.db, user_id)
+            if plan is None:
+                continue
+            indices = [i for i, row in enumerate(rows) if row.user_id == user_id]
+            rule_scores.update(zip(indices, plan.evaluate_many([rows[i].answers for i in indices])))
+        return rule_scores
+
+    def _rescore_batch(self, rows) -> Dict[str, int]:
+        submission_ids = [row.id for row in rows]
+        existing = self._existing_scores(submission_ids)
+
+        kept_adjustment = np.array([
+            (existing[str(s)].ai_adjustment or 0) if str(s) in existing else np.nan
+            for s in submission_ids
+        ])
+        features = extract_features([row.answers for row in rows], [row.features for row in rows])
+        scores = score_features(features, self.config, kept_adjustment)
+        rule_scores = self._rule_scores(rows)
+
+        now = datetime.utcnow()
+        updates, history, inserts = [], [], []
+        for i, submission_id in enumerate(submission_ids):
+            rule_score = rule_scores.get(i)
+            if rule_score is not None:
+                final_score = min(100, rule_score.total + int(scores["ai_adjustment"][i]))
+                values = {
+                    "base_score": rule_score.total,
+                    "final_score": final_score,
+                    "score_factors": rule_score.factors,
+                    "score_category": score_category(final_score),
+                    "scoring_version": RULES_SCORING_VERSION
+                }
+            else:
+                values = {
+                    "base_score": int(scores["base_score"][i]),
+                    "final_score": int(scores["final_score"][i]),
+                    "score_factors": {
+                        factor: {"value": int(scores[factor][i]), "weight": self.config.weights[factor]}
+                        for factor in FACTORS
+                    },
+                    "score_category": str(scores["score_category"][i]),
+                    "scoring_version": self.config.scoring_version
+                }
+            values["calculated_at"] = now
+
+            current = existing.get(str(submission_id))
+            if current is None:
+                inserts.append({
+                    "id": uuid.uuid4(),
+                    "submission_id": uuid.UUID(str(submission_id)),
+                    "ai_adjustment": int(scores["ai_adjustment"][i]),
+                    "ai_insights": {},
+                    "buying_signals_detected": features.signals[i],
+                    "ai_status": "pending" if self.defer_ai else "completed",
+                    **values
+                })
+                continue
+
+            if (
+                current.base_score == values["base_score"]
+                and current.final_score == values["final_score"]
+                and current.score_category == values["score_category"]
+                and current.score_factors == values["score_factors"]
+            ):
+                continue
+
+            updates.append({"id": current.id, **values})
+            if current.final_score != values["final_score"]:
+                history.append({
+                    "id": uuid.uuid4(),
+                    "lead_score_id": current.id,
+                    "previous_score": current.final_score,
+                    "new_score": values["final_score"],
+                    "change_reason": f"Bulk rescore ({values['scoring_version']})",
+                    "changed_at": now,
+                    "changed_by": self.changed_by
+                })
+
+        if not self.dry_run:
+            # ORM bulk statements: executemany UPDATE by primary key, multi-row INSERT
+            if updates:
+                self.db.execute(update(LeadScore), updates)
+            if history:
+                self.db.execute(insert(LeadScoreHistory), history)
+            if inserts:
+                self.db.execute(insert(LeadScore), inserts)
+            self.db.commit()
+
+        return {
+            "updated": len(updates),
+            "created": len(inserts),
+            "unchanged": len(rows) - len(updates) - len(inserts)
+        }
+
+
+ACTIVE_RUN_STATUSES = ("pending", "processing")
+
+# Active runs without progress for this long died with their API process
+RUN_STALE_AFTER = timedelta(minutes=30)
+
+
+def get_rescore_run(db: Session, run_id: str) -> Optional[RescoreRun]:
+    """Load a run, marking it failed if its process stopped reporting progress"""
+    run = db.query(RescoreRun).filter(RescoreRun.id == run_id).first()
+    if run and run.status in ACTIVE_RUN_STATUSES and run.updated_at < datetime.utcnow() - RUN_STALE_AFTER:
+        run.status, run.error_message, run.completed_at = "failed", "Interrupted", datetime.utcnow()
+        db.commit()
+    return run
+
+
+def start_rescore_run(
+    db: Session,
+    config: RescoringConfig,
+    user_id=None,
+    batch_size: Optional[int] = None,
+    dry_run: bool = False,
+    changed_by=None
+) -> RescoreRun:
+    """
+    Record a rescore run and execute it in a background thread with its own
+    session. Progress and the outcome are written to the run's row.
+    """
+    run = RescoreRun(
+        user_id=str(user_id) if user_id is not None else None,
+        requested_by=str(changed_by) if changed_by else None,
+        dry_run=dry_run,
+        status="pending"
+    )
+    db.add(run)
+    db.commit()
+    run_id = run.id
+
+    def execute() -> None:
+        session = SessionLocal()
+
+        def update_run(**values) -> None:
+            session.query(RescoreRun).filter(RescoreRun.id == run_id).update(
+                {**values, "updated_at": datetime.utcnow()}, synchronize_session=False
+            )
+            session.commit()
+
+        def progress(processed: int, total: int) -> None:
+            update_run(processed=processed, total=total)
+
+        try:
+            update_run(status="processing", started_at=datetime.utcnow())
+            rescorer = BulkRescorer(
+                session, config, batch_size=batch_size, progress=progress, dry_run=dry_run, changed_by=changed_by
+            )
+            result = rescorer.run(user_id)
+            update_run(status="completed", result=result, completed_at=datetime.utcnow())
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Rescore run {run_id} failed: {e}")
+            update_run(status="failed", error_message=str(e), completed_at=datetime.utcnow())
+        finally:
+            session.close()
+
+    threading.Thread(target=execute, name=f"rescore-{run_id}", daemon=True).start()
+    return run
@@ -7,6 +7,7 @@ import re
 import json
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from uuid import UUID
 import openai
@@ -20,6 +21,26 @@ from app.models.competitive_analysis import (
 )
 from app.models.form import FormSubmission
 from app.core.config import settings
+from app.services.competitor_catalog import DEFAULT_BATTLE_CARDS, competitor_catalog, default_battle_card
+from app.services.competitive_rollups import CompetitiveRollupService
+from app.services.competitor_dictionaries import COMPETITOR_PATTERNS, competitor_dictionaries
+from app.services.llm_batching import BatchTask, LLMBatcher
+from app.services.llm_hedging import call_within_deadline
+
+# Batched positioning prompt, for refreshing the positioning of many insights at once
+POSITIONING_TASK = BatchTask(
+    kind="competitive_positioning",
+    instructions=(
+        "Generate a competitive positioning strategy for each lead. Items list the competitors the lead "
+        "is evaluating, its current solution, pain points, timeline and our advantages over the first competitor."
+    ),
+    output_format=(
+        "strategy (1-2 sentences), approach (3-5 key approach points), "
+        "battle_points (3-5 points to emphasize), risks (2-3 risks to mitigate)"
+    ),
+    max_tokens_per_item=400,
+    temperature=0.7
+)
 
 
 class CompetitiveAnalysisService:
@@ -30,57 +51,33 @@ class CompetitiveAnalysisService:
         self.openai_client = openai.Client(api_key=settings.OPENAI_API_KEY)
         
         # Competitor detection patterns
-        self.competitor_patterns = {
-            'salesforce': {
-                'keywords': ['salesforce', 'sfdc', 'sf crm'],
-                'category': 'enterprise_crm',
-                'tier': 'enterprise'
-            },
-            'hubspot': {
-                'keywords': ['hubspot', 'hub spot'],
-                'category': 'marketing_automation',
-                'tier': 'mid_market'
-            },
-            'pipedrive': {
-                'keywords': ['pipedrive', 'pipe drive'],
-                'category': 'sales_crm',
-                'tier': 'smb'
-            },
-            'excel': {
-                'keywords': ['excel', 'spreadsheet', 'sheets', 'google sheets'],
-                'category': 'manual_process',
-                'tier': 'manual'
-            },
-            'custom': {
-                'keywords': ['custom', 'in-house', 'built internally', 'homegrown'],
-                'category': 'custom_solution',
-                'tier': 'custom'
-            },
-            'none': {
-                'keywords': ['nothing', 'manual', 'no solution', 'pen and paper'],
-                'category': 'no_solution',
-                'tier': 'none'
-            }
-        }
+        self.competitor_patterns = COMPETITOR_PATTERNS
         
         # Default battle cards
-        self.default_battle_cards = self._load_default_battle_cards()
+        self.default_battle_cards = DEFAULT_BATTLE_CARDS
     
     async def analyze_competition(
         self,
         submission_id: UUID,
-        form_data: Dict
+        form_data: Dict,
+        features=None,
+        user_id=None
     ) -> CompetitiveInsight:
         """
-        Analyze form submission for competitive intelligence
+        Analyze form submission for competitive intelligence.
+        ``features`` are the submission's SubmissionFeatures, whose detected
+        competitors are used instead of scanning the answers again. Detection
+        uses the competitor dictionary of the tenant (``user_id``), profiles
+        come from the process-wide competitor catalog.
         """
         # Detect competitors
-        detected_competitors, confidence = self._detect_competitors(form_data)
+        detected_competitors, confidence = self._detect_competitors(form_data, features, user_id)
         
         # Get or create competitor profiles
         competitor_profiles = []
+        catalog = competitor_catalog.get(self.db) if detected_competitors else None
         for comp_name in detected_competitors:
-            profile = self._get_or_create_competitor(comp_name)
+            profile = self._get_or_create_competitor(comp_name, user_id, catalog)
             competitor_profiles.append(profile)
         
         # Generate positioning strategy
@@ -112,30 +109,20 @@ class CompetitiveAnalysisService:
         
         return insight
     
-    def _detect_competitors(self, form_data: Dict) -> Tuple[List[str], float]:
-        """Detect competitors mentioned in form data"""
+    def _detect_competitors(self, form_data: Dict, features=None, user_id=None) -> Tuple[List[str], float]:
+        """Detect competitors mentioned in form data, from its SubmissionFeatures when given"""
         form_text = json.dumps(form_data).lower()
-        detected = []
-        confidence_scores = []
-        
-        for comp_name, comp_data in self.competitor_patterns.items():
-            for keyword in comp_data['keywords']:
-                if keyword in form_text:
-                    detected.append(comp_name)
-                    # Higher confidence for exact matches
-                    if f'"{keyword}"' in form_text or f' {keyword} ' in form_text:
-                        confidence_scores.append(0.95)
-                    else:
-                        confidence_scores.append(0.75)
-                    break
+        dictionary = competitor_dictionaries.get(self.db, user_id)
+        if features is not None:
+            detected, confidence = list(features.competitors), features.competitor_confidence
+        else:
+            detected, confidence = dictionary.detect(form_text)
         
-        # Use AI for implicit detection if no explicit mentions
-        if not detected:
-            detected, ai_confidence = self._ai_detect_competitors(form_text)
-            confidence_scores = [ai_confidence] * len(detected)
+        # Use AI for implicit detection only when the text probably refers to one
+        if not detected and dictionary.probable_mention(form_text):
+            detected, confidence = self._ai_detect_competitors(form_text)
         
-        avg_confidence = sum(confidence_scores) / len(confidence_scores) if confidence_scores else 0
-        return detected, avg_confidence
+        return detected, confidence
     
     def _ai_detect_competitors(self, form_text: str) -> Tuple[List[str], float]:
         """Use AI to detect implicit competitor mentions"""
@@ -149,7 +136,8 @@ class CompetitiveAnalysisService:
             Return JSON with: competitors (list), confidence (0-1)
             """
             
-            response = self.openai_client.chat.completions.create(
+            response = call_within_deadline(
+                self.openai_client,
                 model="gpt-4",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.3,
@@ -161,15 +149,14 @@ class CompetitiveAnalysisService:
         except:
             return [], 0.0
     
-    def _get_or_create_competitor(self, name: str) -> CompetitorProfile:
-        """Get existing competitor profile or create new one"""
-        competitor = self.db.query(CompetitorProfile).filter(
-            CompetitorProfile.name == name
-        ).first()
+    def _get_or_create_competitor(self, name: str, user_id=None, catalog=None):
+        """Get the tenant's or the global competitor profile from the catalog, or create a global one"""
+        catalog = catalog or competitor_catalog.get(self.db)
+        competitor = catalog.profile(name, user_id)
         
         if not competitor:
             # Create new profile with defaults
-            battle_card = self.default_battle_cards.get(name, self._get_generic_battle_card())
+            battle_card = default_battle_card(name)
             
             competitor = CompetitorProfile(
                 name=name,
@@ -184,7 +171,16 @@ class CompetitiveAnalysisService:
             )
             
             self.db.add(competitor)
-            self.db.commit()
+            try:
+                self.db.commit()
+            except IntegrityError:
+                # A concurrent analysis created the global profile first
+                self.db.rollback()
+                competitor = self.db.query(CompetitorProfile).filter(
+                    CompetitorProfile.user_id.is_(None),
+                    CompetitorProfile.name == name
+                ).one()
+            competitor_catalog.invalidate()
         
         return competitor
     
@@ -226,7 +222,8 @@ class CompetitiveAnalysisService:
             Format as JSON.
             """
             
-            response = self.openai_client.chat.completions.create(
+            response = call_within_deadline(
+                self.openai_client,
                 model="gpt-4",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.7,
@@ -248,32 +245,82 @@ class CompetitiveAnalysisService:
                 'risks': ['Switching costs', 'Change resistance']
             }
     
-    def get_battle_card(self, competitor_name: str) -> Dict:
-        """Get battle card for specific competitor"""
-        competitor = self.db.query(CompetitorProfile).filter(
-            CompetitorProfile.name == competitor_name
-        ).first()
+    def refresh_positioning(self, insight_ids: List[UUID], batcher: Optional[LLMBatcher] = None) -> int:
+        """
+        Regenerate the positioning of stored insights, LLM_BATCH_SIZE per completion.
         
-        if competitor and competitor.battle_card:
-            return competitor.battle_card
+        Blocking, for scheduled jobs. Returns the number of insights updated,
+        the others keep their positioning.
+        """
+        items = self.positioning_items(insight_ids)
+        if not items:
+            return 0
+        results = (batcher or LLMBatcher(self.openai_client)).complete(POSITIONING_TASK, items)
+        return self.apply_positioning_results(results)
+    
+    def positioning_items(self, insight_ids: List[UUID]) -> Dict[str, Dict]:
+        """Positioning prompt items of the insights with detected competitors, keyed by insight id"""
+        insights = self.db.query(CompetitiveInsight).filter(
+            CompetitiveInsight.id.in_([UUID(str(insight_id)) for insight_id in insight_ids]),
+            CompetitiveInsight.competitor_id.isnot(None)
+        ).all()
+        answers = dict(self.db.query(FormSubmission.id, FormSubmission.answers).filter(
+            FormSubmission.id.in_([str(insight.submission_id) for insight in insights])
+        ).all())
+        catalog = competitor_catalog.get(self.db)
         
-        return self.default_battle_cards.get(competitor_name, self._get_generic_battle_card())
+        items = {}
+        for insight in insights:
+            form_data = answers.get(str(insight.submission_id)) or {}
+            profile = catalog.profile_by_id(insight.competitor_id)
+            items[str(insight.id)] = {
+                'evaluating': insight.competitors_detected or [],
+                'current_solution': form_data.get('current_solution', 'unknown'),
+                'pain_points': form_data.get('pain_points', []),
+                'timeline': form_data.get('timeline', 'not specified'),
+                'our_advantages': profile.our_advantages if profile and profile.our_advantages else []
+            }
+        return items
     
-    def get_objection_handlers(self, competitor_id: UUID) -> List[ObjectionHandler]:
-        """Get objection handling scripts for competitor"""
-        return self.db.query(ObjectionHandler).filter(
-            ObjectionHandler.competitor_id == competitor_id,
-            ObjectionHandler.is_active == True
+    def apply_positioning_results(self, results: Dict[str, Dict]) -> int:
+        """Store batched positioning answers on their insights, skipping incomplete answers"""
+        complete = {
+            insight_id: result for insight_id, result in results.items()
+            if all(key in result for key in ('strategy', 'approach', 'battle_points', 'risks'))
+        }
+        if not complete:
+            return 0
+        
+        insights = self.db.query(CompetitiveInsight).filter(
+            CompetitiveInsight.id.in_([UUID(insight_id) for insight_id in complete])
         ).all()
+        for insight in insights:
+            result = complete[str(insight.id)]
+            insight.positioning_strategy = result['strategy']
+            insight.recommended_approach = result['approach']
+            insight.battle_points = result['battle_points']
+            insight.risk_factors = result['risks']
+        
+        self.db.commit()
+        return len(insights)
+    
+    def get_battle_card(self, competitor_name: str, user_id=None) -> Dict:
+        """Get a copy of the battle card for specific competitor, the tenant's profile first"""
+        return competitor_catalog.get(self.db).battle_card(competitor_name, user_id)
+    
+    def get_objection_handlers(self, competitor_id: UUID, objection_type: Optional[str] = None) -> List:
+        """Get active objection handling scripts for competitor, most successful first"""
+        return competitor_catalog.get(self.db).objection_handlers(competitor_id, objection_type)
     
     def track_competitive_outcome(
         self,
         lead_id: UUID,
         competitor_id: UUID,
         outcome: str,
-        details: Dict
+        details: Dict,
+        user_id=None
     ):
-        """Track win/loss against competitor"""
+        """Track win/loss against competitor, in the lead's tenant rollups too"""
         # Record outcome
         outcome_record = CompetitiveOutcome(
             lead_id=lead_id,
@@ -304,7 +351,14 @@ class CompetitiveAnalysisService:
             if competitor.total_competitions > 0:
                 competitor.win_rate = competitor.wins_against / competitor.total_competitions
         
+        # Daily win/loss rollup of the lead's tenant, read by the competitive statistics
+        if user_id is None:
+            user_id = self.db.query(FormSubmission.user_id).filter(FormSubmission.id == str(lead_id)).scalar()
+        if user_id is not None:
+            CompetitiveRollupService(self.db).record_outcome(outcome_record, user_id, commit=False)
+        
         self.db.commit()
+        competitor_catalog.invalidate()
     
     def _extract_mention_context(self, form_data: Dict, competitors: List[str]) -> str:
         """Extract context where competitor was mentioned"""
@@ -320,84 +374,6 @@ class CompetitiveAnalysisService:
         
         return ' | '.join(contexts[:3])  # Return up to 3 context sentences
     
-    def _load_default_battle_cards(self) -> Dict:
-        """Load default battle cards for known competitors"""
-        return {
-            'salesforce': {
-                'strengths': ['Market leader', 'Enterprise features', 'Extensive ecosystem'],
-                'weaknesses': ['Complex setup', 'Expensive', 'Steep learning curve'],
-                'our_advantages': [
-                    '80% faster implementation (5 minutes vs 2+ weeks)',
-                    '70% lower cost of ownership',
-                    'No technical skills required',
-                    'AI-powered insights out of the box',
-                    'Instant value - no consulting needed'
-                ],
-                'their_advantages': [
-                    'Established brand',
-                    'Large partner ecosystem',
-                    'Enterprise-grade security'
-                ],
-                'positioning': 'Modern, AI-first alternative that delivers instant value without the complexity',
-                'differentiators': ['AI automation', 'Instant setup', 'No training required'],
-                'objection_handlers': {
-                    'price': 'While Salesforce may seem established, consider the total cost including implementation, training, and maintenance. FormFlow delivers 80% of the value at 30% of the cost.',
-                    'features': 'FormFlow focuses on what actually drives results - turning form data into insights. We eliminate feature bloat and complexity.',
-                    'trust': 'We serve 500+ growing companies who switched from Salesforce and saw immediate ROI.'
-                }
-            },
-            'hubspot': {
-                'strengths': ['All-in-one platform', 'Good marketing tools', 'Free tier'],
-                'weaknesses': ['Limited AI capabilities', 'Gets expensive at scale', 'Form analytics basic'],
-                'our_advantages': [
-                    'Specialized in form-to-insight transformation',
-                    'Advanced AI analysis vs basic reporting',
-                    'Instant dashboard generation',
-                    'No per-contact pricing',
-                    'Purpose-built for conversion optimization'
-                ],
-                'their_advantages': [
-                    'Broader marketing toolkit',
-                    'Built-in CRM',
-                    'Email marketing included'
-                ],
-                'positioning': 'Purpose-built for teams that need deep form insights, not another generic marketing platform',
-                'differentiators': ['AI insights', 'Specialized for forms', 'Predictable pricing']
-            },
-            'excel': {
-                'strengths': ['Familiar', 'Flexible', 'Low cost'],
-                'weaknesses': ['Manual process', 'Error-prone', 'No real-time insights', 'No collaboration'],
-                'our_advantages': [
-                    '95% time savings on analysis',
-                    'Real-time insights vs manual updates',
-                    'AI-powered recommendations',
-                    'Zero errors vs manual formulas',
-                    'Team collaboration built-in',
-                    'Scales with your growth'
-                ],
-                'their_advantages': [
-                    'No learning curve',
-                    'One-time cost',
-                    'Complete control'
-                ],
-                'positioning': 'Graduate from manual spreadsheets to AI-powered insights that scale with your business',
-                'differentiators': ['Automation', 'AI insights', 'Real-time updates', 'Collaboration']
-            }
-        }
-    
     def _get_generic_battle_card(self) -> Dict:
         """Get generic battle card for unknown competitors"""
-        return {
-            'strengths': ['Unknown'],
-            'weaknesses': ['Unknown'],
-            'our_advantages': [
-                'Purpose-built for form insights',
-                'AI-powered analysis',
-                '5-minute setup',
-                'No technical skills required',
-                'Instant ROI'
-            ],
-            'their_advantages': ['Existing relationship'],
-            'positioning': 'Modern AI-first solution that delivers immediate value',
-            'differentiators': ['Simplicity', 'Speed', 'Intelligence']
-        }
\ No newline at end of file
+        return default_battle_card(None)
@@ -0,0 +1,214 @@
+"""
+Competitive Rollup Service for FA-49
+Maintains daily win/loss rollups per competitor and tenant and serves the competitive statistics
+"""
+
+from typing import Any, Dict, Optional, Tuple
+from datetime import datetime
+from sqlalchemy import String, cast, func
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+import logging
+
+from app.models.competitive_analysis import CompetitiveOutcome, CompetitiveOutcomeRollup
+from app.models.form import FormSubmission
+from app.services.competitor_catalog import competitor_catalog
+from app.services.rollup_service import bucket_step, truncate_to_bucket
+
+logger = logging.getLogger(__name__)
+
+
+class CompetitiveRollupService:
+    """Service for maintaining and querying competitive outcome rollups"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ------------------------------------------------------------------
+    # Tracking
+    # ------------------------------------------------------------------
+
+    def record_outcome(self, outcome: CompetitiveOutcome, user_id, commit: bool = True) -> None:
+        """Add a tracked outcome to its tenant's daily bucket for the competitor"""
+        timestamp = outcome.outcome_date or datetime.utcnow()
+        rollup = self._get_or_create_bucket(str(user_id), outcome.competitor_id, truncate_to_bucket(timestamp, "day"))
+
+        rollup.outcome_count = (rollup.outcome_count or 0) + 1
+        if outcome.outcome == 'won':
+            rollup.wins = (rollup.wins or 0) + 1
+        elif outcome.outcome == 'lost':
+            rollup.losses = (rollup.losses or 0) + 1
+        rollup.deal_size_sum = (rollup.deal_size_sum or 0) + (outcome.deal_size or 0)
+
+        if commit:
+            self.db.commit()
+
+    def rebuild(self, user_id) -> int:
+        """
+        Recompute a tenant's buckets from the outcomes of its leads.
+
+        Used to backfill outcomes tracked before rollups existed and to correct
+        rollups after deletions.
+
+        Returns:
+            Number of outcomes folded into the rebuilt buckets
+        """
+        user_id = str(user_id)
+        self.db.query(CompetitiveOutcomeRollup).filter(
+            CompetitiveOutcomeRollup.user_id == user_id
+        ).delete(synchronize_session=False)
+        self.db.flush()
+
+        rows = self.db.query(
+            CompetitiveOutcome.competitor_id,
+            CompetitiveOutcome.outcome,
+            CompetitiveOutcome.outcome_date,
+            CompetitiveOutcome.created_at,
+            CompetitiveOutcome.deal_size
+        ).join(
+            # Submission ids are UUID strings, outcome lead ids UUIDs
+            FormSubmission, FormSubmission.id == cast(CompetitiveOutcome.lead_id, String)
+        ).filter(
+            FormSubmission.user_id == user_id,
+            CompetitiveOutcome.competitor_id.isnot(None)
+        ).yield_per(1000)
+
+        buckets: Dict[Tuple[Any, datetime], CompetitiveOutcomeRollup] = {}
+        total = 0
+        for competitor_id, outcome, outcome_date, created_at, deal_size in rows:
+            total += 1
+            bucket_start = truncate_to_bucket(outcome_date or created_at or datetime.utcnow(), "day")
+            rollup = buckets.get((competitor_id, bucket_start))
+            if rollup is None:
+                rollup = buckets[(competitor_id, bucket_start)] = CompetitiveOutcomeRollup(
+                    user_id=user_id,
+                    competitor_id=competitor_id,
+                    bucket_start=bucket_start,
+                    outcome_count=0,
+                    wins=0,
+                    losses=0,
+                    deal_size_sum=0.0
+                )
+            rollup.outcome_count += 1
+            rollup.wins += outcome == 'won'
+            rollup.losses += outcome == 'lost'
+            rollup.deal_size_sum += deal_size or 0
+
+        self.db.add_all(buckets.values())
+        self.db.commit()
+        logger.info(f"Rebuilt {len(buckets)} competitive rollup buckets for {user_id} from {total} outcomes")
+        return total
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def get_statistics(
+        self,
+        user_id,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Win/loss statistics of a tenant, overall and by competitor.
+
+        With a date range ``recent_trends`` covers the days from ``date_from``
+        through ``date_to``, both inclusive.
+        """
+        user_id = str(user_id)
+        rows = self.db.query(
+            CompetitiveOutcomeRollup.competitor_id,
+            func.sum(CompetitiveOutcomeRollup.outcome_count),
+            func.sum(CompetitiveOutcomeRollup.wins),
+            func.sum(CompetitiveOutcomeRollup.losses)
+        ).filter(
+            CompetitiveOutcomeRollup.user_id == user_id
+        ).group_by(CompetitiveOutcomeRollup.competitor_id).all()
+
+        catalog = competitor_catalog.get(self.db)
+        by_competitor: Dict[str, Dict[str, Any]] = {}
+        for competitor_id, competitions, wins, losses in rows:
+            profile = catalog.profile_by_id(competitor_id)
+            name = profile.name if profile else str(competitor_id)
+            # A tenant profile and the global one of the same name report together
+            entry = by_competitor.setdefault(name, {
+                "competitions": 0,
+                "wins": 0,
+                "losses": 0,
+                "win_rate": 0,
+                "top_advantages": profile.our_advantages[:3] if profile and profile.our_advantages else []
+            })
+            entry["competitions"] += competitions or 0
+            entry["wins"] += wins or 0
+            entry["losses"] += losses or 0
+            entry["win_rate"] = entry["wins"] / entry["competitions"] if entry["competitions"] else 0
+
+        total_competitions = sum(entry["competitions"] for entry in by_competitor.values())
+        total_wins = sum(entry["wins"] for entry in by_competitor.values())
+        stats = {
+            "overall": {
+                "total_competitions": total_competitions,
+                "total_wins": total_wins,
+                "total_losses": sum(entry["losses"] for entry in by_competitor.values()),
+                "overall_win_rate": total_wins / total_competitions if total_competitions else 0
+            },
+            "by_competitor": by_competitor
+        }
+
+        if date_from or date_to:
+            stats["recent_trends"] = self._period_trends(user_id, date_from, date_to)
+
+        return stats
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _period_trends(self, user_id: str, date_from: Optional[datetime], date_to: Optional[datetime]) -> Dict[str, Any]:
+        query = self.db.query(
+            func.sum(CompetitiveOutcomeRollup.outcome_count),
+            func.sum(CompetitiveOutcomeRollup.wins),
+            func.sum(CompetitiveOutcomeRollup.losses),
+            func.sum(CompetitiveOutcomeRollup.deal_size_sum)
+        ).filter(CompetitiveOutcomeRollup.user_id == user_id)
+        if date_from:
+            query = query.filter(CompetitiveOutcomeRollup.bucket_start >= truncate_to_bucket(date_from, "day"))
+        if date_to:
+            query = query.filter(
+                CompetitiveOutcomeRollup.bucket_start < truncate_to_bucket(date_to, "day") + bucket_step("day")
+            )
+
+        outcomes, wins, losses, deal_size_sum = query.one()
+        return {
+            "period_wins": wins or 0,
+            "period_losses": losses or 0,
+            "average_deal_size": (deal_size_sum or 0) / outcomes if outcomes else 0
+        }
+
+    def _get_or_create_bucket(self, user_id: str, competitor_id, bucket_start: datetime) -> CompetitiveOutcomeRollup:
+        """Fetch a bucket for update, inserting it if it doesn't exist yet"""
+        query = self.db.query(CompetitiveOutcomeRollup).filter_by(
+            user_id=user_id,
+            competitor_id=competitor_id,
+            bucket_start=bucket_start
+        )
+        rollup = query.with_for_update().first()
+        if rollup:
+            return rollup
+
+        rollup = CompetitiveOutcomeRollup(
+            user_id=user_id,
+            competitor_id=competitor_id,
+            bucket_start=bucket_start,
+            outcome_count=0,
+            wins=0,
+            losses=0,
+            deal_size_sum=0.0
+        )
+        try:
+            # Savepoint so a concurrent insert of the same bucket doesn't abort the tracking
+            with self.db.begin_nested():
+                self.db.add(rollup)
+            return rollup
+        except IntegrityError:
+            return query.with_for_update().one()
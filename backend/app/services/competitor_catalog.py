@@ -0,0 +1,206 @@
+"""
+Competitor Catalog for FA-49
+Process-wide, versioned snapshot of competitor profiles, battle cards and objection handlers
+
+Competitive analysis looks up the profile of every detected competitor on
+every submission, and the /competitors endpoints read the same few rows on
+every request. The tables are tiny and change rarely, so each process loads
+them once into a CompetitorCatalog: read-only records of the profiles (global
+and every tenant's) and of the active objection handlers, indexed by name and
+competitor.
+
+The catalog is a VersionedCache entry under the version of both tables (row
+counts and latest updates), so a write made by any process is picked up
+within VERSIONED_CACHE_CHECK_SECONDS. Writers also call invalidate() after
+committing, which drops the shared version at once.
+
+Battle cards come from the profile's battle_card column, then the built-in
+DEFAULT_BATTLE_CARDS, then GENERIC_BATTLE_CARD. Callers receive a copy they
+may customize.
+"""
+
+from typing import Any, Dict, List, Optional
+from collections import namedtuple
+import copy
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.competitive_analysis import CompetitorProfile, ObjectionHandler
+from app.services.versioned_cache import VersionedCache, table_version
+
+CATALOG_KEY = "all"
+
+# Default battle cards for known competitors
+DEFAULT_BATTLE_CARDS = {
+    'salesforce': {
+        'strengths': ['Market leader', 'Enterprise features', 'Extensive ecosystem'],
+        'weaknesses': ['Complex setup', 'Expensive', 'Steep learning curve'],
+        'our_advantages': [
+            '80% faster implementation (5 minutes vs 2+ weeks)',
+            '70% lower cost of ownership',
+            'No technical skills required',
+            'AI-powered insights out of the box',
+            'Instant value - no consulting needed'
+        ],
+        'their_advantages': [
+            'Established brand',
+            'Large partner ecosystem',
+            'Enterprise-grade security'
+        ],
+        'positioning': 'Modern, AI-first alternative that delivers instant value without the complexity',
+        'differentiators': ['AI automation', 'Instant setup', 'No training required'],
+        'objection_handlers': {
+            'price': 'While Salesforce may seem established, consider the total cost including implementation, training, and maintenance. FormFlow delivers 80% of the value at 30% of the cost.',
+            'features': 'FormFlow focuses on what actually drives results - turning form data into insights. We eliminate feature bloat and complexity.',
+            'trust': 'We serve 500+ growing companies who switched from Salesforce and saw immediate ROI.'
+        }
+    },
+    'hubspot': {
+        'strengths': ['All-in-one platform', 'Good marketing tools', 'Free tier'],
+        'weaknesses': ['Limited AI capabilities', 'Gets expensive at scale', 'Form analytics basic'],
+        'our_advantages': [
+            'Specialized in form-to-insight transformation',
+            'Advanced AI analysis vs basic reporting',
+            'Instant dashboard generation',
+            'No per-contact pricing',
+            'Purpose-built for conversion optimization'
+        ],
+        'their_advantages': [
+            'Broader marketing toolkit',
+            'Built-in CRM',
+            'Email marketing included'
+        ],
+        'positioning': 'Purpose-built for teams that need deep form insights, not another generic marketing platform',
+        'differentiators': ['AI insights', 'Specialized for forms', 'Predictable pricing']
+    },
+    'excel': {
+        'strengths': ['Familiar', 'Flexible', 'Low cost'],
+        'weaknesses': ['Manual process', 'Error-prone', 'No real-time insights', 'No collaboration'],
+        'our_advantages': [
+            '95% time savings on analysis',
+            'Real-time insights vs manual updates',
+            'AI-powered recommendations',
+            'Zero errors vs manual formulas',
+            'Team collaboration built-in',
+            'Scales with your growth'
+        ],
+        'their_advantages': [
+            'No learning curve',
+            'One-time cost',
+            'Complete control'
+        ],
+        'positioning': 'Graduate from manual spreadsheets to AI-powered insights that scale with your business',
+        'differentiators': ['Automation', 'AI insights', 'Real-time updates', 'Collaboration']
+    }
+}
+
+# Battle card for unknown competitors
+GENERIC_BATTLE_CARD = {
+    'strengths': ['Unknown'],
+    'weaknesses': ['Unknown'],
+    'our_advantages': [
+        'Purpose-built for form insights',
+        'AI-powered analysis',
+        '5-minute setup',
+        'No technical skills required',
+        'Instant ROI'
+    ],
+    'their_advantages': ['Existing relationship'],
+    'positioning': 'Modern AI-first solution that delivers immediate value',
+    'differentiators': ['Simplicity', 'Speed', 'Intelligence']
+}
+
+# Immutable copies of the rows, safe to share between sessions and threads
+CompetitorRecord = namedtuple("CompetitorRecord", [attr.key for attr in inspect(CompetitorProfile).column_attrs])
+ObjectionHandlerRecord = namedtuple("ObjectionHandlerRecord", [attr.key for attr in inspect(ObjectionHandler).column_attrs])
+
+
+def _record(record_type, row):
+    return record_type(**{field: getattr(row, field) for field in record_type._fields})
+
+
+def default_battle_card(name: str) -> Dict[str, Any]:
+    """Built-in battle card for a competitor, the generic one for unknown competitors"""
+    return copy.deepcopy(DEFAULT_BATTLE_CARDS.get(name, GENERIC_BATTLE_CARD))
+
+
+class CompetitorCatalog:
+    """Competitor profiles and objection handlers of one version of the tables"""
+    __slots__ = ("profiles", "_by_id", "_by_name", "_handlers")
+
+    def __init__(self, profiles: List[CompetitorRecord], handlers: List[ObjectionHandlerRecord]):
+        self.profiles = profiles
+        self._by_id = {str(profile.id): profile for profile in profiles}
+        # (tenant, name) -> profile, tenant None for the global profiles
+        self._by_name = {(profile.user_id, profile.name): profile for profile in profiles}
+        # competitor id -> active handlers, most successful first
+        self._handlers: Dict[str, List[ObjectionHandlerRecord]] = {}
+        for handler in sorted(handlers, key=lambda handler: handler.success_rate or 0, reverse=True):
+            self._handlers.setdefault(str(handler.competitor_id), []).append(handler)
+
+    def profile(self, name: str, user_id=None) -> Optional[CompetitorRecord]:
+        """The tenant's profile of that name, else the global one"""
+        if user_id is not None:
+            profile = self._by_name.get((str(user_id), name))
+            if profile is not None:
+                return profile
+        return self._by_name.get((None, name))
+
+    def profile_by_id(self, competitor_id) -> Optional[CompetitorRecord]:
+        return self._by_id.get(str(competitor_id))
+
+    def profiles_for(self, user_id=None, is_active: Optional[bool] = True) -> List[CompetitorRecord]:
+        """Global and tenant profiles, best win rate first"""
+        user_id = str(user_id) if user_id is not None else None
+        profiles = [
+            profile for profile in self.profiles
+            if profile.user_id is None or profile.user_id == user_id
+            if is_active is None or bool(profile.is_active) == is_active
+        ]
+        return sorted(profiles, key=lambda profile: profile.win_rate or 0, reverse=True)
+
+    def battle_card(self, name: str, user_id=None) -> Dict[str, Any]:
+        """Copy of the competitor's battle card, falling back to the built-in cards"""
+        profile = self.profile(name, user_id)
+        if profile is not None and profile.battle_card:
+            return copy.deepcopy(profile.battle_card)
+        return default_battle_card(name)
+
+    def objection_handlers(self, competitor_id, objection_type: Optional[str] = None) -> List[ObjectionHandlerRecord]:
+        """Active objection handlers of a competitor, most successful first"""
+        handlers = self._handlers.get(str(competitor_id), [])
+        if objection_type:
+            handlers = [handler for handler in handlers if handler.objection_type == objection_type]
+        return list(handlers)
+
+
+class CompetitorCatalogCache:
+    """The process-wide catalog, reloaded when the competitor tables change"""
+
+    def __init__(self, check_ttl: float = settings.VERSIONED_CACHE_CHECK_SECONDS):
+        self._cache = VersionedCache("competitor_catalog", check_ttl)
+
+    def get(self, db: Session) -> CompetitorCatalog:
+        return self._cache.get(
+            CATALOG_KEY,
+            lambda: table_version(db, (CompetitorProfile,), (ObjectionHandler,)),
+            lambda: self._load(db)
+        )
+
+    def invalidate(self) -> None:
+        """Drop the catalog after a write to competitor profiles or objection handlers"""
+        self._cache.invalidate()
+
+    @staticmethod
+    def _load(db: Session) -> CompetitorCatalog:
+        profiles = db.query(CompetitorProfile).order_by(CompetitorProfile.created_at, CompetitorProfile.id).all()
+        handlers = db.query(ObjectionHandler).filter(ObjectionHandler.is_active == True).all()
+        return CompetitorCatalog(
+            [_record(CompetitorRecord, profile) for profile in profiles],
+            [_record(ObjectionHandlerRecord, handler) for handler in handlers]
+        )
+
+
+competitor_catalog = CompetitorCatalogCache()
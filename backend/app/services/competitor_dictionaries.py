@@ -0,0 +1,247 @@
+"""
+Competitor Dictionaries for FA-49
+Per-tenant competitor detection compiled from CompetitorProfile aliases
+
+A tenant's dictionary holds the built-in competitor patterns, the global
+competitor profiles (no user_id) and the tenant's own profiles, each with its
+name, display name and aliases. It is compiled once into a whole-word
+KeywordMatcher (an Aho-Corasick automaton when pyahocorasick is installed),
+so a submission is scanned once however many competitors are tracked.
+
+Fuzzy aliases: single-word aliases of brands (profiles, and built-in patterns
+marked fuzzy) also go into a deletion index. Each word of the text looks up
+its single-character deletions there, so a misspelling one edit away
+("hubsopt", "salesforse") is found without comparing every word to every
+alias. Generic built-in keywords ("manual", "custom") stay exact.
+
+Probable mentions: when no competitor is named, phrases like "our current
+CRM" or "switching from" suggest an implicit mention. Only then is it worth
+asking the LLM (see CompetitiveAnalysisService._detect_competitors).
+
+Dictionaries are VersionedCache entries per tenant under the version of the
+profiles they read (count and latest update), so an edit made by any process
+is picked up within VERSIONED_CACHE_CHECK_SECONDS.
+"""
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import re
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.competitive_analysis import CompetitorProfile
+from app.services.keyword_matcher import WORD, WORD_START, KeywordMatcher
+from app.services.versioned_cache import VersionedCache, table_version
+
+# Competitor detection patterns
+COMPETITOR_PATTERNS = {
+    'salesforce': {
+        'keywords': ['salesforce', 'sfdc', 'sf crm'],
+        'category': 'enterprise_crm',
+        'tier': 'enterprise',
+        'fuzzy': True
+    },
+    'hubspot': {
+        'keywords': ['hubspot', 'hub spot'],
+        'category': 'marketing_automation',
+        'tier': 'mid_market',
+        'fuzzy': True
+    },
+    'pipedrive': {
+        'keywords': ['pipedrive', 'pipe drive'],
+        'category': 'sales_crm',
+        'tier': 'smb',
+        'fuzzy': True
+    },
+    'excel': {
+        'keywords': ['excel', 'spreadsheet', 'sheets', 'google sheets'],
+        'category': 'manual_process',
+        'tier': 'manual'
+    },
+    'custom': {
+        'keywords': ['custom', 'in-house', 'built internally', 'homegrown'],
+        'category': 'custom_solution',
+        'tier': 'custom'
+    },
+    'none': {
+        'keywords': ['nothing', 'manual', 'no solution', 'pen and paper'],
+        'category': 'no_solution',
+        'tier': 'none'
+    }
+}
+
+# Phrases suggesting a competitor or current solution is mentioned without its name
+MENTION_CUES = [
+    'our current', 'current solution', 'current system', 'current tool', 'current crm',
+    'existing system', 'existing tool', 'existing crm', 'existing platform',
+    'currently use', 'currently using', 'we use', 'we are using', "we're using",
+    'switching from', 'switch from', 'migrating from', 'migrate from', 'moving away from',
+    'replace', 'replacing', 'alternative to', 'compared to', 'competitor', 'other vendor',
+    'another vendor', 'other tool', 'another tool', 'other provider'
+]
+MENTION_MATCHER = KeywordMatcher({'mention': MENTION_CUES}, boundary=WORD_START)
+
+EXACT_CONFIDENCE = 0.95
+PARTIAL_CONFIDENCE = 0.75
+FUZZY_CONFIDENCE = 0.6
+
+# Shorter words are too often one edit away from an unrelated word
+FUZZY_MIN_LENGTH = 5
+
+_WORDS = re.compile(r'[^\W_]+')
+
+# Cache key of the dictionary without a tenant
+GLOBAL_KEY = "global"
+
+
+def _deletions(word: str) -> Set[str]:
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """One substitution, insertion, deletion or adjacent transposition apart"""
+    if len(a) == len(b):
+        diff = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diff) <= 1:
+            return True
+        first, second = diff[0], diff[-1]
+        return len(diff) == 2 and second == first + 1 and a[first] == b[second] and a[second] == b[first]
+    if abs(len(a) - len(b)) > 1:
+        return False
+    short, long = (a, b) if len(a) < len(b) else (b, a)
+    i = 0
+    while i < len(short) and short[i] == long[i]:
+        i += 1
+    return short[i:] == long[i + 1:]
+
+
+class CompetitorDictionary:
+    """Competitor names and aliases compiled for single-pass, fuzzy detection"""
+    __slots__ = ("aliases", "matcher", "_fuzzy_index")
+
+    def __init__(self, entries: Dict[str, Tuple[Iterable[str], bool]]):
+        # name -> (aliases, fuzzy)
+        self.aliases = {name: [alias.lower() for alias in aliases if alias] for name, (aliases, _) in entries.items()}
+        # Competitor keywords match as whole words or phrases, "custom" is not "customer"
+        self.matcher = KeywordMatcher(self.aliases, boundary=WORD)
+
+        # deletion -> (alias, name) of fuzzy single-word aliases
+        self._fuzzy_index: Dict[str, List[Tuple[str, str]]] = {}
+        for name, (_, fuzzy) in entries.items():
+            if not fuzzy:
+                continue
+            for alias in self.aliases[name]:
+                if len(alias) < FUZZY_MIN_LENGTH or not alias.isalnum():
+                    continue
+                for key in _deletions(alias) | {alias}:
+                    self._fuzzy_index.setdefault(key, []).append((alias, name))
+
+    def __len__(self) -> int:
+        return len(self.aliases)
+
+    def detect(self, form_text: str) -> Tuple[List[str], float]:
+        """Competitors named in the lowercased form text, with the average detection confidence"""
+        detected = []
+        confidence_scores = []
+
+        hits = self.matcher.scan(form_text)
+        for comp_name in hits.categories():
+            keyword = hits.keywords(comp_name)[0]
+            detected.append(comp_name)
+            # Higher confidence for exact matches
+            if f'"{keyword}"' in form_text or f' {keyword} ' in form_text:
+                confidence_scores.append(EXACT_CONFIDENCE)
+            else:
+                confidence_scores.append(PARTIAL_CONFIDENCE)
+
+        for comp_name in self._fuzzy_matches(form_text):
+            if comp_name not in detected:
+                detected.append(comp_name)
+                confidence_scores.append(FUZZY_CONFIDENCE)
+
+        avg_confidence = sum(confidence_scores) / len(confidence_scores) if confidence_scores else 0
+        return detected, avg_confidence
+
+    def probable_mention(self, form_text: str) -> bool:
+        """Whether the text likely refers to a competitor without naming a known one"""
+        return 'mention' in MENTION_MATCHER.scan(form_text)
+
+    def _fuzzy_matches(self, form_text: str) -> List[str]:
+        if not self._fuzzy_index:
+            return []
+        names = []
+        for word in dict.fromkeys(_WORDS.findall(form_text.lower())):
+            if len(word) < FUZZY_MIN_LENGTH:
+                continue
+            for key in _deletions(word) | {word}:
+                for alias, name in self._fuzzy_index.get(key, ()):
+                    if name not in names and _within_one_edit(word, alias):
+                        names.append(name)
+        return names
+
+
+def build_dictionary(profiles: Iterable[CompetitorProfile] = ()) -> CompetitorDictionary:
+    """Built-in patterns extended by profiles, later profiles win; inactive profiles are dropped"""
+    entries: Dict[str, Tuple[List[str], bool]] = {
+        name: (list(pattern['keywords']), pattern.get('fuzzy', False))
+        for name, pattern in COMPETITOR_PATTERNS.items()
+    }
+    for profile in profiles:
+        name = profile.name.lower()
+        if not profile.is_active:
+            entries.pop(name, None)
+            continue
+        aliases, _ = entries.get(name, ([], True))
+        for alias in [profile.name, profile.display_name, *(profile.aliases or [])]:
+            if alias and alias.lower() not in aliases:
+                aliases = aliases + [alias.lower()]
+        entries[name] = (aliases, True)
+    return CompetitorDictionary(entries)
+
+
+BUILTIN_COMPETITORS = build_dictionary()
+COMPETITOR_MATCHER = BUILTIN_COMPETITORS.matcher
+
+
+def detect_competitors(form_text: str) -> Tuple[List[str], float]:
+    """Built-in competitors named in the lowercased form text, with the average detection confidence"""
+    return BUILTIN_COMPETITORS.detect(form_text)
+
+
+def _tenant_filter(user_id: Optional[str]):
+    if user_id is None:
+        return CompetitorProfile.user_id.is_(None)
+    return or_(CompetitorProfile.user_id.is_(None), CompetitorProfile.user_id == user_id)
+
+
+class CompetitorDictionaryCache:
+    """Compiled competitor dictionaries per tenant, valid while the profiles they read are unchanged"""
+
+    def __init__(self, check_ttl: float = settings.VERSIONED_CACHE_CHECK_SECONDS):
+        self._cache = VersionedCache("competitor_dictionaries", check_ttl)
+
+    def get(self, db: Session, user_id=None) -> CompetitorDictionary:
+        """The tenant's dictionary, the global one without a tenant"""
+        user_id = str(user_id) if user_id is not None else None
+        return self._cache.get(
+            user_id or GLOBAL_KEY,
+            lambda: table_version(db, (CompetitorProfile, _tenant_filter(user_id))),
+            lambda: self._build(db, user_id)
+        )
+
+    def invalidate(self, user_id=None) -> None:
+        """Drop a tenant's dictionary, or every dictionary after a global profile changed"""
+        self._cache.invalidate(str(user_id) if user_id is not None else None)
+
+    @staticmethod
+    def _build(db: Session, user_id: Optional[str]) -> CompetitorDictionary:
+        profiles = db.query(CompetitorProfile).filter(_tenant_filter(user_id)).order_by(
+            CompetitorProfile.created_at, CompetitorProfile.id
+        ).all()
+        # Tenant profiles extend and override the global ones
+        profiles.sort(key=lambda profile: profile.user_id is not None)
+        return build_dictionary(profiles)
+
+
+competitor_dictionaries = CompetitorDictionaryCache()
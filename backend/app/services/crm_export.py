@@ -6,14 +6,121 @@ Service for exporting lead data to various CRM formats
 import csv
 import json
 import io
-from typing import Dict, List, Optional, Any
-from datetime import datetime
-from sqlalchemy.orm import Session
+import re
+import tempfile
+from typing import Dict, List, Optional, Any, Iterable, Iterator, Tuple, Union, BinaryIO
+from datetime import date, datetime
+from sqlalchemy import String, cast, or_
+from sqlalchemy.orm import Session, Query
 from uuid import UUID
-import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
 
 from app.models.form import FormSubmission
 from app.models.lead_score import LeadScore
+from app.services.crm_field_plans import CRM_FIELD_MAPPINGS, FEATURES_KEY, compile_plan, format_list
+from app.services.submission_features import FEATURES_VERSION
+
+# Columnar exports (Parquet, Arrow IPC)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+# Submissions fetched per round trip and per LeadScore prefetch
+EXPORT_BATCH_SIZE = 500
+
+# CSV rows buffered before a chunk is handed to the response
+CSV_FLUSH_ROWS = 200
+
+ScoredLead = Tuple[Dict[str, Any], Optional[LeadScore]]
+
+# Columns written as numeric / date cells in Excel exports, all others are text
+NUMERIC_COLUMNS = {
+    'NumberOfEmployees', 'AnnualRevenue', 'Custom_Lead_Score__c',
+    'numemployees', 'annualrevenue', 'formflow_score',
+    'value', 'custom_lead_score', 'custom_company_size',
+    'Company_Size', 'Annual_Revenue', 'Lead_Score'
+}
+DATE_COLUMNS = {'add_time', 'Created_Date'}
+
+_NUMBER_RE = re.compile(r'^-?\d+(\.\d+)?$')
+
+# Column types of Parquet / Arrow exports, all other CRM columns are strings
+ARROW_INT_COLUMNS = {
+    'Custom_Lead_Score__c', 'formflow_score', 'custom_lead_score', 'Lead_Score',
+    'NumberOfEmployees', 'numemployees', 'custom_company_size', 'Company_Size'
+}
+ARROW_FLOAT_COLUMNS = {'value'}
+
+# Leads per record batch; every batch is written as one Parquet row group
+ARROW_BATCH_ROWS = 10000
+COLUMNAR_COMPRESSION = 'zstd'
+
+# Keys lead_from_submission and the services add next to the answers
+_LEAD_META_KEYS = {'submission_id', 'created_at', 'insights', 'recommendations', FEATURES_KEY}
+
+
+def lead_from_submission(submission) -> Dict[str, Any]:
+    """Build the lead dictionary the CRM mappings read from a submission row"""
+    data = dict(submission.answers) if isinstance(submission.answers, dict) else {}
+    data['submission_id'] = submission.id
+    data['created_at'] = submission.created_at
+    # Features parsed at ingest, the derived CRM fields parse the answers without them
+    features = getattr(submission, 'features', None)
+    if features and features.get('version') == FEATURES_VERSION:
+        data[FEATURES_KEY] = features
+    return data
+
+
+def flatten_answers(answers: Dict[str, Any], prefix: str = '') -> Dict[str, str]:
+    """Flatten nested answers to dotted keys with string values"""
+    flat = {}
+    for key, value in answers.items():
+        if not prefix and key in _LEAD_META_KEYS:
+            continue
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_answers(value, f"{name}."))
+        elif isinstance(value, list) and any(isinstance(item, dict) for item in value):
+            flat.update(flatten_answers(dict(enumerate(value)), f"{name}."))
+        elif value is not None:
+            flat[name] = format_list(value)
+    return flat
+
+
+def lead_query(db: Session, user_id, request, since: Optional[datetime] = None) -> Query:
+    """
+    Leads of a user selected by an export request, in export order.
+    With ``since`` only leads created or re-scored after that time.
+    """
+    query = db.query(FormSubmission).filter(
+        FormSubmission.user_id == user_id
+    )
+    
+    if since is not None:
+        rescored = db.query(cast(LeadScore.submission_id, String)).filter(
+            LeadScore.calculated_at > since
+        )
+        query = query.filter(or_(
+            FormSubmission.created_at > since,
+            FormSubmission.id.in_(rescored)
+        ))
+    
+    if request.lead_ids:
+        query = query.filter(FormSubmission.id.in_([str(lead_id) for lead_id in request.lead_ids]))
+    else:
+        # Export all leads with optional date filter
+        if request.date_from:
+            query = query.filter(FormSubmission.created_at >= request.date_from)
+        if request.date_to:
+            query = query.filter(FormSubmission.created_at <= request.date_to)
+    
+    return query.order_by(FormSubmission.created_at, FormSubmission.id)
 
 
 class CRMExportService:
@@ -22,102 +129,112 @@ class CRMExportService:
     def __init__(self, db: Session):
         self.db = db
         
-        # CRM field mappings
-        self.field_mappings = {
-            'salesforce': {
-                'FirstName': lambda d: self._extract_first_name(d),
-                'LastName': lambda d: self._extract_last_name(d),
-                'Email': lambda d: d.get('email', ''),
-                'Company': lambda d: d.get('company', d.get('company_name', '')),
-                'Phone': lambda d: d.get('phone', d.get('phone_number', '')),
-                'Title': lambda d: d.get('role', d.get('job_title', d.get('title', ''))),
-                'LeadSource': lambda d: 'FormFlow AI',
-                'Industry': lambda d: d.get('industry', ''),
-                'NumberOfEmployees': lambda d: self._extract_employee_count(d),
-                'AnnualRevenue': lambda d: self._extract_revenue(d),
-                'Rating': lambda d, s: self._get_rating(s),
-                'Description': lambda d, i: i.get('ai_summary', ''),
-                'Website': lambda d: d.get('website', d.get('company_website', '')),
-                'Status': lambda d: 'New',
-                'Custom_Lead_Score__c': lambda d, s: s.final_score if s else 0,
-                'Custom_Score_Category__c': lambda d, s: s.score_category if s else 'unknown',
-                'Custom_Timeline__c': lambda d: d.get('timeline', ''),
-                'Custom_Budget__c': lambda d: d.get('budget', ''),
-                'Custom_Pain_Points__c': lambda d: self._format_list(d.get('pain_points', [])),
-                'Custom_Next_Action__c': lambda d, r: r[0]['action'] if r else '',
-                'Custom_Competitor__c': lambda d: d.get('current_solution', ''),
-                'Custom_Decision_Maker__c': lambda d: 'Yes' if self._is_decision_maker(d) else 'No'
-            },
-            
-            'hubspot': {
-                'firstname': lambda d: self._extract_first_name(d),
-                'lastname': lambda d: self._extract_last_name(d),
-                'email': lambda d: d.get('email', ''),
-                'company': lambda d: d.get('company', d.get('company_name', '')),
-                'phone': lambda d: d.get('phone', d.get('phone_number', '')),
-                'jobtitle': lambda d: d.get('role', d.get('job_title', d.get('title', ''))),
-                'website': lambda d: d.get('website', d.get('company_website', '')),
-                'numemployees': lambda d: self._extract_employee_count(d),
-                'annualrevenue': lambda d: self._extract_revenue(d),
-                'industry': lambda d: d.get('industry', ''),
-                'lead_status': lambda d: 'New',
-                'lifecyclestage': lambda d: 'lead',
-                'hs_lead_status': lambda d: 'NEW',
-                'formflow_score': lambda d, s: s.final_score if s else 0,
-                'formflow_category': lambda d, s: s.score_category if s else 'unknown',
-                'formflow_timeline': lambda d: d.get('timeline', ''),
-                'formflow_budget': lambda d: d.get('budget', ''),
-                'formflow_pain_points': lambda d: self._format_list(d.get('pain_points', [])),
-                'formflow_next_action': lambda d, r: r[0]['action'] if r else '',
-                'formflow_competitor': lambda d: d.get('current_solution', ''),
-                'formflow_insights': lambda d, i: json.dumps(i) if i else ''
-            },
+        # Declarative CRM field mappings, compiled per CRM type by compile_plan
+        self.field_mappings = CRM_FIELD_MAPPINGS
+    
+    def iter_leads(
+        self,
+        query: Query,
+        include_scores: bool = True,
+        batch_size: int = EXPORT_BATCH_SIZE
+    ) -> Iterator[ScoredLead]:
+        """
+        Stream leads of a FormSubmission query with their scores.
+        
+        Rows are read through a server-side cursor and LeadScore rows are
+        prefetched with one IN query per batch, so memory stays flat
+        regardless of how many leads are exported.
+        """
+        rows = query.with_entities(
+            FormSubmission.id,
+            FormSubmission.answers,
+            FormSubmission.features,
+            FormSubmission.created_at
+        ).execution_options(stream_results=True).yield_per(batch_size)
+        
+        batch = []
+        for row in rows:
+            batch.append(lead_from_submission(row))
+            if len(batch) >= batch_size:
+                yield from self._attach_scores(batch, include_scores)
+                batch = []
+        
+        if batch:
+            yield from self._attach_scores(batch, include_scores)
+    
+    def score_leads(
+        self,
+        leads: Iterable[Dict],
+        include_scores: bool = True,
+        batch_size: int = EXPORT_BATCH_SIZE
+    ) -> Iterator[ScoredLead]:
+        """Attach scores to already loaded lead dictionaries, batch by batch"""
+        batch = []
+        for lead in leads:
+            batch.append(lead)
+            if len(batch) >= batch_size:
+                yield from self._attach_scores(batch, include_scores)
+                batch = []
+        
+        if batch:
+            yield from self._attach_scores(batch, include_scores)
+    
+    def iter_rows(
+        self,
+        scored_leads: Iterable[ScoredLead],
+        crm_type: str = 'generic',
+        include_insights: bool = True,
+        include_recommendations: bool = False,
+        exported_at: Optional[datetime] = None,
+        upsert_key: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Map scored leads to rows in the target CRM's format"""
+        for _, row in self._iter_lead_rows(
+            scored_leads, crm_type, include_insights, include_recommendations, exported_at, upsert_key
+        ):
+            yield row
+    
+    def _iter_lead_rows(
+        self,
+        scored_leads: Iterable[ScoredLead],
+        crm_type: str,
+        include_insights: bool,
+        include_recommendations: bool,
+        exported_at: Optional[datetime],
+        upsert_key: Optional[str]
+    ) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        plan = compile_plan(crm_type, upsert_key=upsert_key)
+        # One timestamp per export, so every row carries the same export time
+        exported_at = exported_at or datetime.utcnow()
+        
+        for lead, lead_score in scored_leads:
+            # Get insights and recommendations (would come from services)
+            insights = lead.get('insights', {}) if include_insights else {}
+            recommendations = lead.get('recommendations', []) if include_recommendations else []
             
-            'pipedrive': {
-                'name': lambda d: d.get('name', d.get('full_name', '')),
-                'email': lambda d: d.get('email', ''),
-                'phone': lambda d: d.get('phone', d.get('phone_number', '')),
-                'org_name': lambda d: d.get('company', d.get('company_name', '')),
-                'title': lambda d: f"Lead from {d.get('company', 'FormFlow')}",
-                'value': lambda d: self._extract_deal_value(d),
-                'currency': lambda d: 'USD',
-                'status': lambda d: 'open',
-                'visible_to': lambda d: '3',  # Everyone in company
-                'add_time': lambda d: datetime.utcnow().isoformat(),
-                'custom_fields': {
-                    'lead_score': lambda d, s: s.final_score if s else 0,
-                    'score_category': lambda d, s: s.score_category if s else 'unknown',
-                    'timeline': lambda d: d.get('timeline', ''),
-                    'budget': lambda d: d.get('budget', ''),
-                    'pain_points': lambda d: self._format_list(d.get('pain_points', [])),
-                    'competitor': lambda d: d.get('current_solution', ''),
-                    'job_title': lambda d: d.get('role', d.get('job_title', '')),
-                    'company_size': lambda d: self._extract_employee_count(d)
-                }
-            },
+            yield lead, plan.extract(lead, lead_score, insights, recommendations, exported_at)
+    
+    def iter_csv(self, rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        """Encode rows as CSV, yielding chunks of CSV_FLUSH_ROWS rows"""
+        output = io.StringIO()
+        writer = None
+        pending = 0
+        
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(output, fieldnames=row.keys())
+                writer.writeheader()
+            writer.writerow(row)
+            pending += 1
             
-            'generic': {
-                'Name': lambda d: d.get('name', d.get('full_name', '')),
-                'Email': lambda d: d.get('email', ''),
-                'Phone': lambda d: d.get('phone', d.get('phone_number', '')),
-                'Company': lambda d: d.get('company', d.get('company_name', '')),
-                'Job_Title': lambda d: d.get('role', d.get('job_title', d.get('title', ''))),
-                'Website': lambda d: d.get('website', d.get('company_website', '')),
-                'Industry': lambda d: d.get('industry', ''),
-                'Company_Size': lambda d: self._extract_employee_count(d),
-                'Annual_Revenue': lambda d: self._extract_revenue(d),
-                'Lead_Score': lambda d, s: s.final_score if s else 0,
-                'Score_Category': lambda d, s: s.score_category if s else 'unknown',
-                'Timeline': lambda d: d.get('timeline', ''),
-                'Budget': lambda d: d.get('budget', ''),
-                'Pain_Points': lambda d: self._format_list(d.get('pain_points', [])),
-                'Current_Solution': lambda d: d.get('current_solution', ''),
-                'Decision_Maker': lambda d: 'Yes' if self._is_decision_maker(d) else 'No',
-                'Source': lambda d: 'FormFlow AI',
-                'Created_Date': lambda d: datetime.utcnow().strftime('%Y-%m-%d'),
-                'Notes': lambda d: self._generate_notes(d)
-            }
-        }
+            if pending >= CSV_FLUSH_ROWS:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate()
+                pending = 0
+        
+        if output.tell():
+            yield output.getvalue()
     
     def export_to_csv(
         self,
@@ -140,222 +257,257 @@ class CRMExportService:
         Returns:
             CSV string content
         """
-        if crm_type not in self.field_mappings:
-            crm_type = 'generic'
-        
-        mapping = self.field_mappings[crm_type]
-        csv_data = []
-        
-        for lead in leads:
-            # Get lead score if available
-            lead_score = None
-            if include_scores and 'submission_id' in lead:
-                lead_score = self.db.query(LeadScore).filter(
-                    LeadScore.submission_id == lead['submission_id']
-                ).first()
-            
-            # Get insights and recommendations (would come from services)
-            insights = lead.get('insights', {}) if include_insights else {}
-            recommendations = lead.get('recommendations', []) if include_recommendations else []
-            
-            # Map fields according to CRM format
-            row = {}
-            for crm_field, extractor in mapping.items():
-                if crm_field == 'custom_fields' and isinstance(extractor, dict):
-                    # Handle Pipedrive custom fields
-                    for custom_field, custom_extractor in extractor.items():
-                        row[f'custom_{custom_field}'] = self._safe_extract(
-                            custom_extractor, lead, lead_score, insights, recommendations
-                        )
-                else:
-                    row[crm_field] = self._safe_extract(
-                        extractor, lead, lead_score, insights, recommendations
-                    )
-            
-            csv_data.append(row)
-        
-        # Generate CSV
-        return self._generate_csv(csv_data)
+        rows = self.iter_rows(
+            self.score_leads(leads, include_scores),
+            crm_type=crm_type,
+            include_insights=include_insights,
+            include_recommendations=include_recommendations
+        )
+        return ''.join(self.iter_csv(rows))
     
     def export_to_json(
         self,
-        leads: List[Dict],
+        leads: Iterable[Dict],
         crm_type: str = 'generic',
-        include_scores: bool = True
+        include_scores: bool = True,
+        upsert_key: Optional[str] = None
     ) -> str:
         """Export leads to JSON format for API integration"""
-        if crm_type not in self.field_mappings:
-            crm_type = 'generic'
+        plan = compile_plan(crm_type, include_custom_fields=False, upsert_key=upsert_key)
+        exported_at = datetime.utcnow()
         
-        mapping = self.field_mappings[crm_type]
-        json_data = []
-        
-        for lead in leads:
-            # Get lead score if available
-            lead_score = None
-            if include_scores and 'submission_id' in lead:
-                lead_score = self.db.query(LeadScore).filter(
-                    LeadScore.submission_id == lead['submission_id']
-                ).first()
-            
-            # Map fields
-            record = {}
-            for crm_field, extractor in mapping.items():
-                if crm_field != 'custom_fields':
-                    record[crm_field] = self._safe_extract(
-                        extractor, lead, lead_score, {}, []
-                    )
-            
-            json_data.append(record)
+        json_data = [
+            plan.extract(lead, lead_score, exported_at=exported_at)
+            for lead, lead_score in self.score_leads(leads, include_scores)
+        ]
         
         return json.dumps(json_data, indent=2, default=str)
     
+    def write_excel(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        target: Union[str, BinaryIO],
+        crm_type: str = 'generic'
+    ) -> int:
+        """
+        Write rows to an XLSX file with a write-only workbook.
+        
+        openpyxl streams each appended row to a temporary file on disk, so
+        memory stays flat however many rows are written. Numeric and date
+        columns are written as typed cells.
+        
+        Returns:
+            Number of lead rows written
+        """
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Leads')
+        columns = None
+        count = 0
+        
+        for row in rows:
+            if columns is None:
+                columns = list(row.keys())
+                sheet.append(columns)
+            sheet.append([self._excel_cell(sheet, column, row[column]) for column in columns])
+            count += 1
+        
+        # Add metadata sheet
+        metadata = workbook.create_sheet('Metadata')
+        metadata.append(['Field', 'Value'])
+        metadata.append(['Export Date', datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')])
+        metadata.append(['CRM Type', crm_type.upper()])
+        metadata.append(['Total Leads', count])
+        metadata.append(['Source', 'FormFlow AI'])
+        
+        workbook.save(target)
+        return count
+    
     def export_to_excel(
         self,
         leads: List[Dict],
         crm_type: str = 'generic'
     ) -> bytes:
         """Export leads to Excel format"""
-        # First get CSV data
-        csv_content = self.export_to_csv(leads, crm_type)
+        rows = self.iter_rows(self.score_leads(leads), crm_type=crm_type)
         
-        # Convert to DataFrame
-        csv_buffer = io.StringIO(csv_content)
-        df = pd.read_csv(csv_buffer)
+        with tempfile.TemporaryFile(suffix='.xlsx') as excel_file:
+            self.write_excel(rows, excel_file, crm_type)
+            excel_file.seek(0)
+            return excel_file.read()
+    
+    def arrow_schema(self, crm_type: str = 'generic', upsert_key: Optional[str] = None) -> 'pa.Schema':
+        """
+        Typed schema of columnar exports: the CRM columns followed by the
+        submission id, its creation time and the flattened answers.
         
-        # Write to Excel
-        excel_buffer = io.BytesIO()
-        with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Leads', index=False)
-            
-            # Add metadata sheet
-            metadata = pd.DataFrame({
-                'Field': ['Export Date', 'CRM Type', 'Total Leads', 'Source'],
-                'Value': [datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'), 
-                         crm_type.upper(), len(leads), 'FormFlow AI']
-            })
-            metadata.to_excel(writer, sheet_name='Metadata', index=False)
+        The answers are one map column of dotted keys rather than a column
+        per key: the schema is written before the first lead is read and
+        forms differ in their questions, so columns per key would need a
+        second pass over the selection and give every form the union of all
+        forms' columns.
+        """
+        self._require_pyarrow()
+        fields = []
+        for column in compile_plan(crm_type, upsert_key=upsert_key).columns:
+            if column in ARROW_INT_COLUMNS:
+                fields.append(pa.field(column, pa.int64()))
+            elif column in ARROW_FLOAT_COLUMNS:
+                fields.append(pa.field(column, pa.float64()))
+            elif column in DATE_COLUMNS:
+                fields.append(pa.field(column, pa.timestamp('us')))
+            else:
+                fields.append(pa.field(column, pa.string()))
         
-        excel_buffer.seek(0)
-        return excel_buffer.read()
+        fields.append(pa.field('submission_id', pa.string()))
+        fields.append(pa.field('created_at', pa.timestamp('us')))
+        fields.append(pa.field('answers', pa.map_(pa.string(), pa.string())))
+        return pa.schema(fields)
     
-    def _safe_extract(self, extractor, lead_data, lead_score=None, insights=None, recommendations=None):
-        """Safely extract value using extractor function"""
-        try:
-            # Check how many parameters the extractor accepts
-            import inspect
-            sig = inspect.signature(extractor)
-            param_count = len(sig.parameters)
+    def iter_record_batches(
+        self,
+        scored_leads: Iterable[ScoredLead],
+        crm_type: str = 'generic',
+        include_insights: bool = True,
+        include_recommendations: bool = False,
+        upsert_key: Optional[str] = None,
+        batch_rows: int = ARROW_BATCH_ROWS,
+        exported_at: Optional[datetime] = None
+    ) -> Iterator['pa.RecordBatch']:
+        """Convert scored leads to typed Arrow record batches of batch_rows leads"""
+        schema = self.arrow_schema(crm_type, upsert_key)
+        converters = [self._arrow_converter(field.type) for field in schema]
+        columns = [[] for _ in schema]
+        crm_columns = len(schema) - 3
+        
+        def flush():
+            arrays = [pa.array(values, type=field.type) for values, field in zip(columns, schema)]
+            for values in columns:
+                values.clear()
+            return pa.RecordBatch.from_arrays(arrays, schema=schema)
+        
+        for lead, row in self._iter_lead_rows(
+            scored_leads, crm_type, include_insights, include_recommendations, exported_at, upsert_key
+        ):
+            values = list(row.values())
+            values.append(lead.get('submission_id'))
+            values.append(lead.get('created_at'))
+            for index, value in enumerate(values):
+                columns[index].append(converters[index](value))
+            columns[crm_columns + 2].append(list(flatten_answers(lead).items()))
             
-            if param_count == 1:
-                return extractor(lead_data)
-            elif param_count == 2:
-                # Could be score, insights, or recommendations
-                if 'score' in str(sig):
-                    return extractor(lead_data, lead_score)
-                elif 'insights' in str(sig) or 'i' in str(sig):
-                    return extractor(lead_data, insights)
-                else:
-                    return extractor(lead_data, recommendations)
-            else:
-                return extractor(lead_data)
-        except:
-            return ''
-    
-    def _extract_first_name(self, data: Dict) -> str:
-        """Extract first name from full name"""
-        name = data.get('name', data.get('full_name', ''))
-        if name:
-            parts = name.split()
-            return parts[0] if parts else ''
-        return ''
-    
-    def _extract_last_name(self, data: Dict) -> str:
-        """Extract last name from full name"""
-        name = data.get('name', data.get('full_name', ''))
-        if name:
-            parts = name.split()
-            return parts[-1] if len(parts) > 1 else ''
-        return ''
+            if len(columns[0]) >= batch_rows:
+                yield flush()
+        
+        if columns[0]:
+            yield flush()
     
-    def _extract_employee_count(self, data: Dict) -> str:
-        """Extract employee count from various formats"""
-        for field in ['employees', 'company_size', 'team_size', 'employee_count']:
-            if field in data:
-                value = str(data[field])
-                # Extract number from strings like "50-100" or "100+"
-                import re
-                numbers = re.findall(r'\d+', value)
-                if numbers:
-                    return numbers[0]
-        return ''
+    def write_parquet(
+        self,
+        batches: Iterable['pa.RecordBatch'],
+        target: Union[str, BinaryIO],
+        schema: 'pa.Schema',
+        compression: str = COLUMNAR_COMPRESSION
+    ) -> int:
+        """Write record batches to a Parquet file, one row group per batch"""
+        self._require_pyarrow()
+        count = 0
+        with pq.ParquetWriter(target, schema, compression=compression) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+                count += batch.num_rows
+        return count
     
-    def _extract_revenue(self, data: Dict) -> str:
-        """Extract annual revenue from various formats"""
-        for field in ['revenue', 'annual_revenue', 'company_revenue']:
-            if field in data:
-                return str(data[field])
-        return ''
+    def write_arrow_stream(
+        self,
+        batches: Iterable['pa.RecordBatch'],
+        target: Union[str, BinaryIO],
+        schema: 'pa.Schema',
+        compression: str = COLUMNAR_COMPRESSION
+    ) -> int:
+        """Write record batches in the Arrow IPC streaming format"""
+        self._require_pyarrow()
+        count = 0
+        options = pa.ipc.IpcWriteOptions(compression=compression)
+        with pa.ipc.new_stream(target, schema, options=options) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+                count += batch.num_rows
+        return count
     
-    def _extract_deal_value(self, data: Dict) -> float:
-        """Extract potential deal value from budget"""
-        budget = data.get('budget', '')
-        if budget:
-            import re
-            # Extract numbers from budget string
-            numbers = re.findall(r'[\d,]+', budget.replace('$', '').replace('k', '000'))
-            if numbers:
-                return float(numbers[0].replace(',', ''))
-        return 0
+    def _require_pyarrow(self) -> None:
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("pyarrow is required for Parquet and Arrow exports")
     
-    def _get_rating(self, lead_score) -> str:
-        """Get Salesforce rating based on score"""
-        if not lead_score:
-            return 'Cold'
-        if lead_score.final_score >= 80:
-            return 'Hot'
-        elif lead_score.final_score >= 60:
-            return 'Warm'
-        return 'Cold'
+    def _arrow_converter(self, arrow_type) -> Any:
+        """Per-column conversion of row values to the column's Arrow type"""
+        if pa.types.is_integer(arrow_type):
+            return lambda value: self._arrow_number(value, int)
+        if pa.types.is_floating(arrow_type):
+            return lambda value: self._arrow_number(value, float)
+        if pa.types.is_timestamp(arrow_type):
+            return self._arrow_timestamp
+        return lambda value: None if value is None else str(value)
     
-    def _is_decision_maker(self, data: Dict) -> bool:
-        """Check if lead is a decision maker"""
-        role = str(data.get('role', data.get('job_title', ''))).lower()
-        decision_keywords = ['ceo', 'cto', 'cfo', 'director', 'manager', 'vp', 'president', 'owner', 'founder']
-        return any(keyword in role for keyword in decision_keywords)
+    def _arrow_number(self, value: Any, number_type) -> Optional[Union[int, float]]:
+        if value is None or value == '' or isinstance(value, bool):
+            return None
+        if isinstance(value, (int, float)):
+            return number_type(value)
+        text = str(value).replace(',', '').strip()
+        return number_type(float(text)) if _NUMBER_RE.match(text) else None
     
-    def _format_list(self, items: List) -> str:
-        """Format list as comma-separated string"""
-        if isinstance(items, list):
-            return ', '.join(str(item) for item in items)
-        return str(items)
+    def _arrow_timestamp(self, value: Any) -> Optional[datetime]:
+        if isinstance(value, datetime):
+            return value
+        if isinstance(value, date):
+            return datetime.combine(value, datetime.min.time())
+        if isinstance(value, str) and value:
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                return None
+        return None
     
-    def _generate_notes(self, data: Dict) -> str:
-        """Generate notes field with key information"""
-        notes = []
-        
-        if 'pain_points' in data:
-            notes.append(f"Pain Points: {self._format_list(data['pain_points'])}")
-        
-        if 'current_solution' in data:
-            notes.append(f"Current Solution: {data['current_solution']}")
+    def _excel_cell(self, sheet, column: str, value: Any) -> Any:
+        """Convert a row value to a typed Excel cell value"""
+        if value is None or value == '':
+            return None
         
-        if 'timeline' in data:
-            notes.append(f"Timeline: {data['timeline']}")
+        if column in NUMERIC_COLUMNS:
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                return value
+            text = str(value).replace(',', '').strip()
+            if _NUMBER_RE.match(text):
+                return float(text) if '.' in text else int(text)
         
-        if 'budget' in data:
-            notes.append(f"Budget: {data['budget']}")
+        elif column in DATE_COLUMNS:
+            if isinstance(value, str):
+                try:
+                    parsed = datetime.fromisoformat(value)
+                except ValueError:
+                    return ILLEGAL_CHARACTERS_RE.sub('', value)
+                value = parsed.date() if len(value) == 10 else parsed
+            if isinstance(value, (date, datetime)):
+                cell = WriteOnlyCell(sheet, value=value)
+                cell.number_format = 'yyyy-mm-dd hh:mm:ss' if isinstance(value, datetime) else 'yyyy-mm-dd'
+                return cell
         
-        return ' | '.join(notes)
+        if isinstance(value, (int, float, bool)):
+            return value
+        # Control characters are not allowed in XLSX strings
+        return ILLEGAL_CHARACTERS_RE.sub('', str(value))
     
-    def _generate_csv(self, data: List[Dict]) -> str:
-        """Generate CSV string from data"""
-        if not data:
-            return ''
-        
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=data[0].keys())
-        writer.writeheader()
-        writer.writerows(data)
+    def _attach_scores(self, batch: List[Dict], include_scores: bool) -> Iterator[ScoredLead]:
+        """Pair a batch of leads with their latest LeadScore using one IN query"""
+        scores = {}
+        if include_scores:
+            submission_ids = [lead['submission_id'] for lead in batch if lead.get('submission_id')]
+            if submission_ids:
+                rows = self.db.query(LeadScore).filter(
+                    LeadScore.submission_id.in_(submission_ids)
+                ).order_by(LeadScore.calculated_at)
+                # Later rows overwrite earlier ones, keeping the latest score
+                scores = {str(score.submission_id): score for score in rows}
         
-        return output.getvalue()
\ No newline at end of file
+        for lead in batch:
+            yield lead, scores.get(str(lead.get('submission_id')))
@@ -0,0 +1,443 @@
+"""
+CRM Field Extraction Plans for FA-48
+Declarative CRM column mappings compiled once into extraction plans
+
+A mapping describes each CRM column with a field spec instead of a lambda:
+
+    field('company', 'company_name')   first key present in the lead, in order
+    const('New')                       fixed value
+    derived('name', 0)                 value computed once per lead (here: first name)
+    score('final_score')               value from the lead's LeadScore
+    insight('ai_summary')              value from the AI insights
+    recommendation('next_action')      value from the follow-up recommendations
+    export_time('%Y-%m-%d')            export timestamp, identical for every row
+
+compile_plan() resolves the specs into getters with a single known signature
+and records which derived values the mapping needs, so every derived value is
+computed once per lead and shared by all columns that use it.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from datetime import datetime
+from functools import lru_cache
+import json
+import re
+
+from app.services.submission_features import employee_count, revenue
+
+FieldSpec = Tuple[Any, ...]
+Getter = Callable[[Dict, Dict, Any, Dict, List, datetime], Any]
+
+# Lead dictionary key of the submission's stored SubmissionFeatures
+FEATURES_KEY = 'submission_features'
+_AMOUNT_RE = re.compile(r'[\d,]+')
+
+DECISION_MAKER_KEYWORDS = ('ceo', 'cto', 'cfo', 'director', 'manager', 'vp', 'president', 'owner', 'founder')
+
+
+def field(*keys: str, default: Any = '') -> FieldSpec:
+    return ('field', keys, default)
+
+
+def const(value: Any) -> FieldSpec:
+    return ('const', value)
+
+
+def derived(name: str, index: Optional[int] = None) -> FieldSpec:
+    return ('derived', name, index)
+
+
+def score(name: str) -> FieldSpec:
+    return ('score', name)
+
+
+def insight(name: str) -> FieldSpec:
+    return ('insight', name)
+
+
+def recommendation(name: str) -> FieldSpec:
+    return ('recommendation', name)
+
+
+def export_time(fmt: Optional[str] = None) -> FieldSpec:
+    return ('export_time', fmt)
+
+
+# ----------------------------------------------------------------------
+# Derived values, computed once per lead
+# ----------------------------------------------------------------------
+
+def format_list(items: Any) -> str:
+    """Format list as comma-separated string"""
+    if isinstance(items, list):
+        return ', '.join(str(item) for item in items)
+    return str(items)
+
+
+def _name_parts(lead: Dict) -> Tuple[str, str]:
+    """First and last name from the full name"""
+    parts = str(lead.get('name', lead.get('full_name', '')) or '').split()
+    if not parts:
+        return '', ''
+    return parts[0], parts[-1] if len(parts) > 1 else ''
+
+
+def _employee_count(lead: Dict) -> str:
+    """Employee count parsed at ingest, or from formats like "50-100" or "100+" """
+    features = lead.get(FEATURES_KEY)
+    count = features['employee_count'] if features else employee_count(lead)
+    return '' if count is None else str(count)
+
+
+def _revenue(lead: Dict) -> str:
+    features = lead.get(FEATURES_KEY)
+    value = features['revenue'] if features else revenue(lead)
+    return '' if value is None else value
+
+
+def _deal_value(lead: Dict) -> float:
+    """Potential deal value from the budget answer"""
+    budget = lead.get('budget', '')
+    if budget:
+        numbers = _AMOUNT_RE.findall(str(budget).replace('$', '').replace('k', '000'))
+        for number in numbers:
+            number = number.replace(',', '')
+            if number:
+                return float(number)
+    return 0
+
+
+def _decision_maker(lead: Dict) -> str:
+    role = str(lead.get('role', lead.get('job_title', ''))).lower()
+    return 'Yes' if any(keyword in role for keyword in DECISION_MAKER_KEYWORDS) else 'No'
+
+
+def _notes(lead: Dict) -> str:
+    """Notes field with key qualification answers"""
+    notes = []
+    if 'pain_points' in lead:
+        notes.append(f"Pain Points: {format_list(lead['pain_points'])}")
+    if 'current_solution' in lead:
+        notes.append(f"Current Solution: {lead['current_solution']}")
+    if 'timeline' in lead:
+        notes.append(f"Timeline: {lead['timeline']}")
+    if 'budget' in lead:
+        notes.append(f"Budget: {lead['budget']}")
+    return ' | '.join(notes)
+
+
+DERIVED_FIELDS: Dict[str, Callable[[Dict], Any]] = {
+    'name': _name_parts,
+    'employee_count': _employee_count,
+    'revenue': _revenue,
+    'deal_value': _deal_value,
+    'decision_maker': _decision_maker,
+    'pain_points': lambda lead: format_list(lead.get('pain_points', [])),
+    'notes': _notes,
+    'deal_title': lambda lead: f"Lead from {lead.get('company', 'FormFlow')}",
+    'email_key': lambda lead: str(lead.get('email') or '').strip().lower()
+}
+
+
+# ----------------------------------------------------------------------
+# Score, insight and recommendation values
+# ----------------------------------------------------------------------
+
+def _rating(lead_score) -> str:
+    """Salesforce rating based on score"""
+    if not lead_score:
+        return 'Cold'
+    if lead_score.final_score >= 80:
+        return 'Hot'
+    if lead_score.final_score >= 60:
+        return 'Warm'
+    return 'Cold'
+
+
+SCORE_FIELDS: Dict[str, Callable[[Any], Any]] = {
+    'final_score': lambda s: s.final_score if s else 0,
+    'score_category': lambda s: s.score_category if s else 'unknown',
+    'rating': _rating
+}
+
+INSIGHT_FIELDS: Dict[str, Callable[[Dict], Any]] = {
+    'ai_summary': lambda i: i.get('ai_summary', '') if i else '',
+    'json': lambda i: json.dumps(i, default=str) if i else ''
+}
+
+
+def _next_action(recommendations: List) -> str:
+    if recommendations and isinstance(recommendations[0], dict):
+        return recommendations[0].get('action', '')
+    return ''
+
+
+RECOMMENDATION_FIELDS: Dict[str, Callable[[List], Any]] = {
+    'next_action': _next_action
+}
+
+VALUE_FIELDS = {
+    'score': SCORE_FIELDS,
+    'insight': INSIGHT_FIELDS,
+    'recommendation': RECOMMENDATION_FIELDS
+}
+
+
+# ----------------------------------------------------------------------
+# CRM mappings
+# ----------------------------------------------------------------------
+
+CRM_FIELD_MAPPINGS: Dict[str, Dict[str, Any]] = {
+    'salesforce': {
+        'FirstName': derived('name', 0),
+        'LastName': derived('name', 1),
+        'Email': field('email'),
+        'Company': field('company', 'company_name'),
+        'Phone': field('phone', 'phone_number'),
+        'Title': field('role', 'job_title', 'title'),
+        'LeadSource': const('FormFlow AI'),
+        'Industry': field('industry'),
+        'NumberOfEmployees': derived('employee_count'),
+        'AnnualRevenue': derived('revenue'),
+        'Rating': score('rating'),
+        'Description': insight('ai_summary'),
+        'Website': field('website', 'company_website'),
+        'Status': const('New'),
+        'Custom_Lead_Score__c': score('final_score'),
+        'Custom_Score_Category__c': score('score_category'),
+        'Custom_Timeline__c': field('timeline'),
+        'Custom_Budget__c': field('budget'),
+        'Custom_Pain_Points__c': derived('pain_points'),
+        'Custom_Next_Action__c': recommendation('next_action'),
+        'Custom_Competitor__c': field('current_solution'),
+        'Custom_Decision_Maker__c': derived('decision_maker')
+    },
+
+    'hubspot': {
+        'firstname': derived('name', 0),
+        'lastname': derived('name', 1),
+        'email': field('email'),
+        'company': field('company', 'company_name'),
+        'phone': field('phone', 'phone_number'),
+        'jobtitle': field('role', 'job_title', 'title'),
+        'website': field('website', 'company_website'),
+        'numemployees': derived('employee_count'),
+        'annualrevenue': derived('revenue'),
+        'industry': field('industry'),
+        'lead_status': const('New'),
+        'lifecyclestage': const('lead'),
+        'hs_lead_status': const('NEW'),
+        'formflow_score': score('final_score'),
+        'formflow_category': score('score_category'),
+        'formflow_timeline': field('timeline'),
+        'formflow_budget': field('budget'),
+        'formflow_pain_points': derived('pain_points'),
+        'formflow_next_action': recommendation('next_action'),
+        'formflow_competitor': field('current_solution'),
+        'formflow_insights': insight('json')
+    },
+
+    'pipedrive': {
+        'name': field('name', 'full_name'),
+        'email': field('email'),
+        'phone': field('phone', 'phone_number'),
+        'org_name': field('company', 'company_name'),
+        'title': derived('deal_title'),
+        'value': derived('deal_value'),
+        'currency': const('USD'),
+        'status': const('open'),
+        'visible_to': const('3'),  # Everyone in company
+        'add_time': export_time(),
+        'custom_fields': {
+            'lead_score': score('final_score'),
+            'score_category': score('score_category'),
+            'timeline': field('timeline'),
+            'budget': field('budget'),
+            'pain_points': derived('pain_points'),
+            'competitor': field('current_solution'),
+            'job_title': field('role', 'job_title'),
+            'company_size': derived('employee_count')
+        }
+    },
+
+    'generic': {
+        'Name': field('name', 'full_name'),
+        'Email': field('email'),
+        'Phone': field('phone', 'phone_number'),
+        'Company': field('company', 'company_name'),
+        'Job_Title': field('role', 'job_title', 'title'),
+        'Website': field('website', 'company_website'),
+        'Industry': field('industry'),
+        'Company_Size': derived('employee_count'),
+        'Annual_Revenue': derived('revenue'),
+        'Lead_Score': score('final_score'),
+        'Score_Category': score('score_category'),
+        'Timeline': field('timeline'),
+        'Budget': field('budget'),
+        'Pain_Points': derived('pain_points'),
+        'Current_Solution': field('current_solution'),
+        'Decision_Maker': derived('decision_maker'),
+        'Source': const('FormFlow AI'),
+        'Created_Date': export_time('%Y-%m-%d'),
+        'Notes': derived('notes')
+    }
+}
+
+
+# Upsert key column per CRM (an external id field the CRM can match rows on)
+UPSERT_KEY_COLUMNS = {
+    'salesforce': 'FormFlow_Id__c',
+    'hubspot': 'formflow_id',
+    'pipedrive': 'custom_formflow_id',
+    'generic': 'FormFlow_Id'
+}
+
+UPSERT_KEYS: Dict[str, FieldSpec] = {
+    'submission_id': field('submission_id'),
+    'email': derived('email_key')
+}
+
+
+# ----------------------------------------------------------------------
+# Compilation
+# ----------------------------------------------------------------------
+
+class ExtractionPlan:
+    """
+    Compiled column getters of one CRM mapping.
+
+    Every getter takes (lead, derived, lead_score, insights, recommendations,
+    exported_at); ``derived`` holds the values listed in ``derived_fields``,
+    computed once per lead by ``extract``.
+    """
+
+    __slots__ = ('crm_type', 'columns', 'getters', 'derived_fields')
+
+    def __init__(
+        self,
+        crm_type: str,
+        columns: List[Tuple[str, Getter]],
+        derived_fields: List[Tuple[str, Callable[[Dict], Any]]]
+    ):
+        self.crm_type = crm_type
+        self.columns = [column for column, _ in columns]
+        self.getters = columns
+        self.derived_fields = derived_fields
+
+    def extract(
+        self,
+        lead: Dict,
+        lead_score: Any = None,
+        insights: Optional[Dict] = None,
+        recommendations: Optional[List] = None,
+        exported_at: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """Map one lead to a row of this CRM's columns"""
+        values = {}
+        for name, compute in self.derived_fields:
+            try:
+                values[name] = compute(lead)
+            except Exception:
+                # Malformed answers export as empty cells rather than failing the export
+                values[name] = None
+
+        insights = insights or {}
+        recommendations = recommendations or []
+        exported_at = exported_at or datetime.utcnow()
+
+        return {
+            column: getter(lead, values, lead_score, insights, recommendations, exported_at)
+            for column, getter in self.getters
+        }
+
+
+def _guarded(compute: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    def safe(value):
+        try:
+            return compute(value)
+        except Exception:
+            return ''
+    return safe
+
+
+def _compile_field(spec: FieldSpec) -> Getter:
+    kind = spec[0]
+
+    if kind == 'field':
+        keys, default = spec[1], spec[2]
+        if len(keys) == 1:
+            key = keys[0]
+            return lambda lead, d, s, i, r, t: lead.get(key, default)
+
+        # Fallback chain: the first key present wins, like nested dict.get calls
+        def first_present(lead, d, s, i, r, t):
+            for key in keys:
+                if key in lead:
+                    return lead[key]
+            return default
+        return first_present
+
+    if kind == 'const':
+        value = spec[1]
+        return lambda lead, d, s, i, r, t: value
+
+    if kind == 'derived':
+        name, index = spec[1], spec[2]
+        if index is None:
+            return lambda lead, d, s, i, r, t: '' if d[name] is None else d[name]
+        return lambda lead, d, s, i, r, t: '' if d[name] is None else d[name][index]
+
+    if kind in ('score', 'insight', 'recommendation'):
+        compute = _guarded(VALUE_FIELDS[kind][spec[1]])
+        if kind == 'score':
+            return lambda lead, d, s, i, r, t: compute(s)
+        if kind == 'insight':
+            return lambda lead, d, s, i, r, t: compute(i)
+        return lambda lead, d, s, i, r, t: compute(r)
+
+    if kind == 'export_time':
+        fmt = spec[1]
+        if fmt is None:
+            return lambda lead, d, s, i, r, t: t.isoformat()
+        return lambda lead, d, s, i, r, t: t.strftime(fmt)
+
+    raise ValueError(f"Unknown field spec: {kind}")
+
+
+@lru_cache(maxsize=None)
+def compile_plan(
+    crm_type: str,
+    include_custom_fields: bool = True,
+    upsert_key: Optional[str] = None
+) -> ExtractionPlan:
+    """
+    Compile a CRM mapping into an extraction plan (cached per CRM type).
+    Pipedrive custom fields become ``custom_<name>`` columns. With an
+    ``upsert_key`` the CRM's key column comes first.
+    """
+    if crm_type not in CRM_FIELD_MAPPINGS:
+        crm_type = 'generic'
+
+    columns = []
+    if upsert_key:
+        columns.append((UPSERT_KEY_COLUMNS[crm_type], UPSERT_KEYS[upsert_key]))
+    for column, spec in CRM_FIELD_MAPPINGS[crm_type].items():
+        if column == 'custom_fields':
+            if include_custom_fields:
+                columns.extend(
+                    (f'custom_{custom_column}', custom_spec)
+                    for custom_column, custom_spec in spec.items()
+                )
+            continue
+        columns.append((column, spec))
+
+    derived_names = []
+    for _, spec in columns:
+        if spec[0] == 'derived' and spec[1] not in derived_names:
+            derived_names.append(spec[1])
+
+    return ExtractionPlan(
+        crm_type,
+        [(column, _compile_field(spec)) for column, spec in columns],
+        [(name, DERIVED_FIELDS[name]) for name in derived_names]
+    )
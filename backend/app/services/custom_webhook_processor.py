@@ -7,6 +7,10 @@ import hmac
 from app.models.webhook import WebhookConfig, WebhookLog
 from app.models.form import FormSubmission, Dashboard
 from app.schemas.webhook import TypeformWebhook
+from app.services.rollup_service import SubmissionRollupService
+from app.services.dashboard_cache import invalidate_for_submission
+from app.services.competitor_dictionaries import competitor_dictionaries
+from app.services.submission_features import extract_submission_features
 from sqlalchemy.orm import Session
 import uuid
 
@@ -197,7 +201,8 @@ class CustomWebhookProcessor:
             form_response = webhook.form_response
             response_id = f"{form_response.get('token', '')}_{uuid.uuid4().hex[:8]}"
             
-            # Store submission
+            # Store submission with its features
+            answers = webhook.parse_answers()
             submission = FormSubmission(
                 user_id=webhook_config.user_id,
                 typeform_id=form_response.get("form_id", ""),
@@ -206,7 +211,10 @@ class CustomWebhookProcessor:
                 submitted_at=datetime.fromisoformat(
                     form_response.get("submitted_at", datetime.utcnow().isoformat()).replace("Z", "+00:00")
                 ),
-                answers=webhook.parse_answers(),
+                answers=answers,
+                features=extract_submission_features(
+                    answers, competitor_dictionaries.get(self.db, webhook_config.user_id)
+                ).to_dict(),
                 dashboard_url=f"/dashboard/{response_id}"
             )
             self.db.add(submission)
@@ -220,6 +228,20 @@ class CustomWebhookProcessor:
             
             self.db.commit()
             
+            # Update time-series rollups
+            try:
+                SubmissionRollupService(self.db).record_submission(submission)
+            except Exception as e:
+                print(f"⚠️ Failed to update rollups for submission {submission.id}: {str(e)}")
+                self.db.rollback()
+            
+            # Invalidate multi-form dashboards reading this form
+            try:
+                invalidate_for_submission(self.db, submission)
+            except Exception as e:
+                print(f"⚠️ Failed to invalidate dashboards for submission {submission.id}: {str(e)}")
+                self.db.rollback()
+            
             return {
                 "status": "success",
                 "submission_id": submission.id,
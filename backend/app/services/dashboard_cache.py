@@ -0,0 +1,133 @@
+"""
+Multi-Form Dashboard Cache (FA-44)
+Event-driven invalidation of aggregated dashboard results
+
+Cached results are valid for a cache key made of the dashboard's config hash
+and its data watermark (``data_version``). Anything that changes the inputs
+of an aggregation (new submissions, mapping edits, config changes) bumps the
+watermark of exactly the dashboards that depend on it, so results are reused
+until something changes instead of for a fixed TTL.
+
+Reads go through two tiers: the shared cache layer (in-process LRU or Redis,
+see app.core.cache), then the dashboard's ``cached_data`` column.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+from uuid import UUID
+import hashlib
+import json
+import logging
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.core.cache import CacheNamespace, cache_manager
+from app.models.form import FormSubmission
+from app.models.multi_form_dashboard import MultiFormDashboard, MultiFormMapping
+
+logger = logging.getLogger(__name__)
+
+# Entries are keyed by watermark and never go stale, the TTL only bounds storage
+RESULT_TTL = 6 * 60 * 60
+
+
+def config_hash(dashboard: MultiFormDashboard) -> str:
+    """Stable hash of the configuration an aggregation result depends on"""
+    config = {
+        "aggregation": dashboard.aggregation_config,
+        "filters": dashboard.filter_config,
+        "analytics": dashboard.analytics_config
+    }
+    encoded = json.dumps(config, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()[:32]
+
+
+def cache_key(dashboard: MultiFormDashboard) -> str:
+    """Key a cached result must carry to be served for the dashboard's current state"""
+    return f"{config_hash(dashboard)}:{dashboard.data_version or 0}"
+
+
+class DashboardResultCache:
+    """
+    Aggregation results in the shared cache in front of the cached_data column.
+
+    Entries are stored under the dashboard id plus the cache key they were
+    computed for, so a watermark bump in any process makes older entries
+    unreachable without an explicit eviction.
+    """
+
+    def __init__(self, cache: Optional[CacheNamespace] = None):
+        self.cache = cache or cache_manager.namespace("dashboard_results", ttl=RESULT_TTL)
+
+    def get(self, dashboard: MultiFormDashboard) -> Optional[Dict[str, Any]]:
+        """Cached result for the dashboard's current key, from the cache or the DB"""
+        key = cache_key(dashboard)
+
+        result = self.cache.get(f"{dashboard.id}:{key}")
+        if result is not None:
+            return result
+
+        if dashboard.cache_key != key or not dashboard.cached_data:
+            return None
+
+        self.cache.set(f"{dashboard.id}:{key}", dashboard.cached_data)
+        return dashboard.cached_data
+
+    def put(self, dashboard: MultiFormDashboard, key: str, result: Dict[str, Any]) -> None:
+        """
+        Store a result computed for ``key`` in both tiers.
+
+        ``key`` is captured before the aggregation reads its inputs, so a
+        result computed while new data arrived is stored under the old
+        watermark and never served for the new one.
+        """
+        dashboard.cached_data = result
+        dashboard.cache_key = key
+        self.cache.set(f"{dashboard.id}:{key}", result)
+
+
+dashboard_result_cache = DashboardResultCache()
+
+
+def dashboards_for_submission(db: Session, submission: FormSubmission) -> List[UUID]:
+    """Dependency index lookup: dashboards with an active mapping reading this submission"""
+    conditions = [MultiFormMapping.form_submission_id == submission.id]
+    if submission.typeform_id:
+        conditions.append(MultiFormMapping.form_external_id == submission.typeform_id)
+
+    rows = db.query(MultiFormMapping.dashboard_id).filter(
+        MultiFormMapping.is_active == True,  # noqa: E712
+        or_(*conditions)
+    ).distinct()
+    return [row.dashboard_id for row in rows]
+
+
+def mark_dashboards_dirty(db: Session, dashboard_ids: Iterable[UUID], commit: bool = True) -> int:
+    """
+    Bump the data watermark of the given dashboards.
+
+    The increment happens in SQL so concurrent ingests never lose a bump.
+    Returns the number of dashboards marked dirty.
+    """
+    dashboard_ids = list(dashboard_ids)
+    if not dashboard_ids:
+        return 0
+
+    updated = db.query(MultiFormDashboard).filter(
+        MultiFormDashboard.id.in_(dashboard_ids)
+    ).update(
+        {MultiFormDashboard.data_version: MultiFormDashboard.data_version + 1},
+        synchronize_session=False
+    )
+
+    if commit:
+        db.commit()
+    return updated
+
+
+def invalidate_for_submission(db: Session, submission: FormSubmission) -> int:
+    """Mark the dashboards that read a newly stored submission dirty"""
+    dashboard_ids = dashboards_for_submission(db, submission)
+    if dashboard_ids:
+        logger.info(f"Submission {submission.id} invalidates {len(dashboard_ids)} multi-form dashboards")
+    return mark_dashboards_dirty(db, dashboard_ids)
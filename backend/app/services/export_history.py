@@ -0,0 +1,93 @@
+"""
+CRM Export History for FA-48
+Records exports and provides the watermark delta exports start from
+
+Every export (streamed or background) gets an ExportHistory row whose
+watermark is taken before any lead is read. Only completed exports advance
+the watermark, so a failed or interrupted nightly sync is simply repeated by
+the next one, and only exports of the full selection: an export restricted
+to lead ids or a date range did not cover the leads outside it.
+
+Delta exports overlap the previous export by DELTA_OVERLAP to cover leads
+committed while it was running; with an upsert key the few repeated rows
+update themselves in the CRM.
+"""
+
+from typing import List, Optional
+from datetime import datetime, timedelta
+import logging
+
+from sqlalchemy.orm import Session
+
+from app.models.export_job import ExportHistory
+
+logger = logging.getLogger(__name__)
+
+DELTA_OVERLAP = timedelta(minutes=5)
+
+
+def delta_since(db: Session, user_id, crm_type: str) -> Optional[datetime]:
+    """Lower bound of the next delta export, None when nothing was exported yet"""
+    last = db.query(ExportHistory.watermark).filter(
+        ExportHistory.user_id == str(user_id),
+        ExportHistory.crm_type == crm_type,
+        ExportHistory.status == "completed",
+        ExportHistory.full_selection.is_(True)
+    ).order_by(ExportHistory.watermark.desc()).first()
+    return last.watermark - DELTA_OVERLAP if last else None
+
+
+def start_export(
+    db: Session,
+    user_id,
+    request,
+    export_format: str,
+    file_name: Optional[str] = None,
+    job_id: Optional[str] = None
+) -> ExportHistory:
+    """Record an export about to read leads, with the delta bound it selects from"""
+    crm_type = request.crm_type.value
+    entry = ExportHistory(
+        user_id=str(user_id),
+        job_id=job_id,
+        crm_type=crm_type,
+        format=export_format,
+        delta=request.delta,
+        full_selection=not (request.lead_ids or request.date_from or request.date_to),
+        upsert_key=request.upsert_key.value if request.upsert_key else None,
+        since=delta_since(db, user_id, crm_type) if request.delta else None,
+        watermark=datetime.utcnow(),
+        status="processing",
+        file_name=file_name
+    )
+    db.add(entry)
+    db.commit()
+    return entry
+
+
+def complete_export(db: Session, history_id: str, lead_count: int) -> None:
+    db.query(ExportHistory).filter(ExportHistory.id == history_id).update({
+        ExportHistory.status: "completed",
+        ExportHistory.lead_count: lead_count,
+        ExportHistory.completed_at: datetime.utcnow()
+    }, synchronize_session=False)
+    db.commit()
+
+
+def fail_export(db: Session, history_id: str, message: str) -> None:
+    db.query(ExportHistory).filter(
+        ExportHistory.id == history_id,
+        ExportHistory.status == "processing"
+    ).update({
+        ExportHistory.status: "failed",
+        ExportHistory.error_message: message,
+        ExportHistory.completed_at: datetime.utcnow()
+    }, synchronize_session=False)
+    db.commit()
+    logger.info(f"Export {history_id} did not complete: {message}")
+
+
+def list_exports(db: Session, user_id, limit: int = 10, offset: int = 0) -> List[ExportHistory]:
+    return db.query(ExportHistory).filter(
+        ExportHistory.user_id == str(user_id)
+    ).order_by(ExportHistory.created_at.desc()).offset(offset).limit(limit).all()
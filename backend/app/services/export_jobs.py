@@ -0,0 +1,583 @@
+"""
+CRM Export Jobs for FA-48
+Background exports produced in checkpointed chunks on local storage
+
+A job's lead selection is split into ranges of EXPORT_CHUNK_SIZE consecutive
+leads. Every range is written to its own part file, renamed into place only
+once complete, and checkpointed in its ExportChunk row. Chunks are claimed
+with a conditional UPDATE, so they can be produced in parallel by a process
+pool or by several API processes, and a job interrupted by a restart resumes
+with the chunks that are not done yet. When all chunks are done the parts are
+assembled into the final file.
+
+Parquet and Arrow parts are uncompressed Arrow IPC streams of the typed record
+batches; assembling streams their batches into the final file, so no more than
+one batch is held in memory.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import asyncio
+import csv
+import json
+import logging
+import os
+import shutil
+
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Query, Session
+
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.models.export_job import ExportChunk, ExportHistory, ExportJob
+from app.models.form import FormSubmission
+from app.schemas.crm_export import CRMExportRequest
+from app.services.crm_export import PYARROW_AVAILABLE, CRMExportService, lead_query
+from app.services.crm_field_plans import compile_plan
+from app.services.export_history import complete_export, fail_export, start_export
+
+if PYARROW_AVAILABLE:
+    import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("csv", "json", "excel", "parquet", "arrow")
+COLUMNAR_FORMATS = ("parquet", "arrow")
+FILE_EXTENSIONS = {"csv": "csv", "json": "json", "excel": "xlsx", "parquet": "parquet", "arrow": "arrow"}
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "excel": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream"
+}
+ACTIVE_STATUSES = ("pending", "processing")
+
+# A chunk claimed longer ago than this is assumed to belong to a dead worker
+CHUNK_STALE_AFTER = timedelta(minutes=10)
+
+ChunkKeys = Tuple[Optional[datetime], Optional[str], datetime, str, int]
+
+
+class ExportCancelled(Exception):
+    """Raised while producing a chunk of a job that is no longer active"""
+
+
+def job_dir(job_id: str) -> str:
+    return os.path.join(settings.EXPORT_STORAGE_DIR, str(job_id))
+
+
+def part_path(job_id: str, chunk_index: int) -> str:
+    return os.path.join(job_dir(job_id), f"part-{chunk_index:06d}")
+
+
+def plan_chunks(query: Query, chunk_size: int) -> List[ChunkKeys]:
+    """
+    Split an ordered lead query into ranges of ``chunk_size`` leads.
+
+    Only the (created_at, id) keys are read. Returns the exclusive lower and
+    inclusive upper key of every range with its lead count.
+    """
+    keys = query.with_entities(
+        FormSubmission.created_at,
+        FormSubmission.id
+    ).execution_options(stream_results=True).yield_per(chunk_size)
+
+    chunks = []
+    after_created_at, after_id = None, None
+    count = 0
+    for created_at, submission_id in keys:
+        count += 1
+        if count == chunk_size:
+            chunks.append((after_created_at, after_id, created_at, submission_id, count))
+            after_created_at, after_id = created_at, submission_id
+            count = 0
+
+    if count:
+        chunks.append((after_created_at, after_id, created_at, submission_id, count))
+    return chunks
+
+
+def chunk_query(query: Query, chunk: ExportChunk) -> Query:
+    """Restrict an ordered lead query to the key range of one chunk"""
+    query = query.filter(or_(
+        FormSubmission.created_at < chunk.last_created_at,
+        and_(FormSubmission.created_at == chunk.last_created_at, FormSubmission.id <= chunk.last_id)
+    ))
+    if chunk.after_id is not None:
+        query = query.filter(or_(
+            FormSubmission.created_at > chunk.after_created_at,
+            and_(FormSubmission.created_at == chunk.after_created_at, FormSubmission.id > chunk.after_id)
+        ))
+    return query
+
+
+def write_part(
+    rows: Iterable[Any],
+    path: str,
+    export_format: str,
+    columns: List[str],
+    schema: Optional["pa.Schema"] = None
+) -> int:
+    """
+    Write one chunk's rows to its part file: CSV rows without header for CSV
+    exports, an Arrow IPC stream of the record batches ``rows`` holds for
+    Parquet and Arrow exports, one JSON object per line otherwise. The file
+    only appears under its final name once it is complete.
+    """
+    tmp_path = f"{path}.tmp"
+    count = 0
+    if export_format in COLUMNAR_FORMATS:
+        with pa.ipc.new_stream(tmp_path, schema) as writer:
+            for batch in rows:
+                writer.write_batch(batch)
+                count += batch.num_rows
+        os.replace(tmp_path, path)
+        return count
+
+    with open(tmp_path, "w", newline="", encoding="utf-8") as part:
+        if export_format == "csv":
+            writer = csv.DictWriter(part, fieldnames=columns)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                part.write(json.dumps(row, default=str))
+                part.write("\n")
+                count += 1
+
+    os.replace(tmp_path, path)
+    return count
+
+
+def iter_part_rows(paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    for path in paths:
+        with open(path, encoding="utf-8") as part:
+            for line in part:
+                yield json.loads(line)
+
+
+def iter_part_batches(paths: Iterable[str]) -> Iterator["pa.RecordBatch"]:
+    for path in paths:
+        with pa.memory_map(path) as source:
+            yield from pa.ipc.open_stream(source)
+
+
+def assemble_parts(
+    service: CRMExportService,
+    paths: List[str],
+    target: str,
+    export_format: str,
+    crm_type: str,
+    columns: List[str],
+    schema: Optional["pa.Schema"] = None
+) -> None:
+    """Concatenate part files into the final export file"""
+    tmp_path = f"{target}.tmp"
+
+    if export_format == "csv":
+        with open(tmp_path, "w", newline="", encoding="utf-8") as output:
+            csv.DictWriter(output, fieldnames=columns).writeheader()
+            for path in paths:
+                with open(path, newline="", encoding="utf-8") as part:
+                    shutil.copyfileobj(part, output)
+
+    elif export_format == "json":
+        with open(tmp_path, "w", encoding="utf-8") as output:
+            output.write("[")
+            separator = "\n  "
+            for path in paths:
+                with open(path, encoding="utf-8") as part:
+                    for line in part:
+                        output.write(separator)
+                        output.write(line.rstrip("\n"))
+                        separator = ",\n  "
+            output.write("\n]" if separator != "\n  " else "]")
+
+    elif export_format == "parquet":
+        service.write_parquet(iter_part_batches(paths), tmp_path, schema)
+
+    elif export_format == "arrow":
+        service.write_arrow_stream(iter_part_batches(paths), tmp_path, schema)
+
+    else:
+        service.write_excel(iter_part_rows(paths), tmp_path, crm_type=crm_type)
+
+    os.replace(tmp_path, target)
+
+
+class ExportJobService:
+    """Export job steps against one database session"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create_job(self, user_id, request: CRMExportRequest) -> ExportJob:
+        if request.format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {request.format.value}")
+        if request.format in COLUMNAR_FORMATS and not PYARROW_AVAILABLE:
+            raise ValueError(f"pyarrow is required for {request.format.value} exports")
+
+        crm_type = request.crm_type.value
+        export_format = request.format.value
+        job = ExportJob(
+            user_id=str(user_id),
+            crm_type=crm_type,
+            format=export_format,
+            request_params=request.model_dump(mode="json"),
+            status="pending",
+            chunk_size=settings.EXPORT_CHUNK_SIZE,
+            file_name=f"leads_{crm_type}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{FILE_EXTENSIONS[export_format]}"
+        )
+        self.db.add(job)
+        self.db.flush()
+
+        history = start_export(self.db, user_id, request, export_format, file_name=job.file_name, job_id=job.id)
+        job.delta_since = history.since
+        self.db.commit()
+        return job
+
+    def prepare(self, job_id: str) -> Optional[List[int]]:
+        """
+        Plan the chunks of a job on its first run and mark it processing.
+
+        Returns the indexes of chunks still to produce, or None if the job is
+        no longer active. Completed chunks whose part file is missing are
+        produced again.
+        """
+        job = self._active_job(job_id)
+        if job is None:
+            return None
+
+        os.makedirs(job_dir(job_id), exist_ok=True)
+
+        if job.total_chunks is None:
+            self._plan(job)
+            try:
+                self.db.commit()
+            except IntegrityError:
+                # Planned concurrently by another worker, use its chunks
+                self.db.rollback()
+                return self.prepare(job_id)
+
+        job.status = "processing"
+        job.started_at = job.started_at or datetime.utcnow()
+
+        remaining = []
+        for chunk in self.db.query(ExportChunk).filter(ExportChunk.job_id == job.id).order_by(ExportChunk.chunk_index):
+            if chunk.status == "completed" and os.path.exists(part_path(job.id, chunk.chunk_index)):
+                continue
+            if chunk.status == "completed":
+                chunk.status = "pending"
+                job.completed_chunks = max((job.completed_chunks or 0) - 1, 0)
+                job.exported_rows = max((job.exported_rows or 0) - (chunk.row_count or 0), 0)
+            remaining.append(chunk.chunk_index)
+
+        self.db.commit()
+        return remaining
+
+    def _plan(self, job: ExportJob) -> None:
+        query = lead_query(self.db, job.user_id, CRMExportRequest(**job.request_params), since=job.delta_since)
+        chunks = plan_chunks(query, job.chunk_size)
+        for index, (after_created_at, after_id, last_created_at, last_id, _) in enumerate(chunks):
+            self.db.add(ExportChunk(
+                job_id=job.id,
+                chunk_index=index,
+                after_created_at=after_created_at,
+                after_id=after_id,
+                last_created_at=last_created_at,
+                last_id=last_id
+            ))
+        job.total_chunks = len(chunks)
+        job.total_rows = sum(chunk[-1] for chunk in chunks)
+
+    def produce_chunk(self, job_id: str, chunk_index: int) -> int:
+        """
+        Claim one chunk and write its part file.
+
+        Returns the number of rows written, 0 if another worker holds or has
+        finished the chunk.
+        """
+        job = self._active_job(job_id)
+        if job is None:
+            raise ExportCancelled(job_id)
+
+        now = datetime.utcnow()
+        claimed = self.db.query(ExportChunk).filter(
+            ExportChunk.job_id == job_id,
+            ExportChunk.chunk_index == chunk_index,
+            or_(
+                ExportChunk.status == "pending",
+                and_(ExportChunk.status == "processing", ExportChunk.claimed_at < now - CHUNK_STALE_AFTER)
+            )
+        ).update({ExportChunk.status: "processing", ExportChunk.claimed_at: now}, synchronize_session=False)
+        self.db.commit()
+        if not claimed:
+            return 0
+
+        chunk = self.db.query(ExportChunk).filter(
+            ExportChunk.job_id == job_id,
+            ExportChunk.chunk_index == chunk_index
+        ).one()
+        request = CRMExportRequest(**job.request_params)
+
+        service = CRMExportService(self.db)
+        leads = service.iter_leads(
+            chunk_query(lead_query(self.db, job.user_id, request, since=job.delta_since), chunk),
+            include_scores=request.include_scores
+        )
+        if job.format in COLUMNAR_FORMATS:
+            rows = service.iter_record_batches(
+                leads,
+                crm_type=job.crm_type,
+                include_insights=request.include_insights,
+                include_recommendations=request.include_recommendations,
+                upsert_key=request.upsert_key,
+                exported_at=job.created_at
+            )
+            schema = service.arrow_schema(job.crm_type, request.upsert_key)
+        else:
+            rows = service.iter_rows(
+                leads,
+                crm_type=job.crm_type,
+                include_insights=request.include_insights,
+                include_recommendations=request.include_recommendations,
+                exported_at=job.created_at,
+                upsert_key=request.upsert_key
+            )
+            schema = None
+        count = write_part(rows, part_path(job_id, chunk_index), job.format, self._columns(job, request), schema)
+
+        # Checkpoint, unless the claim went stale and the chunk was taken over meanwhile
+        checkpointed = self.db.query(ExportChunk).filter(
+            ExportChunk.id == chunk.id,
+            ExportChunk.claimed_at == now
+        ).update({
+            ExportChunk.status: "completed",
+            ExportChunk.row_count: count,
+            ExportChunk.completed_at: datetime.utcnow()
+        }, synchronize_session=False)
+        if checkpointed:
+            self.db.query(ExportJob).filter(ExportJob.id == job_id).update({
+                ExportJob.completed_chunks: ExportJob.completed_chunks + 1,
+                ExportJob.exported_rows: ExportJob.exported_rows + count
+            }, synchronize_session=False)
+        self.db.commit()
+        return count
+
+    def finish(self, job_id: str) -> bool:
+        """
+        Assemble the final file once every chunk is done.
+
+        Returns False while chunks are still held by another worker; the
+        worker that completes the last chunk finishes the job.
+        """
+        job = self._active_job(job_id)
+        if job is None:
+            raise ExportCancelled(job_id)
+
+        chunks = self.db.query(ExportChunk).filter(
+            ExportChunk.job_id == job_id
+        ).order_by(ExportChunk.chunk_index).all()
+        if any(chunk.status != "completed" for chunk in chunks):
+            return False
+
+        paths = [part_path(job_id, chunk.chunk_index) for chunk in chunks]
+        target = os.path.join(job_dir(job_id), job.file_name)
+        service = CRMExportService(self.db)
+        request = CRMExportRequest(**job.request_params)
+        assemble_parts(
+            service,
+            paths,
+            target,
+            job.format,
+            job.crm_type,
+            self._columns(job, request),
+            service.arrow_schema(job.crm_type, request.upsert_key) if job.format in COLUMNAR_FORMATS else None
+        )
+
+        exported_rows = sum(chunk.row_count or 0 for chunk in chunks)
+        finished = self._update_job(
+            job_id,
+            status="completed",
+            file_path=target,
+            exported_rows=exported_rows,
+            completed_at=datetime.utcnow()
+        )
+        if finished:
+            for path in paths:
+                os.remove(path)
+            self._close_history(job_id, lead_count=exported_rows)
+        return finished
+
+    def fail(self, job_id: str, message: str) -> bool:
+        failed = self._update_job(job_id, status="failed", error_message=message, completed_at=datetime.utcnow())
+        if failed:
+            self._close_history(job_id, error=message)
+        return failed
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel an active job and remove its files. Returns False if it is not active."""
+        cancelled = self._update_job(job_id, status="cancelled", completed_at=datetime.utcnow())
+        if cancelled:
+            shutil.rmtree(job_dir(job_id), ignore_errors=True)
+            self._close_history(job_id, error="Cancelled")
+        return cancelled
+
+    def incomplete_job_ids(self) -> List[str]:
+        return [
+            row.id for row in self.db.query(ExportJob.id).filter(
+                ExportJob.status.in_(ACTIVE_STATUSES)
+            ).order_by(ExportJob.created_at)
+        ]
+
+    def _columns(self, job: ExportJob, request: CRMExportRequest) -> List[str]:
+        return compile_plan(job.crm_type, upsert_key=request.upsert_key).columns
+
+    def _close_history(self, job_id: str, lead_count: int = 0, error: Optional[str] = None) -> None:
+        history = self.db.query(ExportHistory.id).filter(ExportHistory.job_id == job_id).first()
+        if history is None:
+            return
+        if error is None:
+            complete_export(self.db, history.id, lead_count)
+        else:
+            fail_export(self.db, history.id, error)
+
+    def _active_job(self, job_id: str) -> Optional[ExportJob]:
+        return self.db.query(ExportJob).filter(
+            ExportJob.id == job_id,
+            ExportJob.status.in_(ACTIVE_STATUSES)
+        ).first()
+
+    def _update_job(self, job_id: str, **values) -> bool:
+        updated = self.db.query(ExportJob).filter(
+            ExportJob.id == job_id,
+            ExportJob.status.in_(ACTIVE_STATUSES)
+        ).update(values, synchronize_session=False)
+        self.db.commit()
+        return updated > 0
+
+
+@contextmanager
+def _job_service():
+    db = SessionLocal()
+    try:
+        yield ExportJobService(db)
+    finally:
+        db.close()
+
+
+# Module-level steps so they can be sent to a process pool
+
+def prepare_job(job_id: str) -> Optional[List[int]]:
+    with _job_service() as service:
+        return service.prepare(job_id)
+
+
+def produce_chunk(job_id: str, chunk_index: int) -> int:
+    with _job_service() as service:
+        return service.produce_chunk(job_id, chunk_index)
+
+
+def finish_job(job_id: str) -> bool:
+    with _job_service() as service:
+        return service.finish(job_id)
+
+
+def fail_job(job_id: str, message: str) -> bool:
+    with _job_service() as service:
+        return service.fail(job_id, message)
+
+
+class ExportJobRunner:
+    """
+    Runs export jobs in the background of an API process.
+
+    Chunks of a job are produced concurrently by a process pool; planning and
+    assembly run in threads. Each step opens its own session.
+    """
+
+    def __init__(self, process_workers: int = settings.EXPORT_PROCESS_WORKERS):
+        self.process_workers = process_workers
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def submit(self, job_id: str) -> None:
+        """Start running a job. Must be called from a running event loop."""
+        job_id = str(job_id)
+        if job_id in self._tasks:
+            return
+
+        task = asyncio.get_running_loop().create_task(self._run(job_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    def resume_incomplete(self) -> List[str]:
+        """Resume jobs interrupted by a restart, intended to be called at startup"""
+        with _job_service() as service:
+            job_ids = service.incomplete_job_ids()
+
+        for job_id in job_ids:
+            self.submit(job_id)
+        if job_ids:
+            logger.info(f"Resuming {len(job_ids)} export jobs")
+        return job_ids
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job. Chunks already being written finish, no further chunk
+        is started. Returns False if the job is not active.
+        """
+        with _job_service() as service:
+            return service.cancel(str(job_id))
+
+    async def shutdown(self) -> None:
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, job_id: str) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            chunk_indexes = await loop.run_in_executor(None, prepare_job, job_id)
+            if chunk_indexes is None:
+                return
+
+            executor = self._get_executor()
+            rows = await asyncio.gather(*(
+                loop.run_in_executor(executor, produce_chunk, job_id, chunk_index)
+                for chunk_index in chunk_indexes
+            ))
+
+            if await loop.run_in_executor(None, finish_job, job_id):
+                logger.info(f"Export job {job_id} completed ({sum(rows)} rows in this run)")
+            else:
+                logger.info(f"Export job {job_id} waiting for chunks held by other workers")
+        except ExportCancelled:
+            logger.info(f"Export job {job_id} cancelled")
+        except Exception as e:
+            logger.error(f"Export job {job_id} failed: {e}")
+            await loop.run_in_executor(None, fail_job, job_id, str(e))
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.process_workers <= 0:
+            return None
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.process_workers, initializer=_init_worker)
+        return self._executor
+
+
+def _init_worker() -> None:
+    """Forked workers drop the pooled connections inherited from the parent and open their own"""
+    engine.dispose(close=False)
+
+
+export_job_runner = ExportJobRunner()
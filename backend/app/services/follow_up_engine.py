@@ -3,8 +3,11 @@ Follow-up Recommendations Engine for FA-47
 AI-powered engine for generating personalized follow-up recommendations
 """
 
+import asyncio
 import json
-from typing import Dict, List, Optional, Any
+import logging
+import re
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from uuid import UUID
@@ -13,34 +16,18 @@ import openai
 from app.models.lead_score import LeadScore
 from app.models.form import FormSubmission
 from app.core.config import settings
+from app.services.llm_batching import BatchTask, LLMBatcher
+from app.services.llm_hedging import call_within_deadline
+from app.services.submission_features import SubmissionFeatures, extract_submission_features
 
+logger = logging.getLogger(__name__)
 
-class FollowUpRecommendationEngine:
-    """Engine for generating AI-powered follow-up recommendations"""
-    
-    def __init__(self, db: Session):
-        self.db = db
-        self.openai_client = openai.Client(api_key=settings.OPENAI_API_KEY)
-        
-        # Follow-up method preferences by score
-        self.method_by_score = {
-            'hot': ['call', 'demo', 'meeting'],
-            'warm': ['email', 'call', 'linkedin'],
-            'cold': ['email', 'linkedin', 'nurture']
-        }
-        
-        # Timing recommendations by urgency
-        self.timing_by_urgency = {
-            'immediate': 'Within 1 hour',
-            'urgent': 'Within 24 hours',
-            'high': 'Within 48 hours',
-            'medium': 'This week',
-            'low': 'Next 2 weeks'
-        }
-        
-        # Email templates
-        self.email_templates = {
-            'hot_lead': """Subject: Quick question about your {pain_point} challenge
+# Bump when recommendations, templates or the AI prompt change, cached recommendations are regenerated
+ENGINE_VERSION = 2
+
+# Email templates
+EMAIL_TEMPLATES = {
+    'hot_lead': """Subject: Quick question about your {pain_point} challenge
 
 Hi {name},
 
@@ -57,8 +44,8 @@ Are you available for a quick 15-minute call {call_time} to discuss how we can s
 
 Best regards,
 {sales_rep_name}""",
-            
-            'warm_lead': """Subject: Solving {pain_point} for {company}
+    
+    'warm_lead': """Subject: Solving {pain_point} for {company}
 
 Hi {name},
 
@@ -75,8 +62,8 @@ I have availability {availability}.
 
 Best regards,
 {sales_rep_name}""",
-            
-            'competitor_mention': """Subject: FormFlow AI vs {competitor} - Quick comparison
+    
+    'competitor_mention': """Subject: FormFlow AI vs {competitor} - Quick comparison
 
 Hi {name},
 
@@ -95,48 +82,112 @@ Happy to show you a side-by-side comparison. Are you free for a quick call {call
 
 Best regards,
 {sales_rep_name}"""
-        }
-        
-        # Call scripts
-        self.call_scripts = {
-            'opening': """Hi {name}, this is {sales_rep_name} from FormFlow AI. 
+}
+
+# Call scripts
+CALL_SCRIPTS = {
+    'opening': """Hi {name}, this is {sales_rep_name} from FormFlow AI. 
 
 I just received your form submission about {main_challenge}. I wanted to reach out immediately because I noticed your {urgency_indicator}.
 
 Do you have 2 minutes to discuss how we can help you {desired_outcome}?""",
-            
-            'qualifying': """I see you mentioned {pain_point}. Can you tell me more about:
+    
+    'qualifying': """I see you mentioned {pain_point}. Can you tell me more about:
 1. How much time this currently takes your team?
 2. What solution are you using now?
 3. What would success look like for you?""",
-            
-            'closing': """Based on what you've shared, FormFlow AI is a perfect fit because {reasons}.
+    
+    'closing': """Based on what you've shared, FormFlow AI is a perfect fit because {reasons}.
 
 The next step would be {next_step}. Does {proposed_time} work for you?"""
+}
+
+# Batched form of the AI enhancement prompt, for bulk requests
+RECOMMENDATION_TASK = BatchTask(
+    kind="follow_up_recommendations",
+    instructions=(
+        "Each item is a lead with its score, form data, insights and base follow-up recommendations. "
+        "Add 2-3 creative follow-up recommendations based on the lead's specific situation, with specific "
+        "action details, personalization and timing based on its buying signals."
+    ),
+    output_format=(
+        "recommendations (JSON array of objects with keys: action, priority, timing, method, "
+        "template_snippet, reason, success_probability)"
+    ),
+    max_tokens_per_item=600,
+    temperature=0.7
+)
+
+_PLACEHOLDER = re.compile(r'\{(\w+)\}')
+
+
+class CompiledTemplate:
+    """A template split once into literal text and placeholders"""
+    __slots__ = ("parts",)
+    
+    def __init__(self, text: str):
+        # Literals at even indexes, placeholder names at odd ones
+        self.parts = _PLACEHOLDER.split(text)
+    
+    def render(self, values: Dict[str, Any]) -> str:
+        """Fill the placeholders found in ``values``, others stay as they are for the rep"""
+        return "".join(
+            part if i % 2 == 0 else (str(values[part]) if part in values else "{" + part + "}")
+            for i, part in enumerate(self.parts)
+        )
+
+
+COMPILED_EMAIL_TEMPLATES = {key: CompiledTemplate(text) for key, text in EMAIL_TEMPLATES.items()}
+COMPILED_CALL_SCRIPTS = {key: CompiledTemplate(text) for key, text in CALL_SCRIPTS.items()}
+
+
+class FollowUpRecommendationEngine:
+    """Engine for generating AI-powered follow-up recommendations"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+        self.openai_client = openai.Client(api_key=settings.OPENAI_API_KEY)
+        # Set once a lead fell back to its base recommendations, such results are not cached
+        self.degraded = False
+        
+        # Follow-up method preferences by score
+        self.method_by_score = {
+            'hot': ['call', 'demo', 'meeting'],
+            'warm': ['email', 'call', 'linkedin'],
+            'cold': ['email', 'linkedin', 'nurture']
+        }
+        
+        # Timing recommendations by urgency
+        self.timing_by_urgency = {
+            'immediate': 'Within 1 hour',
+            'urgent': 'Within 24 hours',
+            'high': 'Within 48 hours',
+            'medium': 'This week',
+            'low': 'Next 2 weeks'
         }
+        
+        # Email templates and call scripts, compiled once at import
+        self.email_templates = EMAIL_TEMPLATES
+        self.call_scripts = CALL_SCRIPTS
     
     async def generate_recommendations(
         self,
         lead_data: Dict,
         lead_score: int,
         score_category: str = 'warm',
-        urgency: str = 'medium'
+        urgency: str = 'medium',
+        features: Optional[SubmissionFeatures] = None
     ) -> List[Dict]:
         """
         Generate personalized follow-up recommendations
         
+        ``features`` are the lead's stored SubmissionFeatures, extracted from
+        ``lead_data`` when not given.
+        
         Returns:
             List of recommendation dictionaries with actions, timing, and templates
         """
-        # Analyze lead characteristics
-        insights = self._analyze_lead(lead_data)
-        
-        # Generate base recommendations
-        base_recommendations = self._generate_base_recommendations(
-            score_category,
-            urgency,
-            insights
-        )
+        insights, base_recommendations = self.prepare_recommendations(lead_data, score_category, urgency, features)
         
         # Enhance with AI
         ai_recommendations = await self._enhance_with_ai(
@@ -146,9 +197,32 @@ The next step would be {next_step}. Does {proposed_time} work for you?"""
             base_recommendations
         )
         
+        return self.finish_recommendations(ai_recommendations, lead_data, insights)
+    
+    def prepare_recommendations(
+        self,
+        lead_data: Dict,
+        score_category: str = 'warm',
+        urgency: str = 'medium',
+        features: Optional[SubmissionFeatures] = None
+    ) -> Tuple[Dict, List[Dict]]:
+        """Lead insights and the rule-based recommendations, before the AI enhancement"""
+        # Analyze lead characteristics
+        insights = self._analyze_lead(lead_data, features or extract_submission_features(lead_data))
+        
+        # Generate base recommendations
+        base_recommendations = self._generate_base_recommendations(
+            score_category,
+            urgency,
+            insights
+        )
+        return insights, base_recommendations
+    
+    def finish_recommendations(self, recommendations: List[Dict], lead_data: Dict, insights: Dict) -> List[Dict]:
+        """Templates, scripts and priority order for the (enhanced) recommendations"""
         # Add templates and scripts
         final_recommendations = self._add_templates(
-            ai_recommendations,
+            recommendations,
             lead_data,
             insights
         )
@@ -156,7 +230,7 @@ The next step would be {next_step}. Does {proposed_time} work for you?"""
         # Prioritize recommendations
         return self._prioritize_recommendations(final_recommendations)
     
-    def _analyze_lead(self, lead_data: Dict) -> Dict:
+    def _analyze_lead(self, lead_data: Dict, features: SubmissionFeatures) -> Dict:
         """Analyze lead data to extract key insights"""
         insights = {
             'has_budget': False,
@@ -164,7 +238,7 @@ The next step would be {next_step}. Does {proposed_time} work for you?"""
             'is_decision_maker': False,
             'has_pain_points': False,
             'mentioned_competitor': False,
-            'company_size': 'unknown',
+            'company_size': features.company_size,
             'urgency_level': 'medium',
             'main_challenge': None,
             'desired_outcome': None,
@@ -172,36 +246,29 @@ The next step would be {next_step}. Does {proposed_time} work for you?"""
             'competitors': []
         }
         
-        form_text = json.dumps(lead_data).lower()
-        
         # Check for budget
-        if any(indicator in form_text for indicator in ['budget', '$', 'invest', 'spend']):
+        if features.budget_amount is not None or 'budget_ready' in features.signals:
             insights['has_budget'] = True
         
         # Check for timeline
-        timeline_indicators = ['immediate', 'asap', 'urgent', 'q1', 'q2', 'month', 'week']
-        if any(indicator in form_text for indicator in timeline_indicators):
+        if features.timeline != 'no_timeline':
             insights['has_timeline'] = True
-            if any(urgent in form_text for urgent in ['immediate', 'asap', 'urgent']):
-                insights['urgency_level'] = 'high'
+        if features.timeline == 'immediate' or 'high_urgency' in features.signals:
+            insights['urgency_level'] = 'high'
         
         # Check for decision maker
-        authority_indicators = ['ceo', 'cto', 'director', 'manager', 'vp', 'head of']
-        if any(indicator in form_text for indicator in authority_indicators):
+        if features.authority == 'decision_maker':
             insights['is_decision_maker'] = True
         
         # Check for pain points
-        pain_indicators = ['problem', 'challenge', 'issue', 'struggle', 'difficult', 'frustrat']
-        if any(indicator in form_text for indicator in pain_indicators):
+        if features.pain_count or 'pain_points' in features.signals:
             insights['has_pain_points'] = True
         
         # Check for competitors
-        competitors = ['salesforce', 'hubspot', 'excel', 'manual', 'spreadsheet']
-        found_competitors = [comp for comp in competitors if comp in form_text]
-        if found_competitors:
+        if features.competitors:
             insights['mentioned_competitor'] = True
-            insights['competitors'] = found_competitors
-            insights['current_solution'] = found_competitors[0]
+            insights['competitors'] = list(features.competitors)
+            insights['current_solution'] = features.competitors[0]
         
         # Extract main challenge (simplified)
         if 'challenge' in lead_data:
@@ -330,7 +397,10 @@ The next step would be {next_step}. Does {proposed_time} work for you?"""
             Format as JSON array with keys: action, priority, timing, method, template_snippet, reason, success_probability
             """
             
-            response = self.openai_client.chat.completions.create(
+            # The client is synchronous, keep the event loop free for other leads
+            response = await asyncio.to_thread(
+                call_within_deadline,
+                self.openai_client,
                 model="gpt-4",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.7,
@@ -340,21 +410,26 @@ The next step would be {next_step}. Does {proposed_time} work for you?"""
             ai_response = json.loads(response.choices[0].message.content)
             
             # Merge AI enhancements with base recommendations
-            enhanced = base_recommendations.copy()
-            
-            # Add AI-generated recommendations
-            if isinstance(ai_response, list):
-                for ai_rec in ai_response[:3]:  # Limit to 3 additional
-                    if all(key in ai_rec for key in ['action', 'priority', 'timing']):
-                        enhanced.append(ai_rec)
-            
-            return enhanced
+            return self._merge_ai_recommendations(base_recommendations, ai_response)
             
         except Exception as e:
             print(f"AI enhancement error: {e}")
+            self.degraded = True
             # Return base recommendations if AI fails
             return base_recommendations
     
+    def _merge_ai_recommendations(self, base_recommendations: List[Dict], ai_response: Any) -> List[Dict]:
+        """Base recommendations plus up to 3 complete AI-generated ones"""
+        enhanced = base_recommendations.copy()
+        
+        # Add AI-generated recommendations
+        if isinstance(ai_response, list):
+            for ai_rec in ai_response[:3]:  # Limit to 3 additional
+                if isinstance(ai_rec, dict) and all(key in ai_rec for key in ['action', 'priority', 'timing']):
+                    enhanced.append(ai_rec)
+        
+        return enhanced
+    
     def _add_templates(
         self,
         recommendations: List[Dict],
@@ -363,6 +438,13 @@ The next step would be {next_step}. Does {proposed_time} work for you?"""
     ) -> List[Dict]:
         """Add email templates and call scripts to recommendations"""
         enhanced_recs = []
+        challenge = insights.get('main_challenge') or 'challenge'
+        values = {
+            'name': lead_data.get('name', 'there'),
+            'company': lead_data.get('company', 'your company'),
+            'pain_point': challenge,
+            'main_challenge': challenge
+        }
         
         for rec in recommendations:
             enhanced = rec.copy()
@@ -373,22 +455,12 @@ The next step would be {next_step}. Does {proposed_time} work for you?"""
                 if insights['mentioned_competitor']:
                     template_key = 'competitor_mention'
                 
-                template = self.email_templates.get(template_key, '')
-                
-                # Basic template variable replacement
-                template = template.replace('{name}', lead_data.get('name', 'there'))
-                template = template.replace('{company}', lead_data.get('company', 'your company'))
-                template = template.replace('{pain_point}', insights.get('main_challenge', 'challenge'))
-                
-                enhanced['template'] = template
+                template = COMPILED_EMAIL_TEMPLATES.get(template_key)
+                enhanced['template'] = template.render(values) if template else ''
             
             # Add call script if call method
             elif rec.get('method') == 'call':
-                script = self.call_scripts['opening']
-                script = script.replace('{name}', lead_data.get('name', 'there'))
-                script = script.replace('{main_challenge}', insights.get('main_challenge', 'challenge'))
-                
-                enhanced['template'] = script
+                enhanced['template'] = COMPILED_CALL_SCRIPTS['opening'].render(values)
             
             enhanced_recs.append(enhanced)
         
@@ -416,4 +488,112 @@ The next step would be {next_step}. Does {proposed_time} work for you?"""
         """Track the effectiveness of recommendations for future improvement"""
         # This would store feedback in a database table for ML training
         # Implementation depends on your tracking requirements
-        pass
\ No newline at end of file
+        pass
+
+
+async def generate_concurrently(
+    engine: FollowUpRecommendationEngine,
+    leads: Iterable[Tuple[Any, Dict[str, Any]]],
+    concurrency: int = settings.RECOMMENDATION_CONCURRENCY
+) -> AsyncIterator[Tuple[Any, Union[List[Dict], Exception]]]:
+    """
+    Recommendations for many leads, at most ``concurrency`` generated at once.
+    
+    ``leads`` are (key, generate_recommendations keyword arguments) pairs.
+    Yields (key, recommendations) as each lead finishes, or (key, exception)
+    when its generation failed. Leads not yet finished are cancelled when
+    the caller stops iterating, e.g. because the client went away.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    
+    async def generate(key, kwargs):
+        async with semaphore:
+            try:
+                return key, await engine.generate_recommendations(**kwargs)
+            except Exception as e:
+                logger.error(f"Recommendations for lead {key} failed: {e}")
+                return key, e
+    
+    tasks = [asyncio.ensure_future(generate(key, kwargs)) for key, kwargs in leads]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def generate_batched(
+    engine: FollowUpRecommendationEngine,
+    leads: Iterable[Tuple[Any, Dict[str, Any]]],
+    batcher: Optional[LLMBatcher] = None,
+    concurrency: int = settings.RECOMMENDATION_CONCURRENCY
+) -> AsyncIterator[Tuple[Any, Union[List[Dict], Exception]]]:
+    """
+    Recommendations for many leads, the AI enhancement of a chunk of leads in one completion.
+    
+    Takes and yields the same pairs as generate_concurrently. Leads are
+    grouped into chunks of the batcher's batch size (LLM_BATCH_SIZE), at most
+    ``concurrency`` chunks are enhanced at once and the leads of a chunk are
+    yielded when its completions return; the batcher splits a chunk whose
+    prompt would not fit the model's context. A lead missing from the answer
+    keeps its base recommendations.
+    """
+    batcher = batcher or LLMBatcher(engine.openai_client)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    
+    prepared = []
+    failed = []
+    for key, kwargs in leads:
+        try:
+            insights, base_recommendations = engine.prepare_recommendations(
+                kwargs["lead_data"],
+                kwargs.get("score_category", 'warm'),
+                kwargs.get("urgency", 'medium'),
+                kwargs.get("features")
+            )
+        except Exception as e:
+            logger.error(f"Recommendations for lead {key} failed: {e}")
+            failed.append((key, e))
+            continue
+        prepared.append((key, kwargs, insights, base_recommendations))
+    
+    async def enhance(chunk):
+        items = {
+            str(key): {
+                "lead_score": kwargs["lead_score"],
+                "lead_data": kwargs["lead_data"],
+                "insights": insights,
+                "base_recommendations": base_recommendations
+            }
+            for key, kwargs, insights, base_recommendations in chunk
+        }
+        async with semaphore:
+            # The client is synchronous, keep the event loop free for other chunks
+            results = await asyncio.to_thread(batcher.complete, RECOMMENDATION_TASK, items)
+        
+        finished = []
+        for key, kwargs, insights, base_recommendations in chunk:
+            if str(key) not in results:
+                engine.degraded = True
+            try:
+                ai_response = (results.get(str(key)) or {}).get("recommendations")
+                recommendations = engine._merge_ai_recommendations(base_recommendations, ai_response)
+                finished.append((key, engine.finish_recommendations(recommendations, kwargs["lead_data"], insights)))
+            except Exception as e:
+                logger.error(f"Recommendations for lead {key} failed: {e}")
+                finished.append((key, e))
+        return finished
+    
+    for item in failed:
+        yield item
+    
+    size = batcher.batch_size
+    tasks = [asyncio.ensure_future(enhance(prepared[i:i + size])) for i in range(0, len(prepared), size)]
+    try:
+        for done in asyncio.as_completed(tasks):
+            for item in await done:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
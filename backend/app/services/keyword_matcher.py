@@ -0,0 +1,202 @@
+"""
+Keyword Matcher
+Single-pass multi-pattern matching for classification and signal detection
+
+A KeywordMatcher compiles dictionaries of keywords per category once and
+finds every keyword of every category in one scan of the text, instead of
+one substring search per keyword. Matching uses an Aho-Corasick automaton
+when pyahocorasick is installed, otherwise a regex compiled from the keyword
+trie, which the regex engine also walks once per text position.
+
+Boundaries decide where a keyword may match:
+    substring   anywhere, the plain ``keyword in text`` semantics
+    word_start  at the start of a word, "need" matches "needs" but not "kneed"
+    word        as a whole word or phrase, "custom" does not match "customer"
+
+Word characters are letters and digits, so snake_case field names
+("current_weight") count as separate words.
+
+Usage:
+    matcher = KeywordMatcher({"urgency": ["asap", "urgent"]}, boundary="word_start")
+    hits = matcher.scan(text)
+    if "urgency" in hits: ...
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import re
+
+# pyahocorasick is in the requirements, the trie regex covers installs without it
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+SUBSTRING = "substring"
+WORD_START = "word_start"
+WORD = "word"
+BOUNDARIES = (SUBSTRING, WORD_START, WORD)
+
+
+class KeywordHits:
+    """Keywords found per category, with the position of their first occurrence"""
+    __slots__ = ("_hits",)
+
+    def __init__(self, hits: Optional[Dict[str, Dict[str, int]]] = None):
+        self._hits = hits or {}
+
+    def __contains__(self, category: str) -> bool:
+        return category in self._hits
+
+    def __bool__(self) -> bool:
+        return bool(self._hits)
+
+    def categories(self) -> List[str]:
+        """Categories with at least one hit, in dictionary order"""
+        return list(self._hits)
+
+    def keywords(self, category: str) -> List[str]:
+        """Distinct keywords of a category found, in dictionary order"""
+        return list(self._hits.get(category, ()))
+
+    def count(self, category: str) -> int:
+        return len(self._hits.get(category, ()))
+
+    def position(self, category: str, keyword: str) -> Optional[int]:
+        return self._hits.get(category, {}).get(keyword)
+
+
+def _trie_pattern(node: Dict[str, dict]) -> str:
+    """Regex matching the longest keyword of a trie at the current position"""
+    alternatives = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not alternatives:
+        return ''
+    pattern = alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+    # Greedy, longer keywords are tried first
+    return '(?:' + pattern + ')?' if '' in node else pattern
+
+
+class KeywordMatcher:
+    """Keyword dictionaries per category compiled for single-pass scanning"""
+
+    def __init__(self, dictionaries: Dict[str, Iterable[str]], boundary: str = WORD_START):
+        if boundary not in BOUNDARIES:
+            raise ValueError(f"Unknown boundary: {boundary}")
+        self.boundary = boundary
+
+        # keyword -> categories it belongs to, keywords in dictionary order
+        self.categories = list(dictionaries)
+        self._keyword_categories: Dict[str, List[str]] = {}
+        self._order: Dict[Tuple[str, str], int] = {}
+        for category, keywords in dictionaries.items():
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if not keyword:
+                    continue
+                self._keyword_categories.setdefault(keyword, [])
+                if category not in self._keyword_categories[keyword]:
+                    self._keyword_categories[keyword].append(category)
+                    self._order[(category, keyword)] = len(self._order)
+
+        self._automaton = None
+        self._pattern = None
+        if not self._keyword_categories:
+            return
+        if AHOCORASICK_AVAILABLE:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self._keyword_categories:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+        else:
+            trie: Dict[str, dict] = {}
+            for keyword in self._keyword_categories:
+                node = trie
+                for char in keyword:
+                    node = node.setdefault(char, {})
+                node[''] = {}
+            # Starting with the trie keeps the regex engine's first-character
+            # skip, a lookbehind guard would disable it
+            guard = r'\b' if boundary != SUBSTRING else ''
+            self._pattern = re.compile(guard + _trie_pattern(trie))
+            # The trie regex reports the longest keyword at a position, shorter
+            # keywords at the same position are its prefixes
+            self._prefixes = {
+                keyword: [other for other in self._keyword_categories if keyword.startswith(other)]
+                for keyword in self._keyword_categories
+            }
+
+    def __len__(self) -> int:
+        return len(self._keyword_categories)
+
+    def scan(self, text: str) -> KeywordHits:
+        """All keywords in the text by category, matched case-insensitively"""
+        if not text or not self._keyword_categories:
+            return KeywordHits()
+        text = text.lower()
+
+        found: Dict[str, int] = {}
+        for start, keyword in self._raw_matches(text):
+            if keyword in found or not self._within_boundaries(text, start, keyword):
+                continue
+            found[keyword] = start
+            if len(found) == len(self._keyword_categories):
+                break
+
+        # Dictionary order: categories first, then keywords within them
+        entries = sorted(
+            (self._order[(category, keyword)], category, keyword, start)
+            for keyword, start in found.items()
+            for category in self._keyword_categories[keyword]
+        )
+        hits: Dict[str, Dict[str, int]] = {}
+        for _, category, keyword, start in entries:
+            hits.setdefault(category, {})[keyword] = start
+        return KeywordHits(hits)
+
+    def categories_in(self, text: str) -> Set[str]:
+        return set(self.scan(text).categories())
+
+    def _raw_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        if self._automaton is not None:
+            for end, keyword in self._automaton.iter(text):
+                yield end - len(keyword) + 1, keyword
+            return
+        if self.boundary != SUBSTRING:
+            # Same length, and \b now also breaks words at underscores
+            text = text.replace('_', ' ')
+        # Searching again from the next character, so keywords starting inside
+        # a longer match are found too
+        search = self._pattern.search
+        match = search(text)
+        while match:
+            start = match.start()
+            for keyword in self._prefixes[match.group()]:
+                yield start, keyword
+            match = search(text, start + 1)
+
+    def _within_boundaries(self, text: str, start: int, keyword: str) -> bool:
+        if self.boundary == SUBSTRING:
+            return True
+        if start > 0 and text[start - 1].isalnum():
+            return False
+        if self.boundary == WORD:
+            end = start + len(keyword)
+            return end == len(text) or not text[end].isalnum()
+        return True
+
+
+class RegexSet:
+    """Regex lists per category, each compiled into one alternation"""
+
+    def __init__(self, patterns: Dict[str, Iterable[str]], flags: int = re.IGNORECASE):
+        self.patterns = {
+            category: re.compile('|'.join(f'(?:{pattern})' for pattern in category_patterns), flags)
+            for category, category_patterns in patterns.items()
+        }
+
+    def search(self, category: str, text: str) -> Optional[re.Match]:
+        return self.patterns[category].search(text)
+
+    def categories_in(self, text: str) -> Set[str]:
+        """Categories with at least one pattern matching the text"""
+        return {category for category, pattern in self.patterns.items() if pattern.search(text)}
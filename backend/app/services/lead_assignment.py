@@ -23,6 +23,9 @@ from app.models.team_collaboration import (
 from app.models.form import FormSubmission
 from app.models.lead_score import LeadScore
 from app.models.user import User
+from app.services.lead_scoring import LeadScoringEngine, schedule_ai_adjustment
+from app.services.llm_circuit import llm_circuit
+from app.services.submission_features import features_for
 
 
 class LeadAssignmentService:
@@ -112,6 +115,15 @@ class LeadAssignmentService:
             LeadScore.submission_id == lead_id
         ).first()
         
+        # Unscored leads get the rule-based score now, the AI adjustment follows.
+        # While the LLM circuit is open the score stays pending for ai_reenrichment.
+        if not lead_score:
+            lead_score = LeadScoringEngine(self.db).score_rules_only(
+                lead_id, lead.answers or {}, user_id=lead.user_id, features=features_for(lead.answers, lead.features)
+            )
+            if not llm_circuit.is_open:
+                schedule_ai_adjustment(lead_score.id)
+        
         # Determine assignee
         if manual_assignee:
             assignee_id = manual_assignee
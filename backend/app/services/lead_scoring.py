@@ -4,16 +4,257 @@ AI-powered lead scoring algorithm with weighted criteria and buying signal detec
 """
 
 import re
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set, Tuple
 from datetime import datetime, timedelta
+import asyncio
 import json
+import logging
+import threading
 from sqlalchemy.orm import Session
 from uuid import UUID
 import openai
 
-from app.models.lead_score import LeadScore, ScoringRule
+from app.database import SessionLocal
+from app.models.lead_score import LeadScore, LeadScoreHistory, ScoringRule
 from app.models.form import FormSubmission
 from app.core.config import settings
+from app.services.keyword_matcher import WORD_START, KeywordHits, KeywordMatcher
+from app.services.llm_batching import BatchTask, LLMBatcher
+from app.services.llm_circuit import CircuitOpen, llm_circuit
+from app.services.llm_hedging import call_within_deadline
+from app.services.scoring_rules import rule_plans
+
+logger = logging.getLogger(__name__)
+
+# Default scoring weights
+DEFAULT_WEIGHTS = {
+    "budget": 0.30,      # 30% weight
+    "timeline": 0.25,    # 25% weight
+    "authority": 0.20,   # 20% weight
+    "need": 0.15,        # 15% weight
+    "company_size": 0.10 # 10% weight
+}
+
+# Budget thresholds
+BUDGET_THRESHOLDS = [
+    (100000, 30),  # >$100k = 30 points
+    (50000, 25),   # >$50k = 25 points
+    (25000, 20),   # >$25k = 20 points
+    (10000, 15),   # >$10k = 15 points
+    (5000, 10),    # >$5k = 10 points
+    (0, 5)         # <$5k = 5 points
+]
+NO_BUDGET_SCORE = 5
+
+# Timeline scoring
+TIMELINE_SCORES = {
+    "immediate": 25,
+    "this_month": 23,
+    "q1": 20,
+    "q2": 15,
+    "q3": 10,
+    "q4": 5,
+    "next_year": 3,
+    "no_timeline": 0
+}
+
+# Authority levels
+AUTHORITY_SCORES = {
+    "decision_maker": 20,
+    "influencer": 15,
+    "recommender": 10,
+    "evaluator": 8,
+    "end_user": 5,
+    "unknown": 2
+}
+
+# Company size scores
+COMPANY_SIZE_SCORES = {
+    "enterprise": 10,    # 1000+ employees
+    "mid_market": 8,     # 100-999 employees
+    "small_business": 6, # 10-99 employees
+    "startup": 4,        # <10 employees
+    "unknown": 2
+}
+
+# Buying signals keywords
+BUYING_SIGNALS = {
+    "high_urgency": ["urgent", "asap", "immediately", "critical", "pressing", "time-sensitive"],
+    "budget_ready": ["budget approved", "funded", "ready to invest", "allocated funds"],
+    "pain_points": ["struggling", "frustrated", "losing money", "inefficient", "manual process", "time-consuming"],
+    "comparison": ["comparing", "evaluating", "looking at alternatives", "researching solutions"],
+    "commitment": ["ready to move forward", "want to get started", "implement", "deploy"]
+}
+
+BUDGET_FIELDS = ["budget", "investment", "spending", "price_range"]
+TIMELINE_FIELDS = ["timeline", "when", "timeframe", "purchase_date", "implementation"]
+AUTHORITY_FIELDS = ["role", "title", "position", "job_title", "authority"]
+SIZE_FIELDS = ["company_size", "employees", "team_size", "organization_size"]
+
+DECISION_MAKER_KEYWORDS = ["ceo", "cto", "cfo", "president", "vp", "director", "head of", "manager", "owner", "founder"]
+INFLUENCER_KEYWORDS = ["lead", "senior", "principal", "architect", "consultant"]
+PAIN_INDICATORS = ["problem", "challenge", "issue", "struggling", "difficult", "frustrat", "pain", "inefficient"]
+NEED_INDICATORS = ["need", "require", "looking for", "want", "seeking", "must have"]
+
+# Keywords match at word starts, "frustrat" covers "frustrated" and "need" covers "needs"
+SIGNAL_MATCHER = KeywordMatcher(
+    {**BUYING_SIGNALS, "pain_indicators": PAIN_INDICATORS, "need_indicators": NEED_INDICATORS},
+    boundary=WORD_START
+)
+MAX_NEED_SCORE = 15
+MAX_AI_ADJUSTMENT = 15
+
+# Batched form of the AI adjustment prompt, for pending scores adjusted in bulk
+AI_ADJUSTMENT_TASK = BatchTask(
+    kind="lead_score_adjustment",
+    instructions="Analyze each form submission for buying signals and lead quality.",
+    output_format=(
+        "adjustment (additional score, 0-15 points), signals (key buying signals detected), "
+        "priority (recommended follow-up priority), insights"
+    ),
+    max_tokens_per_item=300
+)
+
+DEFAULT_SCORING_VERSION = "v1.0"
+RULES_SCORING_VERSION = "rules-v1"
+
+
+def score_category(final_score: int) -> str:
+    if final_score >= 80:
+        return "hot"
+    elif final_score >= 60:
+        return "warm"
+    return "cold"
+
+
+def _leading_number(value: str) -> Optional[int]:
+    numbers = re.findall(r'\d+', value.replace(',', ''))
+    return int(numbers[0]) if numbers else None
+
+
+def budget_amount(form_data: Dict) -> Optional[int]:
+    """Budget in dollars from the first budget field stating an amount"""
+    for field in BUDGET_FIELDS:
+        if field in form_data:
+            value = str(form_data[field]).lower()
+            
+            # Extract numeric value
+            amount = _leading_number(value)
+            if amount is not None:
+                # Check if it's in thousands (k) or millions (m)
+                if 'k' in value:
+                    amount *= 1000
+                elif 'm' in value:
+                    amount *= 1000000
+                return amount
+    
+    return None
+
+
+def timeline_level(form_data: Dict) -> str:
+    """TIMELINE_SCORES key for the purchase timeline"""
+    for field in TIMELINE_FIELDS:
+        if field in form_data:
+            value = str(form_data[field]).lower()
+            
+            # Check for immediate indicators
+            if any(word in value for word in ["immediate", "asap", "urgent", "now"]):
+                return "immediate"
+            
+            # Check for month references
+            if "this month" in value or "30 days" in value:
+                return "this_month"
+            
+            # Check for quarter references
+            if "q1" in value or "first quarter" in value:
+                return "q1"
+            elif "q2" in value or "second quarter" in value:
+                return "q2"
+            elif "q3" in value or "third quarter" in value:
+                return "q3"
+            elif "q4" in value or "fourth quarter" in value:
+                return "q4"
+            
+            # Check for year references
+            if "next year" in value or "2026" in value:
+                return "next_year"
+    
+    return "no_timeline"
+
+
+def authority_level(form_data: Dict) -> str:
+    """AUTHORITY_SCORES key for the respondent's role"""
+    for field in AUTHORITY_FIELDS:
+        if field in form_data:
+            value = str(form_data[field]).lower()
+            
+            # Check for decision maker
+            if any(keyword in value for keyword in DECISION_MAKER_KEYWORDS):
+                return "decision_maker"
+            
+            # Check for influencer
+            if any(keyword in value for keyword in INFLUENCER_KEYWORDS):
+                return "influencer"
+            
+            # Check for explicit authority mention
+            if "decision" in value or "approve" in value or "budget" in value:
+                return "decision_maker"
+    
+    return "unknown"
+
+
+def scan_signals(form_data: Dict) -> KeywordHits:
+    """Buying signal and need indicator keywords in the answers, in one scan"""
+    # Convert all form data to searchable text
+    return SIGNAL_MATCHER.scan(json.dumps(form_data))
+
+
+def need_indicator_counts(form_data: Dict, hits: Optional[KeywordHits] = None) -> Tuple[int, int]:
+    """Pain point and need indicators mentioned anywhere in the answers"""
+    hits = hits if hits is not None else scan_signals(form_data)
+    return hits.count("pain_indicators"), hits.count("need_indicators")
+
+
+def need_score(pain_count: int, need_count: int) -> int:
+    return min(MAX_NEED_SCORE, (pain_count * 3) + (need_count * 2))
+
+
+def company_size_level(form_data: Dict) -> str:
+    """COMPANY_SIZE_SCORES key for the respondent's company"""
+    for field in SIZE_FIELDS:
+        if field in form_data:
+            value = str(form_data[field]).lower()
+            
+            # Extract numbers
+            size = _leading_number(value)
+            if size is not None:
+                if size >= 1000 or "enterprise" in value:
+                    return "enterprise"
+                elif size >= 100 or "mid" in value:
+                    return "mid_market"
+                elif size >= 10 or "small" in value:
+                    return "small_business"
+                else:
+                    return "startup"
+    
+    # Check company name field for size indicators
+    if "company" in form_data:
+        company = str(form_data["company"]).lower()
+        if any(corp in company for corp in ["inc", "corp", "llc", "ltd"]):
+            return "mid_market"
+    
+    return "unknown"
+
+
+def detect_buying_signals(form_data: Dict, hits: Optional[KeywordHits] = None) -> List[str]:
+    """Buying signal types whose keywords appear in the answers"""
+    hits = hits if hits is not None else scan_signals(form_data)
+    return [signal_type for signal_type in BUYING_SIGNALS if signal_type in hits]
+
+
+def signal_adjustment(signal_count: int) -> int:
+    """Rule-based score adjustment used when the AI adjustment is unavailable"""
+    return min(MAX_AI_ADJUSTMENT, signal_count * 2)  # 2 points per signal
 
 
 class LeadScoringEngine:
@@ -23,107 +264,201 @@ class LeadScoringEngine:
         self.db = db
         self.openai_client = openai.Client(api_key=settings.OPENAI_API_KEY)
         
-        # Default scoring weights
-        self.default_weights = {
-            "budget": 0.30,      # 30% weight
-            "timeline": 0.25,    # 25% weight
-            "authority": 0.20,   # 20% weight
-            "need": 0.15,        # 15% weight
-            "company_size": 0.10 # 10% weight
-        }
-        
-        # Budget thresholds
-        self.budget_thresholds = [
-            (100000, 30),  # >$100k = 30 points
-            (50000, 25),   # >$50k = 25 points
-            (25000, 20),   # >$25k = 20 points
-            (10000, 15),   # >$10k = 15 points
-            (5000, 10),    # >$5k = 10 points
-            (0, 5)         # <$5k = 5 points
-        ]
-        
-        # Timeline scoring
-        self.timeline_scores = {
-            "immediate": 25,
-            "this_month": 23,
-            "q1": 20,
-            "q2": 15,
-            "q3": 10,
-            "q4": 5,
-            "next_year": 3,
-            "no_timeline": 0
-        }
-        
-        # Authority levels
-        self.authority_scores = {
-            "decision_maker": 20,
-            "influencer": 15,
-            "recommender": 10,
-            "evaluator": 8,
-            "end_user": 5,
-            "unknown": 2
-        }
-        
-        # Company size scores
-        self.company_size_scores = {
-            "enterprise": 10,    # 1000+ employees
-            "mid_market": 8,     # 100-999 employees
-            "small_business": 6, # 10-99 employees
-            "startup": 4,        # <10 employees
-            "unknown": 2
-        }
-        
-        # Buying signals keywords
-        self.buying_signals = {
-            "high_urgency": ["urgent", "asap", "immediately", "critical", "pressing", "time-sensitive"],
-            "budget_ready": ["budget approved", "funded", "ready to invest", "allocated funds"],
-            "pain_points": ["struggling", "frustrated", "losing money", "inefficient", "manual process", "time-consuming"],
-            "comparison": ["comparing", "evaluating", "looking at alternatives", "researching solutions"],
-            "commitment": ["ready to move forward", "want to get started", "implement", "deploy"]
-        }
+        # Copies, so a tuned engine does not change the module defaults
+        self.default_weights = dict(DEFAULT_WEIGHTS)
+        self.budget_thresholds = list(BUDGET_THRESHOLDS)
+        self.timeline_scores = dict(TIMELINE_SCORES)
+        self.authority_scores = dict(AUTHORITY_SCORES)
+        self.company_size_scores = dict(COMPANY_SIZE_SCORES)
     
-    async def calculate_lead_score(self, submission_id: UUID, form_data: Dict) -> LeadScore:
-        """Calculate comprehensive lead score for a form submission"""
+    async def calculate_lead_score(
+        self,
+        submission_id: UUID,
+        form_data: Dict,
+        user_id=None,
+        defer_ai: bool = False,
+        features=None
+    ) -> LeadScore:
+        """
+        Calculate comprehensive lead score for a form submission.
+        
+        When the tenant (``user_id``) has active scoring rules, its compiled
+        rule plan replaces the default weighted criteria. With ``defer_ai``
+        the rule-based score is returned right away and the AI adjustment is
+        applied in the background (see score_rules_only). While the LLM
+        circuit is open the score is rule-based too and stays pending until
+        ai_reenrichment adjusts it. ``features`` are the submission's stored
+        SubmissionFeatures, extracted from ``form_data`` when not given.
+        """
+        features = _submission_features(form_data, features)
+        if defer_ai or llm_circuit.is_open:
+            lead_score = self.score_rules_only(submission_id, form_data, user_id, features)
+            if defer_ai and not llm_circuit.is_open:
+                schedule_ai_adjustment(lead_score.id)
+            return lead_score
+        
+        base_score, score_factors, scoring_version = self._base_score(form_data, user_id, features)
         
-        # Calculate base score components
-        budget_score = self._score_budget(form_data)
-        timeline_score = self._score_timeline(form_data)
-        authority_score = self._score_authority(form_data)
-        need_score = self._score_need(form_data)
-        company_score = self._score_company_size(form_data)
+        # Get AI adjustment based on buying signals
+        ai_adjustment, ai_insights, signals, ai_status = await self._get_ai_adjustment(form_data, features.signals)
         
-        # Calculate weighted base score
-        base_score = (
-            budget_score * self.default_weights["budget"] +
-            timeline_score * self.default_weights["timeline"] +
-            authority_score * self.default_weights["authority"] +
-            need_score * self.default_weights["need"] +
-            company_score * self.default_weights["company_size"]
+        return self._save_score(
+            submission_id, base_score, ai_adjustment, score_factors, ai_insights, signals, scoring_version, ai_status
+        )
+    
+    def score_rules_only(self, submission_id: UUID, form_data: Dict, user_id=None, features=None) -> LeadScore:
+        """
+        First phase of two-phase scoring, without calling the LLM.
+        
+        The rule-based score and keyword buying signals are persisted with
+        the rule-based signal adjustment and ai_status 'pending', until
+        apply_ai_adjustment replaces the adjustment with the AI's.
+        """
+        features = _submission_features(form_data, features)
+        base_score, score_factors, scoring_version = self._base_score(form_data, user_id, features)
+        signals = list(features.signals)
+        
+        return self._save_score(
+            submission_id, base_score, signal_adjustment(len(signals)), score_factors, {}, signals, scoring_version, "pending"
         )
+    
+    async def apply_ai_adjustment(self, lead_score_id: UUID) -> Optional[LeadScore]:
+        """
+        Second phase of two-phase scoring: AI adjustment of a pending score.
+        
+        A changed final score is recorded in LeadScoreHistory. When the AI is
+        unavailable the rule-based adjustment stays and the score is marked
+        'fallback', or stays 'pending' while the LLM circuit is open.
+        """
+        lead_score = self.db.query(LeadScore).filter(
+            LeadScore.id == lead_score_id,
+            LeadScore.ai_status == "pending"
+        ).first()
+        if not lead_score:
+            return None
+        
+        form_data = self.db.query(FormSubmission.answers).filter(
+            FormSubmission.id == str(lead_score.submission_id)
+        ).scalar() or {}
         
-        # Get AI adjustment based on buying signals
-        ai_adjustment, ai_insights, signals = await self._get_ai_adjustment(form_data)
+        try:
+            adjustment, ai_insights, ai_signals = await asyncio.to_thread(self._request_ai_adjustment, form_data)
+        except CircuitOpen:
+            # Stays pending, re-enriched when the circuit closes
+            return lead_score
+        except Exception as e:
+            logger.warning(f"AI adjustment of lead score {lead_score_id} failed, keeping the rule-based one: {e}")
+            lead_score.ai_status = "fallback"
+            self.db.commit()
+            return lead_score
         
+        self._apply_adjustment(lead_score, adjustment, ai_insights, ai_signals)
+        self.db.commit()
+        return lead_score
+    
+    def apply_ai_adjustments(self, lead_score_ids: List[UUID], batcher: Optional[LLMBatcher] = None) -> Dict[str, int]:
+        """
+        AI adjustment of many pending scores, LLM_BATCH_SIZE submissions per completion.
+        
+        Blocking, for bulk jobs and scripts. Returns the number of scores
+        'completed' and of scores left on their rule-based adjustment
+        ('fallback', or still 'pending' when the LLM circuit opened).
+        """
+        items = self.ai_adjustment_items(lead_score_ids)
+        if not items:
+            return {"completed": 0, "fallback": 0}
+        results = (batcher or LLMBatcher(self.openai_client)).complete(AI_ADJUSTMENT_TASK, items)
+        # Unanswered because the circuit opened: keep them pending for the re-enrichment
+        missing_status = "pending" if llm_circuit.is_open else "fallback"
+        return self.apply_ai_adjustment_results(list(items), results, missing_status)
+    
+    def ai_adjustment_items(self, lead_score_ids: List[UUID], ai_status: str = "pending") -> Dict[str, Dict]:
+        """Answers of the scores still waiting for their AI adjustment, keyed by score id"""
+        scores = self.db.query(LeadScore.id, LeadScore.submission_id).filter(
+            LeadScore.id.in_([UUID(str(lead_score_id)) for lead_score_id in lead_score_ids]),
+            LeadScore.ai_status == ai_status
+        ).all()
+        answers = dict(self.db.query(FormSubmission.id, FormSubmission.answers).filter(
+            FormSubmission.id.in_([str(score.submission_id) for score in scores])
+        ).all())
+        return {str(score.id): answers.get(str(score.submission_id)) or {} for score in scores}
+    
+    def apply_ai_adjustment_results(
+        self,
+        lead_score_ids: List,
+        results: Dict[str, Dict],
+        missing_status: str = "fallback"
+    ) -> Dict[str, int]:
+        """
+        Apply batched AI answers to pending or batched scores.
+        
+        Scores without a usable answer keep the rule-based adjustment and get
+        ``missing_status``, 'fallback' unless they are to be retried.
+        """
+        counts = {"completed": 0, "fallback": 0}
+        lead_scores = self.db.query(LeadScore).filter(
+            LeadScore.id.in_([UUID(str(lead_score_id)) for lead_score_id in lead_score_ids]),
+            LeadScore.ai_status.in_(["pending", "batched"])
+        ).all()
+        for lead_score in lead_scores:
+            result = results.get(str(lead_score.id))
+            try:
+                adjustment, ai_insights, ai_signals = _parse_ai_adjustment(result)
+            except (AttributeError, TypeError, ValueError):
+                lead_score.ai_status = missing_status
+                counts["fallback"] += 1
+                continue
+            self._apply_adjustment(lead_score, adjustment, ai_insights, ai_signals)
+            counts["completed"] += 1
+        
+        self.db.commit()
+        return counts
+    
+    def _apply_adjustment(self, lead_score: LeadScore, adjustment: int, ai_insights: Dict, ai_signals: List) -> None:
+        """Replace the rule-based adjustment of a score with the AI's, recording a changed score"""
+        previous_score = lead_score.final_score
+        signals = lead_score.buying_signals_detected or []
+        
+        lead_score.ai_adjustment = int(adjustment)
+        lead_score.final_score = min(100, lead_score.base_score + int(adjustment))
+        lead_score.score_category = score_category(lead_score.final_score)
+        lead_score.ai_insights = ai_insights
+        lead_score.buying_signals_detected = signals + [s for s in ai_signals if s not in signals]
+        lead_score.ai_status = "completed"
+        lead_score.calculated_at = datetime.utcnow()
+        
+        if lead_score.final_score != previous_score:
+            self.db.add(LeadScoreHistory(
+                lead_score_id=lead_score.id,
+                previous_score=previous_score,
+                new_score=lead_score.final_score,
+                change_reason="AI adjustment"
+            ))
+    
+    def _base_score(self, form_data: Dict, user_id, features) -> tuple[float, Dict, str]:
+        """Base score and factor breakdown from the tenant's rules or the default criteria"""
+        rule_plan = rule_plans.get(self.db, user_id) if user_id is not None else None
+        if rule_plan is not None:
+            rule_score = rule_plan.evaluate(form_data)
+            return rule_score.total, rule_score.factors, RULES_SCORING_VERSION
+        
+        base_score, score_factors = self._default_base_score(features)
+        return base_score, score_factors, DEFAULT_SCORING_VERSION
+    
+    def _save_score(
+        self,
+        submission_id: UUID,
+        base_score: float,
+        ai_adjustment: int,
+        score_factors: Dict,
+        ai_insights: Dict,
+        signals: List[str],
+        scoring_version: str,
+        ai_status: str
+    ) -> LeadScore:
         # Calculate final score (capped at 100)
         final_score = min(100, int(base_score + ai_adjustment))
         
-        # Determine category
-        if final_score >= 80:
-            category = "hot"
-        elif final_score >= 60:
-            category = "warm"
-        else:
-            category = "cold"
-        
-        # Create score factors breakdown
-        score_factors = {
-            "budget": {"value": budget_score, "weight": self.default_weights["budget"]},
-            "timeline": {"value": timeline_score, "weight": self.default_weights["timeline"]},
-            "authority": {"value": authority_score, "weight": self.default_weights["authority"]},
-            "need": {"value": need_score, "weight": self.default_weights["need"]},
-            "company_size": {"value": company_score, "weight": self.default_weights["company_size"]}
-        }
-        
         # Save to database
         lead_score = LeadScore(
             submission_id=submission_id,
@@ -131,9 +466,11 @@ class LeadScoringEngine:
             ai_adjustment=ai_adjustment,
             final_score=final_score,
             score_factors=score_factors,
-            score_category=category,
+            score_category=score_category(final_score),
             ai_insights=ai_insights,
             buying_signals_detected=signals,
+            scoring_version=scoring_version,
+            ai_status=ai_status,
             calculated_at=datetime.utcnow()
         )
         
@@ -143,184 +480,118 @@ class LeadScoringEngine:
         
         return lead_score
     
+    def _default_base_score(self, features) -> tuple[float, Dict]:
+        """Weighted base score over the default criteria, with its factor breakdown"""
+        # Calculate base score components
+        budget_score = self._budget_points(features.budget_amount)
+        timeline_score = self.timeline_scores[features.timeline]
+        authority_score = self.authority_scores[features.authority]
+        need_points = need_score(features.pain_count, features.need_count)
+        company_score = self.company_size_scores[features.company_size]
+        
+        # Calculate weighted base score
+        base_score = (
+            budget_score * self.default_weights["budget"] +
+            timeline_score * self.default_weights["timeline"] +
+            authority_score * self.default_weights["authority"] +
+            need_points * self.default_weights["need"] +
+            company_score * self.default_weights["company_size"]
+        )
+        
+        # Create score factors breakdown
+        score_factors = {
+            "budget": {"value": budget_score, "weight": self.default_weights["budget"]},
+            "timeline": {"value": timeline_score, "weight": self.default_weights["timeline"]},
+            "authority": {"value": authority_score, "weight": self.default_weights["authority"]},
+            "need": {"value": need_points, "weight": self.default_weights["need"]},
+            "company_size": {"value": company_score, "weight": self.default_weights["company_size"]}
+        }
+        return base_score, score_factors
+    
     def _score_budget(self, form_data: Dict) -> int:
         """Score based on budget information"""
-        budget_fields = ["budget", "investment", "spending", "price_range"]
-        
-        for field in budget_fields:
-            if field in form_data:
-                value = str(form_data[field]).lower()
-                
-                # Extract numeric value
-                numbers = re.findall(r'\d+', value.replace(',', ''))
-                if numbers:
-                    amount = int(numbers[0])
-                    
-                    # Check if it's in thousands (k) or millions (m)
-                    if 'k' in value:
-                        amount *= 1000
-                    elif 'm' in value:
-                        amount *= 1000000
-                    
-                    # Return score based on thresholds
-                    for threshold, score in self.budget_thresholds:
-                        if amount >= threshold:
-                            return score
-        
-        return 5  # Default low score if no budget info
+        return self._budget_points(budget_amount(form_data))
+    
+    def _budget_points(self, amount: Optional[int]) -> int:
+        if amount is not None:
+            # Return score based on thresholds
+            for threshold, score in self.budget_thresholds:
+                if amount >= threshold:
+                    return score
+        
+        return NO_BUDGET_SCORE  # Default low score if no budget info
     
     def _score_timeline(self, form_data: Dict) -> int:
         """Score based on purchase timeline"""
-        timeline_fields = ["timeline", "when", "timeframe", "purchase_date", "implementation"]
-        
-        for field in timeline_fields:
-            if field in form_data:
-                value = str(form_data[field]).lower()
-                
-                # Check for immediate indicators
-                if any(word in value for word in ["immediate", "asap", "urgent", "now"]):
-                    return self.timeline_scores["immediate"]
-                
-                # Check for month references
-                if "this month" in value or "30 days" in value:
-                    return self.timeline_scores["this_month"]
-                
-                # Check for quarter references
-                if "q1" in value or "first quarter" in value:
-                    return self.timeline_scores["q1"]
-                elif "q2" in value or "second quarter" in value:
-                    return self.timeline_scores["q2"]
-                elif "q3" in value or "third quarter" in value:
-                    return self.timeline_scores["q3"]
-                elif "q4" in value or "fourth quarter" in value:
-                    return self.timeline_scores["q4"]
-                
-                # Check for year references
-                if "next year" in value or "2026" in value:
-                    return self.timeline_scores["next_year"]
-        
-        return self.timeline_scores["no_timeline"]
+        return self.timeline_scores[timeline_level(form_data)]
     
     def _score_authority(self, form_data: Dict) -> int:
         """Score based on decision-making authority"""
-        authority_fields = ["role", "title", "position", "job_title", "authority"]
-        
-        decision_maker_keywords = ["ceo", "cto", "cfo", "president", "vp", "director", "head of", "manager", "owner", "founder"]
-        influencer_keywords = ["lead", "senior", "principal", "architect", "consultant"]
-        
-        for field in authority_fields:
-            if field in form_data:
-                value = str(form_data[field]).lower()
-                
-                # Check for decision maker
-                if any(keyword in value for keyword in decision_maker_keywords):
-                    return self.authority_scores["decision_maker"]
-                
-                # Check for influencer
-                if any(keyword in value for keyword in influencer_keywords):
-                    return self.authority_scores["influencer"]
-                
-                # Check for explicit authority mention
-                if "decision" in value or "approve" in value or "budget" in value:
-                    return self.authority_scores["decision_maker"]
-        
-        return self.authority_scores["unknown"]
+        return self.authority_scores[authority_level(form_data)]
     
     def _score_need(self, form_data: Dict) -> int:
         """Score based on identified needs and pain points"""
-        need_score = 0
-        max_score = 15
-        
-        # Convert all form data to searchable text
-        form_text = json.dumps(form_data).lower()
-        
-        # Check for pain point indicators
-        pain_indicators = ["problem", "challenge", "issue", "struggling", "difficult", "frustrat", "pain", "inefficient"]
-        pain_count = sum(1 for indicator in pain_indicators if indicator in form_text)
-        
-        # Check for specific needs
-        need_indicators = ["need", "require", "looking for", "want", "seeking", "must have"]
-        need_count = sum(1 for indicator in need_indicators if indicator in form_text)
-        
-        # Calculate score based on indicators found
-        indicator_score = min(max_score, (pain_count * 3) + (need_count * 2))
-        
-        return indicator_score
+        pain_count, need_count = need_indicator_counts(form_data)
+        return need_score(pain_count, need_count)
     
     def _score_company_size(self, form_data: Dict) -> int:
         """Score based on company size"""
-        size_fields = ["company_size", "employees", "team_size", "organization_size"]
-        
-        for field in size_fields:
-            if field in form_data:
-                value = str(form_data[field]).lower()
-                
-                # Extract numbers
-                numbers = re.findall(r'\d+', value.replace(',', ''))
-                if numbers:
-                    size = int(numbers[0])
-                    
-                    if size >= 1000 or "enterprise" in value:
-                        return self.company_size_scores["enterprise"]
-                    elif size >= 100 or "mid" in value:
-                        return self.company_size_scores["mid_market"]
-                    elif size >= 10 or "small" in value:
-                        return self.company_size_scores["small_business"]
-                    else:
-                        return self.company_size_scores["startup"]
-        
-        # Check company name field for size indicators
-        if "company" in form_data:
-            company = str(form_data["company"]).lower()
-            if any(corp in company for corp in ["inc", "corp", "llc", "ltd"]):
-                return self.company_size_scores["mid_market"]
-        
-        return self.company_size_scores["unknown"]
+        return self.company_size_scores[company_size_level(form_data)]
     
-    async def _get_ai_adjustment(self, form_data: Dict) -> tuple[int, Dict, List]:
-        """Use AI to detect buying signals and adjust score"""
-        form_text = json.dumps(form_data)
-        
-        # Detect buying signals
-        detected_signals = []
-        for signal_type, keywords in self.buying_signals.items():
-            if any(keyword in form_text.lower() for keyword in keywords):
-                detected_signals.append(signal_type)
+    async def _get_ai_adjustment(
+        self,
+        form_data: Dict,
+        detected_signals: Optional[List[str]] = None
+    ) -> tuple[int, Dict, List, str]:
+        """
+        Use AI to detect buying signals and adjust score.
+        
+        Also returns the ai_status to save: 'completed', 'fallback' when the
+        rule-based adjustment replaced a failed AI call, or 'pending' when the
+        LLM circuit was open, for the re-enrichment to adjust it later.
+        """
+        # Detect buying signals, unless already parsed at ingest
+        if detected_signals is None:
+            detected_signals = detect_buying_signals(form_data)
         
         # Get AI insights
         try:
-            prompt = f"""
-            Analyze this form submission for buying signals and lead quality.
-            
-            Form Data: {form_text}
-            
-            Provide:
-            1. Additional score adjustment (0-15 points)
-            2. Key buying signals detected
-            3. Recommended follow-up priority
-            
-            Format as JSON with keys: adjustment, signals, priority, insights
-            """
-            
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3,
-                max_tokens=500
-            )
-            
-            ai_response = json.loads(response.choices[0].message.content)
-            
-            return (
-                min(15, ai_response.get("adjustment", 0)),
-                ai_response.get("insights", {}),
-                detected_signals + ai_response.get("signals", [])
-            )
+            adjustment, ai_insights, ai_signals = await asyncio.to_thread(self._request_ai_adjustment, form_data)
+            return adjustment, ai_insights, detected_signals + ai_signals, "completed"
+        except CircuitOpen:
+            ai_status = "pending"
         except Exception as e:
-            print(f"AI scoring error: {e}")
-            # Fallback to rule-based adjustment
-            adjustment = len(detected_signals) * 2  # 2 points per signal
-            return min(15, adjustment), {}, detected_signals
+            logger.warning(f"AI scoring failed, using the rule-based adjustment: {e}")
+            ai_status = "fallback"
+        
+        # Fallback to rule-based adjustment
+        return signal_adjustment(len(detected_signals)), {}, detected_signals, ai_status
+    
+    def _request_ai_adjustment(self, form_data: Dict) -> tuple[int, Dict, List]:
+        """Blocking GPT-4 call for the score adjustment, insights and signals"""
+        form_text = json.dumps(form_data)
+        prompt = f"""
+        Analyze this form submission for buying signals and lead quality.
+        
+        Form Data: {form_text}
+        
+        Provide:
+        1. Additional score adjustment (0-15 points)
+        2. Key buying signals detected
+        3. Recommended follow-up priority
+        
+        Format as JSON with keys: adjustment, signals, priority, insights
+        """
+        
+        response = call_within_deadline(
+            self.openai_client,
+            model="gpt-4",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3,
+            max_tokens=500
+        )
+        
+        return _parse_ai_adjustment(json.loads(response.choices[0].message.content))
     
     def get_score_explanation(self, lead_score: LeadScore) -> Dict:
         """Get human-readable explanation of the score"""
@@ -346,4 +617,53 @@ class LeadScoringEngine:
                 "reason": "Buying signals detected"
             }
         
-        return explanation
\ No newline at end of file
+        return explanation
+
+
+def _parse_ai_adjustment(ai_response: Dict) -> tuple[int, Dict, List]:
+    """Capped adjustment, insights and signals of one AI answer"""
+    return (
+        min(MAX_AI_ADJUSTMENT, int(ai_response.get("adjustment", 0))),
+        ai_response.get("insights", {}),
+        ai_response.get("signals", [])
+    )
+
+
+def _submission_features(form_data: Dict, features=None):
+    """The given SubmissionFeatures, or the features extracted from the answers"""
+    if features is not None:
+        return features
+    # submission_features builds on this module's parsers
+    from app.services.submission_features import extract_submission_features
+    return extract_submission_features(form_data)
+
+
+_ai_adjustment_tasks: Set[asyncio.Task] = set()
+
+
+async def complete_ai_adjustment(lead_score_id: UUID) -> None:
+    """Apply the deferred AI adjustment of a score with a session of its own"""
+    db = SessionLocal()
+    try:
+        await LeadScoringEngine(db).apply_ai_adjustment(lead_score_id)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Deferred AI adjustment of lead score {lead_score_id} failed: {e}")
+    finally:
+        db.close()
+
+
+def schedule_ai_adjustment(lead_score_id: UUID) -> None:
+    """Run the AI adjustment of a pending score in the background"""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Called outside the event loop (sync services, scripts)
+        threading.Thread(
+            target=asyncio.run, args=(complete_ai_adjustment(lead_score_id),), daemon=True
+        ).start()
+        return
+    
+    task = loop.create_task(complete_ai_adjustment(lead_score_id))
+    _ai_adjustment_tasks.add(task)
+    task.add_done_callback(_ai_adjustment_tasks.discard)
@@ -0,0 +1,161 @@
+"""
+Offline LLM Batch Jobs
+Submits latency-tolerant bulk work as offline LLM batches and applies the results once collected
+
+Two kinds of work go through the provider's batch API:
+
+- lead_score_adjustment: scores waiting for their AI adjustment (ai_status
+  'pending'), e.g. created by a bulk rescore with defer_ai. They are
+  'batched' while their batch runs, so each score is submitted once, and
+  scores without a usable answer keep the rule-based adjustment ('fallback').
+- competitive_positioning: the positioning of recent competitive insights,
+  refreshed nightly.
+
+Every submitted batch is an LLMBatchJob row. collect_batches() checks the
+submitted ones, from any process, and applies the results of the batches
+that completed; poll_batches() repeats that until none is left.
+"""
+
+from typing import Dict, Optional
+from datetime import datetime
+from uuid import UUID
+import asyncio
+import logging
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.competitive_analysis import CompetitiveInsight
+from app.models.lead_score import LeadScore
+from app.models.llm_batch_job import LLMBatchJob
+from app.services.competitive_analysis import POSITIONING_TASK, CompetitiveAnalysisService
+from app.services.lead_scoring import AI_ADJUSTMENT_TASK, LeadScoringEngine
+from app.services.llm_batching import BatchTask, LLMBatcher, LLMBatchFailed
+
+logger = logging.getLogger(__name__)
+
+
+def submit_ai_adjustments(db: Session, batcher: Optional[LLMBatcher] = None, limit: Optional[int] = None) -> Optional[LLMBatchJob]:
+    """Submit the pending AI adjustments, oldest scores first, as one offline batch"""
+    query = db.query(LeadScore.id).filter(LeadScore.ai_status == "pending").order_by(LeadScore.calculated_at)
+    if limit:
+        query = query.limit(limit)
+
+    engine = LeadScoringEngine(db)
+    items = engine.ai_adjustment_items([row.id for row in query])
+    if not items:
+        return None
+
+    job = _submit(db, batcher or LLMBatcher(engine.openai_client), AI_ADJUSTMENT_TASK, items)
+    db.query(LeadScore).filter(
+        LeadScore.id.in_([UUID(lead_score_id) for lead_score_id in items]),
+        LeadScore.ai_status == "pending"
+    ).update({LeadScore.ai_status: "batched"}, synchronize_session=False)
+    db.commit()
+    return job
+
+
+def submit_positioning_refresh(db: Session, since: datetime, batcher: Optional[LLMBatcher] = None) -> Optional[LLMBatchJob]:
+    """Submit the positioning of the competitive insights created since ``since`` as one offline batch"""
+    insight_ids = [
+        row.id for row in db.query(CompetitiveInsight.id).filter(
+            CompetitiveInsight.created_at >= since,
+            CompetitiveInsight.competitor_id.isnot(None)
+        )
+    ]
+    service = CompetitiveAnalysisService(db)
+    items = service.positioning_items(insight_ids)
+    if not items:
+        return None
+
+    job = _submit(db, batcher or LLMBatcher(service.openai_client), POSITIONING_TASK, items)
+    db.commit()
+    return job
+
+
+def collect_batches(db: Session, batcher: Optional[LLMBatcher] = None) -> Dict[str, int]:
+    """
+    Check every submitted batch once and apply the results of completed ones.
+
+    Returns the number of batches collected, failed and still running.
+    """
+    batcher = batcher or LLMBatcher()
+    counts = {"collected": 0, "failed": 0, "running": 0}
+    jobs = db.query(LLMBatchJob).filter(LLMBatchJob.status == "submitted").order_by(LLMBatchJob.submitted_at).all()
+
+    for job in jobs:
+        try:
+            results = batcher.collect(job.provider_batch_id, job.item_ids)
+        except LLMBatchFailed as e:
+            logger.warning(f"LLM batch {job.id} failed, its items are released: {e}")
+            _release(db, job)
+            job.status, job.error_message, job.collected_at = "failed", str(e), datetime.utcnow()
+            db.commit()
+            counts["failed"] += 1
+            continue
+        except Exception as e:
+            # Provider unreachable, checked again on the next round
+            logger.warning(f"Checking LLM batch {job.id} failed: {e}")
+            counts["running"] += 1
+            continue
+
+        if results is None:
+            counts["running"] += 1
+            continue
+
+        job.applied_count = _apply(db, job, results)
+        job.status, job.collected_at = "collected", datetime.utcnow()
+        db.commit()
+        counts["collected"] += 1
+        logger.info(f"Collected LLM batch {job.id}: {job.applied_count} of {len(job.item_ids)} {job.kind} items applied")
+
+    return counts
+
+
+async def poll_batches(
+    batcher: Optional[LLMBatcher] = None,
+    interval: float = settings.LLM_BATCH_POLL_INTERVAL
+) -> None:
+    """Collect submitted batches every ``interval`` seconds until none is running"""
+    while True:
+        # Each round in a session of its own, batches run for hours
+        db = SessionLocal()
+        try:
+            counts = await asyncio.to_thread(collect_batches, db, batcher)
+        finally:
+            db.close()
+        if not counts["running"]:
+            return
+        await asyncio.sleep(interval)
+
+
+def _submit(db: Session, batcher: LLMBatcher, task: BatchTask, items: Dict[str, Dict]) -> LLMBatchJob:
+    job = LLMBatchJob(
+        kind=task.kind,
+        provider_batch_id=batcher.submit(task, items),
+        item_ids=list(items),
+        status="submitted",
+        submitted_at=datetime.utcnow()
+    )
+    db.add(job)
+    return job
+
+
+def _apply(db: Session, job: LLMBatchJob, results: Dict[str, Dict]) -> int:
+    """Apply a completed batch's results with the service of its kind, returning the items applied"""
+    if job.kind == AI_ADJUSTMENT_TASK.kind:
+        return LeadScoringEngine(db).apply_ai_adjustment_results(job.item_ids, results)["completed"]
+    if job.kind == POSITIONING_TASK.kind:
+        return CompetitiveAnalysisService(db).apply_positioning_results(results)
+    logger.error(f"LLM batch {job.id} has unknown kind {job.kind}, results dropped")
+    return 0
+
+
+def _release(db: Session, job: LLMBatchJob) -> None:
+    """Make the items of a failed batch eligible for the next submission"""
+    if job.kind == AI_ADJUSTMENT_TASK.kind:
+        db.query(LeadScore).filter(
+            LeadScore.id.in_([UUID(lead_score_id) for lead_score_id in job.item_ids]),
+            LeadScore.ai_status == "batched"
+        ).update({LeadScore.ai_status: "pending"}, synchronize_session=False)
@@ -0,0 +1,215 @@
+"""
+LLM Request Batching
+Packs many items into one structured chat completion, sent right away or as an offline batch
+
+Bulk jobs (bulk recommendations, AI adjustment of pending lead scores,
+competitive positioning refreshes) used to send one chat completion per
+lead, repeating the same instructions every time. A BatchTask holds the
+instructions once; the items of a chunk are sent together as a JSON object
+keyed by item id and the model answers with one JSON object per id.
+Up to LLM_BATCH_SIZE items go into one prompt, fewer when the prompt and
+the answer tokens reserved per item would not fit the model's context.
+
+LLMBatcher.complete sends the chunks right away. Latency-tolerant jobs use
+submit() instead: every chunk becomes one line of a JSONL file uploaded for
+the provider's batch API, which answers within the completion window at a
+lower price. collect() polls the batch and returns the per-item outputs once
+it has completed.
+
+Items missing from an answer, or whose answer is not a JSON object, are left
+out of the results so callers fall back per item, e.g. to their rule-based
+path.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional
+from dataclasses import dataclass
+import json
+import logging
+
+import openai
+
+from app.config import settings
+from app.services.llm_circuit import llm_circuit
+
+logger = logging.getLogger(__name__)
+
+CHAT_COMPLETIONS_ENDPOINT = "/v1/chat/completions"
+
+# Batch statuses after which no output will come
+FAILED_BATCH_STATUSES = ("failed", "expired", "cancelled")
+
+# Conservative estimate for English text and JSON, no tokenizer is installed
+CHARS_PER_TOKEN = 3
+# Tokens the chat format adds per message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class LLMBatchFailed(Exception):
+    """Raised when an offline batch ended without output"""
+
+
+@dataclass(frozen=True)
+class BatchTask:
+    """Instructions shared by the items of a batch and the shape of each item's answer"""
+    kind: str
+    instructions: str
+    output_format: str  # Keys of the per-item JSON object, as described to the model
+    max_tokens_per_item: int = 300
+    temperature: float = 0.3
+    model: str = "gpt-4"
+    context_tokens: int = 8192  # Prompt plus completion limit of the model
+
+    def messages(self, items: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Chat messages asking for one answer per item id"""
+        return [
+            {
+                "role": "system",
+                "content": (
+                    f"{self.instructions}\n\n"
+                    "The user message is a JSON object mapping item ids to items. Answer with a single "
+                    "JSON object that has one key per item id, each value a JSON object with keys: "
+                    f"{self.output_format}. Answer every item independently and add no other text."
+                )
+            },
+            {"role": "user", "content": json.dumps(items, default=str)}
+        ]
+
+    def prompt_tokens(self, items: Dict[str, Any]) -> int:
+        """Upper estimate of the prompt tokens of a chunk"""
+        messages = self.messages(items)
+        chars = sum(len(message["content"]) for message in messages)
+        return -(-chars // CHARS_PER_TOKEN) + MESSAGE_OVERHEAD_TOKENS * len(messages)
+
+    def fits(self, items: Dict[str, Any]) -> bool:
+        """Whether the prompt and the answer tokens of the chunk fit the model's context"""
+        return self.prompt_tokens(items) + self.max_tokens_per_item * len(items) <= self.context_tokens
+
+    def request_body(self, items: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "messages": self.messages(items),
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens_per_item * len(items)
+        }
+
+
+def parse_results(content: str, item_ids) -> Dict[str, Dict[str, Any]]:
+    """Per-item answers of a batched completion, only for the requested ids"""
+    try:
+        answer = json.loads(content)
+    except (TypeError, ValueError):
+        logger.warning("Batched completion is not valid JSON, its items fall back")
+        return {}
+    if not isinstance(answer, dict):
+        return {}
+    return {
+        item_id: answer[item_id]
+        for item_id in item_ids
+        if isinstance(answer.get(item_id), dict)
+    }
+
+
+class LLMBatcher:
+    """Sends the items of a BatchTask in chunks of up to ``batch_size`` per chat completion"""
+
+    def __init__(self, client=None, batch_size: int = settings.LLM_BATCH_SIZE):
+        self.client = client or openai.Client(api_key=settings.OPENAI_API_KEY)
+        self.batch_size = max(1, batch_size)
+
+    def chunks(self, task: BatchTask, items: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Items in order, ``batch_size`` per chunk at most and as many as fit the task's context.
+
+        An item too large to fit on its own still gets a chunk, which the
+        provider rejects and the item falls back.
+        """
+        chunk: Dict[str, Any] = {}
+        for item_id, item in items.items():
+            candidate = {**chunk, item_id: item}
+            if chunk and (len(candidate) > self.batch_size or not task.fits(candidate)):
+                yield chunk
+                candidate = {item_id: item}
+            chunk = candidate
+        if chunk:
+            yield chunk
+
+    # ------------------------------------------------------------------
+    # Online
+    # ------------------------------------------------------------------
+
+    def complete(self, task: BatchTask, items: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Answers for the items, one blocking chat completion per chunk.
+
+        A failed chunk is logged and its items are missing from the result.
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        for chunk in self.chunks(task, items):
+            try:
+                response = llm_circuit.call(self.client.chat.completions.create, **task.request_body(chunk))
+            except Exception as e:
+                logger.warning(f"Batched {task.kind} completion of {len(chunk)} items failed: {e}")
+                continue
+            results.update(parse_results(response.choices[0].message.content, chunk))
+        return results
+
+    # ------------------------------------------------------------------
+    # Offline
+    # ------------------------------------------------------------------
+
+    def submit(self, task: BatchTask, items: Dict[str, Any]) -> str:
+        """Submit the chunks as an offline batch and return the provider's batch id"""
+        lines = [
+            json.dumps({
+                "custom_id": f"{task.kind}-{index}",
+                "method": "POST",
+                "url": CHAT_COMPLETIONS_ENDPOINT,
+                "body": task.request_body(chunk)
+            }, default=str)
+            for index, chunk in enumerate(self.chunks(task, items))
+        ]
+        input_file = self.client.files.create(
+            file=(f"{task.kind}.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch"
+        )
+        # Not wrapped by the installed client, posted as a plain API call
+        batch = self.client.post("/batches", cast_to=Dict[str, Any], body={
+            "input_file_id": input_file.id,
+            "endpoint": CHAT_COMPLETIONS_ENDPOINT,
+            "completion_window": settings.LLM_BATCH_COMPLETION_WINDOW,
+            "metadata": {"kind": task.kind}
+        })
+        logger.info(f"Submitted {task.kind} batch {batch['id']} with {len(items)} items in {len(lines)} requests")
+        return batch["id"]
+
+    def collect(self, batch_id: str, item_ids) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Answers of a submitted batch for the given item ids.
+
+        Returns None while the batch is still running and raises LLMBatchFailed
+        when it ended without output.
+        """
+        batch = self.client.get(f"/batches/{batch_id}", cast_to=Dict[str, Any])
+        status = batch.get("status")
+        if status in FAILED_BATCH_STATUSES:
+            raise LLMBatchFailed(f"Batch {batch_id} {status}: {batch.get('errors')}")
+        if status != "completed":
+            return None
+
+        item_ids = set(item_ids)
+        results: Dict[str, Dict[str, Any]] = {}
+        if not batch.get("output_file_id"):
+            return results
+
+        output = self.client.files.content(batch["output_file_id"])
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") != 200:
+                logger.warning(f"Request {record.get('custom_id')} of batch {batch_id} failed: {record.get('error')}")
+                continue
+            content = response["body"]["choices"][0]["message"]["content"]
+            results.update(parse_results(content, item_ids))
+        return results
@@ -0,0 +1,215 @@
+"""
+LLM Circuit Breaker
+Fails LLM calls fast while the provider is erroring or slow, so AI paths fall back to their rules
+
+Every chat completion made by the AI processor, lead scoring, recommendations,
+competitive analysis and the batching layer goes through the process-wide
+``llm_circuit``. It keeps the outcome and latency of the last
+LLM_CIRCUIT_WINDOW calls; a call that raised or took longer than
+LLM_CIRCUIT_SLOW_CALL_SECONDS counts as failed. A call its caller cut short
+(CallCancelled, e.g. a deadline) is not counted.
+
+- closed: calls go through. Once at least LLM_CIRCUIT_MIN_CALLS are in the
+  window and LLM_CIRCUIT_FAILURE_RATE of them failed, the circuit opens.
+- open: calls raise CircuitOpen immediately, callers take their rule-based
+  path instead of waiting out the client timeout. After
+  LLM_CIRCUIT_OPEN_SECONDS the circuit is half-open.
+- half_open: one probe call at a time goes through, the others still fail
+  fast. A successful probe closes the circuit, a failed one opens it again.
+
+Output produced by a fallback is marked by its callers (dashboards 'degraded',
+lead scores left 'pending'); the on_close listeners, see ai_reenrichment,
+enrich it again once the circuit closes. The state is per process, like the
+provider's view of each worker's connections.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+from collections import deque
+import logging
+import threading
+import time
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling the LLM while the circuit is open"""
+
+
+class CallCancelled(Exception):
+    """Raised by a blocking call its caller cut short, which is not counted as a failure"""
+
+
+class LLMCircuitBreaker:
+    """Error rate and latency based circuit breaker around blocking and async LLM calls"""
+
+    def __init__(
+        self,
+        window: int = settings.LLM_CIRCUIT_WINDOW,
+        min_calls: int = settings.LLM_CIRCUIT_MIN_CALLS,
+        failure_rate: float = settings.LLM_CIRCUIT_FAILURE_RATE,
+        slow_call_seconds: float = settings.LLM_CIRCUIT_SLOW_CALL_SECONDS,
+        open_seconds: float = settings.LLM_CIRCUIT_OPEN_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.clock = clock
+
+        self._outcomes: deque = deque(maxlen=window)  # True for a failed or slow call
+        self._latencies: deque = deque(maxlen=window)  # Seconds, of the calls that returned
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._close_listeners: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking LLM call through the breaker, raises CircuitOpen without calling while open"""
+        probe = self._before_call()
+        started = self.clock()
+        try:
+            result = fn(*args, **kwargs)
+        except CallCancelled:
+            # Cut short by its caller (a deadline), which says nothing about the provider
+            self._release_probe(probe)
+            raise
+        except Exception:
+            self._after_call(probe, self.clock() - started, failed=True)
+            raise
+        self._after_call(probe, self.clock() - started, failed=False)
+        return result
+
+    async def acall(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Await an async LLM call through the breaker, raises CircuitOpen without calling while open"""
+        probe = self._before_call()
+        started = self.clock()
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception:
+            self._after_call(probe, self.clock() - started, failed=True)
+            raise
+        except BaseException:
+            # Cancelled, which says nothing about the provider, but frees the probe slot
+            self._release_probe(probe)
+            raise
+        self._after_call(probe, self.clock() - started, failed=False)
+        return result
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls fail fast: open, or half-open with the probe call in flight"""
+        with self._lock:
+            state = self._current_state()
+            return state == OPEN or (state == HALF_OPEN and self._probe_in_flight)
+
+    def on_close(self, callback: Callable[[], None]) -> None:
+        """Call ``callback`` (from the thread whose call closed it) each time the circuit closes again"""
+        self._close_listeners.append(callback)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Latency of the recent calls that returned, None before any did"""
+        with self._lock:
+            return self._percentile_locked(percentile)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = len(self._outcomes)
+            return {
+                "state": self._current_state(),
+                "recent_calls": calls,
+                "failure_rate": sum(self._outcomes) / calls if calls else 0.0,
+                "p95_latency": self._percentile_locked(0.95)
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._outcomes.clear()
+            self._latencies.clear()
+            self._state = CLOSED
+            self._probe_in_flight = False
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self.clock() - self._opened_at >= self.open_seconds:
+            return HALF_OPEN
+        return self._state
+
+    def _percentile_locked(self, percentile: float) -> Optional[float]:
+        latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(percentile * len(latencies)))]
+
+    def _before_call(self) -> bool:
+        """Admit a call, returning whether it is the half-open probe"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return False
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._state = HALF_OPEN
+                self._probe_in_flight = True
+                return True
+        raise CircuitOpen("LLM circuit is open, using the fallback")
+
+    def _release_probe(self, probe: bool) -> None:
+        if probe:
+            with self._lock:
+                self._probe_in_flight = False
+
+    def _after_call(self, probe: bool, latency: float, failed: bool) -> None:
+        slow = latency > self.slow_call_seconds
+        closed = False
+        with self._lock:
+            if probe:
+                self._probe_in_flight = False
+            if not failed:
+                self._latencies.append(latency)
+
+            if probe:
+                if failed or slow:
+                    self._open(f"probe call {'failed' if failed else f'took {latency:.1f}s'}")
+                else:
+                    self._outcomes.clear()
+                    self._state = CLOSED
+                    closed = True
+                    logger.info("LLM circuit closed, the provider answered the probe call")
+            elif self._state == CLOSED:
+                self._outcomes.append(failed or slow)
+                calls = len(self._outcomes)
+                if calls >= self.min_calls and sum(self._outcomes) / calls >= self.failure_rate:
+                    self._open(f"{sum(self._outcomes)} of the last {calls} calls failed or were slow")
+
+        if closed:
+            for callback in self._close_listeners:
+                try:
+                    callback()
+                except Exception as e:
+                    logger.error(f"LLM circuit close listener failed: {e}")
+
+    def _open(self, reason: str) -> None:
+        self._state = OPEN
+        self._opened_at = self.clock()
+        logger.warning(f"LLM circuit opened for {self.open_seconds}s: {reason}")
+
+
+llm_circuit = LLMCircuitBreaker()
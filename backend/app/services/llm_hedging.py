@@ -0,0 +1,217 @@
+"""
+Deadline-aware and Hedged LLM Requests
+Bounds LLM requests by the deadline of the work they belong to and duplicates tail-latency requests
+
+Deadlines: a pipeline step opens ``llm_deadline(seconds)``; requests made
+inside it, in the same task, its child tasks or threads started with
+asyncio.to_thread, share the absolute deadline (nested deadlines only
+tighten it). An async request still running at the deadline is cancelled and
+raises DeadlineExceeded, so the caller takes its fallback in time. Blocking
+requests sent with call_within_deadline get the remaining time as their
+client timeout, without retries, and raise DeadlineExceeded when it runs out.
+
+Hedging: once LLM_HEDGE_MIN_SAMPLES latencies were observed, a request that
+has not answered after the p95 latency of the recent requests gets a
+duplicate. Whichever answers first wins, the other is cancelled. A hedge is
+only sent while at most LLM_HEDGE_MAX_RATE of the recent requests were
+hedged, so the tail shrinks for a bounded share of extra spend.
+
+Every attempt goes through the LLM circuit breaker; attempts cancelled by a
+deadline or a faster duplicate are not counted as failures.
+"""
+
+from typing import Any, Callable, Dict, Iterator, Optional
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+import asyncio
+import logging
+import threading
+import time
+
+import openai
+
+from app.config import settings
+from app.services.llm_circuit import CallCancelled, LLMCircuitBreaker, llm_circuit
+
+logger = logging.getLogger(__name__)
+
+# Absolute time.monotonic() deadline of the current unit of work
+_deadline: ContextVar[Optional[float]] = ContextVar("llm_deadline", default=None)
+
+
+class DeadlineExceeded(CallCancelled, TimeoutError):
+    """Raised when an LLM request would end after the deadline of its work"""
+
+
+@contextmanager
+def llm_deadline(seconds: Optional[float]) -> Iterator[None]:
+    """LLM requests made inside must answer within ``seconds``, None for no deadline"""
+    if seconds is None:
+        yield
+        return
+
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left until the current deadline, None without one"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def call_within_deadline(client: openai.Client, circuit: LLMCircuitBreaker = llm_circuit, **request) -> Any:
+    """
+    Blocking chat completion through the circuit, bounded by the current deadline.
+
+    Under a deadline the request is sent with the remaining time as its
+    timeout and no retries, a request cut off by it raises DeadlineExceeded.
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return circuit.call(client.chat.completions.create, **request)
+    if remaining <= 0:
+        raise DeadlineExceeded("Deadline passed before the LLM request was sent")
+
+    bounded = client.with_options(timeout=remaining, max_retries=0)
+
+    def create() -> Any:
+        try:
+            return bounded.chat.completions.create(**request)
+        except openai.APITimeoutError as e:
+            raise DeadlineExceeded(f"No LLM answer within the deadline ({remaining:.1f}s)") from e
+
+    return circuit.call(create)
+
+
+class HedgedRequester:
+    """Sends async LLM requests within the current deadline, hedging the slow ones"""
+
+    def __init__(
+        self,
+        enabled: bool = settings.LLM_HEDGING_ENABLED,
+        max_hedge_rate: float = settings.LLM_HEDGE_MAX_RATE,
+        min_samples: int = settings.LLM_HEDGE_MIN_SAMPLES,
+        window: int = settings.LLM_HEDGE_LATENCY_WINDOW,
+        percentile: float = 0.95,
+        circuit: LLMCircuitBreaker = llm_circuit
+    ):
+        self.enabled = enabled
+        self.max_hedge_rate = max_hedge_rate
+        self.min_samples = min_samples
+        self.percentile = percentile
+        self.circuit = circuit
+
+        self._latencies: deque = deque(maxlen=window)  # Seconds, of the winning attempts
+        self._hedged: deque = deque(maxlen=window)  # Per finished request, whether it was hedged
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def request(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Await ``fn(*args, **kwargs)``, an async LLM call, hedged and bounded by the deadline.
+
+        Raises DeadlineExceeded when no attempt answered in time, CircuitOpen
+        while the circuit is open, or the error of the last failed attempt.
+        """
+        deadline = _deadline.get()
+        if deadline is not None and time.monotonic() >= deadline:
+            raise DeadlineExceeded("Deadline passed before the LLM request was sent")
+
+        hedge_after = self.hedge_delay()
+        attempts: Dict[asyncio.Future, float] = {}
+
+        def launch() -> None:
+            attempts[asyncio.ensure_future(self.circuit.acall(fn, *args, **kwargs))] = time.monotonic()
+
+        launch()
+        started = time.monotonic()
+        hedged = False
+        error: Optional[BaseException] = None
+        try:
+            while attempts:
+                now = time.monotonic()
+                waits = []
+                if deadline is not None:
+                    waits.append(deadline - now)
+                if hedge_after is not None:
+                    waits.append(started + hedge_after - now)
+                done, _ = await asyncio.wait(
+                    list(attempts),
+                    timeout=max(0.0, min(waits)) if waits else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+
+                for attempt in done:
+                    attempt_started = attempts.pop(attempt)
+                    if attempt.exception() is None:
+                        self._record(time.monotonic() - attempt_started, hedged)
+                        return attempt.result()
+                    error = attempt.exception()
+
+                if not attempts:
+                    break
+                if deadline is not None and time.monotonic() >= deadline:
+                    self._record(None, hedged)
+                    raise DeadlineExceeded(f"No LLM answer within the deadline ({len(attempts)} attempts cancelled)")
+                if hedge_after is not None and time.monotonic() - started >= hedge_after:
+                    # One duplicate per request at most
+                    hedge_after = None
+                    if self._take_hedge():
+                        hedged = True
+                        launch()
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+        self._record(None, hedged)
+        raise error
+
+    def hedge_delay(self) -> Optional[float]:
+        """Wait before a request is duplicated, None while hedging is off or not yet calibrated"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(self.percentile * len(latencies)))]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = len(self._hedged)
+            hedge_rate = sum(self._hedged) / requests if requests else 0.0
+        return {
+            "enabled": self.enabled,
+            "hedge_delay": self.hedge_delay(),
+            "recent_requests": requests,
+            "hedge_rate": hedge_rate
+        }
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _take_hedge(self) -> bool:
+        """Whether one more hedge keeps the recent hedge rate within budget"""
+        with self._lock:
+            # Counting this request, which is still running
+            return (sum(self._hedged) + 1) / (len(self._hedged) + 1) <= self.max_hedge_rate
+
+    def _record(self, latency: Optional[float], hedged: bool) -> None:
+        with self._lock:
+            self._hedged.append(hedged)
+            if latency is not None:
+                self._latencies.append(latency)
+
+
+llm_requests = HedgedRequester()
@@ -0,0 +1,84 @@
+"""
+Follow-up Recommendation Cache (FA-47)
+Generated recommendations reused until a lead's inputs change
+
+Recommendations are a function of the lead's answers and features, its score
+and category, the urgency and the engine version. recommendation_key hashes
+those inputs; a cached result is served only under the key it was generated
+for, so re-scoring a lead, new answers or an ENGINE_VERSION bump regenerate
+it without explicit eviction.
+
+Reads go through two tiers like the dashboard cache: the shared cache layer
+(in-process LRU or Redis, see app.core.cache), then the recommendations
+stored on the lead's LeadScore row.
+"""
+
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import CacheNamespace, cache_manager
+from app.models.lead_score import LeadScore
+from app.services.follow_up_engine import ENGINE_VERSION
+from app.services.submission_features import SubmissionFeatures
+
+# Entries are keyed by their inputs and never go stale, the TTL only bounds storage
+RESULT_TTL = 6 * 60 * 60
+
+
+def recommendation_key(
+    lead_data: Dict[str, Any],
+    lead_score: int,
+    score_category: Optional[str],
+    urgency: str = 'medium',
+    features: Optional[SubmissionFeatures] = None
+) -> str:
+    """Stable hash of everything generated recommendations depend on"""
+    inputs = {
+        "lead_data": lead_data,
+        "lead_score": lead_score,
+        "score_category": score_category,
+        "urgency": urgency,
+        "features": features.to_dict() if features is not None else None,
+        "version": ENGINE_VERSION
+    }
+    encoded = json.dumps(inputs, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class RecommendationCache:
+    """Generated recommendations in the shared cache in front of the LeadScore row"""
+
+    def __init__(self, cache: Optional[CacheNamespace] = None):
+        self.cache = cache or cache_manager.namespace("recommendations", ttl=RESULT_TTL)
+
+    def get(self, lead_score: LeadScore, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Recommendations generated for ``key``, from the cache or the score row"""
+        recommendations = self.cache.get(f"{lead_score.id}:{key}")
+        if recommendations is not None:
+            return recommendations
+
+        if lead_score.recommendations_key != key or lead_score.recommendations is None:
+            return None
+
+        self.cache.set(f"{lead_score.id}:{key}", lead_score.recommendations)
+        return lead_score.recommendations
+
+    def put(self, lead_score: LeadScore, key: str, recommendations: List[Dict[str, Any]]) -> None:
+        """Store recommendations on the score row (committed by the caller) and in the cache"""
+        lead_score.recommendations = recommendations
+        lead_score.recommendations_key = key
+        self.cache.set(f"{lead_score.id}:{key}", recommendations)
+
+    def store(self, db: Session, lead_score_id, key: str, recommendations: List[Dict[str, Any]]) -> None:
+        """Like put, for a score row that is not loaded in ``db``"""
+        db.query(LeadScore).filter(LeadScore.id == lead_score_id).update(
+            {LeadScore.recommendations: recommendations, LeadScore.recommendations_key: key},
+            synchronize_session=False
+        )
+        self.cache.set(f"{lead_score_id}:{key}", recommendations)
+
+
+recommendation_cache = RecommendationCache()
@@ -0,0 +1,178 @@
+"""
+Hash Join for Multi-Form Aggregation (FA-44)
+Merges records from several form sources on a shared key in a single pass
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+
+CONFLICT_RESOLUTIONS = ("latest", "average", "priority")
+JOIN_TYPES = ("outer", "inner")
+
+
+def normalize_join_key(value: Any) -> Optional[str]:
+    """
+    Normalize a join key value so "Ann@Example.com " and "ann@example.com" match
+    """
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    key = str(value).strip().lower()
+    return key or None
+
+
+class _JoinedRecord:
+    """Accumulated state for one join key"""
+
+    __slots__ = (
+        "values", "ranks", "sums", "counts", "mixed", "sources", "source_ids",
+        "latest_at", "latest_source", "record_count", "source_mask"
+    )
+
+    def __init__(self):
+        self.values: Dict[str, Any] = {}
+        self.ranks: Dict[str, Any] = {}
+        self.sums: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.mixed: Set[str] = set()  # Averaged fields that had a non-numeric value, resolved by latest
+        self.sources: List[str] = []
+        self.source_ids: List[str] = []
+        self.latest_at: str = ""
+        self.latest_source: Optional[str] = None
+        self.record_count = 0
+        self.source_mask = 0
+
+
+class HashJoinAggregator:
+    """
+    Streaming hash join across form sources.
+
+    Records are consumed one at a time and folded into a hash table keyed by
+    the normalized join key, so the join is O(total records) and memory grows
+    with the number of distinct keys rather than the number of records.
+
+    Conflicting field values are resolved per field:
+        latest   - value from the most recently submitted record
+        priority - value from the source with the highest mapping priority
+                   (ties broken by submission time)
+        average  - mean of numeric values; fields with any non-numeric value
+                   fall back to latest
+    """
+
+    def __init__(
+        self,
+        join_key: str,
+        conflict_resolution: str = "latest",
+        join_type: str = "outer"
+    ):
+        if not join_key:
+            raise ValueError("join aggregation requires a join_key")
+        if conflict_resolution not in CONFLICT_RESOLUTIONS:
+            raise ValueError(f"Unknown conflict resolution: {conflict_resolution}")
+        if join_type not in JOIN_TYPES:
+            raise ValueError(f"Unknown join type: {join_type}")
+
+        self.join_key = join_key
+        self.conflict_resolution = conflict_resolution
+        self.join_type = join_type
+
+        self._table: Dict[str, _JoinedRecord] = {}
+        self._unmatched: List[Dict] = []
+        self._source_count = 0
+
+    def add_source(
+        self,
+        records: Iterable[Dict],
+        source_title: str,
+        priority: int = 0,
+        form_type: Optional[str] = None
+    ) -> None:
+        """Fold every record of one source into the join table"""
+        source_index = self._source_count
+        self._source_count += 1
+
+        for record in records:
+            self.add(record, source_index, source_title, priority, form_type)
+
+    def add(
+        self,
+        record: Dict,
+        source_index: int,
+        source_title: str,
+        priority: int = 0,
+        form_type: Optional[str] = None
+    ) -> None:
+        """Fold a single record into the join table"""
+        key = normalize_join_key(record.get(self.join_key))
+
+        if key is None:
+            if self.join_type == "outer":
+                unmatched = dict(record)
+                unmatched["_form_source"] = source_title
+                unmatched["_form_type"] = form_type
+                self._unmatched.append(unmatched)
+            return
+
+        joined = self._table.get(key)
+        if joined is None:
+            joined = self._table[key] = _JoinedRecord()
+
+        joined.source_mask |= 1 << source_index
+        joined.record_count += 1
+        submitted_at = record.get("_submitted_at") or ""
+        if submitted_at >= joined.latest_at:
+            joined.latest_at = submitted_at
+            joined.latest_source = source_title
+        if source_title not in joined.sources:
+            joined.sources.append(source_title)
+        if record.get("_source_id"):
+            joined.source_ids.append(record["_source_id"])
+
+        rank = (priority, submitted_at) if self.conflict_resolution == "priority" else submitted_at
+        averaging = self.conflict_resolution == "average"
+
+        for field, value in record.items():
+            if value is None or field.startswith("_"):
+                continue
+
+            if averaging and field not in joined.mixed:
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    joined.sums[field] = joined.sums.get(field, 0) + value
+                    joined.counts[field] = joined.counts.get(field, 0) + 1
+                else:
+                    # Not averageable after all, the latest value resolves it
+                    joined.mixed.add(field)
+                    joined.sums.pop(field, None)
+                    joined.counts.pop(field, None)
+
+            # The latest value is kept for averaged fields too, in case they turn mixed
+            current = joined.ranks.get(field)
+            if current is None or rank >= current:
+                joined.values[field] = value
+                joined.ranks[field] = rank
+
+    def results(self) -> Iterator[Dict]:
+        """Yield merged records followed by unmatched records (outer join)"""
+        all_sources = (1 << self._source_count) - 1
+
+        for key, joined in self._table.items():
+            if self.join_type == "inner" and joined.source_mask != all_sources:
+                continue
+
+            # A field is resolved either by its average or by its latest value, never both
+            record = {field: value for field, value in joined.values.items() if field not in joined.sums}
+            for field, total in joined.sums.items():
+                record[field] = total / joined.counts[field]
+
+            record["_join_key"] = key
+            record["_submitted_at"] = joined.latest_at or None
+            record["_form_source"] = joined.latest_source
+            record["_sources"] = joined.sources
+            record["_source_ids"] = joined.source_ids
+            record["_record_count"] = joined.record_count
+            yield record
+
+        yield from self._unmatched
+
+    @property
+    def key_count(self) -> int:
+        return len(self._table)
@@ -0,0 +1,315 @@
+"""
+Submission Rollup Service
+Maintains hourly/daily submission rollups on ingest and serves time-series queries
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+import logging
+
+from app.models.form import FormSubmission, Dashboard
+from app.models.submission_rollup import SubmissionRollup
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("hour", "day")
+SCOPE_TYPES = ("form", "user")
+
+# Ranges longer than this are served from daily buckets
+HOURLY_MAX_SPAN = timedelta(days=7)
+
+
+def truncate_to_bucket(timestamp: datetime, granularity: str) -> datetime:
+    """Truncate a timestamp to the start of its hour/day bucket (naive UTC)"""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def bucket_step(granularity: str) -> timedelta:
+    """Width of a single bucket"""
+    return timedelta(hours=1) if granularity == "hour" else timedelta(days=1)
+
+
+def choose_granularity(start: datetime, end: datetime) -> str:
+    """Pick the coarsest granularity that still gives a useful chart"""
+    return "hour" if end - start <= HOURLY_MAX_SPAN else "day"
+
+
+def extract_numeric_fields(answers: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    """Return the numeric answers of a submission (booleans excluded)"""
+    numeric = {}
+    for key, value in (answers or {}).items():
+        if isinstance(value, bool):
+            continue
+        if isinstance(value, (int, float)):
+            numeric[key] = float(value)
+    return numeric
+
+
+class SubmissionRollupService:
+    """Service for maintaining and querying submission rollups"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ------------------------------------------------------------------
+    # Ingest
+    # ------------------------------------------------------------------
+
+    def record_submission(self, submission: FormSubmission, commit: bool = True) -> None:
+        """
+        Add a newly stored submission to its form and user buckets.
+
+        Buckets are chosen from ``submitted_at`` (event time), so a webhook
+        that arrives hours late still increments the correct historical bucket.
+        """
+        timestamp = submission.submitted_at or submission.created_at or datetime.utcnow()
+        numeric = extract_numeric_fields(submission.answers)
+
+        for scope_type, scope_key in self._scopes_for(submission):
+            for granularity in GRANULARITIES:
+                rollup = self._get_or_create_bucket(
+                    scope_type, scope_key, granularity, truncate_to_bucket(timestamp, granularity)
+                )
+                rollup.submission_count = (rollup.submission_count or 0) + 1
+
+                if numeric:
+                    sums = dict(rollup.numeric_sums or {})
+                    counts = dict(rollup.numeric_counts or {})
+                    for field, value in numeric.items():
+                        sums[field] = sums.get(field, 0) + value
+                        counts[field] = counts.get(field, 0) + 1
+                    # Reassign so SQLAlchemy picks up the JSON change
+                    rollup.numeric_sums = sums
+                    rollup.numeric_counts = counts
+
+        if commit:
+            self.db.commit()
+
+    def record_template_type(self, submission: FormSubmission, template_type: str, commit: bool = True) -> None:
+        """Add a processed submission's template type to its buckets"""
+        timestamp = submission.submitted_at or submission.created_at or datetime.utcnow()
+
+        for scope_type, scope_key in self._scopes_for(submission):
+            for granularity in GRANULARITIES:
+                rollup = self._get_or_create_bucket(
+                    scope_type, scope_key, granularity, truncate_to_bucket(timestamp, granularity)
+                )
+                template_counts = dict(rollup.template_counts or {})
+                template_counts[template_type] = template_counts.get(template_type, 0) + 1
+                rollup.template_counts = template_counts
+
+        if commit:
+            self.db.commit()
+
+    def rebuild_range(
+        self,
+        scope_type: str,
+        scope_key: str,
+        start: datetime,
+        end: datetime
+    ) -> int:
+        """
+        Recompute the buckets of one scope from raw submissions.
+
+        Used to correct rollups after backfills, deletions or replays. Only the
+        buckets overlapping ``[start, end)`` are rewritten.
+
+        Returns:
+            Number of submissions folded into the rebuilt buckets
+        """
+        if scope_type not in SCOPE_TYPES:
+            raise ValueError(f"Unknown scope type: {scope_type}")
+
+        day_start = truncate_to_bucket(start, "day")
+        day_end = truncate_to_bucket(end, "day") + bucket_step("day")
+
+        self.db.query(SubmissionRollup).filter(
+            SubmissionRollup.scope_type == scope_type,
+            SubmissionRollup.scope_key == scope_key,
+            SubmissionRollup.bucket_start >= day_start,
+            SubmissionRollup.bucket_start < day_end
+        ).delete(synchronize_session=False)
+        self.db.flush()
+
+        scope_column = FormSubmission.typeform_id if scope_type == "form" else FormSubmission.user_id
+        # Same event time as record_submission, submissions without submitted_at included
+        event_time = func.coalesce(FormSubmission.submitted_at, FormSubmission.created_at)
+        rows = self.db.query(FormSubmission, event_time, Dashboard.template_type).outerjoin(
+            Dashboard, Dashboard.submission_id == FormSubmission.id
+        ).filter(
+            scope_column == scope_key,
+            event_time >= day_start,
+            event_time < day_end
+        ).yield_per(1000)
+
+        buckets: Dict[Tuple[str, datetime], Dict[str, Any]] = {}
+        total = 0
+        for submission, timestamp, template_type in rows:
+            total += 1
+            numeric = extract_numeric_fields(submission.answers)
+            for granularity in GRANULARITIES:
+                key = (granularity, truncate_to_bucket(timestamp, granularity))
+                bucket = buckets.setdefault(key, {"count": 0, "sums": {}, "counts": {}, "templates": {}})
+                bucket["count"] += 1
+                for field, value in numeric.items():
+                    bucket["sums"][field] = bucket["sums"].get(field, 0) + value
+                    bucket["counts"][field] = bucket["counts"].get(field, 0) + 1
+                if template_type:
+                    bucket["templates"][template_type] = bucket["templates"].get(template_type, 0) + 1
+
+        for (granularity, bucket_start), bucket in buckets.items():
+            self.db.add(SubmissionRollup(
+                scope_type=scope_type,
+                scope_key=scope_key,
+                granularity=granularity,
+                bucket_start=bucket_start,
+                submission_count=bucket["count"],
+                numeric_sums=bucket["sums"],
+                numeric_counts=bucket["counts"],
+                template_counts=bucket["templates"]
+            ))
+
+        self.db.commit()
+        logger.info(f"Rebuilt {len(buckets)} {scope_type} rollup buckets for {scope_key} from {total} submissions")
+        return total
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def get_time_series(
+        self,
+        scope_type: str,
+        scope_keys: Iterable[str],
+        start: datetime,
+        end: datetime,
+        granularity: Optional[str] = None,
+        fill_gaps: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Get a time series for one or more scopes of the same type.
+
+        Buckets from several scopes (e.g. all forms of a multi-form dashboard)
+        are merged by bucket start. With ``fill_gaps`` empty buckets are
+        returned as zero points so charts get a continuous x axis.
+        """
+        if scope_type not in SCOPE_TYPES:
+            raise ValueError(f"Unknown scope type: {scope_type}")
+
+        granularity = granularity or choose_granularity(start, end)
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+
+        scope_keys = [key for key in scope_keys if key]
+        range_start = truncate_to_bucket(start, granularity)
+        range_end = truncate_to_bucket(end, granularity)
+
+        rollups = []
+        if scope_keys:
+            rollups = self.db.query(SubmissionRollup).filter(
+                SubmissionRollup.scope_type == scope_type,
+                SubmissionRollup.scope_key.in_(scope_keys),
+                SubmissionRollup.granularity == granularity,
+                SubmissionRollup.bucket_start >= range_start,
+                SubmissionRollup.bucket_start <= range_end
+            ).order_by(SubmissionRollup.bucket_start).all()
+
+        merged: Dict[datetime, Dict[str, Any]] = {}
+        for rollup in rollups:
+            point = merged.setdefault(rollup.bucket_start, self._empty_point(rollup.bucket_start))
+            point["count"] += rollup.submission_count or 0
+            self._merge_counts(point["numeric_sums"], rollup.numeric_sums)
+            self._merge_counts(point["numeric_counts"], rollup.numeric_counts)
+            self._merge_counts(point["template_counts"], rollup.template_counts)
+
+        if fill_gaps:
+            step = bucket_step(granularity)
+            cursor = range_start
+            while cursor <= range_end:
+                merged.setdefault(cursor, self._empty_point(cursor))
+                cursor += step
+
+        points = [merged[bucket] for bucket in sorted(merged)]
+        for point in points:
+            point["bucket_start"] = point["bucket_start"].isoformat()
+
+        return {
+            "granularity": granularity,
+            "start": range_start.isoformat(),
+            "end": range_end.isoformat(),
+            "total": sum(point["count"] for point in points),
+            "points": points
+        }
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _scopes_for(self, submission: FormSubmission) -> List[Tuple[str, str]]:
+        scopes = []
+        if submission.typeform_id:
+            scopes.append(("form", submission.typeform_id))
+        if submission.user_id:
+            scopes.append(("user", str(submission.user_id)))
+        return scopes
+
+    def _get_or_create_bucket(
+        self,
+        scope_type: str,
+        scope_key: str,
+        granularity: str,
+        bucket_start: datetime
+    ) -> SubmissionRollup:
+        """Fetch a bucket for update, inserting it if it doesn't exist yet"""
+        query = self.db.query(SubmissionRollup).filter_by(
+            scope_type=scope_type,
+            scope_key=scope_key,
+            granularity=granularity,
+            bucket_start=bucket_start
+        )
+        rollup = query.with_for_update().first()
+        if rollup:
+            return rollup
+
+        rollup = SubmissionRollup(
+            scope_type=scope_type,
+            scope_key=scope_key,
+            granularity=granularity,
+            bucket_start=bucket_start,
+            submission_count=0,
+            numeric_sums={},
+            numeric_counts={},
+            template_counts={}
+        )
+        try:
+            # Savepoint so a concurrent insert of the same bucket doesn't abort the ingest
+            with self.db.begin_nested():
+                self.db.add(rollup)
+            return rollup
+        except IntegrityError:
+            return query.with_for_update().one()
+
+    @staticmethod
+    def _empty_point(bucket_start: datetime) -> Dict[str, Any]:
+        return {
+            "bucket_start": bucket_start,
+            "count": 0,
+            "numeric_sums": {},
+            "numeric_counts": {},
+            "template_counts": {}
+        }
+
+    @staticmethod
+    def _merge_counts(target: Dict[str, float], source: Optional[Dict[str, float]]) -> None:
+        for key, value in (source or {}).items():
+            target[key] = target.get(key, 0) + value
@@ -0,0 +1,234 @@
+"""
+Compiled Scoring Rules for FA-45
+Per-tenant lead scoring from the ScoringRule table
+
+A tenant's active rules are loaded once and compiled into a RulePlan. Rules
+are grouped by the answer field they read (the decision table) and each one
+becomes a closure with its conditions already parsed: operators resolved,
+keyword lists folded into one regex, range tables sorted for bisection.
+Scoring a submission reads and normalizes every field once and calls the
+closures, no rule JSON is interpreted per submission.
+
+Plans are VersionedCache entries per tenant under the version of the
+tenant's rules (count and latest update), so a rule edited by any process is
+picked up within VERSIONED_CACHE_CHECK_SECONDS.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from bisect import bisect_right
+import logging
+import operator
+import re
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.lead_score import ScoringRule
+from app.services.versioned_cache import VersionedCache, table_version
+
+logger = logging.getLogger(__name__)
+
+MAX_RULE_SCORE = 100
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne
+}
+
+TRUE_VALUES = {"true", "yes", "y", "1", "on"}
+
+_NUMBER = re.compile(r'-?\d+(?:\.\d+)?')
+
+# (normalized text, parsed number) -> points
+RuleCheck = Callable[[str, Optional[float]], float]
+
+
+def parse_number(text: str) -> Optional[float]:
+    """First number in a lowercased answer, scaled by a k or m suffix"""
+    text = text.replace(',', '')
+    match = _NUMBER.search(text)
+    if not match:
+        return None
+    number = float(match.group())
+    suffix = text[match.end():match.end() + 1]
+    if suffix == 'k':
+        number *= 1000
+    elif suffix == 'm':
+        number *= 1000000
+    return number
+
+
+def _numeric_check(conditions: Dict[str, Any], max_points: int) -> RuleCheck:
+    if "ranges" in conditions:
+        # Decision table of (minimum, points), the highest minimum reached scores
+        table = sorted((float(minimum), float(points)) for minimum, points in conditions["ranges"])
+        minimums = [minimum for minimum, _ in table]
+        points = [points for _, points in table]
+
+        def check(text: str, number: Optional[float]) -> float:
+            if number is None:
+                return 0
+            index = bisect_right(minimums, number) - 1
+            return points[index] if index >= 0 else 0
+        return check
+
+    compare = OPERATORS[conditions.get("operator", ">=")]
+    value = float(conditions["value"])
+
+    def check(text: str, number: Optional[float]) -> float:
+        return max_points if number is not None and compare(number, value) else 0
+    return check
+
+
+def _text_check(conditions: Dict[str, Any], max_points: int) -> RuleCheck:
+    keywords = [str(keyword).lower() for keyword in conditions["contains"] if str(keyword)]
+    if not keywords:
+        raise ValueError("contains needs at least one keyword")
+    pattern = re.compile("|".join(re.escape(keyword) for keyword in keywords))
+
+    def check(text: str, number: Optional[float]) -> float:
+        return max_points if pattern.search(text) else 0
+    return check
+
+
+def _select_check(conditions: Dict[str, Any], max_points: int) -> RuleCheck:
+    if "options" in conditions:
+        options = {str(option).strip().lower(): float(points) for option, points in conditions["options"].items()}
+    else:
+        options = {str(option).strip().lower(): max_points for option in conditions["values"]}
+
+    def check(text: str, number: Optional[float]) -> float:
+        return options.get(text, 0)
+    return check
+
+
+def _boolean_check(conditions: Dict[str, Any], max_points: int) -> RuleCheck:
+    expected = bool(conditions.get("equals", True))
+
+    def check(text: str, number: Optional[float]) -> float:
+        return max_points if (text in TRUE_VALUES) == expected else 0
+    return check
+
+
+RULE_COMPILERS = {
+    "numeric": _numeric_check,
+    "text": _text_check,
+    "select": _select_check,
+    "boolean": _boolean_check
+}
+
+
+def compile_rule(rule: ScoringRule) -> RuleCheck:
+    """Closure for one rule, ValueError when its type or conditions are invalid"""
+    compiler = RULE_COMPILERS.get(rule.rule_type)
+    if compiler is None:
+        raise ValueError(f"Unknown rule type: {rule.rule_type}")
+    try:
+        return compiler(rule.conditions or {}, rule.max_points)
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"Invalid conditions for {rule.rule_type} rule: {e}")
+
+
+class RuleScore:
+    __slots__ = ("total", "factors")
+
+    def __init__(self, total: int, factors: Dict[str, Dict[str, Any]]):
+        self.total = total
+        self.factors = factors
+
+
+class RulePlan:
+    """A tenant's rules compiled into per-field checks"""
+    __slots__ = ("rule_names", "weights", "max_points", "fields")
+
+    def __init__(self, rules: Sequence[ScoringRule], checks: Sequence[RuleCheck]):
+        self.rule_names = [rule.name for rule in rules]
+        self.weights = np.array([rule.weight if rule.weight is not None else 1.0 for rule in rules])
+        self.max_points = np.array([rule.max_points for rule in rules], dtype=float)
+
+        fields: Dict[str, List[Tuple[int, RuleCheck]]] = {}
+        for index, (rule, check) in enumerate(zip(rules, checks)):
+            fields.setdefault(rule.field_name, []).append((index, check))
+        self.fields = list(fields.items())
+
+    def __len__(self) -> int:
+        return len(self.rule_names)
+
+    def points(self, answers_list: Sequence[Optional[Dict[str, Any]]]) -> np.ndarray:
+        """Points of every rule for every submission, one row per submission"""
+        points = np.zeros((len(answers_list), len(self.rule_names)))
+        for row, answers in enumerate(answers_list):
+            if not answers:
+                continue
+            for field_name, checks in self.fields:
+                raw = answers.get(field_name)
+                if raw is None:
+                    continue
+                text = str(raw).strip().lower()
+                number = parse_number(text)
+                for index, check in checks:
+                    points[row, index] = check(text, number)
+        return np.minimum(points, self.max_points)
+
+    def totals(self, points: np.ndarray) -> np.ndarray:
+        return np.minimum(MAX_RULE_SCORE, points @ self.weights).astype(np.int64)
+
+    def evaluate(self, answers: Dict[str, Any]) -> RuleScore:
+        """Score one submission with its per-rule breakdown"""
+        return self.evaluate_many([answers])[0]
+
+    def evaluate_many(self, answers_list: Sequence[Optional[Dict[str, Any]]]) -> List[RuleScore]:
+        """Scores of many submissions with their per-rule breakdowns"""
+        points = self.points(answers_list)
+        weights = [float(weight) for weight in self.weights]
+        return [
+            RuleScore(int(total), {
+                name: {"value": int(row[index]), "weight": weights[index]}
+                for index, name in enumerate(self.rule_names)
+            })
+            for total, row in zip(self.totals(points), points)
+        ]
+
+
+def compile_rules(rules: Iterable[ScoringRule]) -> Optional[RulePlan]:
+    """Plan for the valid rules, None without any; invalid rules are skipped"""
+    compiled, checks = [], []
+    for rule in rules:
+        try:
+            checks.append(compile_rule(rule))
+        except ValueError as e:
+            logger.warning(f"Skipping scoring rule {rule.id}: {e}")
+            continue
+        compiled.append(rule)
+    return RulePlan(compiled, checks) if compiled else None
+
+
+class RulePlanCache:
+    """Compiled rule plans per tenant, valid while the tenant's rules are unchanged"""
+
+    def __init__(self, check_ttl: float = settings.VERSIONED_CACHE_CHECK_SECONDS):
+        self._cache = VersionedCache("rule_plans", check_ttl)
+
+    def get(self, db: Session, user_id) -> Optional[RulePlan]:
+        """The tenant's plan, None when it has no active rules"""
+        user_id = str(user_id)
+        return self._cache.get(
+            user_id,
+            lambda: table_version(db, (ScoringRule, ScoringRule.user_id == user_id)),
+            lambda: compile_rules(db.query(ScoringRule).filter(
+                ScoringRule.user_id == user_id,
+                ScoringRule.is_active == True
+            ).order_by(ScoringRule.created_at, ScoringRule.id).all())
+        )
+
+    def invalidate(self, user_id=None) -> None:
+        """Drop a tenant's plan, every plan without a tenant"""
+        self._cache.invalidate(str(user_id) if user_id is not None else None)
+
+
+rule_plans = RulePlanCache()
@@ -0,0 +1,148 @@
+"""
+Submission Features
+Typed features of a form submission, extracted once at ingest
+
+Template detection, lead scoring, follow-up recommendations, competitive
+analysis and the CRM exports all read the same facts out of a submission's
+answers: budget, purchase timeline, the respondent's authority, company
+size, competitors and buying signals. extract_submission_features parses
+them in one pass and the result is stored on FormSubmission.features, so the
+downstream services read typed values instead of serializing and scanning
+the answers again.
+
+Stored features carry FEATURES_VERSION. Rows stored before features existed,
+or by an older extractor, are re-extracted on read by features_for.
+"""
+
+from typing import Any, Dict, List, Optional
+from dataclasses import asdict, dataclass, field, fields
+import json
+import re
+
+from app.services.competitor_dictionaries import BUILTIN_COMPETITORS, CompetitorDictionary
+from app.services.keyword_matcher import WORD_START, KeywordMatcher
+from app.services.lead_scoring import (
+    authority_level,
+    budget_amount,
+    company_size_level,
+    detect_buying_signals,
+    need_indicator_counts,
+    scan_signals,
+    timeline_level
+)
+
+# Bump when the extraction changes, stored features of older versions are re-extracted
+FEATURES_VERSION = 1
+
+EMPLOYEE_COUNT_FIELDS = ["employees", "company_size", "team_size", "employee_count"]
+REVENUE_FIELDS = ["revenue", "annual_revenue", "company_revenue"]
+
+# Keywords for different template types
+TEMPLATE_KEYWORDS = {
+    "diet_plan": ["diet", "weight", "calories", "meal", "nutrition", "food", "eating", "healthy"],
+    "lead_score": ["lead", "company", "budget", "timeline", "business", "purchase", "decision"],
+    "event_registration": ["event", "registration", "attend", "ticket", "conference", "workshop"]
+}
+TEMPLATE_MATCHER = KeywordMatcher(TEMPLATE_KEYWORDS, boundary=WORD_START)
+
+_DIGITS_RE = re.compile(r'\d+')
+
+
+@dataclass
+class SubmissionFeatures:
+    """Scoring, routing and enrichment facts of one submission"""
+    template_type: str = "generic"
+    budget_amount: Optional[int] = None  # Dollars, None without a stated budget
+    timeline: str = "no_timeline"  # TIMELINE_SCORES key
+    authority: str = "unknown"  # AUTHORITY_SCORES key
+    company_size: str = "unknown"  # COMPANY_SIZE_SCORES key
+    employee_count: Optional[int] = None
+    revenue: Optional[str] = None
+    pain_count: int = 0
+    need_count: int = 0
+    signals: List[str] = field(default_factory=list)  # BUYING_SIGNALS types
+    competitors: List[str] = field(default_factory=list)  # COMPETITOR_PATTERNS names
+    competitor_confidence: float = 0.0
+    version: int = FEATURES_VERSION
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SubmissionFeatures":
+        known = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+
+def detect_template_type(answers: Dict[str, Any]) -> str:
+    """Detect which template to use based on form answers"""
+    # Combine all answer values into a single text for analysis
+    text = " ".join(str(v) for v in answers.values() if v)
+
+    # Count keyword matches in one scan
+    hits = TEMPLATE_MATCHER.scan(text)
+    scores = {template: hits.count(template) for template in TEMPLATE_KEYWORDS}
+
+    # Return template with highest score
+    template = max(scores, key=scores.get)
+
+    # Default to generic if no clear match
+    if scores[template] == 0:
+        return "generic"
+
+    return template
+
+
+def employee_count(answers: Dict[str, Any]) -> Optional[int]:
+    """Employee count from formats like "50-100" or "100+", the lower bound"""
+    for key in EMPLOYEE_COUNT_FIELDS:
+        if key in answers:
+            numbers = _DIGITS_RE.findall(str(answers[key]))
+            if numbers:
+                return int(numbers[0])
+    return None
+
+
+def revenue(answers: Dict[str, Any]) -> Optional[str]:
+    """Revenue answer as given, currencies and ranges are left to the CRM"""
+    for key in REVENUE_FIELDS:
+        if key in answers:
+            return str(answers[key])
+    return None
+
+
+def extract_submission_features(
+    answers: Optional[Dict[str, Any]],
+    competitors: Optional[CompetitorDictionary] = None
+) -> SubmissionFeatures:
+    """Parse every feature of a submission's answers once, competitors from the tenant's dictionary"""
+    answers = answers or {}
+    hits = scan_signals(answers)
+    pain_count, need_count = need_indicator_counts(answers, hits)
+    competitor_names, competitor_confidence = (competitors or BUILTIN_COMPETITORS).detect(json.dumps(answers).lower())
+
+    return SubmissionFeatures(
+        template_type=detect_template_type(answers),
+        budget_amount=budget_amount(answers),
+        timeline=timeline_level(answers),
+        authority=authority_level(answers),
+        company_size=company_size_level(answers),
+        employee_count=employee_count(answers),
+        revenue=revenue(answers),
+        pain_count=pain_count,
+        need_count=need_count,
+        signals=detect_buying_signals(answers, hits),
+        competitors=competitor_names,
+        competitor_confidence=competitor_confidence
+    )
+
+
+def features_for(
+    answers: Optional[Dict[str, Any]],
+    stored: Optional[Dict[str, Any]] = None,
+    competitors: Optional[CompetitorDictionary] = None
+) -> SubmissionFeatures:
+    """A submission's stored features, re-extracted when missing or outdated"""
+    if stored and stored.get("version") == FEATURES_VERSION:
+        return SubmissionFeatures.from_dict(stored)
+    return extract_submission_features(answers, competitors)
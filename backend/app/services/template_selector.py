@@ -7,99 +7,124 @@ from typing import Dict, List, Optional
 import re
 import json
 
+from app.services.keyword_matcher import WORD_START, KeywordHits, KeywordMatcher, RegexSet
+
+
+# Template criteria
+TEMPLATE_CRITERIA = {
+    'sales_lead': {
+        'keywords': ['budget', 'company', 'timeline', 'solution', 'purchase', 
+                    'decision', 'pricing', 'cost', 'investment', 'roi', 'demo',
+                    'competitor', 'evaluation', 'vendor', 'proposal'],
+        'required_fields': ['email', 'company'],
+        'min_keyword_matches': 3,
+        'priority': 1
+    },
+    'health_assessment': {
+        'keywords': ['health', 'wellness', 'symptoms', 'medical', 'diagnosis',
+                    'treatment', 'medication', 'condition', 'pain', 'therapy',
+                    'exercise', 'nutrition', 'mental', 'physical'],
+        'required_fields': [],
+        'min_keyword_matches': 3,
+        'priority': 2
+    },
+    'event_registration': {
+        'keywords': ['event', 'registration', 'attend', 'conference', 'workshop',
+                    'seminar', 'webinar', 'session', 'ticket', 'venue', 'date',
+                    'schedule', 'speaker', 'agenda'],
+        'required_fields': ['name', 'email'],
+        'min_keyword_matches': 3,
+        'priority': 3
+    },
+    'survey_feedback': {
+        'keywords': ['satisfaction', 'feedback', 'rating', 'experience', 'opinion',
+                    'improve', 'recommend', 'service', 'quality', 'suggestion'],
+        'required_fields': [],
+        'min_keyword_matches': 2,
+        'priority': 4
+    },
+    'generic': {
+        'keywords': [],
+        'required_fields': [],
+        'min_keyword_matches': 0,
+        'priority': 99
+    }
+}
+
+# Sales-specific field patterns
+SALES_PATTERNS = {
+    'budget': [
+        r'\$[\d,]+',
+        r'\d+k\b',
+        r'\d+K\b',
+        r'\d+m\b',
+        r'\d+M\b',
+        r'budget.*\d+',
+        r'invest.*\d+',
+        r'spend.*\d+'
+    ],
+    'timeline': [
+        r'q[1-4]\s*202\d',
+        r'quarter',
+        r'immediate',
+        r'asap',
+        r'urgent',
+        r'this\s+(month|week|year)',
+        r'next\s+(month|week|year)',
+        r'\d+\s*(days?|weeks?|months?)'
+    ],
+    'company_size': [
+        r'\d+\s*employees?',
+        r'\d+\s*people',
+        r'enterprise',
+        r'startup',
+        r'small\s*business',
+        r'mid-?market',
+        r'fortune\s*\d+'
+    ],
+    'decision_authority': [
+        r'\b(ceo|cto|cfo|coo|vp|director|manager|head\s+of)\b',
+        r'decision\s*maker',
+        r'budget\s*authority',
+        r'final\s*approval'
+    ]
+}
+
+# Tools a lead may be replacing
+SALES_COMPETITORS = ['salesforce', 'hubspot', 'pipedrive', 'excel', 'manual', 'spreadsheet']
+
+# Compiled once: template keywords and competitors are found in one scan,
+# each sales pattern list is a single alternation
+TEMPLATE_MATCHER = KeywordMatcher(
+    {
+        **{name: criteria['keywords'] for name, criteria in TEMPLATE_CRITERIA.items()},
+        'competitors': SALES_COMPETITORS
+    },
+    boundary=WORD_START
+)
+SALES_PATTERN_SET = RegexSet(SALES_PATTERNS)
+
+
 class TemplateSelector:
     """Service for selecting dashboard templates based on form content"""
     
     def __init__(self):
-        # Define template criteria
-        self.template_criteria = {
-            'sales_lead': {
-                'keywords': ['budget', 'company', 'timeline', 'solution', 'purchase', 
-                            'decision', 'pricing', 'cost', 'investment', 'roi', 'demo',
-                            'competitor', 'evaluation', 'vendor', 'proposal'],
-                'required_fields': ['email', 'company'],
-                'min_keyword_matches': 3,
-                'priority': 1
-            },
-            'health_assessment': {
-                'keywords': ['health', 'wellness', 'symptoms', 'medical', 'diagnosis',
-                            'treatment', 'medication', 'condition', 'pain', 'therapy',
-                            'exercise', 'nutrition', 'mental', 'physical'],
-                'required_fields': [],
-                'min_keyword_matches': 3,
-                'priority': 2
-            },
-            'event_registration': {
-                'keywords': ['event', 'registration', 'attend', 'conference', 'workshop',
-                            'seminar', 'webinar', 'session', 'ticket', 'venue', 'date',
-                            'schedule', 'speaker', 'agenda'],
-                'required_fields': ['name', 'email'],
-                'min_keyword_matches': 3,
-                'priority': 3
-            },
-            'survey_feedback': {
-                'keywords': ['satisfaction', 'feedback', 'rating', 'experience', 'opinion',
-                            'improve', 'recommend', 'service', 'quality', 'suggestion'],
-                'required_fields': [],
-                'min_keyword_matches': 2,
-                'priority': 4
-            },
-            'generic': {
-                'keywords': [],
-                'required_fields': [],
-                'min_keyword_matches': 0,
-                'priority': 99
-            }
-        }
-        
-        # Sales-specific field patterns
-        self.sales_patterns = {
-            'budget': [
-                r'\$[\d,]+',
-                r'\d+k\b',
-                r'\d+K\b',
-                r'\d+m\b',
-                r'\d+M\b',
-                r'budget.*\d+',
-                r'invest.*\d+',
-                r'spend.*\d+'
-            ],
-            'timeline': [
-                r'q[1-4]\s*202\d',
-                r'quarter',
-                r'immediate',
-                r'asap',
-                r'urgent',
-                r'this\s+(month|week|year)',
-                r'next\s+(month|week|year)',
-                r'\d+\s*(days?|weeks?|months?)'
-            ],
-            'company_size': [
-                r'\d+\s*employees?',
-                r'\d+\s*people',
-                r'enterprise',
-                r'startup',
-                r'small\s*business',
-                r'mid-?market',
-                r'fortune\s*\d+'
-            ],
-            'decision_authority': [
-                r'\b(ceo|cto|cfo|coo|vp|director|manager|head\s+of)\b',
-                r'decision\s*maker',
-                r'budget\s*authority',
-                r'final\s*approval'
-            ]
-        }
+        self.template_criteria = TEMPLATE_CRITERIA
+        self.sales_patterns = SALES_PATTERNS
     
-    def select_template(self, form_data: Dict) -> Dict:
+    def select_template(self, form_data: Dict, features=None) -> Dict:
         """
         Select the most appropriate template based on form data
         
+        ``features`` are the submission's stored SubmissionFeatures, whose
+        detected competitors are used for the sales score.
+        
         Returns:
             Dict with template name and confidence score
         """
         # Convert form data to searchable text
         form_text = json.dumps(form_data).lower()
+        hits = TEMPLATE_MATCHER.scan(form_text)
         
         # Track scores for each template
         template_scores = {}
@@ -111,10 +136,7 @@ class TemplateSelector:
             score = 0
             
             # Check keyword matches
-            keyword_matches = sum(
-                1 for keyword in criteria['keywords'] 
-                if keyword in form_text
-            )
+            keyword_matches = hits.count(template_name)
             
             # Check required fields
             has_required_fields = all(
@@ -134,7 +156,7 @@ class TemplateSelector:
                 
                 # Additional scoring for sales template
                 if template_name == 'sales_lead':
-                    score += self._calculate_sales_score(form_data, form_text)
+                    score += self._calculate_sales_score(form_data, form_text, hits, features)
                 
                 template_scores[template_name] = score
         
@@ -158,37 +180,30 @@ class TemplateSelector:
             'is_sales': False
         }
     
-    def _calculate_sales_score(self, form_data: Dict, form_text: str) -> int:
+    def _calculate_sales_score(self, form_data: Dict, form_text: str, hits: KeywordHits, features=None) -> int:
         """Calculate additional score for sales-specific patterns"""
         bonus_score = 0
+        matched = SALES_PATTERN_SET.categories_in(form_text)
         
         # Check for budget patterns
-        for pattern in self.sales_patterns['budget']:
-            if re.search(pattern, form_text, re.IGNORECASE):
-                bonus_score += 10
-                break
+        if 'budget' in matched:
+            bonus_score += 10
         
         # Check for timeline patterns
-        for pattern in self.sales_patterns['timeline']:
-            if re.search(pattern, form_text, re.IGNORECASE):
-                bonus_score += 8
-                break
+        if 'timeline' in matched:
+            bonus_score += 8
         
         # Check for company size patterns
-        for pattern in self.sales_patterns['company_size']:
-            if re.search(pattern, form_text, re.IGNORECASE):
-                bonus_score += 5
-                break
+        if 'company_size' in matched:
+            bonus_score += 5
         
         # Check for decision authority patterns
-        for pattern in self.sales_patterns['decision_authority']:
-            if re.search(pattern, form_text, re.IGNORECASE):
-                bonus_score += 7
-                break
+        if 'decision_authority' in matched:
+            bonus_score += 7
         
         # Check for competitor mentions
-        competitors = ['salesforce', 'hubspot', 'pipedrive', 'excel', 'manual', 'spreadsheet']
-        if any(comp in form_text for comp in competitors):
+        mentions_competitor = bool(features.competitors) if features is not None else 'competitors' in hits
+        if mentions_competitor:
             bonus_score += 10
         
         # Check for specific sales fields
@@ -0,0 +1,81 @@
+"""
+Versioned Caches
+In-process caches of values compiled from DB rows, valid while the rows' version is unchanged
+
+Compiled values (rule plans, keyword matchers, catalogs of records) cannot be
+serialized into the shared cache layer, so each process keeps its own copy
+next to the version of the rows it was built from. The version (row count and
+latest update per table, see table_version) is plain JSON and is shared
+through cache_manager for ``check_ttl`` seconds, so a lookup costs at most one
+aggregate query per key and period across all processes on Redis.
+
+invalidate() drops the shared version along with the local value, so a write
+is picked up at once by the process that made it (and by every process with
+the Redis backend); a write made elsewhere is picked up within ``check_ttl``.
+A ``check_ttl`` of 0 reads the version from the DB on every lookup.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from datetime import datetime
+import threading
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.cache import cache_manager
+
+
+def table_version(db: Session, *sources: Tuple[Any, ...]) -> List[Any]:
+    """
+    Row count and latest updated_at of each source, read with one query.
+
+    A source is a model followed by optional filter criteria. Inactive rows
+    count too, deactivating a row bumps its updated_at.
+    """
+    columns = []
+    for model, *criteria in sources:
+        columns.append(db.query(func.count(model.id)).filter(*criteria).scalar_subquery())
+        columns.append(db.query(func.max(model.updated_at)).filter(*criteria).scalar_subquery())
+    return [
+        value.isoformat() if isinstance(value, datetime) else value
+        for value in db.query(*columns).one()
+    ]
+
+
+class VersionedCache:
+    """Values per key, rebuilt when the version of the rows they were built from changes"""
+
+    def __init__(self, name: str, check_ttl: float = settings.VERSIONED_CACHE_CHECK_SECONDS):
+        self.check_ttl = check_ttl
+        self.versions = cache_manager.namespace(f"{name}_versions", ttl=check_ttl)
+        self._values: Dict[str, Tuple[Any, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, version: Callable[[], Any], build: Callable[[], Any]) -> Any:
+        """The value for ``key``, built again when ``version()`` differs from the one it was built at"""
+        current = self._version(key, version)
+
+        cached = self._values.get(key)
+        if cached is not None and cached[0] == current:
+            return cached[1]
+
+        value = build()
+        with self._lock:
+            self._values[key] = (current, value)
+        return value
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop the value and version of ``key``, of every key without one"""
+        with self._lock:
+            if key is None:
+                self._values.clear()
+                self.versions.clear()
+            else:
+                self._values.pop(key, None)
+                self.versions.delete(key)
+
+    def _version(self, key: str, version: Callable[[], Any]) -> Any:
+        if self.check_ttl <= 0:
+            return version()
+        return self.versions.get_or_set_sync(key, version)
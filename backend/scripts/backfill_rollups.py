@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Rollup backfill
+Usage: python scripts/backfill_rollups.py submissions [--scope form|user] [--key KEY] [--since YYYY-MM-DD] [--until YYYY-MM-DD]
+       python scripts/backfill_rollups.py competitive [--user-id ID]
+
+Run once after deploying the rollup tables and again after bulk imports or
+deletions: submissions rebuilds the hourly/daily submission buckets of every
+form and user (or one scope) from the stored submissions, competitive rebuilds
+every tenant's (or one tenant's) win/loss buckets from the tracked outcomes.
+Ingest only adds new events to the buckets, so without a backfill the time
+series and competitive statistics start at the deploy.
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import String, cast, func
+
+from app.database import SessionLocal
+from app.models.competitive_analysis import CompetitiveOutcome
+from app.models.form import FormSubmission
+from app.services.competitive_rollups import CompetitiveRollupService
+from app.services.rollup_service import SCOPE_TYPES, SubmissionRollupService
+
+
+def parse_date(value: str) -> datetime:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected YYYY-MM-DD, got {value!r}")
+
+
+def backfill_submissions(db, scope_types, key, since, until):
+    rollups = SubmissionRollupService(db)
+    event_time = func.coalesce(FormSubmission.submitted_at, FormSubmission.created_at)
+
+    for scope_type in scope_types:
+        scope_column = FormSubmission.typeform_id if scope_type == "form" else FormSubmission.user_id
+        query = db.query(scope_column, func.min(event_time), func.max(event_time)).filter(scope_column.isnot(None))
+        if key:
+            query = query.filter(scope_column == key)
+
+        scopes = query.group_by(scope_column).all()
+        print(f"🔄 Rebuilding {len(scopes):,} {scope_type} scopes")
+        total = 0
+        for scope_key, first, last in scopes:
+            # rebuild_range rewrites whole days, the end day included
+            total += rollups.rebuild_range(scope_type, scope_key, since or first, until or last)
+        print(f"   {total:,} submissions folded")
+
+
+def backfill_competitive(db, user_id):
+    rollups = CompetitiveRollupService(db)
+    if user_id:
+        user_ids = [user_id]
+    else:
+        user_ids = [row[0] for row in db.query(FormSubmission.user_id).join(
+            # Submission ids are UUID strings, outcome lead ids UUIDs
+            CompetitiveOutcome, FormSubmission.id == cast(CompetitiveOutcome.lead_id, String)
+        ).distinct()]
+
+    print(f"🔄 Rebuilding competitive rollups of {len(user_ids):,} tenants")
+    total = sum(rollups.rebuild(tenant) for tenant in user_ids)
+    print(f"   {total:,} outcomes folded")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild rollups from the stored events")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submissions = commands.add_parser("submissions", help="Rebuild the submission rollups")
+    submissions.add_argument("--scope", choices=SCOPE_TYPES, help="Only rebuild form or user scopes")
+    submissions.add_argument("--key", help="Only rebuild this form id or user id, requires --scope")
+    submissions.add_argument("--since", type=parse_date, help="First day to rebuild (default: each scope's first submission)")
+    submissions.add_argument("--until", type=parse_date, help="Last day to rebuild (default: each scope's latest submission)")
+
+    competitive = commands.add_parser("competitive", help="Rebuild the competitive outcome rollups")
+    competitive.add_argument("--user-id", help="Only rebuild this tenant's buckets")
+    args = parser.parse_args()
+
+    if args.command == "submissions" and args.key and not args.scope:
+        parser.error("--key requires --scope")
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        if args.command == "submissions":
+            scope_types = [args.scope] if args.scope else list(SCOPE_TYPES)
+            backfill_submissions(db, scope_types, args.key, args.since, args.until)
+        else:
+            backfill_competitive(db, args.user_id)
+    finally:
+        db.close()
+
+    print(f"✅ Done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the join aggregation method (FA-44)
+Usage: python scripts/bench_join_aggregation.py [total_records] [sources]
+
+Compares the hash join against a naive nested-loop merge on a small sample,
+then times the hash join on the full record count (default 1,000,000).
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.services.record_join import HashJoinAggregator
+
+
+def generate_sources(total_records: int, source_count: int, key_space: int):
+    """Generate form sources whose records overlap on email"""
+    rng = random.Random(42)
+    base_time = datetime(2025, 1, 1)
+    per_source = total_records // source_count
+
+    sources = []
+    for source_index in range(source_count):
+        records = []
+        for i in range(per_source):
+            records.append({
+                "email": f"lead{rng.randrange(key_space)}@example.com",
+                "score": rng.randint(1, 10),
+                "company": f"Company {rng.randrange(key_space // 4 or 1)}",
+                "plan": rng.choice(["free", "pro", "business"]),
+                "_submitted_at": (base_time + timedelta(seconds=rng.randrange(86400 * 90))).isoformat(),
+                "_source_id": f"{source_index}-{i}"
+            })
+        sources.append({"form_title": f"Form {source_index}", "priority": source_index, "data": records})
+    return sources
+
+
+def hash_join(sources, conflict_resolution="latest"):
+    joiner = HashJoinAggregator("email", conflict_resolution=conflict_resolution)
+    for source in sources:
+        joiner.add_source(source["data"], source["form_title"], source["priority"])
+    return list(joiner.results())
+
+
+def nested_loop_join(sources):
+    """The quadratic merge we used to run outside the product"""
+    merged = []
+    for source in sources:
+        for record in source["data"]:
+            for existing in merged:
+                if existing["email"] == record["email"]:
+                    if record["_submitted_at"] >= existing["_submitted_at"]:
+                        existing.update(record)
+                    break
+            else:
+                merged.append(dict(record))
+    return merged
+
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<32} {elapsed:8.2f}s   {len(result):>9,} rows")
+    return result
+
+
+def peak_memory(label, func, *args):
+    # Measured in a separate run, tracemalloc slows the code under test down
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"   {label:<32} peak {peak / 1024 / 1024:8.1f} MB")
+
+
+def main():
+    total_records = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    source_count = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    print("📊 Small sample: hash join vs nested loop")
+    for sample_size in (2_000, 8_000):
+        sources = generate_sources(sample_size, source_count, key_space=sample_size // 2)
+        timed(f"nested loop ({sample_size:,})", nested_loop_join, sources)
+        timed(f"hash join ({sample_size:,})", hash_join, sources)
+
+    print(f"\n🚀 Hash join at {total_records:,} records across {source_count} forms")
+    sources = generate_sources(total_records, source_count, key_space=total_records // 2)
+    for resolution in ("latest", "priority", "average"):
+        timed(f"hash join [{resolution}]", hash_join, sources, resolution)
+    peak_memory("hash join [latest] memory", hash_join, sources)
+
+
+if __name__ == "__main__":
+    main()
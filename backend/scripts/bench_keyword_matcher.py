@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the shared keyword matcher
+Usage: python scripts/bench_keyword_matcher.py [max_answer_kb]
+
+Times keyword detection over generated free-text answers of growing size
+(up to 1,024 KB by default). Keyword dictionaries: the per-keyword substring
+scans the call sites used before against the compiled matchers, one scan per
+call site and one scan over all dictionaries. Regex patterns: the per-pattern
+re.search loops against one precompiled alternation per category.
+
+Without pyahocorasick the trie regex runs close to the C substring scans and
+mostly buys word boundaries and positions; the automaton backend is what makes
+a single pass cheaper than one scan per keyword.
+"""
+
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.services.submission_features import TEMPLATE_KEYWORDS
+from app.services.competitor_dictionaries import COMPETITOR_MATCHER, COMPETITOR_PATTERNS
+from app.services.keyword_matcher import AHOCORASICK_AVAILABLE, WORD_START, KeywordMatcher
+from app.services.lead_scoring import BUYING_SIGNALS, NEED_INDICATORS, PAIN_INDICATORS, SIGNAL_MATCHER
+from app.services.template_selector import SALES_PATTERN_SET, SALES_PATTERNS, TEMPLATE_CRITERIA, TEMPLATE_MATCHER
+
+FILLER = (
+    "we are a growing team and our current process relies on a lot of back and forth "
+    "between departments while reporting takes 6 hours of friday afternoon for 12 people"
+).split()
+
+DICTIONARIES = {
+    "signals": {**BUYING_SIGNALS, "pain_indicators": PAIN_INDICATORS, "need_indicators": NEED_INDICATORS},
+    "templates": TEMPLATE_KEYWORDS,
+    "selector": {name: criteria["keywords"] for name, criteria in TEMPLATE_CRITERIA.items()},
+    "competitors": {name: pattern["keywords"] for name, pattern in COMPETITOR_PATTERNS.items()},
+}
+
+
+def generate_answer(size_kb: int) -> str:
+    """Free text with a keyword sprinkled in every ~40 words"""
+    rng = random.Random(size_kb)
+    keywords = [keyword for dictionaries in DICTIONARIES.values() for words in dictionaries.values() for keyword in words]
+    words = []
+    length = 0
+    while length < size_kb * 1024:
+        word = rng.choice(keywords) if rng.random() < 0.025 else rng.choice(FILLER)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def substring_scans(text: str):
+    """One ``keyword in text`` per keyword and call site, re.search per pattern"""
+    text = text.lower()
+    hits = {}
+    for site, dictionaries in DICTIONARIES.items():
+        hits[site] = {
+            category: [keyword for keyword in keywords if keyword in text]
+            for category, keywords in dictionaries.items()
+        }
+    return hits
+
+
+def matcher_per_site(text: str):
+    return [SIGNAL_MATCHER.scan(text), TEMPLATE_MATCHER.scan(text), COMPETITOR_MATCHER.scan(text)]
+
+
+COMBINED = KeywordMatcher(
+    {f"{site}:{category}": keywords for site, dictionaries in DICTIONARIES.items() for category, keywords in dictionaries.items()},
+    boundary=WORD_START
+)
+
+
+def matcher_combined(text: str):
+    return COMBINED.scan(text)
+
+
+def pattern_loops(text: str):
+    """re.search per pattern, through the re module cache"""
+    return {
+        category
+        for category, patterns in SALES_PATTERNS.items()
+        if any(re.search(pattern, text, re.IGNORECASE) for pattern in patterns)
+    }
+
+
+def timed(label, func, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(text)
+    elapsed = (time.perf_counter() - start) / repeat
+    throughput = len(text) / elapsed / 1024 / 1024
+    print(f"   {label:<28} {elapsed * 1000:9.3f} ms   {throughput:8.1f} MB/s")
+
+
+def main():
+    max_kb = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    keyword_count = sum(len(words) for dictionaries in DICTIONARIES.values() for words in dictionaries.values())
+    backend = "pyahocorasick automaton" if AHOCORASICK_AVAILABLE else "trie regex"
+    print(f"🔎 {keyword_count} keywords in {len(DICTIONARIES)} dictionaries, matcher backend: {backend}")
+
+    size_kb = 1
+    while size_kb <= max_kb:
+        text = generate_answer(size_kb)
+        repeat = max(1, 2000 // size_kb)
+        print(f"\n📄 {size_kb:,} KB answer")
+        timed("substring scans", substring_scans, text, repeat)
+        timed("matcher per call site", matcher_per_site, text, repeat)
+        timed("one combined matcher", matcher_combined, text, repeat)
+        timed("pattern re.search loops", pattern_loops, text, repeat)
+        timed("pattern set", SALES_PATTERN_SET.categories_in, text, repeat)
+        size_kb *= 8
+
+
+if __name__ == "__main__":
+    main()
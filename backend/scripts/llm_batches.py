@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Offline LLM batches
+Usage: python scripts/llm_batches.py submit [--ai-adjustments] [--positioning-since-hours N] [--limit N]
+       python scripts/llm_batches.py collect [--wait]
+
+Run nightly: submit packs the pending AI adjustments of lead scores and the
+positioning of the last day's competitive insights into offline batches,
+LLM_BATCH_SIZE items per request. collect applies the results of completed
+batches, with --wait it polls every LLM_BATCH_POLL_INTERVAL seconds until
+all submitted batches are collected.
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.database import SessionLocal
+from app.services.llm_batch_jobs import (
+    collect_batches,
+    poll_batches,
+    submit_ai_adjustments,
+    submit_positioning_refresh
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Submit and collect offline LLM batches")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="Submit pending work as offline batches")
+    submit.add_argument("--ai-adjustments", action="store_true", help="Submit the pending AI adjustments of lead scores")
+    submit.add_argument("--positioning-since-hours", type=int, help="Refresh the positioning of insights created in the last N hours")
+    submit.add_argument("--limit", type=int, help="At most this many lead scores")
+
+    collect = commands.add_parser("collect", help="Apply the results of completed batches")
+    collect.add_argument("--wait", action="store_true", help="Poll until every submitted batch is collected")
+    args = parser.parse_args()
+
+    if args.command == "collect" and args.wait:
+        print("⏳ Polling submitted batches")
+        asyncio.run(poll_batches())
+        print("✅ All batches collected")
+        return
+
+    db = SessionLocal()
+    try:
+        if args.command == "collect":
+            counts = collect_batches(db)
+            print(f"✅ Collected: {counts['collected']}  Failed: {counts['failed']}  Running: {counts['running']}")
+            return
+
+        if not args.ai_adjustments and args.positioning_since_hours is None:
+            parser.error("Nothing to submit, pass --ai-adjustments and/or --positioning-since-hours")
+
+        if args.ai_adjustments:
+            job = submit_ai_adjustments(db, limit=args.limit)
+            print(f"📤 AI adjustments: {f'{len(job.item_ids):,} scores in batch {job.provider_batch_id}' if job else 'none pending'}")
+        if args.positioning_since_hours is not None:
+            since = datetime.utcnow() - timedelta(hours=args.positioning_since_hours)
+            job = submit_positioning_refresh(db, since)
+            print(f"📤 Positioning: {f'{len(job.item_ids):,} insights in batch {job.provider_batch_id}' if job else 'no insights'}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
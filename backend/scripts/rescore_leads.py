@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Bulk lead rescoring (FA-45)
+Usage: python scripts/rescore_leads.py [--user-id ID] [--weight budget=0.4 ...] [--batch-size N] [--defer-ai] [--dry-run]
+
+Rescores every stored submission (or one user's) with the default scoring
+tables, optionally with tuned factor weights, and writes changed scores and
+their history back in bulk. Existing AI adjustments are kept, no LLM calls
+are made. With --defer-ai, newly scored leads are left pending for
+scripts/llm_batches.py to adjust in batches.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.database import SessionLocal
+from app.services.bulk_rescoring import BulkRescorer, RescoringConfig
+
+
+def parse_weight(value: str):
+    factor, _, weight = value.partition("=")
+    try:
+        return factor.strip(), float(weight)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected factor=weight, got {value!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescore stored leads in bulk")
+    parser.add_argument("--user-id", help="Only rescore this user's submissions")
+    parser.add_argument("--weight", type=parse_weight, action="append", default=[], help="Factor weight override, e.g. budget=0.4")
+    parser.add_argument("--scoring-version", help="Version recorded on rescored leads")
+    parser.add_argument("--batch-size", type=int, help="Submissions per transaction")
+    parser.add_argument("--defer-ai", action="store_true", help="Leave new scores pending for the batched AI adjustment")
+    parser.add_argument("--dry-run", action="store_true", help="Compute scores without writing them")
+    args = parser.parse_args()
+
+    try:
+        config = RescoringConfig.with_overrides(scoring_version=args.scoring_version, weights=dict(args.weight))
+    except ValueError as e:
+        parser.error(str(e))
+
+    started = time.perf_counter()
+
+    def progress(processed: int, total: int):
+        rate = processed / max(time.perf_counter() - started, 1e-9)
+        print(f"\r   {processed:,}/{total:,} submissions ({rate:,.0f}/s)", end="", flush=True)
+
+    print(f"🔄 Rescoring leads{' (dry run)' if args.dry_run else ''}")
+    print(f"   Weights: {config.weights}")
+
+    db = SessionLocal()
+    try:
+        result = BulkRescorer(
+            db, config, batch_size=args.batch_size, progress=progress, dry_run=args.dry_run, defer_ai=args.defer_ai
+        ).run(args.user_id)
+    finally:
+        db.close()
+
+    print()
+    print(f"✅ Done in {time.perf_counter() - started:.1f}s")
+    print(f"   Updated: {result['updated']:,}  Created: {result['created']:,}  Unchanged: {result['unchanged']:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401  Every table is registered on Base
+from app.database import Base
+from app.services.competitor_catalog import competitor_catalog
+from app.services.competitor_dictionaries import competitor_dictionaries
+from app.services.llm_circuit import llm_circuit
+from app.services.scoring_rules import rule_plans
+
+
+@pytest.fixture(autouse=True)
+def reset_llm_circuit():
+    """The LLM circuit is process-wide, LLM failures stubbed by one test must not open it for the next"""
+    llm_circuit.reset()
+    yield
+    llm_circuit.reset()
+
+
+@pytest.fixture(autouse=True)
+def reset_versioned_caches():
+    """The versioned caches are process-wide, one test's rows must not be served to the next"""
+    yield
+    for cache in (competitor_catalog, competitor_dictionaries, rule_plans):
+        cache.invalidate()
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    # Stored as hex, like the non-native Uuid type binds it
+    return "CHAR(32)"
+
+
+@pytest.fixture
+def db_engine():
+    """sqlite engine with the tables of every model, postgres UUID columns included"""
+    # One connection shared by every thread, so sessions of threadpool endpoints see the same database
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def api_client(db_engine):
+    """TestClient on the app with its sessions on ``db_engine``, signed in as a business user"""
+    from fastapi.testclient import TestClient
+    from sqlalchemy.orm import sessionmaker
+
+    from app.api.dependencies import get_current_user
+    from app.database import SessionLocal, engine
+    from app.main import app
+    from app.models.user import PlanType, User
+
+    db = sessionmaker(bind=db_engine)()
+    user = User(email="owner@example.com", plan_type=PlanType.BUSINESS, is_verified=True)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    db.expunge(user)
+    db.close()
+
+    SessionLocal.configure(bind=db_engine)
+    app.dependency_overrides[get_current_user] = lambda: user
+    client = TestClient(app, base_url="https://api.formflow.ai")
+    client.user = user
+    yield client
+    app.dependency_overrides.clear()
+    SessionLocal.configure(bind=engine)
@@ -0,0 +1,123 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.models import FormSubmission
+from app.models.multi_form_dashboard import AggregationJob, MultiFormDashboard, MultiFormMapping
+from app.services import aggregation_engine, aggregation_scheduler
+from app.services.aggregation_engine import AggregationEngine, compute_aggregation, decode_cursor, encode_cursor
+from app.services.aggregation_scheduler import AggregationScheduler
+
+
+def test_union_aggregation_tags_records_with_their_form():
+    """Test that a union run combines the records of every source, tagged with the form they came from"""
+    all_data = [
+        {"form_title": "Demo request", "form_type": "lead", "data": [{"email": "a@example.com"}]},
+        {"form_title": "Newsletter", "form_type": "signup", "data": [{"email": "b@example.com"}]},
+    ]
+
+    records, metrics = compute_aggregation(all_data, {"aggregation_method": "union"}, None, None)
+
+    assert [(r["email"], r["_form_source"], r["_form_type"]) for r in records] == [
+        ("a@example.com", "Demo request", "lead"),
+        ("b@example.com", "Newsletter", "signup"),
+    ]
+    assert metrics == {}
+
+
+def test_cursor_round_trip():
+    """Test that a pagination cursor decodes to its run and row, and garbage is rejected"""
+    run_id = uuid.uuid4()
+    assert decode_cursor(encode_cursor(run_id, 42)) == (str(run_id), 42)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_join_dashboard_streams_sources_into_the_records_table(db_engine, monkeypatch):
+    """Test that a join run merges the submissions of every form without fetching them into lists"""
+    db = sessionmaker(bind=db_engine)()
+    dashboard = MultiFormDashboard(
+        user_id=uuid.uuid4(),
+        name="Leads",
+        aggregation_config={"aggregation_method": "join", "join_key": "email", "conflict_resolution": "average"}
+    )
+    db.add(dashboard)
+    db.commit()
+    for form_id, title, answers in [
+        ("crm", "CRM", [{"email": "ann@example.com", "score": 4}, {"email": "bob@example.com", "score": 2}]),
+        ("survey", "Survey", [{"email": "Ann@Example.com", "score": 8}]),
+    ]:
+        db.add(MultiFormMapping(dashboard_id=dashboard.id, form_external_id=form_id, form_title=title))
+        for i, record in enumerate(answers):
+            db.add(FormSubmission(
+                typeform_id=form_id, response_id=f"{form_id}-{i}", answers=record, submitted_at=datetime(2025, 1, 1, i)
+            ))
+    db.commit()
+
+    async def fetch_lists(*args):
+        raise AssertionError("join sources are streamed")
+
+    engine = AggregationEngine(db)
+    monkeypatch.setattr(engine, "_fetch_all_form_data", fetch_lists)
+    result = asyncio.run(engine.aggregate_dashboard_data(dashboard.id))
+
+    assert result["metadata"]["sources"] == 2
+    assert result["metadata"]["total_records"] == 2
+    records = {record["_join_key"]: record for record in engine.iter_records(db.get(MultiFormDashboard, dashboard.id))}
+    assert records["ann@example.com"]["score"] == 6
+    assert records["ann@example.com"]["_sources"] == ["CRM", "Survey"]
+    job = db.query(AggregationJob).one()
+    assert (job.status, job.total_forms, job.total_records) == ("completed", 2, 3)
+    db.close()
+
+
+def test_cached_result_keeps_a_cancelled_job_cancelled(db_engine, monkeypatch):
+    """Test that serving a cached result does not complete a job cancelled meanwhile"""
+    db = sessionmaker(bind=db_engine)()
+    dashboard = MultiFormDashboard(user_id=uuid.uuid4(), name="Leads", aggregation_config={})
+    db.add(dashboard)
+    db.commit()
+    job = AggregationJob(dashboard_id=dashboard.id, job_type="full_refresh", status="cancelled")
+    db.add(job)
+    db.commit()
+    cached = {"metrics": {}, "metadata": {"total_records": 0}}
+    monkeypatch.setattr(aggregation_engine.dashboard_result_cache, "get", lambda dashboard: cached)
+
+    result = asyncio.run(AggregationEngine(db).aggregate_dashboard_data(dashboard.id, job_id=job.id))
+
+    assert result == cached
+    db.expire_all()
+    assert db.get(AggregationJob, job.id).status == "cancelled"
+    db.close()
+
+
+def test_failed_aggregation_backs_off_scheduled_refreshes(db_engine, monkeypatch):
+    """Test that a dashboard whose aggregation failed is not refreshed again before its retry time"""
+    monkeypatch.setattr(aggregation_scheduler, "SessionLocal", sessionmaker(bind=db_engine))
+    db = sessionmaker(bind=db_engine)()
+    dashboard = MultiFormDashboard(user_id=uuid.uuid4(), name="Leads", aggregation_config={"aggregation_method": "unknown"})
+    db.add(dashboard)
+    db.commit()
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            asyncio.run(AggregationEngine(db).aggregate_dashboard_data(dashboard.id))
+
+    db.expire_all()
+    dashboard = db.get(MultiFormDashboard, dashboard.id)
+    assert dashboard.refresh_failures == 2
+    assert dashboard.refresh_retry_at > datetime.utcnow() + timedelta(seconds=300)
+    scheduler = AggregationScheduler(max_concurrency=0, process_workers=0)
+    assert scheduler.submit_scheduled_refreshes() == []
+
+    dashboard.refresh_retry_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+
+    async def refresh():
+        return scheduler.submit_scheduled_refreshes()
+
+    assert len(asyncio.run(refresh())) == 1
+    db.close()
@@ -0,0 +1,124 @@
+import asyncio
+import uuid
+
+from app.services.aggregation_scheduler import AggregationScheduler
+
+
+class FakeScheduler(AggregationScheduler):
+    """Scheduler with job rows kept in memory and a recording runner"""
+
+    def __init__(self, max_concurrency=1):
+        super().__init__(max_concurrency=max_concurrency, process_workers=0)
+        self.rows = {}
+        self.ran = []
+        self.release = asyncio.Event()
+
+    def _create_job_row(self, dashboard_id, priority):
+        job_id = uuid.uuid4()
+        self.rows[job_id] = {"status": "pending", "priority": priority}
+        return job_id
+
+    def _find_active_job(self, dashboard_id):
+        return None
+
+    def _update_job_row(self, job_id, only_active=False, **values):
+        row = self.rows.get(job_id)
+        if not row or (only_active and row["status"] not in ("pending", "processing")):
+            return False
+        row.update(values)
+        return True
+
+    async def _run(self, job):
+        self.rows[job.job_id]["status"] = "processing"
+        await self.release.wait()
+        self.ran.append(job.dashboard_id)
+        self.rows[job.job_id]["status"] = "completed"
+
+
+async def drain(scheduler):
+    scheduler.release.set()
+    while scheduler._jobs:
+        await asyncio.sleep(0)
+    await scheduler.shutdown()
+
+
+def test_duplicate_refreshes_share_one_job():
+    """Test that concurrent refreshes of a dashboard are coalesced"""
+    async def scenario():
+        scheduler = FakeScheduler()
+        dashboard_id = uuid.uuid4()
+        first = scheduler.submit(dashboard_id)
+        second = scheduler.submit(dashboard_id, force_refresh=True)
+        await drain(scheduler)
+        return first, second, scheduler
+
+    first, second, scheduler = asyncio.run(scenario())
+    assert first == second
+    assert len(scheduler.rows) == 1
+    assert len(scheduler.ran) == 1
+
+
+def test_interactive_jobs_run_before_scheduled():
+    """Test priority ordering and promotion of pending scheduled jobs"""
+    async def scenario():
+        scheduler = FakeScheduler()
+        busy, scheduled, promoted, interactive = (uuid.uuid4() for _ in range(4))
+        scheduler.submit(busy)
+        await asyncio.sleep(0)  # busy occupies the only worker
+        scheduler.submit(scheduled, priority="scheduled")
+        scheduler.submit(promoted, priority="scheduled")
+        scheduler.submit(interactive)
+        scheduler.submit(promoted, priority="interactive")
+        await drain(scheduler)
+        return scheduler.ran, [busy, interactive, promoted, scheduled]
+
+    ran, expected = asyncio.run(scenario())
+    assert ran == expected
+
+
+def test_cancel_pending_job():
+    """Test that a cancelled pending job never runs"""
+    async def scenario():
+        scheduler = FakeScheduler()
+        busy, cancelled = uuid.uuid4(), uuid.uuid4()
+        scheduler.submit(busy)
+        await asyncio.sleep(0)
+        job_id = scheduler.submit(cancelled)
+        assert scheduler.cancel(job_id)
+        assert not scheduler.cancel(job_id)
+        await drain(scheduler)
+        return scheduler, job_id, busy
+
+    scheduler, job_id, busy = asyncio.run(scenario())
+    assert scheduler.ran == [busy]
+    assert scheduler.rows[job_id]["status"] == "cancelled"
+
+
+def test_scheduled_refreshes_run_until_shutdown():
+    """Test that stale dashboards are queued every interval, and no longer once the scheduler shut down"""
+    class RefreshingScheduler(FakeScheduler):
+        def __init__(self):
+            super().__init__()
+            self.rounds = 0
+
+        def submit_scheduled_refreshes(self):
+            self.rounds += 1
+            if self.rounds == 1:
+                raise RuntimeError("database unavailable")
+            return [self.submit(uuid.uuid4(), priority="scheduled")]
+
+    async def scenario():
+        scheduler = RefreshingScheduler()
+        scheduler.start_scheduled_refreshes(interval=0.01)
+        scheduler.start_scheduled_refreshes(interval=0.01)
+        await asyncio.sleep(0.035)
+        await drain(scheduler)
+        rounds = scheduler.rounds
+        await asyncio.sleep(0.03)
+        return scheduler, rounds
+
+    scheduler, rounds = asyncio.run(scenario())
+    # A failed round does not stop the next ones
+    assert rounds >= 2 and scheduler.rounds == rounds
+    assert len(scheduler.ran) == rounds - 1
+    assert all(row["priority"] == "scheduled" for row in scheduler.rows.values())
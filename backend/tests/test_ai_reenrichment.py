@@ -0,0 +1,138 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Dashboard, FormSubmission, LeadScore
+from app.services import ai_reenrichment
+from app.services.ai_reenrichment import reenrich_dashboards, reenrich_scores
+from app.services.llm_circuit import LLMCircuitBreaker
+
+
+class StubProcessor:
+    """Answers with content, except for submissions marked broken"""
+
+    def __init__(self):
+        self.degraded = False
+
+    async def process(self, answers, template_type):
+        self.degraded = answers.get("broken", False)
+        return {"title": answers["name"]}
+
+
+def test_failing_dashboard_backs_off_without_blocking_the_others(monkeypatch):
+    """Test that a dashboard failing on its own is retried later with backoff while newer ones are enriched"""
+    monkeypatch.setattr(ai_reenrichment, "AIProcessor", StubProcessor)
+    monkeypatch.setattr(ai_reenrichment.TemplateEngine, "render", lambda self, template_type, content: content["title"])
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[FormSubmission.__table__, Dashboard.__table__])
+    db = sessionmaker(bind=engine)()
+
+    created = datetime(2025, 1, 1)
+    for i, answers in enumerate([{"name": "oldest", "broken": True}, {"name": "newer"}]):
+        submission = FormSubmission(id=str(uuid.uuid4()), user_id="user-1", response_id=f"r{i}", answers=answers)
+        db.add(submission)
+        db.add(Dashboard(
+            submission_id=submission.id, template_type="generic", ai_status="degraded",
+            created_at=created + timedelta(minutes=i)
+        ))
+    db.commit()
+
+    assert asyncio.run(reenrich_dashboards(db)) == 1
+    broken, enriched = db.query(Dashboard).order_by(Dashboard.created_at).all()
+    assert (enriched.ai_status, enriched.html_content) == ("completed", "newer")
+    assert broken.ai_status == "degraded" and broken.ai_attempts == 1
+    assert broken.ai_retry_at > datetime.utcnow()
+
+    # Not due yet, then retried with a doubled wait
+    assert asyncio.run(reenrich_dashboards(db)) == 0
+    assert broken.ai_attempts == 1
+    broken.ai_retry_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    asyncio.run(reenrich_dashboards(db))
+    assert broken.ai_attempts == 2
+    assert broken.ai_retry_at - datetime.utcnow() > timedelta(seconds=ai_reenrichment.settings.AI_REENRICH_RETRY_SECONDS)
+    db.close()
+
+
+class StubCompletions:
+    def create(self, **kwargs):
+        raise RuntimeError("offline")
+
+
+class StubScoringEngine:
+    """Completes the AI adjustment of every score it is given, recording the batches"""
+
+    batches = []
+
+    def __init__(self, db):
+        self.db = db
+
+    def apply_ai_adjustments(self, lead_score_ids):
+        self.batches.append(len(lead_score_ids))
+        self.db.query(LeadScore).filter(LeadScore.id.in_(lead_score_ids)).update(
+            {"ai_status": "completed"}, synchronize_session=False
+        )
+        self.db.commit()
+        return {"completed": len(lead_score_ids), "fallback": 0}
+
+
+def test_runs_continue_past_one_batch(monkeypatch, db_engine):
+    """Test that a run re-enriches every due dashboard and pending score, a batch at a time"""
+    monkeypatch.setattr(ai_reenrichment, "AIProcessor", StubProcessor)
+    monkeypatch.setattr(ai_reenrichment.TemplateEngine, "render", lambda self, template_type, content: content["title"])
+    monkeypatch.setattr(ai_reenrichment, "LeadScoringEngine", StubScoringEngine)
+    db = sessionmaker(bind=db_engine)()
+    for i in range(5):
+        submission = FormSubmission(id=str(uuid.uuid4()), user_id="user-1", response_id=f"r{i}", answers={"name": f"lead{i}"})
+        db.add(submission)
+        db.add(Dashboard(submission_id=submission.id, template_type="generic", ai_status="degraded"))
+        db.add(LeadScore(
+            submission_id=uuid.UUID(submission.id), base_score=50, final_score=50, score_factors={}, ai_status="pending"
+        ))
+    db.commit()
+
+    assert asyncio.run(reenrich_dashboards(db, limit=2)) == 5
+    assert reenrich_scores(db, limit=2) == {"completed": 5, "fallback": 0}
+    assert StubScoringEngine.batches == [2, 2, 1]
+    assert db.query(Dashboard).filter_by(ai_status="degraded").count() == 0
+    db.close()
+
+
+def test_runs_stop_while_the_circuit_is_open(monkeypatch, db_engine):
+    """Test that nothing is re-enriched while the LLM circuit is open"""
+    monkeypatch.setattr(ai_reenrichment, "LeadScoringEngine", StubScoringEngine)
+    circuit = LLMCircuitBreaker(min_calls=1, open_seconds=60)
+    monkeypatch.setattr(ai_reenrichment, "llm_circuit", circuit)
+    with pytest.raises(RuntimeError):
+        circuit.call(StubCompletions().create)
+    assert circuit.is_open
+    db = sessionmaker(bind=db_engine)()
+    db.add(Dashboard(submission_id=str(uuid.uuid4()), template_type="generic", ai_status="degraded"))
+    db.commit()
+
+    assert asyncio.run(reenrich_dashboards(db)) == 0
+    assert reenrich_scores(db) == {"completed": 0, "fallback": 0}
+    db.close()
+
+
+def test_sweep_schedules_runs_until_stopped(monkeypatch):
+    """Test that the sweep schedules a run every interval and no more once stopped"""
+    runs = []
+    monkeypatch.setattr(ai_reenrichment, "schedule_reenrichment", lambda: runs.append(1))
+
+    async def sweep():
+        ai_reenrichment.start_reenrichment_sweep(0.01)
+        await asyncio.sleep(0.05)
+        await ai_reenrichment.stop_reenrichment_sweep()
+        swept = len(runs)
+        await asyncio.sleep(0.03)
+        return swept
+
+    swept = asyncio.run(sweep())
+    assert swept >= 2
+    assert len(runs) == swept
@@ -0,0 +1,155 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app.models import FormSubmission, RescoreRun
+from app.services import lead_scoring
+from app.services.bulk_rescoring import BulkRescorer, RescoringConfig, extract_features, get_rescore_run, score_features
+from app.services.lead_scoring import LeadScoringEngine
+
+ANSWERS = [
+    {"budget": "$150k", "timeline": "ASAP", "role": "CEO", "company_size": "2,500 employees"},
+    {"budget": "around 30000", "timeline": "Q3 next year", "title": "Senior engineer", "employees": "45"},
+    {"budget": "not sure", "investment": "5m", "when": "first quarter", "position": "I approve purchases"},
+    {"price_range": "7k", "timeframe": "2026", "job_title": "analyst", "company": "Acme Inc"},
+    {"notes": "We are struggling with a manual process and need a solution urgently, budget approved"},
+    {"budget": "$2,000", "timeline": "this month", "role": "intern", "team_size": "small team of 4"},
+    {},
+]
+
+
+class StubCompletions:
+    def create(self, **kwargs):
+        raise RuntimeError("offline")
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    # The engine falls back to the rule-based adjustment when the LLM call fails
+    client = SimpleNamespace(chat=SimpleNamespace(completions=StubCompletions()))
+    monkeypatch.setattr(lead_scoring.openai, "Client", lambda **kwargs: client)
+    return LeadScoringEngine(db=None)
+
+
+def test_bulk_scores_match_engine(engine):
+    """Test that vectorized factor scores and totals equal the per-lead engine's"""
+    scores = score_features(extract_features(ANSWERS), RescoringConfig())
+
+    for i, answers in enumerate(ANSWERS):
+        assert scores["budget"][i] == engine._score_budget(answers)
+        assert scores["timeline"][i] == engine._score_timeline(answers)
+        assert scores["authority"][i] == engine._score_authority(answers)
+        assert scores["need"][i] == engine._score_need(answers)
+        assert scores["company_size"][i] == engine._score_company_size(answers)
+
+        adjustment, _, _, _ = asyncio.run(engine._get_ai_adjustment(answers))
+        base = sum(getattr(engine, f"_score_{factor}")(answers) * weight for factor, weight in engine.default_weights.items())
+        assert scores["base_score"][i] == int(base)
+        assert scores["final_score"][i] == min(100, int(base + adjustment))
+        assert scores["score_category"][i] == lead_scoring.score_category(scores["final_score"][i])
+
+
+def test_overrides_reweight_and_keep_ai_adjustment():
+    """Test that weight and threshold overrides apply and an existing AI adjustment is kept"""
+    features = extract_features(ANSWERS[:2])
+    config = RescoringConfig.with_overrides(
+        weights={"budget": 1.0, "timeline": 0, "authority": 0, "need": 0, "company_size": 0},
+        budget_thresholds=[(0, 1), (100000, 40)]
+    )
+    scores = score_features(features, config, ai_adjustment=np.array([10, np.nan]))
+
+    assert list(scores["budget"]) == [40, 1]
+    assert list(scores["base_score"]) == [40, 1]
+    assert list(scores["final_score"]) == [50, 1]
+
+    with pytest.raises(ValueError):
+        RescoringConfig.with_overrides(weights={"budgets": 0.5})
+
+
+def test_rescore_writes_back_changed_scores(db_engine):
+    """Test that a rescore updates changed scores with history and creates missing ones"""
+    db = sessionmaker(bind=db_engine)()
+
+    submission_ids = [str(uuid.uuid4()) for _ in range(3)]
+    for i, submission_id in enumerate(submission_ids):
+        db.add(FormSubmission(id=submission_id, user_id="user-1", response_id=f"r{i}", answers=ANSWERS[i]))
+    db.commit()
+    db.execute(
+        text("INSERT INTO lead_scores (id, submission_id, base_score, ai_adjustment, final_score, score_factors, score_category, calculated_at) "
+             "VALUES (:id, :submission_id, 10, 7, 17, '{}', 'cold', :calculated_at)"),
+        {"id": uuid.uuid4().hex, "submission_id": uuid.UUID(submission_ids[0]).hex, "calculated_at": datetime(2025, 1, 1)}
+    )
+    db.commit()
+
+    progress = []
+    result = BulkRescorer(db, batch_size=2, progress=lambda done, total: progress.append(done)).run("user-1")
+    assert result == {"total": 3, "processed": 3, "updated": 1, "created": 2, "unchanged": 0}
+    assert progress == [0, 2, 3]
+
+    rescored = db.execute(text(
+        "SELECT base_score, ai_adjustment, final_score, score_category FROM lead_scores WHERE submission_id = :s"
+    ), {"s": uuid.UUID(submission_ids[0]).hex}).one()
+    assert rescored.ai_adjustment == 7
+    assert rescored.final_score == rescored.base_score + 7
+    history = db.execute(text("SELECT previous_score, new_score FROM lead_score_history")).all()
+    assert [(row.previous_score, row.new_score) for row in history] == [(17, rescored.final_score)]
+
+    # A second run finds nothing to change
+    assert BulkRescorer(db).run("user-1")["unchanged"] == 3
+    db.close()
+
+
+def test_tenants_with_scoring_rules_keep_rule_based_scores(db_engine):
+    """Test that a rescore scores tenants with active rules by their rule plan, others by the default criteria"""
+    db = sessionmaker(bind=db_engine)()
+    db.execute(text(
+        "INSERT INTO scoring_rules VALUES (:id, 'user-1', 'Big budget', 'budget', 'numeric', "
+        "'{\"operator\": \">=\", \"value\": 100000}', 1.0, 40, 1, :at, :at)"
+    ), {"id": uuid.uuid4().hex, "at": datetime(2025, 3, 1)})
+    submissions = {"user-1": str(uuid.uuid4()), "user-2": str(uuid.uuid4())}
+    for i, (user_id, submission_id) in enumerate(submissions.items()):
+        db.add(FormSubmission(id=submission_id, user_id=user_id, response_id=f"r{i}", answers=ANSWERS[0]))
+    db.commit()
+    db.execute(
+        text("INSERT INTO lead_scores (id, submission_id, base_score, ai_adjustment, final_score, score_factors, "
+             "score_category, scoring_version, calculated_at) VALUES (:id, :submission_id, 40, 5, 45, "
+             "'{\"Big budget\": {\"value\": 40, \"weight\": 1.0}}', 'cold', 'rules-v1', :calculated_at)"),
+        {"id": uuid.uuid4().hex, "submission_id": uuid.UUID(submissions["user-1"]).hex, "calculated_at": datetime(2025, 1, 1)}
+    )
+    db.commit()
+
+    result = BulkRescorer(db).run()
+    assert result["unchanged"] == 1 and result["created"] == 1
+
+    rows = {
+        row.submission_id: row for row in db.execute(text(
+            "SELECT submission_id, base_score, final_score, scoring_version FROM lead_scores"
+        ))
+    }
+    ruled = rows[uuid.UUID(submissions["user-1"]).hex]
+    assert (ruled.base_score, ruled.final_score, ruled.scoring_version) == (40, 45, "rules-v1")
+    default = rows[uuid.UUID(submissions["user-2"]).hex]
+    assert default.scoring_version == "v1.0"
+    assert default.base_score == score_features(extract_features(ANSWERS[:1]), RescoringConfig())["base_score"][0]
+    db.close()
+
+
+def test_rescore_run_without_progress_is_reported_failed(db_engine):
+    """Test that an active run whose process stopped reporting progress is marked failed when polled"""
+    db = sessionmaker(bind=db_engine)()
+    stale = RescoreRun(status="processing", updated_at=datetime.utcnow() - timedelta(hours=1))
+    active = RescoreRun(status="processing")
+    db.add_all([stale, active])
+    db.commit()
+
+    assert get_rescore_run(db, stale.id).status == "failed"
+    assert stale.error_message == "Interrupted"
+    assert get_rescore_run(db, active.id).status == "processing"
+    assert get_rescore_run(db, "unknown") is None
+    db.close()
@@ -0,0 +1,175 @@
+import asyncio
+import fnmatch
+import threading
+import time
+
+import pytest
+
+from app.core import cache as cache_module
+from app.core.cache import CacheBackend, CacheManager, MemoryBackend, RedisBackend, create_backend
+
+
+class FakeRedis:
+    """Minimal stand-in for redis.Redis covering what RedisBackend uses"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def set(self, key, value, px=None):
+        self.data[key] = (value, time.monotonic() + px / 1000 if px else None)
+
+    def delete(self, key):
+        return 1 if self.data.pop(key, None) else 0
+
+    def scan_iter(self, match="*", count=None):
+        return [key for key in list(self.data) if fnmatch.fnmatch(key, match)]
+
+
+def test_memory_backend_enforces_entry_and_byte_limits():
+    """Test LRU eviction by count and by total payload size"""
+    backend = MemoryBackend(max_entries=3, max_bytes=100)
+    for key in "abc":
+        backend.set(key, b"x" * 10)
+    backend.get("a")  # a becomes most recently used
+    backend.set("d", b"x" * 10)
+    assert backend.get("b") is None
+    assert backend.get("a") is not None
+
+    backend.set("big", b"x" * 90)
+    assert backend.size_bytes <= 100
+    assert backend.evictions >= 2
+
+
+def test_entries_expire_and_namespaces_are_isolated():
+    """Test per-entry TTL and namespace clearing"""
+    cache = CacheManager(MemoryBackend())
+    templates = cache.namespace("templates", ttl=0.05)
+    profiles = cache.namespace("profiles", ttl=60)
+    templates.set("catalog", ["lead_score"])
+    profiles.set("catalog", {"name": "Acme"})
+
+    assert templates.get("catalog") == ["lead_score"]
+    time.sleep(0.06)
+    assert templates.get("catalog") is None
+    assert profiles.get("catalog") == {"name": "Acme"}
+
+    assert profiles.clear() == 1
+    assert profiles.get("catalog") is None
+
+
+def test_large_values_are_compressed_on_redis():
+    """Test the Redis backend against a fake client with compression"""
+    client = FakeRedis()
+    cache = CacheManager(RedisBackend(client=client), compress_threshold=64)
+    records = [{"email": f"lead{i}@example.com", "score": i} for i in range(200)]
+    cache.set("dashboard_results", "d1", records, ttl=30)
+
+    payload, _ = client.data["formflow:dashboard_results:d1"]
+    assert payload[:1] == b"z"
+    assert len(payload) < len(str(records))
+    assert cache.get("dashboard_results", "d1") == records
+
+
+def test_concurrent_misses_call_loader_once():
+    """Test request coalescing for async callers"""
+    cache = CacheManager(MemoryBackend())
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": 42}
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_set("stats", "k", loader) for _ in range(10)))
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(result == {"value": 42} for result in results)
+    assert cache.stats()["stats"]["coalesced"] == 9
+
+
+def test_stale_value_is_served_while_refreshing():
+    """Test stale-while-revalidate"""
+    cache = CacheManager(MemoryBackend())
+    versions = iter([1, 2])
+
+    async def scenario():
+        first = await cache.get_or_set("stats", "k", lambda: next(versions), ttl=0.01, stale_ttl=60)
+        await asyncio.sleep(0.02)
+        stale = await cache.get_or_set("stats", "k", lambda: next(versions), ttl=0.01, stale_ttl=60)
+        await asyncio.sleep(0)  # let the background refresh run
+        return first, stale, cache.get("stats", "k")
+
+    first, stale, refreshed = asyncio.run(scenario())
+    assert (first, stale, refreshed) == (1, 1, 2)
+    assert cache.stats()["stats"]["stale_hits"] >= 1
+
+
+def test_sync_callers_are_coalesced():
+    """Test request coalescing across threads"""
+    cache = CacheManager(MemoryBackend())
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return "profile"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_set_sync("profiles", "acme", loader)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["profile"] * 5
+    assert cache.stats()["profiles"]["misses"] == 5
+
+
+def test_unreadable_entries_are_misses_and_deleted():
+    """Test that a payload which does not decode is treated as a miss and removed"""
+    client = FakeRedis()
+    cache = CacheManager(RedisBackend(client=client))
+    client.set("formflow:profiles:acme", b"z" + b"not zlib")
+
+    assert cache.get("profiles", "acme", default="missing") == "missing"
+    assert "formflow:profiles:acme" not in client.data
+    assert asyncio.run(cache.get_or_set("profiles", "acme", lambda: "profile")) == "profile"
+    assert cache.stats()["profiles"]["errors"] == 1
+
+
+def test_redis_backend_connects_on_first_use(monkeypatch):
+    """Test that selecting Redis does not connect until the cache is used"""
+    connects = []
+    monkeypatch.setattr(cache_module.settings, "CACHE_BACKEND", "redis")
+    monkeypatch.setattr(cache_module.redis.Redis, "from_url", lambda url: connects.append(url) or FakeRedis())
+
+    backend = create_backend()
+
+    assert isinstance(backend, RedisBackend)
+    assert connects == []
+    backend.set("k", b"v")
+    assert backend.get("k") == b"v"
+    assert len(connects) == 1
+
+
+def test_backends_implement_every_operation():
+    """Test that a backend missing an operation cannot be instantiated"""
+    class GetOnlyBackend(CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnlyBackend()
@@ -0,0 +1,49 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy.orm import sessionmaker
+
+from app.models import CompetitiveOutcomeRollup
+
+COMPETITOR = {"name": " Salesforce ", "display_name": "Salesforce", "aliases": ["sfdc"], "our_advantages": ["Faster setup"]}
+
+
+def test_competitor_profiles_crud(api_client):
+    """Test that a competitor is added once per account, updated and listed with the shared ones"""
+    response = api_client.post("/api/v1/competitors", json=COMPETITOR)
+
+    assert response.status_code == 201
+    competitor = response.json()
+    assert competitor["name"] == "salesforce"
+    assert competitor["user_id"] == api_client.user.id
+    assert api_client.post("/api/v1/competitors", json=COMPETITOR).status_code == 409
+
+    response = api_client.patch(f"/api/v1/competitors/{competitor['id']}", json={"aliases": ["sfdc", "sales cloud"]})
+
+    assert response.status_code == 200
+    assert response.json()["aliases"] == ["sfdc", "sales cloud"]
+    assert [c["id"] for c in api_client.get("/api/v1/competitors").json()] == [competitor["id"]]
+    assert api_client.patch(f"/api/v1/competitors/{uuid.uuid4()}", json={"aliases": []}).status_code == 404
+
+
+def test_competitive_stats_read_the_accounts_rollups(api_client, db_engine):
+    """Test that the statistics sum the signed-in account's buckets only"""
+    competitor_id = uuid.UUID(api_client.post("/api/v1/competitors", json=COMPETITOR).json()["id"])
+    db = sessionmaker(bind=db_engine)()
+    db.add_all([
+        CompetitiveOutcomeRollup(
+            user_id=user_id, competitor_id=competitor_id, bucket_start=datetime(2025, 3, 1),
+            outcome_count=wins + losses, wins=wins, losses=losses, deal_size_sum=0
+        )
+        for user_id, wins, losses in [(api_client.user.id, 2, 1), ("other-account", 0, 4)]
+    ])
+    db.commit()
+    db.close()
+
+    response = api_client.get("/api/v1/competitive-stats")
+
+    assert response.status_code == 200
+    assert response.json()["overall"] == {
+        "total_competitions": 3, "total_wins": 2, "total_losses": 1, "overall_win_rate": 2 / 3
+    }
+    assert response.json()["by_competitor"]["salesforce"]["top_advantages"] == ["Faster setup"]
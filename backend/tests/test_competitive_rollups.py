@@ -0,0 +1,72 @@
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app.models import CompetitiveOutcomeRollup, FormSubmission
+from app.services import competitive_analysis
+from app.services.competitive_analysis import CompetitiveAnalysisService
+from app.services.competitive_rollups import CompetitiveRollupService
+
+
+def add_competitor(db, name):
+    competitor_id = uuid.uuid4()
+    db.execute(text(
+        "INSERT INTO competitor_profiles (id, name, display_name, our_advantages, total_competitions, wins_against, "
+        "losses_against, win_rate, is_active, created_at, updated_at) "
+        "VALUES (:id, :name, :name, '[\"Faster setup\"]', 0, 0, 0, 0, 1, :at, :at)"
+    ), {"id": competitor_id.hex, "name": name, "at": datetime(2025, 1, 1)})
+    db.commit()
+    return competitor_id
+
+
+def add_lead(db, user_id):
+    lead = FormSubmission(user_id=user_id, typeform_id="form_a", response_id=uuid.uuid4().hex, answers={})
+    db.add(lead)
+    db.commit()
+    return uuid.UUID(lead.id)
+
+
+def test_tracked_outcomes_are_rolled_up_per_tenant(monkeypatch, db_engine):
+    """Test that tracking an outcome updates its tenant's daily bucket and the statistics read them"""
+    monkeypatch.setattr(competitive_analysis.openai, "Client", lambda **kwargs: SimpleNamespace())
+    db = sessionmaker(bind=db_engine)()
+    salesforce, hubspot = add_competitor(db, "salesforce"), add_competitor(db, "hubspot")
+    service = CompetitiveAnalysisService(db)
+
+    tracked = [
+        ("user-1", salesforce, "won", 1000, datetime(2025, 3, 1, 9)),
+        ("user-1", salesforce, "lost", None, datetime(2025, 3, 1, 17)),
+        ("user-1", hubspot, "won", 3000, datetime(2025, 3, 5)),
+        ("user-2", salesforce, "lost", 500, datetime(2025, 3, 1)),
+    ]
+    for user_id, competitor_id, outcome, deal_size, at in tracked:
+        monkeypatch.setattr(competitive_analysis, "datetime", SimpleNamespace(utcnow=lambda at=at: at))
+        lead_id = add_lead(db, user_id)
+        # The tenant is looked up from the lead when not given
+        service.track_competitive_outcome(lead_id, competitor_id, outcome, {"deal_size": deal_size})
+
+    assert db.query(CompetitiveOutcomeRollup).filter_by(user_id="user-1").count() == 2
+    rollups = CompetitiveRollupService(db)
+    stats = rollups.get_statistics("user-1")
+    assert stats["overall"] == {"total_competitions": 3, "total_wins": 2, "total_losses": 1, "overall_win_rate": 2 / 3}
+    assert stats["by_competitor"]["salesforce"] == {
+        "competitions": 2, "wins": 1, "losses": 1, "win_rate": 0.5, "top_advantages": ["Faster setup"]
+    }
+    assert "recent_trends" not in stats
+
+    period = rollups.get_statistics("user-1", date_from=datetime(2025, 3, 1, 12), date_to=datetime(2025, 3, 1, 12))
+    assert period["recent_trends"] == {"period_wins": 1, "period_losses": 1, "average_deal_size": 500}
+    assert rollups.get_statistics("user-2")["overall"]["total_losses"] == 1
+
+    # Rebuilding from the raw outcomes gives the same buckets. Postgres casts lead ids
+    # to their dashed text form, sqlite stores them as hex
+    db.execute(text(
+        "UPDATE competitive_outcomes SET lead_id = "
+        "(SELECT id FROM form_submissions WHERE replace(id, '-', '') = competitive_outcomes.lead_id)"
+    ))
+    assert rollups.rebuild("user-1") == 3
+    assert rollups.get_statistics("user-1") == stats
+    db.close()
@@ -0,0 +1,118 @@
+import json
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.models import CompetitorProfile
+from app.services import competitive_analysis
+from app.services.competitive_analysis import CompetitiveAnalysisService
+from app.services.competitor_catalog import DEFAULT_BATTLE_CARDS, CompetitorCatalogCache
+
+
+def add_profile(db, user_id, name, win_rate=0.0, battle_card=None, at=datetime(2025, 1, 1)):
+    profile_id = uuid.uuid4()
+    db.execute(text(
+        "INSERT INTO competitor_profiles (id, user_id, name, display_name, win_rate, battle_card, is_active, created_at, updated_at) "
+        "VALUES (:id, :user_id, :name, :name, :win_rate, :battle_card, 1, :at, :at)"
+    ), {"id": profile_id.hex, "user_id": user_id, "name": name, "win_rate": win_rate,
+        "battle_card": json.dumps(battle_card) if battle_card else None, "at": at})
+    db.commit()
+    return profile_id
+
+
+def add_handler(db, competitor_id, objection_type, success_rate, is_active=True):
+    db.execute(text(
+        "INSERT INTO objection_handlers (id, competitor_id, objection_type, objection_text, success_rate, is_active, created_at, updated_at) "
+        "VALUES (:id, :competitor_id, :type, :type, :rate, :active, :at, :at)"
+    ), {"id": uuid.uuid4().hex, "competitor_id": competitor_id.hex, "type": objection_type,
+        "rate": success_rate, "active": is_active, "at": datetime(2025, 1, 1)})
+    db.commit()
+
+
+def test_catalog_serves_profiles_cards_and_handlers_from_one_load(db_engine):
+    """Test that lookups are answered from the loaded catalog, the tenant's profile first"""
+    engine = db_engine
+    db = sessionmaker(bind=engine)()
+    salesforce = add_profile(db, None, "salesforce", win_rate=0.4)
+    add_profile(db, "user-1", "salesforce", win_rate=0.6, battle_card={"positioning": "Tenant card"})
+    add_profile(db, "user-2", "zoho", win_rate=0.9)
+    add_handler(db, salesforce, "price", 0.3)
+    add_handler(db, salesforce, "features", 0.8)
+    add_handler(db, salesforce, "trust", 0.9, is_active=False)
+
+    cache = CompetitorCatalogCache(check_ttl=0)
+    catalog = cache.get(db)
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    assert cache.get(db) is catalog
+    assert len(statements) == 1  # The version check only
+
+    # While the shared version is fresh, not even the version is read
+    shared = CompetitorCatalogCache(check_ttl=60)
+    assert shared.get(db) is not catalog
+    statements.clear()
+    assert shared.get(db).profile("salesforce", "user-1").win_rate == 0.6
+    assert statements == []
+
+    assert catalog.profile("salesforce", "user-1").win_rate == 0.6
+    assert catalog.profile("salesforce", "user-3").win_rate == 0.4
+    assert [p.name for p in catalog.profiles_for("user-1")] == ["salesforce", "salesforce"]
+    assert [h.objection_type for h in catalog.objection_handlers(salesforce)] == ["features", "price"]
+    assert [h.objection_type for h in catalog.objection_handlers(str(salesforce), "price")] == ["price"]
+
+    assert catalog.battle_card("salesforce", "user-1") == {"positioning": "Tenant card"}
+    # Callers customize their copy, the cached and built-in cards are untouched
+    catalog.battle_card("salesforce")["industry_positioning"] = "Retail"
+    catalog.battle_card("hubspot")["size_positioning"] = "SMB"
+    assert "industry_positioning" not in catalog.battle_card("salesforce")
+    assert "size_positioning" not in DEFAULT_BATTLE_CARDS["hubspot"]
+    db.close()
+
+
+def test_catalog_reloads_after_writes(db_engine):
+    """Test that a new version of the tables is loaded after a write by any process or an invalidation"""
+    db = sessionmaker(bind=db_engine)()
+    salesforce = add_profile(db, None, "salesforce")
+    cache = CompetitorCatalogCache(check_ttl=0)
+    catalog = cache.get(db)
+
+    # Written elsewhere, picked up through the version
+    add_handler(db, salesforce, "price", 0.5)
+    reloaded = cache.get(db)
+    assert reloaded is not catalog and len(reloaded.objection_handlers(salesforce)) == 1
+
+    db.execute(text("UPDATE competitor_profiles SET win_rate = 1.0, updated_at = :at"), {"at": datetime(2025, 1, 2)})
+    db.commit()
+    assert cache.get(db).profile("salesforce").win_rate == 1.0
+
+    current = cache.get(db)
+    cache.invalidate()
+    assert cache.get(db) is not current
+    db.close()
+
+
+def test_global_profile_created_concurrently_is_loaded(db_engine, monkeypatch):
+    """Test that global names are unique and a profile created since the catalog was loaded is reused"""
+    monkeypatch.setattr(competitive_analysis.openai, "Client", lambda **kwargs: SimpleNamespace())
+    db = sessionmaker(bind=db_engine)()
+    add_profile(db, "user-1", "hubspot")
+    service = CompetitiveAnalysisService(db)
+    catalog = CompetitorCatalogCache(check_ttl=0).get(db)
+
+    # Another analysis creates the global profile after this one loaded the catalog
+    existing = add_profile(db, None, "hubspot")
+    with pytest.raises(IntegrityError):
+        add_profile(db, None, "hubspot")
+    db.rollback()
+
+    profile = service._get_or_create_competitor("hubspot", catalog=catalog)
+
+    assert profile.id == existing
+    assert db.query(CompetitorProfile).filter_by(name="hubspot").count() == 2
+    db.close()
@@ -0,0 +1,83 @@
+import json
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app.services import competitive_analysis
+from app.services.competitive_analysis import CompetitiveAnalysisService
+from app.services.competitor_dictionaries import CompetitorDictionaryCache, build_dictionary
+
+
+def make_profile(name, aliases=(), is_active=True, user_id="user-1"):
+    return SimpleNamespace(name=name, display_name=name.title(), aliases=list(aliases), is_active=is_active, user_id=user_id)
+
+
+def test_tenant_aliases_fuzzy_matching_and_inactive_profiles():
+    """Test that profile aliases extend the built-in patterns and match exactly or one edit away"""
+    dictionary = build_dictionary([
+        make_profile("zendesk", ["zendesk sell", "zd"]),
+        make_profile("salesforce", ["pardot"]),
+        make_profile("excel", is_active=False),
+    ])
+
+    assert dictionary.detect('"zd" and some pardot, plus google sheets') == (["salesforce", "zendesk"], 0.85)
+    detected, confidence = dictionary.detect("moving off zendsek and hubsopt")
+    assert detected == ["zendesk", "hubspot"] and confidence == 0.6
+
+    # Generic built-in keywords stay exact, "manuals" is not "manual"
+    assert dictionary.detect("we read the manuals") == ([], 0)
+    assert dictionary.probable_mention("our current crm is slow")
+    assert not dictionary.probable_mention("we read the manuals")
+
+
+def test_llm_only_called_on_probable_mentions(monkeypatch):
+    """Test that the LLM fallback runs only when the pre-filter suggests an implicit mention"""
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        content = json.dumps({"competitors": ["monday"], "confidence": 0.7})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(competitive_analysis.openai, "Client", lambda **kwargs: client)
+    monkeypatch.setattr(competitive_analysis.competitor_dictionaries, "get", lambda db, user_id=None: build_dictionary())
+    service = CompetitiveAnalysisService(db=None)
+
+    assert service._detect_competitors({"notes": "Great product, send pricing"}) == ([], 0)
+    assert calls == []
+    assert service._detect_competitors({"notes": "Our current tool is too slow"}) == (["monday"], 0.7)
+    assert service._detect_competitors({"notes": "We use Salesforce"}) == (["salesforce"], 0.75)
+    assert len(calls) == 1
+
+
+def test_dictionary_cache_rebuilds_on_change(db_engine):
+    """Test that a tenant's dictionary is reused until a profile it reads changes"""
+    db = sessionmaker(bind=db_engine)()
+
+    def add_profile(user_id, name, aliases, updated_at):
+        db.execute(text(
+            "INSERT INTO competitor_profiles (id, user_id, name, display_name, aliases, is_active, created_at, updated_at) "
+            "VALUES (:id, :user_id, :name, :name, :aliases, 1, :at, :at)"
+        ), {"id": uuid.uuid4().hex, "user_id": user_id, "name": name, "aliases": json.dumps(aliases), "at": updated_at})
+        db.commit()
+
+    cache = CompetitorDictionaryCache(check_ttl=0)
+    add_profile(None, "zoho", ["zoho crm"], datetime(2025, 1, 1))
+    shared = cache.get(db)
+    assert "zoho" in shared.aliases and "close" not in shared.aliases
+    assert cache.get(db) is shared
+
+    add_profile("user-1", "close", ["close.io"], datetime(2025, 1, 2))
+    tenant = cache.get(db, "user-1")
+    assert tenant.detect("migrating from close.io and zoho crm")[0] == ["zoho", "close"]
+    assert cache.get(db, "user-1") is tenant
+    assert cache.get(db, "user-2").aliases == shared.aliases
+
+    db.execute(text("UPDATE competitor_profiles SET is_active = 0, updated_at = :at WHERE name = 'close'"), {"at": datetime(2025, 1, 3)})
+    db.commit()
+    assert "close" not in cache.get(db, "user-1").aliases
+    db.close()
@@ -0,0 +1,196 @@
+import csv
+import io
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import FormSubmission
+from app.services import crm_export
+from app.services.crm_export import CRMExportService
+
+
+class FakeScoreQuery:
+    def __init__(self, session):
+        self.session = session
+
+    def filter(self, *criteria):
+        return self
+
+    def order_by(self, *columns):
+        return self
+
+    def __iter__(self):
+        self.session.queries += 1
+        return iter(self.session.scores)
+
+
+class FakeSession:
+    """Counts LeadScore round trips"""
+
+    def __init__(self, scores):
+        self.scores = scores
+        self.queries = 0
+
+    def query(self, model):
+        return FakeScoreQuery(self)
+
+
+def make_leads(count):
+    return [
+        {"submission_id": f"sub-{i}", "name": f"Lead {i} Example", "email": f"lead{i}@example.com", "budget": "$50k"}
+        for i in range(count)
+    ]
+
+
+def test_scores_are_prefetched_per_batch():
+    """Test that scores are loaded with one query per batch, not per lead"""
+    scores = [SimpleNamespace(submission_id="sub-3", final_score=85, score_category="hot")]
+    db = FakeSession(scores)
+    service = CRMExportService(db)
+
+    scored = list(service.score_leads(make_leads(25), batch_size=10))
+
+    assert db.queries == 3
+    assert scored[3][1].final_score == 85
+    assert scored[4][1] is None
+
+
+def test_csv_is_written_incrementally(monkeypatch):
+    """Test that CSV output is produced in chunks with a single header"""
+    monkeypatch.setattr(crm_export, "CSV_FLUSH_ROWS", 50)
+    service = CRMExportService(FakeSession([]))
+    rows = service.iter_rows(service.score_leads(make_leads(120), include_scores=False), crm_type="salesforce")
+
+    chunks = list(service.iter_csv(rows))
+    assert len(chunks) == 3
+
+    parsed = list(csv.DictReader(io.StringIO("".join(chunks))))
+    assert len(parsed) == 120
+    assert parsed[0]["FirstName"] == "Lead"
+    assert parsed[0]["LastName"] == "Example"
+    assert parsed[0]["Rating"] == "Cold"
+
+
+def test_export_to_csv_without_leads():
+    """Test that an empty export produces an empty file"""
+    assert CRMExportService(FakeSession([])).export_to_csv([]) == ""
+
+
+def test_iter_leads_streams_submissions():
+    """Test reading leads from a submission query in batches"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[FormSubmission.__table__])
+    db = sessionmaker(bind=engine)()
+    for i in range(5):
+        db.add(FormSubmission(response_id=f"r{i}", answers={"email": f"lead{i}@example.com"}, created_at=datetime(2025, 1, i + 1)))
+    db.commit()
+
+    service = CRMExportService(db)
+    query = db.query(FormSubmission).order_by(FormSubmission.created_at)
+    leads = list(service.iter_leads(query, include_scores=False, batch_size=2))
+
+    assert [lead["email"] for lead, _ in leads] == [f"lead{i}@example.com" for i in range(5)]
+    assert all(lead["submission_id"] and score is None for lead, score in leads)
+    db.close()
+
+
+def test_excel_export_writes_typed_cells(tmp_path):
+    """Test the write-only XLSX writer with numeric and date cells"""
+    from openpyxl import load_workbook
+
+    service = CRMExportService(FakeSession([]))
+    leads = make_leads(3)
+    leads[0]["company_size"] = "50-100"
+    leads[0]["revenue"] = "$2M"
+    rows = service.iter_rows(service.score_leads(leads, include_scores=False), crm_type="generic")
+
+    path = tmp_path / "leads.xlsx"
+    assert service.write_excel(rows, str(path), crm_type="generic") == 3
+
+    workbook = load_workbook(path)
+    sheet = workbook["Leads"]
+    header = [cell.value for cell in sheet[1]]
+    first = dict(zip(header, [cell.value for cell in sheet[2]]))
+    assert first["Company_Size"] == 50
+    assert first["Annual_Revenue"] == "$2M"
+    assert first["Lead_Score"] == 0
+    assert first["Created_Date"].year >= 2025
+    assert sheet.max_row == 4
+    assert workbook["Metadata"]["B5"].value == "FormFlow AI"
+
+
+def test_score_columns_use_the_lead_score():
+    """Test that compiled plans pass the LeadScore to score columns"""
+    service = CRMExportService(FakeSession([]))
+    score = SimpleNamespace(final_score=85, score_category="hot")
+    lead = {"name": "Ann Lee", "insights": {"ai_summary": "Strong fit"}, "recommendations": [{"action": "Call"}]}
+
+    row = next(service.iter_rows([(lead, score)], crm_type="salesforce", include_recommendations=True))
+    assert row["Rating"] == "Hot"
+    assert row["Custom_Lead_Score__c"] == 85
+    assert row["Custom_Score_Category__c"] == "hot"
+    assert row["Description"] == "Strong fit"
+    assert row["Custom_Next_Action__c"] == "Call"
+
+
+def test_pipedrive_custom_fields_and_fallbacks():
+    """Test that pipedrive custom fields are flattened and field fallbacks apply in order"""
+    service = CRMExportService(FakeSession([]))
+    lead = {"full_name": "Ann Lee", "company_name": "Acme", "job_title": "CTO", "budget": "$50k", "employees": "200+"}
+
+    row = next(service.iter_rows([(lead, None)], crm_type="pipedrive"))
+    assert row["name"] == "Ann Lee"
+    assert row["org_name"] == "Acme"
+    assert row["value"] == 50000.0
+    assert row["custom_job_title"] == "CTO"
+    assert row["custom_company_size"] == "200"
+    assert row["custom_lead_score"] == 0
+    assert "custom_fields" not in row
+
+    # A present but empty key wins over later fallbacks, like nested dict.get calls
+    row = next(service.iter_rows([({"company": "", "company_name": "Acme"}, None)], crm_type="generic"))
+    assert row["Company"] == ""
+
+
+def test_unknown_crm_type_falls_back_to_generic():
+    """Test that an unknown CRM type exports the generic columns"""
+    service = CRMExportService(FakeSession([]))
+    row = next(service.iter_rows([({"name": "Ann"}, None)], crm_type="zoho"))
+    assert row["Name"] == "Ann"
+    assert row["Source"] == "FormFlow AI"
+
+
+def test_parquet_export_has_typed_columns_and_row_groups(tmp_path):
+    """Test Parquet and Arrow exports with typed columns, flattened answers and one row group per batch"""
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    service = CRMExportService(FakeSession([]))
+    leads = make_leads(5)
+    for lead in leads:
+        lead["created_at"] = datetime(2025, 1, 2, 10, 30)
+        lead["company"] = {"name": "Acme", "size": "50-100"}
+    scored = [(lead, SimpleNamespace(final_score=70 + i, score_category="warm")) for i, lead in enumerate(leads)]
+
+    schema = service.arrow_schema("generic")
+    path = tmp_path / "leads.parquet"
+    batches = service.iter_record_batches(scored, crm_type="generic", batch_rows=2)
+    assert service.write_parquet(batches, str(path), schema) == 5
+
+    parquet_file = pq.ParquetFile(path)
+    assert parquet_file.metadata.num_row_groups == 3
+    table = parquet_file.read()
+    assert table.schema.field("Lead_Score").type == pa.int64()
+    assert table.schema.field("created_at").type == pa.timestamp("us")
+    assert table.column("Lead_Score").to_pylist() == [70, 71, 72, 73, 74]
+    assert dict(table.column("answers")[0].as_py())["company.size"] == "50-100"
+
+    stream_path = tmp_path / "leads.arrow"
+    batches = service.iter_record_batches(scored, crm_type="generic")
+    assert service.write_arrow_stream(batches, str(stream_path), schema) == 5
+    with pa.ipc.open_stream(str(stream_path)) as reader:
+        assert reader.read_all().num_rows == 5
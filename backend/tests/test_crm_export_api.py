@@ -0,0 +1,136 @@
+import csv
+import io
+import uuid
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.endpoints import crm_export
+from app.config import settings
+from app.models import FormSubmission
+from app.services import export_jobs
+from app.services.export_jobs import ExportJobRunner
+
+
+class InlineRunner(ExportJobRunner):
+    """Runs a submitted job to completion before the request returns, unless paused"""
+
+    def __init__(self):
+        super().__init__(process_workers=0)
+        self.paused = False
+
+    def submit(self, job_id):
+        if self.paused:
+            return
+        for chunk_index in export_jobs.prepare_job(job_id):
+            export_jobs.produce_chunk(job_id, chunk_index)
+        export_jobs.finish_job(job_id)
+
+
+@pytest.fixture
+def runner(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "EXPORT_STORAGE_DIR", str(tmp_path))
+    runner = InlineRunner()
+    monkeypatch.setattr(crm_export, "export_job_runner", runner)
+    return runner
+
+
+@pytest.fixture
+def leads(api_client, db_engine):
+    db = sessionmaker(bind=db_engine)()
+    db.add_all(
+        FormSubmission(
+            user_id=api_client.user.id,
+            response_id=uuid.uuid4().hex,
+            answers={"name": f"Lead{i} Example", "email": f"lead{i}@example.com"},
+            # Older than the overlap of delta exports
+            created_at=datetime.utcnow() - timedelta(hours=1)
+        )
+        for i in range(3)
+    )
+    db.commit()
+    db.close()
+
+
+def request(**values):
+    return {"crm_type": "generic", "include_scores": False, **values}
+
+
+def test_export_job_completes_and_downloads(api_client, leads, runner):
+    """Test that a background export is polled until completed and its file downloaded"""
+    response = api_client.post("/api/v1/export/jobs", json=request())
+
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+
+    job = api_client.get(f"/api/v1/export/jobs/{job_id}").json()
+
+    assert job["status"] == "completed"
+    assert job["download_url"] == f"/api/v1/export/jobs/{job_id}/download"
+
+    response = api_client.get(job["download_url"])
+
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert sorted(row["Email"] for row in rows) == [f"lead{i}@example.com" for i in range(3)]
+
+
+def test_parquet_export_job_downloads_a_parquet_file(api_client, leads, runner):
+    """Test that a background Parquet export is served with the Parquet media type"""
+    job_id = api_client.post("/api/v1/export/jobs", json=request(format="parquet")).json()["id"]
+
+    response = api_client.get(f"/api/v1/export/jobs/{job_id}/download")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.parquet"
+    assert pq.read_table(io.BytesIO(response.content)).num_rows == 3
+
+
+def test_export_job_is_cancelled_once(api_client, leads, runner):
+    """Test that an active export is cancelled, cannot be downloaded and cancelling it again conflicts"""
+    runner.paused = True
+    job_id = api_client.post("/api/v1/export/jobs", json=request()).json()["id"]
+
+    assert api_client.get(f"/api/v1/export/jobs/{job_id}/download").status_code == 409
+    assert api_client.delete(f"/api/v1/export/jobs/{job_id}").status_code == 200
+    assert api_client.get(f"/api/v1/export/jobs/{job_id}").json()["status"] == "cancelled"
+    assert api_client.delete(f"/api/v1/export/jobs/{job_id}").status_code == 409
+    assert api_client.get(f"/api/v1/export/jobs/{uuid.uuid4()}").status_code == 404
+
+
+def test_delta_export_skips_exported_leads(api_client, leads):
+    """Test that a delta export only contains leads added since the last one"""
+    first = api_client.post("/api/v1/export/leads/csv", json=request(delta=True))
+    second = api_client.post("/api/v1/export/leads/csv", json=request(delta=True))
+
+    assert first.status_code == 200
+    assert len(list(csv.DictReader(io.StringIO(first.text)))) == 3
+    assert second.status_code == 200
+    assert list(csv.DictReader(io.StringIO(second.text))) == []
+
+
+def test_parquet_export_has_one_row_per_lead(api_client, leads):
+    """Test that the Parquet export is a typed file with every lead"""
+    response = api_client.post("/api/v1/export/leads/parquet", json=request())
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.parquet"
+    table = pq.read_table(io.BytesIO(response.content))
+    assert sorted(table.column("Email").to_pylist()) == [f"lead{i}@example.com" for i in range(3)]
+
+
+def test_arrow_export_is_an_ipc_stream(api_client, leads):
+    """Test that the Arrow export reads back as an IPC stream with every lead"""
+    response = api_client.post("/api/v1/export/leads/arrow", json=request())
+
+    assert response.status_code == 200
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == 3
+
+
+def test_columnar_export_without_leads_is_not_found(api_client):
+    """Test that an export of an account without leads is rejected"""
+    assert api_client.post("/api/v1/export/leads/parquet", json=request()).status_code == 404
@@ -0,0 +1,73 @@
+import uuid
+
+from app.core.cache import CacheManager, MemoryBackend
+from app.models.multi_form_dashboard import MultiFormDashboard
+from app.services.dashboard_cache import DashboardResultCache, cache_key
+
+
+def local_cache(max_entries=100):
+    backend = MemoryBackend(max_entries=max_entries)
+    return backend, DashboardResultCache(CacheManager(backend).namespace("dashboard_results"))
+
+
+def make_dashboard(**overrides):
+    values = {
+        "id": uuid.uuid4(),
+        "aggregation_config": {"aggregation_method": "union"},
+        "filter_config": {"custom_filters": [{"field": "score", "operator": ">", "value": 7}]},
+        "analytics_config": None,
+        "data_version": 0
+    }
+    values.update(overrides)
+    return MultiFormDashboard(**values)
+
+
+def test_cache_key_tracks_config_and_watermark():
+    """Test that config edits and data watermark bumps change the key"""
+    dashboard = make_dashboard()
+    key = cache_key(dashboard)
+    assert cache_key(make_dashboard(id=dashboard.id)) == key
+
+    dashboard.data_version = 1
+    assert cache_key(dashboard) != key
+
+    dashboard.data_version = 0
+    dashboard.filter_config = {"custom_filters": [{"field": "score", "operator": ">", "value": 8}]}
+    assert cache_key(dashboard) != key
+
+
+def test_results_are_served_until_dashboard_is_dirty():
+    """Test that a result is reused until the watermark moves"""
+    _, cache = local_cache()
+    dashboard = make_dashboard()
+    cache.put(dashboard, cache_key(dashboard), {"metrics": {"total": 3}})
+
+    assert cache.get(dashboard) == {"metrics": {"total": 3}}
+
+    # Another process marked the dashboard dirty
+    dashboard.data_version = 1
+    assert cache.get(dashboard) is None
+
+
+def test_result_computed_during_ingest_is_not_served_for_new_data():
+    """Test that the key is captured before the aggregation reads its inputs"""
+    _, cache = local_cache()
+    dashboard = make_dashboard()
+    key = cache_key(dashboard)
+    dashboard.data_version = 1  # submission arrived while aggregating
+    cache.put(dashboard, key, {"metrics": {}})
+
+    assert cache.get(dashboard) is None
+
+
+def test_local_tier_is_bounded_and_falls_back_to_db():
+    """Test LRU eviction and reload from the cached_data column"""
+    backend, cache = local_cache(max_entries=2)
+    dashboards = [make_dashboard() for _ in range(3)]
+    for dashboard in dashboards:
+        cache.put(dashboard, cache_key(dashboard), {"metrics": {"id": str(dashboard.id)}})
+
+    assert len(backend) == 2
+    assert cache.cache.get(f"{dashboards[0].id}:{cache_key(dashboards[0])}") is None
+    # Still served from the DB tier
+    assert cache.get(dashboards[0]) == {"metrics": {"id": str(dashboards[0].id)}}
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app.models import FormSubmission
+from app.schemas.crm_export import CRMExportRequest
+from app.services.crm_export import CRMExportService, lead_query
+from app.services.export_history import DELTA_OVERLAP, complete_export, delta_since, start_export
+
+
+def add_submission(db, index, created_at):
+    submission = FormSubmission(
+        user_id="user-1",
+        response_id=f"r{index}",
+        answers={"name": f"Lead{index} Example", "email": f" Lead{index}@Example.com"},
+        created_at=created_at
+    )
+    db.add(submission)
+    db.commit()
+    return submission
+
+
+def test_delta_export_selects_changes_since_watermark(db_engine):
+    """Test that a delta export only selects leads created or re-scored after the last completed export"""
+    db = sessionmaker(bind=db_engine)()
+    old = datetime.utcnow() - timedelta(days=2)
+    rescored = add_submission(db, 0, old)
+    add_submission(db, 1, old)
+
+    request = CRMExportRequest(crm_type="salesforce", delta=True)
+    assert delta_since(db, "user-1", "salesforce") is None
+
+    first = start_export(db, "user-1", request, "csv")
+    assert first.since is None
+    assert lead_query(db, "user-1", request, since=first.since).count() == 2
+
+    # Only completed exports advance the watermark
+    failed = start_export(db, "user-1", request, "csv")
+    assert failed.since is None
+    complete_export(db, first.id, 2)
+    first.watermark = datetime.utcnow() - timedelta(hours=1)
+    db.commit()
+
+    created = add_submission(db, 2, datetime.utcnow())
+    db.execute(
+        text("INSERT INTO lead_scores (id, submission_id, base_score, final_score, score_factors, calculated_at) "
+             "VALUES ('s1', :submission_id, 50, 50, '{}', :calculated_at)"),
+        {"submission_id": rescored.id, "calculated_at": datetime.utcnow()}
+    )
+    db.commit()
+
+    second = start_export(db, "user-1", request, "csv")
+    assert second.since is not None
+    assert delta_since(db, "user-1", "hubspot") is None
+    changed = {lead.id for lead in lead_query(db, "user-1", request, since=second.since)}
+    assert changed == {rescored.id, created.id}
+    db.close()
+
+
+def test_filtered_export_does_not_advance_the_watermark(db_engine):
+    """Test that exports of some lead ids or a date range leave the delta watermark where it was"""
+    db = sessionmaker(bind=db_engine)()
+    old = datetime.utcnow() - timedelta(days=2)
+    skipped = add_submission(db, 0, old)
+    picked = add_submission(db, 1, old)
+
+    full = start_export(db, "user-1", CRMExportRequest(crm_type="salesforce"), "csv")
+    complete_export(db, full.id, 0)
+    full.watermark = old - timedelta(days=1)
+    db.commit()
+
+    for request in [
+        CRMExportRequest(crm_type="salesforce", lead_ids=[picked.id]),
+        CRMExportRequest(crm_type="salesforce", delta=True, date_from=old - timedelta(hours=1)),
+    ]:
+        subset = start_export(db, "user-1", request, "csv")
+        assert not subset.full_selection
+        complete_export(db, subset.id, 1)
+
+    request = CRMExportRequest(crm_type="salesforce", delta=True)
+    delta = start_export(db, "user-1", request, "csv")
+    assert delta.since == full.watermark - DELTA_OVERLAP
+    assert {lead.id for lead in lead_query(db, "user-1", request, since=delta.since)} == {skipped.id, picked.id}
+    db.close()
+
+
+def test_upsert_key_column_comes_first():
+    """Test that an upsert key adds the CRM's key column with a normalized value"""
+    service = CRMExportService(db=None)
+    lead = {"submission_id": "sub-1", "email": " Ann@Example.com"}
+
+    row = next(service.iter_rows([(lead, None)], crm_type="salesforce", upsert_key="email"))
+    assert list(row)[0] == "FormFlow_Id__c"
+    assert row["FormFlow_Id__c"] == "ann@example.com"
+
+    row = next(service.iter_rows([(lead, None)], crm_type="hubspot", upsert_key="submission_id"))
+    assert row["formflow_id"] == "sub-1"
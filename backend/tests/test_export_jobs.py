@@ -0,0 +1,155 @@
+import asyncio
+import csv
+import json
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.database import Base
+from app.models import ExportChunk, ExportHistory, ExportJob, FormSubmission
+from app.schemas.crm_export import CRMExportRequest
+from app.services import export_jobs
+from app.services.export_jobs import ExportJobRunner, ExportJobService
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_STORAGE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "EXPORT_CHUNK_SIZE", 3)
+
+    # A file database, the runner produces chunks from several threads
+    engine = create_engine(f"sqlite:///{tmp_path / 'exports.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[FormSubmission.__table__, ExportJob.__table__, ExportChunk.__table__, ExportHistory.__table__])
+    factory = sessionmaker(bind=engine)
+
+    db = factory()
+    base_time = datetime(2025, 1, 1)
+    for i in range(10):
+        db.add(FormSubmission(
+            user_id="user-1",
+            response_id=f"r{i}",
+            answers={"name": f"Lead{i} Example", "email": f"lead{i}@example.com"},
+            # Pairs share a timestamp so chunk boundaries fall inside equal keys
+            created_at=base_time + timedelta(minutes=i // 2)
+        ))
+    db.commit()
+    db.close()
+    return factory
+
+
+def make_request(export_format="csv"):
+    return CRMExportRequest(format=export_format, crm_type="generic", include_scores=False)
+
+
+def test_export_job_resumes_from_checkpoint(session_factory):
+    """Test that an interrupted job only produces the remaining chunks"""
+    db = session_factory()
+    service = ExportJobService(db)
+    job_id = service.create_job("user-1", make_request()).id
+
+    assert service.prepare(job_id) == [0, 1, 2, 3]
+    assert service.produce_chunk(job_id, 0) == 3
+    assert service.produce_chunk(job_id, 0) == 0  # Already done
+    assert service.produce_chunk(job_id, 1) == 3
+    db.close()
+
+    # Restart: a new worker picks the job up again
+    db = session_factory()
+    service = ExportJobService(db)
+    remaining = service.prepare(job_id)
+    assert remaining == [2, 3]
+    for chunk_index in remaining:
+        service.produce_chunk(job_id, chunk_index)
+    assert service.finish(job_id)
+
+    job = db.get(ExportJob, job_id)
+    assert job.status == "completed"
+    assert job.exported_rows == 10
+    assert job.progress == 1.0
+
+    with open(job.file_path, newline="") as export_file:
+        rows = list(csv.DictReader(export_file))
+    # Each lead exactly once across chunk boundaries
+    assert sorted(row["Email"] for row in rows) == sorted(f"lead{i}@example.com" for i in range(10))
+    assert len({row["Created_Date"] for row in rows}) == 1
+    db.close()
+
+
+def test_finish_waits_for_chunks_held_elsewhere(session_factory):
+    """Test that a job is not assembled while another worker holds a chunk"""
+    db = session_factory()
+    service = ExportJobService(db)
+    job = service.create_job("user-1", make_request("json"))
+    service.prepare(job.id)
+
+    db.query(ExportChunk).filter(ExportChunk.chunk_index == 3).update(
+        {"status": "processing", "claimed_at": datetime.utcnow()}
+    )
+    db.commit()
+
+    for chunk_index in range(4):
+        service.produce_chunk(job.id, chunk_index)
+    assert not service.finish(job.id)
+
+    # The claim goes stale, the chunk is taken over
+    db.query(ExportChunk).filter(ExportChunk.chunk_index == 3).update(
+        {"claimed_at": datetime.utcnow() - timedelta(hours=1)}
+    )
+    db.commit()
+    assert service.produce_chunk(job.id, 3) == 1
+    assert service.finish(job.id)
+
+    with open(db.get(ExportJob, job.id).file_path) as export_file:
+        assert len(json.load(export_file)) == 10
+    db.close()
+
+
+@pytest.mark.parametrize("export_format", ["parquet", "arrow"])
+def test_columnar_job_assembles_typed_parts(session_factory, export_format):
+    """Test that Parquet and Arrow jobs write typed parts per chunk and assemble every lead once"""
+    db = session_factory()
+    service = ExportJobService(db)
+    job = service.create_job("user-1", make_request(export_format))
+
+    for chunk_index in service.prepare(job.id):
+        service.produce_chunk(job.id, chunk_index)
+    assert service.finish(job.id)
+
+    job = db.get(ExportJob, job.id)
+    assert job.file_path.endswith(f".{export_format}")
+    if export_format == "parquet":
+        table = pq.read_table(job.file_path)
+    else:
+        with pa.memory_map(job.file_path) as source:
+            table = pa.ipc.open_stream(source).read_all()
+    assert sorted(table.column("Email").to_pylist()) == sorted(f"lead{i}@example.com" for i in range(10))
+    assert table.schema.field("created_at").type == pa.timestamp("us")
+    assert job.exported_rows == 10
+    db.close()
+
+
+def test_runner_runs_job_and_cancel(session_factory, monkeypatch):
+    """Test running a job end to end with the runner, and cancelling a finished job"""
+    monkeypatch.setattr(export_jobs, "SessionLocal", session_factory)
+    db = session_factory()
+    job = ExportJobService(db).create_job("user-1", make_request("excel"))
+
+    async def run():
+        runner = ExportJobRunner(process_workers=0)
+        runner.submit(job.id)
+        await asyncio.gather(*runner._tasks.values())
+        return runner
+
+    runner = asyncio.run(run())
+
+    db.expire_all()
+    finished = db.get(ExportJob, job.id)
+    assert finished.status == "completed"
+    assert finished.file_path.endswith(".xlsx")
+    assert not runner.cancel(job.id)
+    db.close()
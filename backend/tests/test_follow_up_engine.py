@@ -0,0 +1,130 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.services import follow_up_engine
+from app.services.follow_up_engine import (
+    RECOMMENDATION_TASK, FollowUpRecommendationEngine, generate_batched, generate_concurrently
+)
+from app.services.llm_batching import LLMBatcher
+
+
+def test_bulk_generation_is_bounded_and_streams_in_completion_order(monkeypatch):
+    """Test that leads are generated concurrently up to the limit and yielded as each finishes"""
+    monkeypatch.setattr(follow_up_engine.openai, "Client", lambda **kwargs: SimpleNamespace())
+    engine = FollowUpRecommendationEngine(db=None)
+    running = []
+    peak = []
+
+    async def generate_recommendations(lead_data, **kwargs):
+        running.append(lead_data["id"])
+        peak.append(len(running))
+        await asyncio.sleep(lead_data["delay"])
+        running.remove(lead_data["id"])
+        if lead_data["id"] == "broken":
+            raise ValueError("bad lead")
+        return [{"action": f"Call {lead_data['id']}"}]
+
+    engine.generate_recommendations = generate_recommendations
+    leads = [
+        (lead_id, {"lead_data": {"id": lead_id, "delay": delay}})
+        for lead_id, delay in [("slow", 0.05), ("broken", 0.01), ("fast", 0.01), ("last", 0.01)]
+    ]
+
+    async def collect():
+        return [item async for item in generate_concurrently(engine, leads, concurrency=2)]
+
+    results = asyncio.run(collect())
+
+    assert max(peak) == 2
+    assert [lead_id for lead_id, _ in results] == ["broken", "fast", "last", "slow"]
+    assert isinstance(results[0][1], ValueError)
+    assert results[-1][1] == [{"action": "Call slow"}]
+
+
+def test_bulk_enhancement_packs_leads_into_one_completion_per_chunk(monkeypatch):
+    """Test that a chunk of leads is enhanced by one batched completion, missing leads keep their base recommendations"""
+    monkeypatch.setattr(follow_up_engine.openai, "Client", lambda **kwargs: SimpleNamespace())
+    engine = FollowUpRecommendationEngine(db=None)
+    chunks = []
+
+    def complete(task, items):
+        chunks.append(sorted(items))
+        return {
+            "a": {"recommendations": [{"action": "Send case study", "priority": "high", "timing": "Today", "method": "email"}]},
+            "b": {"recommendations": "not a list"}
+        }
+
+    batcher = SimpleNamespace(batch_size=2, complete=complete)
+    leads = [
+        (lead_id, {"lead_data": {"name": lead_id}, "lead_score": 70, "score_category": "warm"})
+        for lead_id in ["a", "b", "c"]
+    ]
+
+    async def collect():
+        return dict([item async for item in generate_batched(engine, leads, batcher)])
+
+    results = asyncio.run(collect())
+
+    assert sorted(chunks) == [["a", "b"], ["c"]]
+    assert "Send case study" in [rec["action"] for rec in results["a"]]
+    assert [rec["action"] for rec in results["b"]] == [rec["action"] for rec in results["c"]]
+    assert "Send case study" not in [rec["action"] for rec in results["b"]]
+
+
+def test_batched_recommendation_requests_fit_the_model_context(monkeypatch):
+    """Test that a full batch of realistic leads is split so prompt and answer tokens fit the model's context"""
+    monkeypatch.setattr(follow_up_engine.openai, "Client", lambda **kwargs: SimpleNamespace())
+    engine = FollowUpRecommendationEngine(db=None)
+    items = {}
+    for i in range(10):
+        lead_data = {
+            "name": f"Jordan Lee {i}",
+            "email": f"jordan{i}@example.com",
+            "company": f"Northwind Logistics {i}",
+            "role": "VP of Operations",
+            "company_size": "201-500 employees",
+            "budget": "$50,000 - $100,000 approved for this quarter",
+            "timeline": "Within the next 30 days",
+            "current_solution": "Spreadsheets and a legacy form builder we are replacing",
+            "challenge": (
+                "Our regional teams collect intake forms in three different tools and nobody can see "
+                "which leads were followed up. We lose deals because responses take days, and reporting "
+                "for the leadership meeting is assembled by hand every Monday."
+            ),
+            "competitors": "Typeform, Jotform"
+        }
+        insights, base_recommendations = engine.prepare_recommendations(lead_data, "hot", "high")
+        items[f"lead-{i}"] = {
+            "lead_score": 85,
+            "lead_data": lead_data,
+            "insights": insights,
+            "base_recommendations": base_recommendations
+        }
+
+    chunks = list(LLMBatcher(SimpleNamespace(), batch_size=10).chunks(RECOMMENDATION_TASK, items))
+
+    assert len(chunks) > 1
+    assert [item_id for chunk in chunks for item_id in chunk] == list(items)
+    for chunk in chunks:
+        body = RECOMMENDATION_TASK.request_body(chunk)
+        assert RECOMMENDATION_TASK.prompt_tokens(chunk) + body["max_tokens"] <= RECOMMENDATION_TASK.context_tokens
+
+
+def test_templates_are_filled_from_precompiled_parts(monkeypatch):
+    """Test that known placeholders are filled, others are left for the rep and missing values fall back"""
+    monkeypatch.setattr(follow_up_engine.openai, "Client", lambda **kwargs: SimpleNamespace())
+    engine = FollowUpRecommendationEngine(db=None)
+    recommendations = [
+        {"action": "Call", "timing": "Within 1 hour", "method": "call"},
+        {"action": "Email", "timing": "Immediately", "method": "email"},
+        {"action": "Connect", "timing": "This week", "method": "linkedin"},
+    ]
+    insights = {"main_challenge": None, "mentioned_competitor": False}
+
+    call, email, linkedin = engine._add_templates(recommendations, {"name": "Ann"}, insights)
+
+    assert call["template"].startswith("Hi Ann, this is {sales_rep_name} from FormFlow AI.")
+    assert "about challenge." in call["template"]
+    assert email["template"].startswith("Subject: Quick question about your challenge challenge")
+    assert "{benefit_1}" in email["template"] and "{name}" not in email["template"]
+    assert "template" not in linkedin
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from app.services import keyword_matcher
+from app.services.competitor_dictionaries import COMPETITOR_MATCHER
+from app.services.keyword_matcher import SUBSTRING, WORD, WORD_START, KeywordMatcher, RegexSet
+from app.services.lead_scoring import detect_buying_signals, need_indicator_counts
+from app.services.template_selector import TemplateSelector
+
+DICTIONARIES = {
+    "budget_ready": ["budget approved", "funded"],
+    "pain": ["frustrat", "manual process", "pain"],
+    "need": ["need", "budget"],
+}
+
+
+@pytest.fixture(params=["automaton", "trie_regex"])
+def backend(request, monkeypatch):
+    """Runs a test with the Aho-Corasick automaton and again with the trie regex"""
+    monkeypatch.setattr(keyword_matcher, "AHOCORASICK_AVAILABLE", request.param == "automaton")
+    return request.param
+
+
+def test_boundaries_and_overlapping_keywords(backend):
+    """Test that every keyword is found in one scan, within the matcher's word boundaries"""
+    text = "Our BUDGET approved last week. Frustrated by a manual-process, we needs help in Spain."
+
+    hits = KeywordMatcher(DICTIONARIES, boundary=WORD_START).scan(text)
+    assert hits.categories() == ["budget_ready", "pain", "need"]
+    assert hits.keywords("budget_ready") == ["budget approved"]
+    assert hits.keywords("pain") == ["frustrat"]
+    assert hits.keywords("need") == ["need", "budget"]
+    assert hits.position("need", "budget") == 4
+
+    assert KeywordMatcher(DICTIONARIES, boundary=WORD).scan(text).keywords("need") == ["budget"]
+    assert KeywordMatcher(DICTIONARIES, boundary=SUBSTRING).scan(text).keywords("pain") == ["frustrat", "pain"]
+    assert not KeywordMatcher(DICTIONARIES).scan("")
+    with pytest.raises(ValueError):
+        KeywordMatcher(DICTIONARIES, boundary="fuzzy")
+
+
+def test_automaton_backend_matches_trie_regex(monkeypatch):
+    """Test that the Aho-Corasick backend finds the same hits as the trie regex"""
+    text = "budget approved, frustrated, needs funding, budgeted"
+    for boundary in (SUBSTRING, WORD_START, WORD):
+        automaton_hits = KeywordMatcher(DICTIONARIES, boundary=boundary).scan(text)
+        monkeypatch.setattr(keyword_matcher, "AHOCORASICK_AVAILABLE", False)
+        regex_hits = KeywordMatcher(DICTIONARIES, boundary=boundary).scan(text)
+        monkeypatch.setattr(keyword_matcher, "AHOCORASICK_AVAILABLE", True)
+        assert automaton_hits._hits == regex_hits._hits
+    assert KeywordMatcher(DICTIONARIES)._automaton is not None
+
+
+def test_shared_matchers_at_call_sites():
+    """Test signal, competitor and template detection through the shared matchers"""
+    answers = {"notes": "Struggling with spreadsheets, we need this ASAP", "customer_count": "120"}
+    assert detect_buying_signals(answers) == ["high_urgency", "pain_points"]
+    assert need_indicator_counts(answers) == (1, 1)
+
+    # Whole words only, "customer" is not a custom solution
+    form_text = json.dumps({"current": "Excel and some pen and paper", "customer_count": 5}).lower()
+    assert COMPETITOR_MATCHER.scan(form_text).categories() == ["excel", "none"]
+
+    selection = TemplateSelector().select_template({
+        "email": "ann@example.com",
+        "company": "Acme",
+        "budget": "$50k",
+        "timeline": "Q2 2025",
+        "notes": "Evaluating vendors to replace HubSpot, CTO decision, proposal and demo"
+    })
+    assert selection["template"] == "sales_lead"
+
+    patterns = RegexSet({"budget": [r'\$[\d,]+', r'\d+k\b'], "size": [r'\d+\s*employees?']})
+    assert patterns.categories_in("about 50K for 200 Employees") == {"budget", "size"}
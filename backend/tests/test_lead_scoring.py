@@ -0,0 +1,134 @@
+import asyncio
+import json
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app.models import FormSubmission, LeadScore
+from app.services import lead_scoring, llm_batching
+from app.services.ai_reenrichment import reenrich_scores
+from app.services.lead_scoring import LeadScoringEngine
+from app.services.llm_circuit import CircuitOpen, LLMCircuitBreaker
+
+ANSWERS = {"budget": "$60k", "timeline": "Q1", "role": "VP Sales", "notes": "urgent, budget approved"}
+
+
+class StubCompletions:
+    def __init__(self, content=None):
+        self.content = content
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        if self.content is None:
+            raise RuntimeError("model unavailable")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.content))])
+
+
+def make_engine(db, monkeypatch, content=None):
+    completions = StubCompletions(content)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    monkeypatch.setattr(lead_scoring.openai, "Client", lambda **kwargs: client)
+    return LeadScoringEngine(db), completions
+
+
+@pytest.fixture
+def db(db_engine):
+    session = sessionmaker(bind=db_engine)()
+    yield session
+    session.close()
+
+
+def add_submission(db):
+    submission = FormSubmission(id=str(uuid.uuid4()), user_id="user-1", response_id="r1", answers=ANSWERS)
+    db.add(submission)
+    db.commit()
+    return uuid.UUID(submission.id)
+
+
+def history(db):
+    return db.execute(text("SELECT previous_score, new_score, change_reason FROM lead_score_history")).all()
+
+
+def test_rule_only_score_then_ai_adjustment(db, monkeypatch):
+    """Test that the fast path persists a pending score and the AI adjustment updates it with history"""
+    submission_id = add_submission(db)
+    engine, completions = make_engine(db, monkeypatch, json.dumps({"adjustment": 14, "signals": ["expansion"], "insights": {"fit": "high"}}))
+
+    score = engine.score_rules_only(submission_id, ANSWERS, user_id="user-1")
+    assert completions.calls == 0
+    assert score.ai_status == "pending"
+    assert score.buying_signals_detected == ["high_urgency", "budget_ready"]
+    assert score.final_score == score.base_score + 4
+
+    updated = asyncio.run(engine.apply_ai_adjustment(score.id))
+    assert updated.ai_status == "completed"
+    assert updated.final_score == updated.base_score + 14
+    assert updated.buying_signals_detected == ["high_urgency", "budget_ready", "expansion"]
+    assert history(db) == [(updated.base_score + 4, updated.base_score + 14, "AI adjustment")]
+
+    # Applied once only
+    assert asyncio.run(engine.apply_ai_adjustment(score.id)) is None
+    assert completions.calls == 1
+
+
+def test_ai_failure_keeps_rule_based_adjustment(db, monkeypatch):
+    """Test that a failed AI call marks the score as fallback without changing it"""
+    submission_id = add_submission(db)
+    engine, _ = make_engine(db, monkeypatch)
+
+    score = engine.score_rules_only(submission_id, ANSWERS)
+    final_score = score.final_score
+    updated = asyncio.run(engine.apply_ai_adjustment(score.id))
+
+    assert updated.ai_status == "fallback"
+    assert updated.final_score == final_score
+    assert history(db) == []
+    assert db.query(LeadScore).count() == 1
+
+
+def test_inline_ai_failure_is_saved_as_fallback_or_pending(db, monkeypatch, caplog):
+    """Test that scoring with a failed AI call saves 'fallback', and 'pending' when the circuit opened meanwhile"""
+    submission_id = add_submission(db)
+    engine, completions = make_engine(db, monkeypatch)
+    score = asyncio.run(engine.calculate_lead_score(submission_id, ANSWERS))
+    assert score.ai_status == "fallback" and completions.calls == 1
+    assert "AI scoring failed, using the rule-based adjustment: model unavailable" in caplog.messages
+    assert score.final_score == score.base_score + 4
+
+    def circuit_opened(form_data):
+        # Opened by another request after calculate_lead_score checked it
+        raise CircuitOpen("LLM circuit is open, using the fallback")
+
+    monkeypatch.setattr(engine, "_request_ai_adjustment", circuit_opened)
+    score = asyncio.run(engine.calculate_lead_score(submission_id, ANSWERS))
+    assert score.ai_status == "pending"
+    assert score.final_score == score.base_score + 4
+
+
+def test_open_circuit_scores_without_waiting_then_reenriches(db, monkeypatch):
+    """Test that an open LLM circuit leaves new scores pending and they are AI adjusted after it closes"""
+    circuit = LLMCircuitBreaker(min_calls=1, open_seconds=60)
+    monkeypatch.setattr(lead_scoring, "llm_circuit", circuit)
+    monkeypatch.setattr(llm_batching, "llm_circuit", circuit)
+    with pytest.raises(RuntimeError):
+        circuit.call(StubCompletions().create)
+    assert circuit.is_open
+
+    submission_id = add_submission(db)
+    engine, completions = make_engine(db, monkeypatch)
+    score = asyncio.run(engine.calculate_lead_score(submission_id, ANSWERS, user_id="user-1"))
+    assert score.ai_status == "pending" and completions.calls == 0
+
+    # Nothing reaches the LLM, the score stays pending instead of falling back
+    assert reenrich_scores(db) == {"completed": 0, "fallback": 1}
+    assert db.query(LeadScore).one().ai_status == "pending"
+
+    circuit.reset()
+    completions.content = json.dumps({str(score.id): {"adjustment": 10, "signals": [], "insights": {}}})
+    assert reenrich_scores(db) == {"completed": 1, "fallback": 0}
+    assert completions.calls == 1
+    assert db.query(LeadScore).one().final_score == score.base_score + 10
@@ -0,0 +1,77 @@
+import time
+
+from app.models.user import PlanType
+
+RULE = {
+    "name": "Budget",
+    "field_name": "budget",
+    "rule_type": "numeric",
+    "conditions": {"ranges": [[0, 5], [25000, 20]]},
+    "max_points": 20
+}
+
+
+def test_scoring_rules_crud(api_client):
+    """Test that a rule is created, listed, updated and deleted for the signed-in account"""
+    response = api_client.post("/api/v1/scoring/rules", json=RULE)
+
+    assert response.status_code == 201
+    rule_id = response.json()["id"]
+    assert [rule["id"] for rule in api_client.get("/api/v1/scoring/rules").json()] == [rule_id]
+
+    response = api_client.patch(f"/api/v1/scoring/rules/{rule_id}", json={"weight": 0.5})
+
+    assert response.status_code == 200
+    assert response.json()["weight"] == 0.5
+
+    assert api_client.delete(f"/api/v1/scoring/rules/{rule_id}").status_code == 204
+    assert api_client.get("/api/v1/scoring/rules").json() == []
+    assert api_client.delete(f"/api/v1/scoring/rules/{rule_id}").status_code == 404
+
+
+def test_invalid_scoring_rules_are_rejected(api_client):
+    """Test that rules which do not compile are rejected on create and update"""
+    response = api_client.post("/api/v1/scoring/rules", json={**RULE, "rule_type": "regex"})
+
+    assert response.status_code == 400
+
+    rule_id = api_client.post("/api/v1/scoring/rules", json=RULE).json()["id"]
+    response = api_client.patch(f"/api/v1/scoring/rules/{rule_id}", json={"conditions": {"operator": "~", "value": 1}})
+
+    assert response.status_code == 400
+    assert api_client.get("/api/v1/scoring/rules").json()[0]["conditions"] == RULE["conditions"]
+
+
+def test_admin_rescore_runs_in_the_background(api_client):
+    """Test that a started rescore can be polled until it completes"""
+    response = api_client.post("/api/v1/admin/leads/rescore", json={"dry_run": True})
+
+    assert response.status_code == 202
+    run_id = response.json()["run_id"]
+
+    deadline = time.monotonic() + 10
+    while True:
+        run = api_client.get(f"/api/v1/admin/leads/rescore/{run_id}").json()
+        if run["status"] in ("completed", "failed") or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+
+    assert run["status"] == "completed"
+    assert run["dry_run"] is True
+    assert api_client.get("/api/v1/admin/leads/rescore/unknown").status_code == 404
+
+
+def test_admin_rescore_requires_business_plan(api_client):
+    """Test that accounts below the business plan cannot start a rescore"""
+    api_client.user.plan_type = PlanType.PRO
+
+    response = api_client.post("/api/v1/admin/leads/rescore", json={"dry_run": True})
+
+    assert response.status_code == 403
+
+
+def test_admin_rescore_rejects_unknown_weights(api_client):
+    """Test that overrides of factors the rescorer does not know are rejected"""
+    response = api_client.post("/api/v1/admin/leads/rescore", json={"weights": {"astrology": 1.0}})
+
+    assert response.status_code == 400
@@ -0,0 +1,194 @@
+import email
+import json
+import threading
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import openai
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app.models import FormSubmission, LLMBatchJob
+from app.services import lead_scoring, llm_batch_jobs
+from app.services.llm_batching import BatchTask, LLMBatcher, LLMBatchFailed
+
+TASK = BatchTask(kind="echo", instructions="Size each lead.", output_format="size")
+
+
+class StubLLM:
+    """Local stand-in for the chat completions, files and batches endpoints"""
+
+    def __init__(self, answer):
+        self.answer = answer  # item -> answer object, None leaves the item out
+        self.completions = []
+        self.files = {}
+        self.batches = {}
+
+    def complete(self, body):
+        self.completions.append(body)
+        items = json.loads(body["messages"][-1]["content"])
+        answers = {item_id: self.answer(item) for item_id, item in items.items()}
+        content = json.dumps({item_id: answer for item_id, answer in answers.items() if answer is not None})
+        return {
+            "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}]
+        }
+
+    def finish(self, batch_id, status="completed"):
+        """Run a submitted batch like the provider would"""
+        batch = self.batches[batch_id]
+        batch["status"] = status
+        if status == "completed":
+            lines = []
+            for line in self.files[batch["input_file_id"]].decode().splitlines():
+                request = json.loads(line)
+                lines.append(json.dumps({
+                    "custom_id": request["custom_id"],
+                    "response": {"status_code": 200, "body": self.complete(request["body"])}
+                }))
+            batch["output_file_id"] = f"file-out-{batch_id}"
+            self.files[batch["output_file_id"]] = "\n".join(lines).encode()
+
+    def serve(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def reply(self, payload, content_type="application/json"):
+                body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers["Content-Length"]))
+                if self.path == "/v1/chat/completions":
+                    return self.reply(stub.complete(json.loads(raw)))
+                if self.path == "/v1/files":
+                    message = email.message_from_bytes(
+                        b"Content-Type: " + self.headers["Content-Type"].encode() + b"\r\n\r\n" + raw
+                    )
+                    parts = {part.get_param("name", header="content-disposition"): part for part in message.get_payload()}
+                    file_id = f"file-{len(stub.files)}"
+                    stub.files[file_id] = parts["file"].get_payload(decode=True)
+                    return self.reply({"id": file_id, "object": "file", "bytes": 0, "created_at": 0,
+                                       "filename": "batch.jsonl", "purpose": parts["purpose"].get_payload(), "status": "uploaded"})
+                if self.path == "/v1/batches":
+                    request = json.loads(raw)
+                    batch = {"id": f"batch-{len(stub.batches)}", "status": "in_progress", **request}
+                    stub.batches[batch["id"]] = batch
+                    return self.reply(batch)
+                self.send_error(404)
+
+            def do_GET(self):
+                parts = self.path.strip("/").split("/")
+                if parts[1] == "batches":
+                    return self.reply(stub.batches[parts[2]])
+                if parts[1] == "files" and parts[3] == "content":
+                    return self.reply(stub.files[parts[2]], "application/octet-stream")
+                self.send_error(404)
+
+        return ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+
+
+@pytest.fixture
+def llm():
+    servers = []
+
+    def start(answer):
+        stub = StubLLM(answer)
+        server = stub.serve()
+        servers.append(server)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        client = openai.Client(api_key="test", base_url=f"http://127.0.0.1:{server.server_port}/v1", max_retries=0)
+        return stub, client
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_items_are_packed_into_one_completion_per_chunk(llm):
+    """Test that a chunk of items is one request and items missing from the answer are left out"""
+    stub, client = llm(lambda item: None if item["name"] == "skip" else {"size": len(item["name"])})
+    batcher = LLMBatcher(client, batch_size=2)
+
+    results = batcher.complete(TASK, {"a": {"name": "acme"}, "b": {"name": "skip"}, "c": {"name": "globex"}})
+
+    assert results == {"a": {"size": 4}, "c": {"size": 6}}
+    assert len(stub.completions) == 2
+    assert stub.completions[0]["max_tokens"] == 2 * TASK.max_tokens_per_item
+    assert "Size each lead." in stub.completions[0]["messages"][0]["content"]
+
+
+def test_offline_batch_is_submitted_then_collected(llm):
+    """Test that chunks become lines of an uploaded batch whose results are collected once it completed"""
+    stub, client = llm(lambda item: {"size": len(item["name"])})
+    batcher = LLMBatcher(client, batch_size=2)
+    items = {"a": {"name": "acme"}, "b": {"name": "initech"}, "c": {"name": "globex"}}
+
+    batch_id = batcher.submit(TASK, items)
+
+    batch = stub.batches[batch_id]
+    assert batch["endpoint"] == "/v1/chat/completions" and batch["completion_window"] == "24h"
+    assert len(stub.files[batch["input_file_id"]].splitlines()) == 2
+    assert batcher.collect(batch_id, items) is None
+    assert not stub.completions
+
+    stub.finish(batch_id)
+    assert batcher.collect(batch_id, ["a", "c"]) == {"a": {"size": 4}, "c": {"size": 6}}
+
+    expired = batcher.submit(TASK, items)
+    stub.finish(expired, "expired")
+    with pytest.raises(LLMBatchFailed):
+        batcher.collect(expired, items)
+
+
+def test_pending_ai_adjustments_go_through_an_offline_batch(llm, monkeypatch, db_engine):
+    """Test that pending scores are batched once, then adjusted or left on the rule-based adjustment"""
+    stub, client = llm(lambda item: {"adjustment": 12, "signals": ["expansion"], "insights": {}}
+                       if item["company"] == "acme" else None)
+    batcher = LLMBatcher(client, batch_size=10)
+    monkeypatch.setattr(lead_scoring.openai, "Client", lambda **kwargs: SimpleNamespace())
+
+    db = sessionmaker(bind=db_engine)()
+
+    score_ids = {}
+    for company in ["acme", "initech", "globex"]:
+        submission = FormSubmission(id=str(uuid.uuid4()), user_id="user-1", response_id=company, answers={"company": company})
+        db.add(submission)
+        db.commit()
+        score_ids[company] = uuid.uuid4()
+        db.execute(text(
+            "INSERT INTO lead_scores (id, submission_id, base_score, ai_adjustment, final_score, score_factors, "
+            "score_category, buying_signals_detected, ai_status, calculated_at) "
+            "VALUES (:id, :submission_id, 60, 2, 62, '{}', 'warm', '[\"budget_ready\"]', :status, :at)"
+        ), {"id": score_ids[company].hex, "submission_id": uuid.UUID(submission.id).hex,
+            "status": "completed" if company == "globex" else "pending", "at": datetime(2025, 1, 1)})
+    db.commit()
+
+    job = llm_batch_jobs.submit_ai_adjustments(db, batcher)
+    assert sorted(job.item_ids) == sorted([str(score_ids["acme"]), str(score_ids["initech"])])
+    assert db.execute(text("SELECT count(*) FROM lead_scores WHERE ai_status = 'batched'")).scalar() == 2
+    # Already in a batch, not submitted again
+    assert llm_batch_jobs.submit_ai_adjustments(db, batcher) is None
+    assert llm_batch_jobs.collect_batches(db, batcher) == {"collected": 0, "failed": 0, "running": 1}
+
+    stub.finish(job.provider_batch_id)
+    assert llm_batch_jobs.collect_batches(db, batcher) == {"collected": 1, "failed": 0, "running": 0}
+    assert len(stub.completions) == 1
+
+    rows = dict(db.execute(text("SELECT id, final_score || ' ' || ai_status FROM lead_scores")).all())
+    assert rows[score_ids["acme"].hex] == "72 completed"
+    assert rows[score_ids["initech"].hex] == "62 fallback"
+    assert rows[score_ids["globex"].hex] == "62 completed"
+    assert db.query(LLMBatchJob).one().applied_count == 1
+    db.close()
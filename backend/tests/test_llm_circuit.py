@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from app.services.llm_circuit import CircuitOpen, LLMCircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def failing():
+    raise TimeoutError("provider timed out")
+
+
+def make_breaker(clock):
+    return LLMCircuitBreaker(window=10, min_calls=4, failure_rate=0.5, slow_call_seconds=5, open_seconds=30, clock=clock)
+
+
+def test_circuit_opens_on_errors_and_slow_calls_then_fails_fast():
+    """Test that failed and slow calls open the circuit and calls then raise without reaching the LLM"""
+    clock = Clock()
+    breaker = make_breaker(clock)
+    calls = []
+
+    def slow():
+        calls.append("slow")
+        clock.now += 6
+        return "late answer"
+
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.call(slow) == "late answer"
+    with pytest.raises(TimeoutError):
+        breaker.call(failing)
+    assert breaker.state == "closed"  # 3 calls, below min_calls
+
+    with pytest.raises(TimeoutError):
+        breaker.call(failing)
+    assert breaker.state == "open" and breaker.is_open
+
+    with pytest.raises(CircuitOpen):
+        breaker.call(slow)
+    assert calls == ["slow"]
+    assert breaker.stats()["failure_rate"] == 0.75
+
+
+def test_half_open_probe_closes_the_circuit_and_notifies():
+    """Test that after the open period one probe goes through, a failed probe reopens, a good one closes"""
+    clock = Clock()
+    breaker = make_breaker(clock)
+    closed = []
+    breaker.on_close(lambda: closed.append(clock.now))
+    for _ in range(4):
+        with pytest.raises(TimeoutError):
+            breaker.call(failing)
+
+    clock.now += 30
+    assert breaker.state == "half_open" and not breaker.is_open
+    with pytest.raises(TimeoutError):
+        breaker.call(failing)
+    assert breaker.is_open
+
+    clock.now += 30
+
+    async def probe():
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def concurrent_calls():
+        return await asyncio.gather(breaker.acall(probe), breaker.acall(probe), return_exceptions=True)
+
+    first, second = asyncio.run(concurrent_calls())
+    assert first == "answer" and isinstance(second, CircuitOpen)
+    assert breaker.state == "closed"
+    assert closed == [60]
+    assert breaker.call(lambda: "ok") == "ok"
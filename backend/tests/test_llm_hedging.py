@@ -0,0 +1,123 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from app.services.llm_circuit import LLMCircuitBreaker
+from app.services.llm_hedging import (
+    DeadlineExceeded, HedgedRequester, call_within_deadline, llm_deadline, remaining_time
+)
+
+
+def make_requester(**kwargs):
+    return HedgedRequester(enabled=True, min_samples=3, window=20, circuit=LLMCircuitBreaker(window=10, min_calls=4), **kwargs)
+
+
+def test_deadline_cancels_the_request_without_counting_a_failure():
+    """Test that a request still running at the deadline is cancelled, nested deadlines only tighten"""
+    requester = make_requester(max_hedge_rate=0.5)
+    cancelled = []
+
+    async def hanging():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def run():
+        with llm_deadline(0.05):
+            with llm_deadline(5):
+                assert remaining_time() <= 0.05
+            with pytest.raises(DeadlineExceeded):
+                await requester.request(hanging)
+            await asyncio.sleep(0.06)
+            with pytest.raises(DeadlineExceeded):
+                await requester.request(hanging)
+        assert remaining_time() is None
+
+    asyncio.run(run())
+    assert cancelled == [True]
+    assert requester.circuit.stats()["recent_calls"] == 0
+    assert requester.stats()["recent_requests"] == 1
+
+
+def test_slow_request_is_hedged_within_the_budget():
+    """Test that a request slower than the p95 gets a duplicate that wins, until the hedge budget is used"""
+    requester = make_requester(max_hedge_rate=0.2)
+    attempts = []
+
+    async def answer(delay, label):
+        attempts.append(label)
+        await asyncio.sleep(delay)
+        return label
+
+    async def first_slow(label):
+        # Only the first attempt of a request is slow
+        delay = 10 if attempts.count(label) == 0 else 0.01
+        return await answer(delay, label)
+
+    async def run():
+        for i in range(4):
+            assert await requester.request(answer, 0.01, f"fast-{i}") == f"fast-{i}"
+        assert requester.hedge_delay() is not None
+
+        assert await requester.request(first_slow, "hedged") == "hedged"
+        assert attempts.count("hedged") == 2
+
+        # 1 hedge in 5 requests, another would exceed the 20% budget
+        with llm_deadline(0.3):
+            with pytest.raises(DeadlineExceeded):
+                await requester.request(first_slow, "over-budget")
+        assert attempts.count("over-budget") == 1
+
+    asyncio.run(run())
+    assert requester.stats()["recent_requests"] == 6
+    assert requester.stats()["hedge_rate"] == pytest.approx(1 / 6)
+
+
+class StubClient:
+    """Chat completions client recording the options of every request, timing out when told to"""
+
+    def __init__(self, times_out=False):
+        self.times_out = times_out
+        self.options = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def with_options(self, **options):
+        self.options.append(options)
+        return self
+
+    def create(self, **request):
+        if self.times_out:
+            raise openai.APITimeoutError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+        return request["model"]
+
+
+def test_blocking_requests_are_bounded_by_the_deadline():
+    """Test that a blocking request, also from a worker thread, gets the remaining time as timeout without retries"""
+    circuit = LLMCircuitBreaker(window=10, min_calls=1)
+
+    client = StubClient()
+    assert call_within_deadline(client, circuit, model="gpt-4") == "gpt-4"
+    assert client.options == []
+
+    async def run():
+        with llm_deadline(5):
+            return await asyncio.to_thread(call_within_deadline, client, circuit, model="gpt-4")
+
+    assert asyncio.run(run()) == "gpt-4"
+    (options,) = client.options
+    assert 4 < options["timeout"] <= 5 and options["max_retries"] == 0
+
+    # Cut off by the deadline, which does not count against the provider
+    with llm_deadline(0.5):
+        with pytest.raises(DeadlineExceeded):
+            call_within_deadline(StubClient(times_out=True), circuit, model="gpt-4")
+    with llm_deadline(-1):
+        with pytest.raises(DeadlineExceeded):
+            call_within_deadline(client, circuit, model="gpt-4")
+    assert len(client.options) == 1
+    assert circuit.stats()["recent_calls"] == 2 and circuit.stats()["failure_rate"] == 0
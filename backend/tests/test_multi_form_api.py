@@ -0,0 +1,170 @@
+import json
+import uuid
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.endpoints import multi_form
+from app.models.multi_form_dashboard import AggregatedRecord, AggregationJob, MultiFormDashboard
+from app.services.aggregation_engine import encode_cursor
+from app.services.aggregation_scheduler import AggregationScheduler
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    """Scheduler without workers, so queued jobs stay pending"""
+    scheduler = AggregationScheduler(max_concurrency=0, process_workers=0)
+    monkeypatch.setattr(multi_form, "aggregation_scheduler", scheduler)
+    return scheduler
+
+
+@pytest.fixture
+def db(api_client, db_engine):
+    # sqlite binds UUID columns from UUID objects only, postgres takes the string id as well
+    api_client.user.id = uuid.UUID(api_client.user.id)
+    session = sessionmaker(bind=db_engine)()
+    yield session
+    session.close()
+
+
+def make_dashboard(db, user_id, records=None, **values):
+    dashboard = MultiFormDashboard(user_id=user_id, name="Leads", aggregation_config={}, **values)
+    db.add(dashboard)
+    db.commit()
+
+    if records is not None:
+        run_id = uuid.uuid4()
+        db.add_all(
+            AggregatedRecord(dashboard_id=dashboard.id, run_id=run_id, row_number=i, data=record)
+            for i, record in enumerate(records)
+        )
+        dashboard.cached_data = {"metrics": {}, "metadata": {"run_id": str(run_id)}}
+        db.commit()
+
+    return dashboard
+
+
+def test_aggregate_queues_a_job_to_poll(api_client, db, scheduler):
+    """Test that aggregating without cached results returns a pending job that can be polled"""
+    dashboard = make_dashboard(db, api_client.user.id)
+
+    response = api_client.post(f"/api/v1/multi-dashboards/{dashboard.id}/aggregate")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "pending"
+    job_id = response.json()["job_id"]
+
+    response = api_client.get(f"/api/v1/multi-dashboards/{dashboard.id}/jobs/{job_id}")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "pending"
+    assert response.json()["priority"] == "interactive"
+
+
+def test_aggregate_of_another_users_dashboard_is_not_found(api_client, db, scheduler):
+    """Test that a dashboard of another user cannot be aggregated"""
+    dashboard = make_dashboard(db, uuid.uuid4())
+
+    response = api_client.post(f"/api/v1/multi-dashboards/{dashboard.id}/aggregate")
+
+    assert response.status_code == 404
+    assert db.query(AggregationJob).count() == 0
+
+
+def test_cancel_job_once(api_client, db, scheduler):
+    """Test that a pending job is cancelled and cancelling it again conflicts"""
+    dashboard = make_dashboard(db, api_client.user.id)
+    job_id = api_client.post(f"/api/v1/multi-dashboards/{dashboard.id}/aggregate").json()["job_id"]
+
+    response = api_client.delete(f"/api/v1/multi-dashboards/{dashboard.id}/jobs/{job_id}")
+
+    assert response.status_code == 200
+    assert api_client.get(f"/api/v1/multi-dashboards/{dashboard.id}/jobs/{job_id}").json()["status"] == "cancelled"
+
+    response = api_client.delete(f"/api/v1/multi-dashboards/{dashboard.id}/jobs/{job_id}")
+
+    assert response.status_code == 409
+
+
+def test_records_are_paged_with_a_cursor(api_client, db):
+    """Test that records are served in pages linked by next_cursor"""
+    dashboard = make_dashboard(db, api_client.user.id, records=[{"n": i} for i in range(3)])
+
+    first = api_client.get(f"/api/v1/multi-dashboards/{dashboard.id}/records", params={"limit": 2}).json()
+    second = api_client.get(
+        f"/api/v1/multi-dashboards/{dashboard.id}/records",
+        params={"limit": 2, "cursor": first["next_cursor"]}
+    ).json()
+
+    assert first["records"] == [{"n": 0}, {"n": 1}]
+    assert first["has_more"] is True
+    assert second["records"] == [{"n": 2}]
+    assert second["has_more"] is False
+
+
+def test_records_cursor_of_a_previous_run_is_gone(api_client, db):
+    """Test that a cursor from an earlier aggregation run is rejected with 410"""
+    dashboard = make_dashboard(db, api_client.user.id, records=[{"n": 0}])
+
+    response = api_client.get(
+        f"/api/v1/multi-dashboards/{dashboard.id}/records",
+        params={"cursor": encode_cursor(uuid.uuid4(), 0)}
+    )
+
+    assert response.status_code == 410
+
+
+def test_records_before_aggregation_are_not_found(api_client, db):
+    """Test that a dashboard without an aggregation run has no records"""
+    dashboard = make_dashboard(db, api_client.user.id)
+
+    assert api_client.get(f"/api/v1/multi-dashboards/{dashboard.id}/records").status_code == 404
+    assert api_client.get(f"/api/v1/multi-dashboards/{dashboard.id}/records/stream").status_code == 404
+
+
+def test_records_stream_as_ndjson(api_client, db):
+    """Test that every record of the current run is streamed as one JSON line"""
+    dashboard = make_dashboard(db, api_client.user.id, records=[{"n": i} for i in range(3)])
+
+    response = api_client.get(f"/api/v1/multi-dashboards/{dashboard.id}/records/stream")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == [{"n": 0}, {"n": 1}, {"n": 2}]
+
+
+def test_public_records_by_share_token(api_client, db):
+    """Test that records of a public dashboard are served by share token only"""
+    make_dashboard(db, uuid.uuid4(), records=[{"n": 0}], is_public=True, share_token="shared")
+
+    response = api_client.get("/api/v1/multi-dashboards/public/shared/records")
+
+    assert response.status_code == 200
+    assert response.json()["records"] == [{"n": 0}]
+    assert api_client.get("/api/v1/multi-dashboards/public/unknown/records").status_code == 404
+
+
+def test_timeseries_of_a_dashboard_without_forms(api_client, db):
+    """Test that a dashboard without form mappings has an empty time series"""
+    dashboard = make_dashboard(db, api_client.user.id)
+
+    response = api_client.get(
+        f"/api/v1/multi-dashboards/{dashboard.id}/timeseries",
+        params={"start": "2026-01-01T00:00:00", "end": "2026-01-03T00:00:00"}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["granularity"] == "hour"
+    assert response.json()["total"] == 0
+
+
+def test_timeseries_range_must_be_ordered(api_client, db):
+    """Test that a range starting after its end is rejected"""
+    dashboard = make_dashboard(db, api_client.user.id)
+
+    response = api_client.get(
+        f"/api/v1/multi-dashboards/{dashboard.id}/timeseries",
+        params={"start": "2026-01-03T00:00:00", "end": "2026-01-01T00:00:00"}
+    )
+
+    assert response.status_code == 400
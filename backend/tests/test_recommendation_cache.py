@@ -0,0 +1,50 @@
+import uuid
+
+from app.core.cache import CacheManager, MemoryBackend
+from app.models.lead_score import LeadScore
+from app.services import recommendation_cache as recommendation_cache_module
+from app.services.recommendation_cache import RecommendationCache, recommendation_key
+from app.services.submission_features import extract_submission_features
+
+ANSWERS = {"name": "Ann", "company": "Acme", "budget": "$60k", "timeline": "ASAP"}
+RECOMMENDATIONS = [{"action": "Call immediately", "priority": "high", "timing": "Within 1 hour", "method": "call"}]
+
+
+def local_cache():
+    return RecommendationCache(CacheManager(MemoryBackend(max_entries=100)).namespace("recommendations"))
+
+
+def test_key_changes_with_every_input(monkeypatch):
+    """Test that answers, score, category, urgency and the engine version change the key"""
+    features = extract_submission_features(ANSWERS)
+    key = recommendation_key(ANSWERS, 80, "hot", "urgent", features)
+    assert recommendation_key(dict(reversed(list(ANSWERS.items()))), 80, "hot", "urgent", features) == key
+
+    assert recommendation_key(dict(ANSWERS, timeline="next year"), 80, "hot", "urgent", features) != key
+    assert recommendation_key(ANSWERS, 65, "hot", "urgent", features) != key
+    assert recommendation_key(ANSWERS, 80, "warm", "urgent", features) != key
+    assert recommendation_key(ANSWERS, 80, "hot", "medium", features) != key
+
+    monkeypatch.setattr(recommendation_cache_module, "ENGINE_VERSION", recommendation_cache_module.ENGINE_VERSION + 1)
+    assert recommendation_key(ANSWERS, 80, "hot", "urgent", features) != key
+
+
+def test_recommendations_served_from_cache_then_score_row():
+    """Test that stored recommendations are served under their key only, from either tier"""
+    lead_score = LeadScore(id=uuid.uuid4(), final_score=80, score_category="hot")
+    key = recommendation_key(ANSWERS, 80, "hot")
+    cache = local_cache()
+
+    assert cache.get(lead_score, key) is None
+    cache.put(lead_score, key, RECOMMENDATIONS)
+    assert lead_score.recommendations_key == key
+    assert cache.get(lead_score, key) == RECOMMENDATIONS
+
+    # Another process with an empty cache reads the row and warms its cache
+    cold = local_cache()
+    assert cold.get(lead_score, key) == RECOMMENDATIONS
+    lead_score.recommendations = None
+    assert cold.get(lead_score, key) == RECOMMENDATIONS
+
+    # Re-scored lead, new key
+    assert cache.get(lead_score, recommendation_key(ANSWERS, 60, "warm")) is None
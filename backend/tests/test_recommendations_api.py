@@ -0,0 +1,44 @@
+import json
+import uuid
+from types import SimpleNamespace
+
+from sqlalchemy.orm import sessionmaker
+
+from app.models import FormSubmission
+from app.models.lead_score import LeadScore
+from app.services import follow_up_engine
+
+
+def test_bulk_recommendations_stream_one_line_per_lead(api_client, db_engine, monkeypatch):
+    """Test that each requested lead gets one NDJSON line, unknown leads first"""
+    # The AI enhancement fails offline, the base recommendations are served
+    monkeypatch.setattr(follow_up_engine.openai, "Client", lambda **kwargs: SimpleNamespace())
+    db = sessionmaker(bind=db_engine)()
+    submission = FormSubmission(
+        user_id=api_client.user.id,
+        answers={"budget": "$150k", "timeline": "ASAP", "role": "CEO"}
+    )
+    db.add(submission)
+    db.commit()
+    db.add(LeadScore(
+        submission_id=uuid.UUID(submission.id), base_score=80, final_score=80, score_factors={}, score_category="hot"
+    ))
+    db.commit()
+    unknown = uuid.uuid4()
+
+    response = api_client.post(
+        "/api/v1/leads/recommendations/bulk",
+        json={"lead_ids": [str(unknown), submission.id, submission.id]}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [(line["lead_id"], line["status"]) for line in lines] == [
+        (str(unknown), "not_found"),
+        (submission.id, "completed")
+    ]
+    assert lines[0]["recommendations"] == []
+    assert lines[1]["recommendations"]
+    assert all(rec["template"] is None for rec in lines[1]["recommendations"])
+    db.close()
@@ -0,0 +1,95 @@
+import pytest
+from app.services.record_join import HashJoinAggregator
+
+
+CRM_FORM = [
+    {"email": "ann@example.com", "score": 4, "company": "Acme", "_submitted_at": "2025-01-01T10:00:00", "_source_id": "a1"},
+    {"email": "bob@example.com", "score": 2, "_submitted_at": "2025-01-02T10:00:00", "_source_id": "a2"},
+]
+
+SURVEY_FORM = [
+    {"email": " Ann@Example.com", "score": 8, "company": "Acme Corp", "_submitted_at": "2025-01-03T10:00:00", "_source_id": "b1"},
+    {"email": None, "score": 5, "_submitted_at": "2025-01-03T11:00:00", "_source_id": "b2"},
+]
+
+
+def run_join(conflict_resolution="latest", join_type="outer"):
+    joiner = HashJoinAggregator("email", conflict_resolution=conflict_resolution, join_type=join_type)
+    joiner.add_source(CRM_FORM, source_title="CRM", priority=10)
+    joiner.add_source(SURVEY_FORM, source_title="Survey", priority=1)
+    return {record.get("_join_key"): record for record in joiner.results()}
+
+
+def test_join_merges_records_on_normalized_key():
+    """Test that records sharing an email are merged into one"""
+    results = run_join()
+    ann = results["ann@example.com"]
+    assert ann["_sources"] == ["CRM", "Survey"]
+    assert ann["_source_ids"] == ["a1", "b1"]
+    assert ann["_record_count"] == 2
+
+
+def test_join_latest_resolution():
+    """Test that the most recent submission wins field conflicts"""
+    ann = run_join("latest")["ann@example.com"]
+    assert ann["score"] == 8
+    assert ann["company"] == "Acme Corp"
+    assert ann["_submitted_at"] == "2025-01-03T10:00:00"
+
+
+def test_join_priority_resolution():
+    """Test that the highest priority source wins field conflicts"""
+    ann = run_join("priority")["ann@example.com"]
+    assert ann["score"] == 4
+    assert ann["company"] == "Acme"
+
+
+def test_join_average_resolution():
+    """Test that numeric fields are averaged and text falls back to latest"""
+    ann = run_join("average")["ann@example.com"]
+    assert ann["score"] == 6
+    assert ann["company"] == "Acme Corp"
+
+
+def test_join_average_of_mixed_values_falls_back_to_latest():
+    """Test that a field with numeric and text values is resolved by its latest value only"""
+    joiner = HashJoinAggregator("email", conflict_resolution="average")
+    joiner.add_source([
+        {"email": "ann@example.com", "budget": 10, "_submitted_at": "2025-01-01"},
+        {"email": "ann@example.com", "budget": "n/a", "_submitted_at": "2025-01-02"},
+        {"email": "ann@example.com", "budget": 30, "_submitted_at": "2025-01-03"},
+        {"email": "bob@example.com", "budget": "n/a", "_submitted_at": "2025-01-01"},
+        {"email": "bob@example.com", "budget": 20, "_submitted_at": "2025-01-02"},
+    ], source_title="CRM")
+
+    results = {record["_join_key"]: record for record in joiner.results()}
+
+    assert results["ann@example.com"]["budget"] == 30
+    assert results["bob@example.com"]["budget"] == 20
+
+
+def test_outer_join_keeps_unmatched_records():
+    """Test that outer joins keep records without a join key"""
+    results = run_join(join_type="outer")
+    assert len(results) == 3
+    assert results[None]["_form_source"] == "Survey"
+
+
+def test_inner_join_only_keeps_keys_in_every_source():
+    """Test that inner joins drop keys missing from a source"""
+    results = run_join(join_type="inner")
+    assert list(results) == ["ann@example.com"]
+
+
+def test_join_requires_key():
+    """Test that a join key is mandatory"""
+    with pytest.raises(ValueError):
+        HashJoinAggregator("")
+
+
+def test_join_keeps_empty_field_names():
+    """Test that a record with an empty answer key is merged instead of failing"""
+    joiner = HashJoinAggregator("email")
+    joiner.add_source([{"email": "ann@example.com", "": "untitled question"}], source_title="CRM")
+    (ann,) = joiner.results()
+    assert ann[""] == "untitled question"
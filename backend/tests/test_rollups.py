@@ -0,0 +1,126 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import FormSubmission, Dashboard, SubmissionRollup
+from app.services.rollup_service import SubmissionRollupService, choose_granularity
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(
+        engine,
+        tables=[FormSubmission.__table__, Dashboard.__table__, SubmissionRollup.__table__]
+    )
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def add_submission(db, submitted_at, typeform_id="form_a", user_id="user_1", answers=None):
+    submission = FormSubmission(
+        user_id=user_id,
+        typeform_id=typeform_id,
+        response_id=f"resp_{typeform_id}_{submitted_at.isoformat()}",
+        submitted_at=submitted_at,
+        answers=answers or {}
+    )
+    db.add(submission)
+    db.commit()
+    return submission
+
+
+def test_record_submission_updates_form_and_user_buckets(db):
+    """Test that ingest increments hourly and daily buckets for form and user"""
+    service = SubmissionRollupService(db)
+
+    for minute in (5, 40):
+        submission = add_submission(db, datetime(2025, 1, 1, 10, minute), answers={"score": 4, "name": "Ann"})
+        service.record_submission(submission)
+
+    rollups = db.query(SubmissionRollup).all()
+    assert len(rollups) == 4  # form/user x hour/day
+
+    hourly = db.query(SubmissionRollup).filter_by(scope_type="form", granularity="hour").one()
+    assert hourly.bucket_start == datetime(2025, 1, 1, 10)
+    assert hourly.submission_count == 2
+    assert hourly.numeric_sums == {"score": 8.0}
+    assert hourly.numeric_counts == {"score": 2}
+
+
+def test_late_submission_lands_in_its_own_bucket(db):
+    """Test that a late webhook is bucketed by submitted_at, not arrival time"""
+    service = SubmissionRollupService(db)
+    service.record_submission(add_submission(db, datetime(2025, 1, 3, 9)))
+    service.record_submission(add_submission(db, datetime(2025, 1, 1, 23)))
+
+    series = service.get_time_series(
+        "form", ["form_a"], datetime(2025, 1, 1), datetime(2025, 1, 3), granularity="day"
+    )
+    assert [point["count"] for point in series["points"]] == [1, 0, 1]
+    assert series["total"] == 2
+
+
+def test_time_series_merges_forms_and_template_counts(db):
+    """Test merging several forms and template type breakdowns"""
+    service = SubmissionRollupService(db)
+    first = add_submission(db, datetime(2025, 2, 1, 8), typeform_id="form_a")
+    second = add_submission(db, datetime(2025, 2, 1, 9), typeform_id="form_b")
+    for submission in (first, second):
+        service.record_submission(submission)
+    service.record_template_type(first, "lead_score")
+    service.record_template_type(second, "generic")
+
+    series = service.get_time_series(
+        "form", ["form_a", "form_b"], datetime(2025, 2, 1), datetime(2025, 2, 1, 23, 59), granularity="day"
+    )
+    assert len(series["points"]) == 1
+    assert series["points"][0]["count"] == 2
+    assert series["points"][0]["template_counts"] == {"lead_score": 1, "generic": 1}
+
+
+def test_rebuild_range_recomputes_from_raw_submissions(db):
+    """Test late-arrival correction by rebuilding buckets from raw rows"""
+    service = SubmissionRollupService(db)
+    # Stored without going through the ingest hook
+    add_submission(db, datetime(2025, 3, 1, 12), answers={"score": 3})
+    add_submission(db, datetime(2025, 3, 1, 13), answers={"score": 5})
+
+    total = service.rebuild_range("form", "form_a", datetime(2025, 3, 1), datetime(2025, 3, 1))
+    assert total == 2
+
+    daily = db.query(SubmissionRollup).filter_by(scope_type="form", granularity="day").one()
+    assert daily.submission_count == 2
+    assert daily.numeric_sums == {"score": 8.0}
+
+
+def test_rebuild_range_buckets_submissions_without_submitted_at_by_created_at(db):
+    """Test that a rebuild keeps submissions the ingest hook bucketed by their created_at"""
+    service = SubmissionRollupService(db)
+    submission = FormSubmission(
+        user_id="user_1", typeform_id="form_a", response_id="resp_no_submitted_at",
+        created_at=datetime(2025, 3, 1, 9, 30), answers={}
+    )
+    db.add(submission)
+    db.commit()
+    service.record_submission(submission)
+    add_submission(db, datetime(2025, 3, 1, 12))
+
+    assert service.rebuild_range("form", "form_a", datetime(2025, 3, 1), datetime(2025, 3, 1)) == 2
+    hours = db.query(SubmissionRollup).filter_by(scope_type="form", granularity="hour").order_by(
+        SubmissionRollup.bucket_start
+    ).all()
+    assert [(h.bucket_start, h.submission_count) for h in hours] == [
+        (datetime(2025, 3, 1, 9), 1),
+        (datetime(2025, 3, 1, 12), 1),
+    ]
+
+
+def test_choose_granularity():
+    """Test automatic granularity selection"""
+    now = datetime(2025, 1, 10)
+    assert choose_granularity(now - timedelta(days=2), now) == "hour"
+    assert choose_granularity(now - timedelta(days=90), now) == "day"
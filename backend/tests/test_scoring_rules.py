@@ -0,0 +1,79 @@
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app.services.scoring_rules import RulePlanCache, compile_rule, compile_rules, parse_number
+
+
+def make_rule(name, field_name, rule_type, conditions, max_points, weight=1.0):
+    return SimpleNamespace(
+        id=name, name=name, field_name=field_name, rule_type=rule_type,
+        conditions=conditions, max_points=max_points, weight=weight
+    )
+
+
+RULES = [
+    make_rule("Budget", "budget", "numeric", {"ranges": [[0, 5], [100000, 40], [25000, 20]]}, 40),
+    make_rule("Large team", "team", "numeric", {"operator": ">=", "value": 50}, 10, weight=0.5),
+    make_rule("Urgency", "notes", "text", {"contains": ["ASAP", "urgent"]}, 15),
+    make_rule("Plan", "plan", "select", {"options": {"Enterprise": 20, "Pro": 8}}, 20),
+    make_rule("Newsletter", "newsletter", "boolean", {"equals": True}, 5),
+]
+
+
+def test_rule_plan_scores_submissions():
+    """Test that a compiled plan scores each rule type and sums weighted points"""
+    plan = compile_rules(RULES)
+
+    score = plan.evaluate({
+        "budget": "$30k", "team": "120 people", "notes": "Need this asap!", "plan": " enterprise", "newsletter": True
+    })
+    assert score.total == 20 + 5 + 15 + 20 + 5
+    assert score.factors["Large team"] == {"value": 10, "weight": 0.5}
+
+    scores = plan.evaluate_many([{"budget": "2m"}, {"budget": "n/a", "newsletter": "no"}, None])
+    assert [score.total for score in scores] == [40, 0, 0]
+
+
+def test_invalid_rules_are_rejected_or_skipped():
+    """Test that invalid rules fail to compile and are left out of a plan"""
+    bad = make_rule("Bad", "budget", "numeric", {"operator": "~", "value": 1}, 10)
+    with pytest.raises(ValueError):
+        compile_rule(bad)
+    with pytest.raises(ValueError):
+        compile_rule(make_rule("Odd", "x", "regex", {}, 1))
+
+    plan = compile_rules([bad, RULES[2]])
+    assert plan.rule_names == ["Urgency"]
+    assert compile_rules([bad]) is None
+    assert parse_number("about 1,500.5k users") == 1500500
+
+
+def test_plan_cache_recompiles_when_rules_change(db_engine):
+    """Test that a tenant's plan is reused until one of its rules changes"""
+    db = sessionmaker(bind=db_engine)()
+
+    def add_rule(name, updated_at):
+        db.execute(text(
+            "INSERT INTO scoring_rules (id, user_id, name, field_name, rule_type, conditions, weight, max_points, is_active, created_at, updated_at) "
+            "VALUES (:id, 'user-1', :name, 'notes', 'text', '{\"contains\": [\"urgent\"]}', 1.0, 10, 1, :at, :at)"
+        ), {"id": uuid.uuid4().hex, "name": name, "at": updated_at})
+        db.commit()
+
+    cache = RulePlanCache(check_ttl=0)
+    assert cache.get(db, "user-1") is None
+
+    add_rule("Urgency", datetime(2025, 1, 1))
+    plan = cache.get(db, "user-1")
+    assert plan.rule_names == ["Urgency"]
+    assert cache.get(db, "user-1") is plan
+    assert cache.get(db, "user-2") is None
+
+    db.execute(text("UPDATE scoring_rules SET is_active = 0, updated_at = :at"), {"at": datetime(2025, 1, 2)})
+    db.commit()
+    assert cache.get(db, "user-1") is None
+    db.close()
@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+from app.services import lead_scoring
+from app.services.crm_export import CRMExportService, lead_from_submission
+from app.services.follow_up_engine import FollowUpRecommendationEngine
+from app.services.lead_scoring import LeadScoringEngine
+from app.services.submission_features import (
+    FEATURES_VERSION,
+    SubmissionFeatures,
+    extract_submission_features,
+    features_for
+)
+
+ANSWERS = {
+    "company": "Acme Company",
+    "budget": "$60k",
+    "timeline": "ASAP",
+    "role": "VP Sales",
+    "employees": "200-500",
+    "annual_revenue": "$12M",
+    "notes": "Frustrated with our spreadsheet, we need this urgently"
+}
+
+
+def test_features_extracted_once_and_round_trip():
+    """Test that every feature is parsed from the answers and survives JSON storage"""
+    features = extract_submission_features(ANSWERS)
+
+    assert features.template_type == "lead_score"
+    assert features.budget_amount == 60000
+    assert (features.timeline, features.authority, features.company_size) == ("immediate", "decision_maker", "mid_market")
+    assert (features.employee_count, features.revenue) == (200, "$12M")
+    assert (features.pain_count, features.need_count) == (1, 1)
+    assert features.signals == ["high_urgency", "pain_points"]
+    assert features.competitors == ["excel"]
+
+    assert features_for(ANSWERS, features.to_dict()) == features
+    assert extract_submission_features(None) == SubmissionFeatures()
+
+
+def test_stored_features_are_read_instead_of_the_answers(monkeypatch):
+    """Test that scoring, recommendations and CRM exports consume stored features"""
+    monkeypatch.setattr(lead_scoring.openai, "Client", lambda **kwargs: SimpleNamespace())
+    stored = extract_submission_features(ANSWERS).to_dict()
+    stored.update(budget_amount=150000, timeline="q4", competitors=["hubspot"], employee_count=42)
+    features = features_for(ANSWERS, stored)
+
+    engine = LeadScoringEngine(db=None)
+    base_score, factors = engine._default_base_score(features)
+    assert factors["budget"]["value"] == 30
+    assert factors["timeline"]["value"] == lead_scoring.TIMELINE_SCORES["q4"]
+
+    insights = FollowUpRecommendationEngine(db=None)._analyze_lead(ANSWERS, features)
+    assert insights["competitors"] == ["hubspot"] and insights["is_decision_maker"]
+
+    submission = SimpleNamespace(id="s1", answers=ANSWERS, features=stored, created_at=None)
+    row = next(CRMExportService(None).iter_rows([(lead_from_submission(submission), None)], crm_type="generic"))
+    assert (row["Company_Size"], row["Annual_Revenue"]) == ("42", "$12M")
+    assert "submission_features" not in row
+
+    # Features of an older extractor are parsed again
+    outdated = dict(stored, version=FEATURES_VERSION - 1)
+    assert features_for(ANSWERS, outdated).budget_amount == 60000
+    assert "submission_features" not in lead_from_submission(SimpleNamespace(**dict(vars(submission), features=outdated)))
@@ -171,7 +171,7 @@ def test_typeform_webhook_duplicate_submission():
 
 def test_template_type_detection():
     """Test automatic template type detection"""
-    from app.api.v1.webhooks import detect_template_type
+    from app.services.submission_features import detect_template_type
     
     # Test diet plan detection
     diet_answers = {